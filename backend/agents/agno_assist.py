@@ -2,19 +2,17 @@ from textwrap import dedent
 
 from agno.agent import Agent
 from agno.knowledge import Knowledge
-from agno.knowledge.embedder.ollama import OllamaEmbedder
-from agno.models.ollama import Ollama
-from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.vectordb.pgvector import PgVector, SearchType
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_EMBEDDER_MODEL_ID, OLLAMA_MODEL_ID
-from db.session import db_url, get_postgres_db
+from app.models import get_embedder, get_model
+from db.session import db_engine, db_url, get_postgres_db
+from tools.duckduckgo import DuckDuckGoTools
 
 agno_assist = Agent(
     id="agno-assist",
     name="Agno Assist",
     # model=OpenAIChat(id=OPENAI_MODEL_ID),
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(parallel_tool_calls=True),
     # Tools available to the agent
     tools=[DuckDuckGoTools()],
     # Description of the agent
@@ -40,6 +38,8 @@ agno_assist = Agent(
         - Use the `search_knowledge_base` tool to iteratively gather information.
         - Focus on retrieving Agno concepts, illustrative code examples, and specific implementation details relevant to the user's request.
         - Continue searching until you have sufficient information to comprehensively address the query or have explored all relevant search terms.
+        - Independent searches (several knowledge base terms, or a knowledge base search plus a web search)
+          can be requested together in one turn; they run at the same time.
 
         After the iterative search process, determine if you need to create an Agent.
 
@@ -79,12 +79,10 @@ agno_assist = Agent(
         contents_db=get_postgres_db(),
         vector_db=PgVector(
             db_url=db_url,
+            db_engine=db_engine,
             table_name="agno_assist_knowledge",
             search_type=SearchType.hybrid,
-            embedder=OllamaEmbedder(
-                id=OLLAMA_EMBEDDER_MODEL_ID,
-                host=OLLAMA_BASE_URL,
-            ),
+            embedder=get_embedder(),
         ),
     ),
     # Give the agent a tool to search the knowledge base (this is True by default but set here for clarity)
@@ -1,12 +1,11 @@
 from agno.agent import Agent
-from agno.models.ollama import Ollama
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_MODEL_ID
+from app.models import get_model
 
 agno_simple = Agent(
     id="agno-simple",
     name="Agno Simple Agent",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(cache_namespace="agno-simple", semantic_cache=True),
     # Description of the agent
     # Defines agent identity/persona. Start of system message
     description="You are a helpful assistant. All your responses must be brief and concise.",
@@ -1,16 +1,15 @@
 from textwrap import dedent
 
 from agno.agent import Agent
-from agno.models.ollama import Ollama
-from agno.tools.duckduckgo import DuckDuckGoTools
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_MODEL_ID
+from app.models import get_model
 from db.session import get_postgres_db
+from tools.duckduckgo import DuckDuckGoTools
 
 web_agent = Agent(
     id="web-search-agent",
     name="Web Search Agent",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(parallel_tool_calls=True),
     # Tools available to the agent
     tools=[DuckDuckGoTools()],
     # Description of the agent
@@ -26,6 +25,7 @@ web_agent = Agent(
             1. Understand and Search:
             - Carefully analyze the user's query to identify 1-3 *precise* search terms.
             - Use the `duckduckgo_search` tool to gather relevant information. Prioritize reputable and recent sources.
+            - When you need several searches, request them together in one turn; they run at the same time.
             - Cross-reference information from multiple sources to ensure accuracy.
             - If initial searches are insufficient or yield conflicting information, refine your search terms or acknowledge the limitations/conflicts in your response.
 
@@ -0,0 +1,12 @@
+"""
+AgentOS application package.
+
+Loads .env before anything else in the package is imported: the settings singletons (db.engine's
+PoolSettings, the registry's, the jobs queue's, ...) read the environment when their modules are
+imported, and both entry points, app.main and app.worker, import this package first. compose.yaml
+only passes the DB_* variables to the containers; the rest comes from the mounted .env.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
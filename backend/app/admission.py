@@ -0,0 +1,257 @@
+"""
+Admission control for agent, team and workflow runs.
+
+Each model profile admits a bounded number of concurrent runs. Excess runs wait in a priority
+queue (interactive chat ahead of batch workflows) and are rejected quickly with 429 when the
+queue is full, or 503 when they have waited longer than the configured limit. Both responses
+carry a Retry-After header so clients can back off instead of piling up inside Ollama.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from modules.metrics import Histogram
+
+# Lower value is served first
+PRIORITIES: Dict[str, int] = {"interactive": 0, "batch": 1}
+
+PRIORITY_HEADER = "x-run-priority"
+
+# POST endpoints that start (or continue) a run and therefore occupy the model
+RUN_PATH = re.compile(r"^/(?P<type>agents|teams|workflows)/(?P<id>[^/]+)/runs(?:/[^/]+/continue)?/?$")
+
+
+class AdmissionSettings(BaseSettings):
+    """Admission control settings loaded from ADMISSION_* environment variables."""
+
+    enabled: bool = True
+    # Concurrent runs admitted per model profile
+    max_active: int = 4
+    # Runs allowed to wait per model profile before new ones get a 429
+    max_queue: int = 32
+    # Seconds a run may wait before it gets a 503; keep below the frontend's 60s client timeout
+    max_wait: float = 30.0
+
+    model_config = SettingsConfigDict(env_prefix="ADMISSION_", case_sensitive=False)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a run cannot be admitted."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    priority_name: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Bounded active set plus a priority queue for one model profile.
+
+    Must be used from a single event loop (the ASGI server's). A released slot is handed directly
+    to the highest-priority waiter, so queued runs are never overtaken by new arrivals.
+    """
+
+    def __init__(self, name: str, max_active: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        # Exponentially weighted average run duration, used to estimate Retry-After
+        self._avg_run_seconds = 5.0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.peak_queue_depth = 0
+        self.wait_seconds = {name: Histogram() for name in PRIORITIES}
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        return sum(
+            1
+            for waiter in self._queue
+            if not waiter.future.done() and (priority is None or waiter.priority_name == priority)
+        )
+
+    def retry_after(self) -> int:
+        """Rough seconds until a new run could be admitted, given the current backlog."""
+        backlog = self.queue_depth() + 1
+        estimate = self._avg_run_seconds * backlog / max(self.max_active, 1)
+        return int(min(max(math.ceil(estimate), 1), 120))
+
+    async def acquire(self, priority: str) -> float:
+        """
+        Wait for a slot.
+
+        Args:
+            priority: Name of the priority class, one of PRIORITIES
+
+        Returns:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            AdmissionRejected: The queue is full (429) or the wait exceeded max_wait (503)
+        """
+        if self.active < self.max_active and self.queue_depth() == 0:
+            self.active += 1
+            self._record_admission(priority, 0.0)
+            return 0.0
+
+        if self.queue_depth() >= self.max_queue:
+            self.rejected_full += 1
+            raise AdmissionRejected(429, f"Model '{self.name}' queue is full", self.retry_after())
+
+        waiter = _Waiter(
+            PRIORITIES[priority], next(self._sequence), priority, asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._queue, waiter)
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth())
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter.future, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was handed over in the same tick the timeout fired: take it rather than leak it
+                waited = time.perf_counter() - started
+                self._record_admission(priority, waited)
+                return waited
+            self.rejected_timeout += 1
+            self._prune()
+            raise AdmissionRejected(
+                503, f"Model '{self.name}' is saturated; waited {self.max_wait:g}s", self.retry_after()
+            ) from None
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the client went away
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()
+            self._prune()
+            raise
+        waited = time.perf_counter() - started
+        self._record_admission(priority, waited)
+        return waited
+
+    def release(self, run_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the next waiter if there is one."""
+        if run_seconds is not None:
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * run_seconds
+        while self._queue:
+            waiter = heapq.heappop(self._queue)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self.active -= 1
+
+    def _prune(self) -> None:
+        self._queue = [waiter for waiter in self._queue if not waiter.future.done()]
+        heapq.heapify(self._queue)
+
+    def _record_admission(self, priority: str, waited: float) -> None:
+        self.admitted += 1
+        self.wait_seconds[priority].observe(waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queue_depth": {name: self.queue_depth(name) for name in PRIORITIES},
+            "peak_queue_depth": self.peak_queue_depth,
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_run_seconds": round(self._avg_run_seconds, 3),
+            "wait_seconds": {name: histogram.snapshot() for name, histogram in self.wait_seconds.items()},
+        }
+
+
+class AdmissionRegistry:
+    """One AdmissionController per model profile, created on first use."""
+
+    def __init__(self, settings: AdmissionSettings):
+        self.settings = settings
+        self._controllers: Dict[str, AdmissionController] = {}
+
+    def controller(self, profile: str) -> AdmissionController:
+        if profile not in self._controllers:
+            self._controllers[profile] = AdmissionController(
+                profile, self.settings.max_active, self.settings.max_queue, self.settings.max_wait
+            )
+        return self._controllers[profile]
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {profile: controller.snapshot() for profile, controller in self._controllers.items()}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that gates run endpoints through the admission controllers.
+
+    The slot is held until the response (including a streamed one) has been fully sent.
+    """
+
+    def __init__(self, app: ASGIApp, admission: AdmissionRegistry, resolve_profile: Callable[[str], str]):
+        self.app = app
+        self.admission = admission
+        self.resolve_profile = resolve_profile
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match = RUN_PATH.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if match is None or scope.get("method") != "POST" or not self.admission.settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        priority = self._priority(scope, match.group("type"))
+        controller = self.admission.controller(self.resolve_profile(match.group("id")))
+        try:
+            await controller.acquire(priority)
+        except AdmissionRejected as rejected:
+            response = JSONResponse(
+                {"detail": rejected.detail},
+                status_code=rejected.status_code,
+                headers={"Retry-After": str(rejected.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.perf_counter() - started)
+
+    @staticmethod
+    def _priority(scope: Scope, entity_type: str) -> str:
+        for name, value in scope.get("headers", []):
+            if name.decode("latin-1") == PRIORITY_HEADER:
+                requested = value.decode("latin-1").strip().lower()
+                if requested in PRIORITIES:
+                    return requested
+        # Chat with agents and teams is interactive; workflows are long-running batch jobs
+        return "batch" if entity_type == "workflows" else "interactive"
+
+
+# Global registry shared by the middleware and the /metrics/admission endpoint
+admission = AdmissionRegistry(AdmissionSettings())
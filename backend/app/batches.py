@@ -0,0 +1,200 @@
+"""
+Batch runs of many workflow inputs in one request.
+
+Analysts bring spreadsheets of tickers or topics; sending each one as its own workflow run meant
+hundreds of HTTP calls, each holding a connection for minutes. POST /batches takes the whole list
+for one workflow (InvestmentWorkflowInput or ResearchTopic items), validates every item against the
+workflow's input schema and queues it as durable jobs (app.jobs) in one transaction. Items with the
+same input, up to case and whitespace, share one job, and so do investment requests the tables of
+workflows.request_parser parse to the same fields however they are worded; their research, parsing
+and analysis run once, for the first such item. Identical searches of different items running at
+the same time share one network call (app.search_cache). A batch runs at most max_concurrency jobs
+at a time over all workers, and every job also takes a slot of its model profile at batch priority
+(app.admission), so a large batch never starves interactive chat. GET /batches/{id} reports
+progress, throughput in items per minute and the model tokens consumed; GET /batches/{id}/items
+pages through the per-item results.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from app.jobs import FINISHED, PostgresJobQueue, job_queue, workflow_entity
+from app.search_cache import normalize_query
+from workflows.request_parser import request_key
+
+
+class BatchSettings(BaseSettings):
+    """Batch run settings loaded from WORKFLOW_BATCHES_* environment variables."""
+
+    max_items: int = 500
+    # Jobs of one batch running at the same time over all workers, unless the request sets its own
+    max_concurrency: int = 8
+
+    model_config = SettingsConfigDict(env_prefix="WORKFLOW_BATCHES_", case_sensitive=False)
+
+
+def _normalized(value: Any) -> Any:
+    if isinstance(value, str):
+        return normalize_query(value)
+    if isinstance(value, dict):
+        return {key: _normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalized(item) for item in value]
+    return value
+
+
+def item_key(item: Any) -> str:
+    """Items with the same key produce the same results and run as one job."""
+    return json.dumps(_normalized(item), sort_keys=True, default=str)
+
+
+def parsed_key(item: Any) -> Optional[str]:
+    """The key of an investment request the tables can parse, on what it means rather than how it is worded."""
+    if not isinstance(item, dict) or not isinstance(item.get("investment_request"), str):
+        return None
+    parsed = request_key(item["investment_request"])
+    if parsed is None:
+        return None
+    rest = {key: value for key, value in item.items() if key != "investment_request"}
+    return item_key({**rest, "parsed_request": parsed})
+
+
+def dedupe(items: Sequence[Any]) -> Tuple[List[Any], List[int]]:
+    """
+    The distinct inputs of a batch, and for each item the index of its input.
+
+    Items share an input when their keys match, or when their investment requests parse to the same
+    fields. The first item of an input is the one that runs; items with the same key follow it even
+    when only it parses.
+    """
+    inputs: List[Any] = []
+    positions: Dict[str, int] = {}
+    item_inputs: List[int] = []
+    for item in items:
+        key = item_key(item)
+        if key not in positions:
+            parsed = parsed_key(item)
+            if parsed is not None and parsed in positions:
+                positions[key] = positions[parsed]
+            else:
+                positions[key] = len(inputs)
+                inputs.append(item)
+                if parsed is not None:
+                    positions[parsed] = positions[key]
+        item_inputs.append(positions[key])
+    return inputs, item_inputs
+
+
+def summarize(batch: Dict[str, Any]) -> Dict[str, Any]:
+    """Progress, throughput and token usage of a batch from PostgresJobQueue.batch()."""
+    items = batch["items"]
+    statuses = batch["item_statuses"]
+    finished = sum(count for status, count in statuses.items() if status in FINISHED)
+    done = finished == items
+    # Throughput over the time the batch has been running, until its last job finished
+    end = batch["finished_at"] if done and batch["finished_at"] is not None else batch["now"]
+    seconds = max((end - batch["created_at"]).total_seconds(), 1e-3)
+    jobs = sum(batch["jobs"].values())
+    return {
+        "batch_id": batch["id"],
+        "workflow_id": batch["workflow_id"],
+        "status": "finished" if done else "running",
+        "items": items,
+        "jobs": jobs,
+        "deduplicated_items": items - jobs,
+        "max_concurrency": batch["max_concurrency"],
+        "item_statuses": statuses,
+        "job_statuses": batch["jobs"],
+        "created_at": batch["created_at"],
+        "finished_at": batch["finished_at"] if done else None,
+        "elapsed_seconds": round(seconds, 3),
+        "items_per_minute": round(60 * finished / seconds, 2),
+        "tokens": batch["tokens"],
+        "tokens_per_item": round(batch["tokens"] / finished) if finished else 0,
+    }
+
+
+# Global settings shared by the batch endpoints
+batch_settings = BatchSettings()
+
+
+# ************* API *************
+class BatchRequest(BaseModel):
+    workflow_id: str = Field(description="Id of the workflow every item runs, e.g. investment-analyst-pro")
+    items: List[Any] = Field(min_length=1, description="Workflow inputs, each matching the workflow's input schema")
+    max_concurrency: Optional[int] = Field(default=None, ge=1, description="Jobs of the batch running at a time")
+    max_attempts: Optional[int] = Field(default=None, ge=1)
+    user_id: Optional[str] = None
+
+
+batches_router = APIRouter(prefix="/batches", tags=["Batches"])
+
+
+def _store() -> PostgresJobQueue:
+    if not job_queue.enabled or job_queue.store is None:
+        raise HTTPException(status_code=503, detail="Workflow jobs are disabled")
+    return job_queue.store
+
+
+def validate_items(workflow: Any, items: Sequence[Any]) -> List[Any]:
+    """Items checked against the workflow's input schema, as JSON-ready values."""
+    schema = getattr(workflow, "input_schema", None)
+    if schema is None:
+        return list(items)
+    validated: List[Any] = []
+    for index, item in enumerate(items):
+        try:
+            validated.append(schema.model_validate(item).model_dump(mode="json"))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Item {index} is not a valid {schema.__name__}: {e}")
+    return validated
+
+
+@batches_router.post("", status_code=202)
+async def submit_batch(request: BatchRequest) -> Dict[str, Any]:
+    """Queue every item of a batch and return the batch id."""
+    store = _store()
+    if len(request.items) > batch_settings.max_items:
+        raise HTTPException(status_code=413, detail=f"A batch holds at most {batch_settings.max_items} items")
+    try:
+        entity = workflow_entity(request.workflow_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    workflow = await asyncio.to_thread(entity.materialize)
+    inputs, item_inputs = dedupe(validate_items(workflow, request.items))
+    batch_id, job_ids = await asyncio.to_thread(
+        store.submit_batch,
+        request.workflow_id,
+        inputs,
+        item_inputs,
+        request.max_attempts or job_queue.settings.max_attempts,
+        request.max_concurrency or batch_settings.max_concurrency,
+        request.user_id,
+    )
+    return {"batch_id": batch_id, "items": len(item_inputs), "jobs": len(job_ids)}
+
+
+@batches_router.get("/{batch_id}")
+async def get_batch(batch_id: str) -> Dict[str, Any]:
+    """Progress, items per minute and tokens consumed of a batch."""
+    batch = await asyncio.to_thread(_store().batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return summarize(batch)
+
+
+@batches_router.get("/{batch_id}/items")
+async def get_batch_items(batch_id: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """A page of a batch's items in order, each with its job's status, result or error, and tokens."""
+    store = _store()
+    items = await asyncio.to_thread(store.batch_items, batch_id, offset, min(limit, 500))
+    if not items and await asyncio.to_thread(store.batch, batch_id) is None:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    return {"batch_id": batch_id, "offset": offset, "items": items}
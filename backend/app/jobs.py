@@ -0,0 +1,882 @@
+"""
+Durable background jobs for workflow runs.
+
+A workflow run used to live and die with the HTTP stream that started it: a browser refresh or a
+dropped Chainlit websocket threw away minutes of work, and a run could only use the replica that
+received it. POST /jobs now stores the run in a Postgres table and returns a job id. Worker
+processes, any number on any node (python -m app.worker, or WORKFLOW_JOBS_API_WORKERS inside the
+API), claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent claims never block
+each other or take the same job. A running job holds a lease (locked_until) that its worker's
+heartbeat keeps extending; when a worker dies, the lease runs out and another worker claims the
+job again (visibility timeout). Failed attempts are retried with exponential backoff up to
+max_attempts. Every event of a run is stored as it happens, so clients poll GET /jobs/{id} or
+(re-)subscribe to GET /jobs/{id}/events from the last event id they saw.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    func,
+    insert,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateSchema
+
+from app.admission import AdmissionRegistry, AdmissionRejected, admission
+from modules.metrics import Histogram
+from workflows.usage import TokenUsage, track_usage
+
+log = logging.getLogger("app")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+# Token events are stored in batches; any other event flushes the batch right away
+TOKEN_EVENTS = ("RunContent", "TeamRunContent")
+# Upper bounds in seconds for job run and queue wait times
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+class JobSettings(BaseSettings):
+    """Workflow job queue settings loaded from WORKFLOW_JOBS_* environment variables."""
+
+    enabled: bool = True
+    db_schema: str = "ai"
+    # How long a claimed job stays leased to its worker without a heartbeat
+    visibility_timeout_seconds: int = 120
+    heartbeat_seconds: float = 30.0
+    max_attempts: int = 3
+    # Delay before the second attempt; doubles with every further attempt
+    retry_backoff_seconds: float = 10.0
+    # How often an idle worker looks for queued jobs
+    poll_seconds: float = 1.0
+    # Jobs one worker process runs at the same time
+    worker_concurrency: int = 2
+    # Job slots of the worker inside the API process; 0 leaves the jobs to dedicated worker processes
+    api_workers: int = 1
+    event_flush_seconds: float = 0.5
+
+    model_config = SettingsConfigDict(env_prefix="WORKFLOW_JOBS_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class Job:
+    """A job claimed by a worker, for one attempt."""
+
+    id: str
+    workflow_id: str
+    input: Any
+    session_id: Optional[str]
+    user_id: Optional[str]
+    attempt: int
+    max_attempts: int
+    # Seconds between submission (or the retry time) and this claim
+    waited_seconds: float
+
+
+class PostgresJobQueue:
+    """Jobs and their events in Postgres; every method is one short transaction."""
+
+    def __init__(self, engine: Engine, schema: str):
+        self.engine = engine
+        self.schema = schema
+        metadata = MetaData(schema=schema)
+        self.jobs = Table(
+            "workflow_jobs",
+            metadata,
+            Column("id", String(36), primary_key=True),
+            Column("workflow_id", String(255), nullable=False),
+            Column("input", Text, nullable=False),
+            Column("session_id", String(255)),
+            Column("user_id", String(255)),
+            Column("status", String(16), nullable=False),
+            Column("attempts", Integer, nullable=False, default=0),
+            Column("max_attempts", Integer, nullable=False),
+            # Earliest time the job may be claimed; pushed back by the retry backoff
+            Column("run_after", DateTime(timezone=True), nullable=False),
+            Column("locked_by", String(255)),
+            # Lease of the running attempt, extended by heartbeats
+            Column("locked_until", DateTime(timezone=True)),
+            Column("heartbeat_at", DateTime(timezone=True)),
+            Column("result", Text),
+            Column("error", Text),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Column("started_at", DateTime(timezone=True)),
+            Column("finished_at", DateTime(timezone=True)),
+            # Model tokens consumed over all attempts
+            Column("tokens", Integer, nullable=False, default=0),
+            Column("batch_id", String(36)),
+            Index("ix_workflow_jobs_claim", "status", "run_after"),
+            Index("ix_workflow_jobs_batch", "batch_id", "status"),
+        )
+        self.events = Table(
+            "workflow_job_events",
+            metadata,
+            Column("id", BigInteger, primary_key=True, autoincrement=True),
+            Column("job_id", String(36), nullable=False, index=True),
+            Column("attempt", Integer, nullable=False),
+            Column("event", String(64), nullable=False),
+            Column("payload", Text, nullable=False),
+            Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+        )
+        self.batches = Table(
+            "workflow_batches",
+            metadata,
+            Column("id", String(36), primary_key=True),
+            Column("workflow_id", String(255), nullable=False),
+            Column("items", Integer, nullable=False),
+            # Jobs of the batch running at the same time, over every worker
+            Column("max_concurrency", Integer),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+        )
+        self.items = Table(
+            "workflow_batch_items",
+            metadata,
+            Column("batch_id", String(36), primary_key=True),
+            Column("item_index", Integer, primary_key=True),
+            # Items with the same input share one job
+            Column("job_id", String(36), nullable=False, index=True),
+        )
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(CreateSchema(self.schema, if_not_exists=True))
+                self.jobs.metadata.create_all(conn, checkfirst=True)
+            self._ready = True
+
+    def submit(
+        self,
+        workflow_id: str,
+        input: Any,
+        max_attempts: int,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> str:
+        self._ensure_table()
+        row = self._job_row(workflow_id, input, max_attempts, session_id, user_id)
+        with self.engine.begin() as conn:
+            conn.execute(insert(self.jobs).values(row))
+        return row["id"]
+
+    def submit_batch(
+        self,
+        workflow_id: str,
+        inputs: List[Any],
+        item_inputs: List[int],
+        max_attempts: int,
+        max_concurrency: Optional[int] = None,
+        user_id: Optional[str] = None,
+    ) -> Tuple[str, List[str]]:
+        """
+        Queue one job per distinct input and the batch's items, in one transaction.
+
+        Args:
+            workflow_id: Workflow every item runs
+            inputs: The distinct inputs of the batch
+            item_inputs: For each item, in order, the index of its input in `inputs`
+            max_attempts: Attempts per job
+            max_concurrency: Jobs of the batch running at the same time; None for no limit
+            user_id: User the runs belong to
+
+        Returns:
+            Tuple[str, List[str]]: The batch id and the job id of each input
+        """
+        self._ensure_table()
+        batch_id = str(uuid4())
+        jobs = [self._job_row(workflow_id, input, max_attempts, None, user_id, batch_id) for input in inputs]
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(self.batches).values(
+                    id=batch_id,
+                    workflow_id=workflow_id,
+                    items=len(item_inputs),
+                    max_concurrency=max_concurrency,
+                    created_at=func.now(),
+                )
+            )
+            conn.execute(insert(self.jobs).values(jobs))
+            conn.execute(
+                insert(self.items),
+                [
+                    {"batch_id": batch_id, "item_index": index, "job_id": jobs[input]["id"]}
+                    for index, input in enumerate(item_inputs)
+                ],
+            )
+        return batch_id, [job["id"] for job in jobs]
+
+    @staticmethod
+    def _job_row(
+        workflow_id: str,
+        input: Any,
+        max_attempts: int,
+        session_id: Optional[str],
+        user_id: Optional[str],
+        batch_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "id": str(uuid4()),
+            "workflow_id": workflow_id,
+            "input": json.dumps(input, default=str),
+            "session_id": session_id,
+            "user_id": user_id,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_after": func.now(),
+            "created_at": func.now(),
+            "tokens": 0,
+            "batch_id": batch_id,
+        }
+
+    def claim(
+        self, worker_id: str, visibility_timeout: float, workflow_ids: Optional[Sequence[str]] = None
+    ) -> Optional[Job]:
+        """
+        Lease the oldest claimable job to a worker: a queued job that is due, or a running one whose lease ran out.
+
+        Times come from the database clock, so workers on different nodes agree on leases. Jobs of a
+        batch running as many jobs as its max_concurrency are passed over.
+        """
+        self._ensure_table()
+        jobs = self.jobs
+        now = func.now()
+        expired = and_(jobs.c.status == RUNNING, jobs.c.locked_until < now)
+        scope = jobs.c.workflow_id.in_(workflow_ids) if workflow_ids else true()
+        with self.engine.begin() as conn:
+            # A job whose last attempt lost its lease fails instead of running again
+            exhausted = (
+                select(jobs.c.id)
+                .where(expired, jobs.c.attempts >= jobs.c.max_attempts, scope)
+                .with_for_update(skip_locked=True)
+            )
+            conn.execute(
+                update(jobs)
+                .where(jobs.c.id.in_(exhausted))
+                .values(
+                    status=FAILED,
+                    error="Worker stopped heartbeating during the last attempt",
+                    finished_at=now,
+                    locked_by=None,
+                    locked_until=None,
+                )
+            )
+            claimable = or_(and_(jobs.c.status == QUEUED, jobs.c.run_after <= now), expired)
+            full: List[str] = []
+            while True:
+                outside_full = or_(jobs.c.batch_id.is_(None), jobs.c.batch_id.notin_(full)) if full else true()
+                candidate = conn.execute(
+                    select(jobs.c.id, jobs.c.batch_id)
+                    .where(claimable, scope, outside_full)
+                    .order_by(jobs.c.run_after, jobs.c.created_at)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                ).first()
+                if candidate is None:
+                    return None
+                if candidate.batch_id is None or self._batch_has_room(conn, candidate.batch_id):
+                    break
+                full.append(candidate.batch_id)
+            row = conn.execute(
+                update(jobs)
+                .where(jobs.c.id == candidate.id)
+                .values(
+                    status=RUNNING,
+                    attempts=jobs.c.attempts + 1,
+                    locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=visibility_timeout),
+                    heartbeat_at=now,
+                    started_at=func.coalesce(jobs.c.started_at, now),
+                )
+                .returning(
+                    jobs.c.id,
+                    jobs.c.workflow_id,
+                    jobs.c.input,
+                    jobs.c.session_id,
+                    jobs.c.user_id,
+                    jobs.c.attempts,
+                    jobs.c.max_attempts,
+                    func.extract("epoch", now - jobs.c.run_after).label("waited"),
+                )
+            ).first()
+        if row is None:
+            return None
+        return Job(
+            id=row.id,
+            workflow_id=row.workflow_id,
+            input=json.loads(row.input),
+            session_id=row.session_id,
+            user_id=row.user_id,
+            attempt=row.attempts,
+            max_attempts=row.max_attempts,
+            waited_seconds=max(0.0, float(row.waited or 0)),
+        )
+
+    def _batch_has_room(self, conn: Any, batch_id: str) -> bool:
+        """Whether a batch may start another job; locks the batch row so concurrent claims count each other."""
+        limit = conn.execute(
+            select(self.batches.c.max_concurrency).where(self.batches.c.id == batch_id).with_for_update()
+        ).scalar()
+        if not limit:
+            return True
+        running = conn.execute(
+            select(func.count())
+            .select_from(self.jobs)
+            .where(
+                self.jobs.c.batch_id == batch_id, self.jobs.c.status == RUNNING, self.jobs.c.locked_until >= func.now()
+            )
+        ).scalar()
+        return running < limit
+
+    def _owned(self, job: Job, worker_id: str) -> Any:
+        """Rows still leased to this worker for this attempt; a reclaimed job no longer matches."""
+        return and_(
+            self.jobs.c.id == job.id,
+            self.jobs.c.status == RUNNING,
+            self.jobs.c.locked_by == worker_id,
+            self.jobs.c.attempts == job.attempt,
+        )
+
+    def heartbeat(self, job: Job, worker_id: str, visibility_timeout: float) -> bool:
+        """Extend the lease of a running attempt; False if the worker lost the job."""
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                update(self.jobs)
+                .where(self._owned(job, worker_id))
+                .values(locked_until=func.now() + timedelta(seconds=visibility_timeout), heartbeat_at=func.now())
+            )
+        return result.rowcount == 1
+
+    def complete(self, job: Job, worker_id: str, result: Any, tokens: int = 0) -> bool:
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                update(self.jobs)
+                .where(self._owned(job, worker_id))
+                .values(
+                    status=SUCCEEDED,
+                    result=json.dumps(result, default=str),
+                    error=None,
+                    tokens=self.jobs.c.tokens + tokens,
+                    finished_at=func.now(),
+                    locked_by=None,
+                    locked_until=None,
+                )
+            )
+        return updated.rowcount == 1
+
+    def fail(self, job: Job, worker_id: str, error: str, backoff_seconds: float, tokens: int = 0) -> str:
+        """Queue the job again after a backoff, or fail it on its last attempt. Returns the new status."""
+        retry = job.attempt < job.max_attempts
+        values: Dict[str, Any] = {
+            "error": error,
+            "locked_by": None,
+            "locked_until": None,
+            "tokens": self.jobs.c.tokens + tokens,
+        }
+        if retry:
+            delay = backoff_seconds * 2 ** (job.attempt - 1)
+            values.update(status=QUEUED, run_after=func.now() + timedelta(seconds=delay))
+        else:
+            values.update(status=FAILED, finished_at=func.now())
+        with self.engine.begin() as conn:
+            updated = conn.execute(update(self.jobs).where(self._owned(job, worker_id)).values(**values))
+        if updated.rowcount != 1:
+            return "lost"
+        return QUEUED if retry else FAILED
+
+    def add_events(self, job: Job, events: List[Tuple[str, str]]) -> None:
+        if not events:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(self.events),
+                [
+                    {"job_id": job.id, "attempt": job.attempt, "event": event, "payload": payload}
+                    for event, payload in events
+                ],
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            row = conn.execute(select(self.jobs).where(self.jobs.c.id == job_id)).mappings().first()
+        if row is None:
+            return None
+        job = dict(row)
+        job["input"] = json.loads(job["input"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def events_after(self, job_id: str, after: int, limit: int = 500) -> List[Any]:
+        self._ensure_table()
+        events = self.events
+        with self.engine.connect() as conn:
+            return list(
+                conn.execute(
+                    select(events.c.id, events.c.attempt, events.c.event, events.c.payload)
+                    .where(events.c.job_id == job_id, events.c.id > after)
+                    .order_by(events.c.id)
+                    .limit(limit)
+                ).all()
+            )
+
+    def batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """A batch with its jobs and items per status, the tokens consumed and when its jobs started and finished."""
+        self._ensure_table()
+        jobs, items = self.jobs, self.items
+        with self.engine.connect() as conn:
+            row = conn.execute(select(self.batches).where(self.batches.c.id == batch_id)).mappings().first()
+            if row is None:
+                return None
+            statuses = conn.execute(
+                select(jobs.c.status, func.count()).where(jobs.c.batch_id == batch_id).group_by(jobs.c.status)
+            ).all()
+            item_statuses = conn.execute(
+                select(jobs.c.status, func.count())
+                .select_from(items.join(jobs, jobs.c.id == items.c.job_id))
+                .where(items.c.batch_id == batch_id)
+                .group_by(jobs.c.status)
+            ).all()
+            totals = conn.execute(
+                select(
+                    func.coalesce(func.sum(jobs.c.tokens), 0).label("tokens"),
+                    func.min(jobs.c.started_at).label("started_at"),
+                    func.max(jobs.c.finished_at).label("finished_at"),
+                    func.now().label("now"),
+                ).where(jobs.c.batch_id == batch_id)
+            ).first()
+        assert totals is not None
+        return {
+            **dict(row),
+            "jobs": {status: int(count) for status, count in statuses},
+            "item_statuses": {status: int(count) for status, count in item_statuses},
+            "tokens": int(totals.tokens),
+            "started_at": totals.started_at,
+            "finished_at": totals.finished_at,
+            "now": totals.now,
+        }
+
+    def batch_items(self, batch_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Items of a batch in order, each with the status and result of its job."""
+        self._ensure_table()
+        items, jobs = self.items, self.jobs
+        with self.engine.connect() as conn:
+            rows = (
+                conn.execute(
+                    select(
+                        items.c.item_index,
+                        items.c.job_id,
+                        jobs.c.input,
+                        jobs.c.status,
+                        jobs.c.result,
+                        jobs.c.error,
+                        jobs.c.tokens,
+                    )
+                    .join(jobs, jobs.c.id == items.c.job_id)
+                    .where(items.c.batch_id == batch_id)
+                    .order_by(items.c.item_index)
+                    .offset(offset)
+                    .limit(limit)
+                )
+                .mappings()
+                .all()
+            )
+        return [
+            {
+                **row,
+                "input": json.loads(row["input"]),
+                "result": json.loads(row["result"]) if row["result"] is not None else None,
+            }
+            for row in rows
+        ]
+
+    def counts(self, workflow_id: Optional[str] = None) -> Dict[str, int]:
+        self._ensure_table()
+        query = select(self.jobs.c.status, func.count()).group_by(self.jobs.c.status)
+        if workflow_id is not None:
+            query = query.where(self.jobs.c.workflow_id == workflow_id)
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).all()
+        return {status: int(count) for status, count in rows}
+
+
+class JobStats:
+    """Thread-safe counters for the jobs this process's workers ran."""
+
+    FIELDS = ("claimed", "reclaimed", "succeeded", "retried", "failed", "lost", "tokens")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.FIELDS, 0)
+        self.run_seconds = Histogram(JOB_BUCKETS)
+        self.wait_seconds = Histogram(JOB_BUCKETS)
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, "run_seconds": self.run_seconds.snapshot(), "wait_seconds": self.wait_seconds.snapshot()}
+
+
+def workflow_entity(workflow_id: str) -> Any:
+    """The registry entry of a workflow, without importing it."""
+    from app.registry import registry
+
+    entity = registry.get(workflow_id)
+    if entity is None or entity._spec.type != "workflow":
+        raise ValueError(f"Unknown workflow id: {workflow_id!r}")
+    return entity
+
+
+def resolve_workflow(workflow_id: str) -> Any:
+    """The registered workflow with this id, imported on first use."""
+    return workflow_entity(workflow_id).materialize()
+
+
+def _event_payload(event: Any) -> str:
+    payload = event.to_dict() if hasattr(event, "to_dict") else {"content": str(event)}
+    return json.dumps(payload, default=str)
+
+
+class JobWorker:
+    """Claims jobs and runs their workflows, storing every event and heartbeating while it runs."""
+
+    def __init__(
+        self,
+        queue: PostgresJobQueue,
+        settings: JobSettings,
+        stats: JobStats,
+        resolve: Callable[[str], Any] = resolve_workflow,
+        workflow_ids: Optional[Sequence[str]] = None,
+        worker_id: Optional[str] = None,
+        admission: Optional[AdmissionRegistry] = None,
+        profile: Callable[[str], str] = lambda workflow_id: "default",
+    ):
+        self.queue = queue
+        self.settings = settings
+        self.stats = stats
+        self.resolve = resolve
+        # Runs take a slot of their workflow's model profile, like workflow runs over HTTP
+        self.admission = admission
+        self.profile = profile
+        self.workflow_ids = list(workflow_ids) if workflow_ids else None
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._stop = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def run(self, concurrency: int) -> None:
+        """Run `concurrency` claim loops until stop() is called."""
+        self._stop.clear()
+        log.info(f"Job worker {self.worker_id} started with {concurrency} slots")
+        await asyncio.gather(*(self._loop() for _ in range(concurrency)))
+
+    def start(self, concurrency: int) -> asyncio.Task:
+        """Run the worker in the background of the current event loop (e.g. the API's)."""
+        task = asyncio.create_task(self.run(concurrency))
+        self._tasks.append(task)
+        return task
+
+    async def stop(self) -> None:
+        self._stop.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = await asyncio.to_thread(
+                    self.queue.claim, self.worker_id, self.settings.visibility_timeout_seconds, self.workflow_ids
+                )
+            except Exception as e:  # noqa: BLE001
+                log.warning(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=self.settings.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.process(job)
+
+    async def process(self, job: Job) -> str:
+        """Run one attempt of a job and record its outcome. Returns the job's new status."""
+        self.stats.incr("reclaimed" if job.attempt > 1 else "claimed")
+        self.stats.wait_seconds.observe(job.waited_seconds)
+        log.info(f"Job {job.id} ({job.workflow_id}) attempt {job.attempt}/{job.max_attempts} on {self.worker_id}")
+        started = time.perf_counter()
+        usage = TokenUsage()
+        run = asyncio.create_task(self._run(job, usage))
+        heartbeat = asyncio.create_task(self._heartbeat(job, run))
+        try:
+            result = await run
+        except asyncio.CancelledError:
+            if not heartbeat.done():
+                raise
+            # The heartbeat cancelled the run: the lease ran out and another worker may have the job
+            self.stats.incr("lost")
+            log.warning(f"Job {job.id} attempt {job.attempt} lost its lease, stopped")
+            return "lost"
+        except Exception as e:  # noqa: BLE001
+            status = await asyncio.to_thread(
+                self.queue.fail,
+                job,
+                self.worker_id,
+                f"{type(e).__name__}: {e}",
+                self.settings.retry_backoff_seconds,
+                usage.total_tokens,
+            )
+            self.stats.incr({QUEUED: "retried", FAILED: "failed"}.get(status, "lost"))
+            log.warning(f"Job {job.id} attempt {job.attempt} failed ({status}): {e}")
+            return status
+        finally:
+            heartbeat.cancel()
+            self.stats.run_seconds.observe(time.perf_counter() - started)
+            self.stats.incr("tokens", usage.total_tokens)
+        if not await asyncio.to_thread(self.queue.complete, job, self.worker_id, result, usage.total_tokens):
+            self.stats.incr("lost")
+            return "lost"
+        self.stats.incr("succeeded")
+        return SUCCEEDED
+
+    async def _heartbeat(self, job: Job, run: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.settings.heartbeat_seconds)
+            try:
+                owned = await asyncio.to_thread(
+                    self.queue.heartbeat, job, self.worker_id, self.settings.visibility_timeout_seconds
+                )
+            except Exception as e:  # noqa: BLE001
+                # Keep running; the lease only runs out if heartbeats keep failing
+                log.warning(f"Heartbeat for job {job.id} failed: {e}")
+                continue
+            if not owned:
+                run.cancel()
+                return
+
+    async def _run(self, job: Job, usage: TokenUsage) -> Any:
+        async with self._model_slot(job.workflow_id):
+            with track_usage(usage):
+                return await self._stream(job)
+
+    @asynccontextmanager
+    async def _model_slot(self, workflow_id: str) -> AsyncIterator[None]:
+        """Hold a run slot of the workflow's model profile at batch priority, waiting as long as it takes."""
+        if self.admission is None or not self.admission.settings.enabled:
+            yield
+            return
+        controller = self.admission.controller(self.profile(workflow_id))
+        while True:
+            try:
+                await controller.acquire("batch")
+                break
+            except AdmissionRejected as rejected:
+                await asyncio.sleep(rejected.retry_after)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            controller.release(time.perf_counter() - started)
+
+    async def _stream(self, job: Job) -> Any:
+        """Stream the job's workflow run into the events table and return its final content."""
+        workflow = self.resolve(job.workflow_id)
+        pending: List[Tuple[str, str]] = []
+        flushed = time.perf_counter()
+        completed = None
+        async for event in workflow.arun(
+            input=job.input, session_id=job.session_id, user_id=job.user_id, stream=True, stream_events=True
+        ):
+            kind = getattr(event, "event", type(event).__name__)
+            pending.append((kind, _event_payload(event)))
+            if kind not in TOKEN_EVENTS or time.perf_counter() - flushed >= self.settings.event_flush_seconds:
+                await asyncio.to_thread(self.queue.add_events, job, pending)
+                pending, flushed = [], time.perf_counter()
+            if kind == "WorkflowError":
+                raise RuntimeError(getattr(event, "error", None) or "Workflow run failed")
+            if kind == "WorkflowCompleted":
+                completed = event
+        await asyncio.to_thread(self.queue.add_events, job, pending)
+        if completed is None:
+            raise RuntimeError("Workflow run ended without completing")
+        failed = [step.step_name for step in getattr(completed, "step_results", None) or [] if not step.success]
+        if failed:
+            raise RuntimeError(f"Steps failed: {failed}")
+        content = completed.content
+        return content.model_dump() if isinstance(content, BaseModel) else content
+
+
+class JobQueue:
+    """Submits jobs and runs this process's workers."""
+
+    def __init__(self, settings: JobSettings, store: Optional[PostgresJobQueue] = None):
+        self.settings = settings
+        self.store = store
+        self.stats = JobStats()
+        self.worker: Optional[JobWorker] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled and self.store is not None
+
+    def new_worker(self, workflow_ids: Optional[Sequence[str]] = None, **kwargs: Any) -> JobWorker:
+        """A worker for jobs of the given workflows, by default every workflow in the registry."""
+        assert self.store is not None
+        from app.registry import registry
+
+        if not workflow_ids:
+            workflow_ids = [entity.id for entity in registry.entities("workflow")]
+        kwargs.setdefault("admission", admission)
+        kwargs.setdefault("profile", registry.model_profile)
+        return JobWorker(self.store, self.settings, self.stats, workflow_ids=workflow_ids, **kwargs)
+
+    def start_api_workers(self) -> None:
+        """Start the workers configured to run inside the API process."""
+        if self.enabled and self.settings.api_workers > 0 and self.worker is None:
+            self.worker = self.new_worker()
+            self.worker.start(self.settings.api_workers)
+
+    async def stop_api_workers(self) -> None:
+        if self.worker is not None:
+            await self.worker.stop()
+            self.worker = None
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"enabled": self.enabled, "worker": self.stats.snapshot()}
+        if self.store is not None:
+            try:
+                status["jobs"] = self.store.counts()
+            except Exception as e:  # noqa: BLE001
+                status["postgres_error"] = str(e)
+        return status
+
+
+def _build_job_queue() -> JobQueue:
+    settings = JobSettings()
+    store = None
+    if settings.enabled:
+        from db.session import db_engine
+
+        store = PostgresJobQueue(db_engine, settings.db_schema)
+    return JobQueue(settings, store)
+
+
+# Global job queue shared by the API and the workers of this process
+job_queue = _build_job_queue()
+
+
+# ************* API *************
+class JobRequest(BaseModel):
+    workflow_id: str = Field(description="Id of the workflow to run, e.g. investment-analyst-pro")
+    input: Any = Field(description="Workflow input: a string, or an object matching the workflow's input schema")
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+    max_attempts: Optional[int] = Field(default=None, ge=1)
+
+
+jobs_router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _store() -> PostgresJobQueue:
+    if not job_queue.enabled or job_queue.store is None:
+        raise HTTPException(status_code=503, detail="Workflow jobs are disabled")
+    return job_queue.store
+
+
+@jobs_router.post("", status_code=202)
+async def submit_job(request: JobRequest) -> Dict[str, str]:
+    """Queue a workflow run and return its job id."""
+    store = _store()
+    try:
+        workflow_entity(request.workflow_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    job_id = await asyncio.to_thread(
+        store.submit,
+        request.workflow_id,
+        request.input,
+        request.max_attempts or job_queue.settings.max_attempts,
+        request.session_id,
+        request.user_id,
+    )
+    return {"job_id": job_id, "status": QUEUED}
+
+
+@jobs_router.get("/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Status, attempts and, once finished, the result or error of a job."""
+    job = await asyncio.to_thread(_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@jobs_router.get("/{job_id}/events")
+async def job_events(job_id: str, after: int = 0, last_event_id: Optional[str] = Header(default=None)) -> Any:
+    """
+    Server-sent events of a job's run, from the start or after the given event id, until the job finishes.
+
+    Reconnecting clients resume with ?after=<id> or the Last-Event-ID header.
+    """
+    store = _store()
+    if await asyncio.to_thread(store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    return StreamingResponse(_follow(store, job_id, after), media_type="text/event-stream")
+
+
+async def _follow(store: PostgresJobQueue, job_id: str, after: int) -> AsyncIterator[str]:
+    while True:
+        # Read the status before the events, so no event written before the job finished is missed
+        job = await asyncio.to_thread(store.get, job_id)
+        events = await asyncio.to_thread(store.events_after, job_id, after)
+        for event in events:
+            after = event.id
+            yield f"id: {event.id}\nevent: {event.event}\ndata: {event.payload}\n\n"
+        if not events and (job is None or job["status"] in FINISHED):
+            status = job["status"] if job is not None else "missing"
+            yield f"event: JobFinished\ndata: {json.dumps({'job_id': job_id, 'status': status})}\n\n"
+            return
+        if not events:
+            await asyncio.sleep(job_queue.settings.poll_seconds)
@@ -1,34 +1,71 @@
 """AgentOS"""
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator
 
 from agno.os import AgentOS
+from fastapi import FastAPI
 
-from agents.agno_assist import agno_assist
-from agents.simple_agent import agno_simple
-from agents.web_agent import web_agent
+from app.admission import AdmissionMiddleware, admission
+from app.batches import batches_router
+from app.jobs import job_queue, jobs_router
+from app.metrics import metrics_router
+from app.registry import RegistrySettings, registry
+from app.single_flight import SingleFlightMiddleware, single_flight
 from modules.langfuse import init_tracing
-from teams.multilingual_team import multilingual_team
-from teams.reasoning_finance_team import reasoning_research_team
-from workflows.investment_workflow import investment_workflow
-from workflows.research_workflow import research_workflow
 
 # Ensure tracing is initialized before any agent calls happen
 init_tracing()
 
 os_config_path = str(Path(__file__).parent.joinpath("config.yaml"))
 
+# Lazy mode only imports an agent, team or workflow module on its first run or config request
+registry_settings = RegistrySettings()
+lazy = registry_settings.lazy_entities
+
+log = logging.getLogger("app")
+
+
+def _log_warmup_failure(task: "asyncio.Task[None]") -> None:
+    # Nothing awaits the warm-up task; the entity is loaded again (and fails visibly) on its first run
+    if not task.cancelled() and task.exception() is not None:
+        log.warning(f"Entity warm-up failed: {task.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Warm up the configured entities in the background so /health is served immediately
+    warmup = asyncio.create_task(asyncio.to_thread(registry.warm_up, registry_settings.warmup_ids))
+    warmup.add_done_callback(_log_warmup_failure)
+    # Run queued workflow jobs in this process too, unless dedicated workers (app.worker) handle them
+    job_queue.start_api_workers()
+    yield
+    await job_queue.stop_api_workers()
+    warmup.cancel()
+
+
 # Create the AgentOS
 agent_os = AgentOS(
     id="agentos-docker",
-    agents=[agno_simple, web_agent, agno_assist],
-    teams=[multilingual_team, reasoning_research_team],
-    workflows=[investment_workflow, research_workflow],
+    agents=registry.entities("agent", lazy=lazy),
+    teams=registry.entities("team", lazy=lazy),
+    workflows=registry.entities("workflow", lazy=lazy),
     # Configuration for the AgentOS
     config=os_config_path,
+    lifespan=lifespan,
 )
 
 app = agent_os.get_app()
+app.include_router(metrics_router)
+app.include_router(jobs_router)
+app.include_router(batches_router)
+# Bound concurrent runs per model and queue the rest by priority
+app.add_middleware(AdmissionMiddleware, admission=admission, resolve_profile=registry.model_profile)
+# Outermost, so requests that join an in-flight run never take an admission slot
+app.add_middleware(SingleFlightMiddleware, flights=single_flight, is_coalescable=registry.coalescable)
 
 if __name__ == "__main__":
     # Serve the application
@@ -0,0 +1,141 @@
+"""Runtime metrics endpoints for the backend subsystems."""
+
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.admission import admission
+from app.jobs import job_queue
+from app.models import model_registry
+from app.rate_limit import rate_limiter
+from app.registry import registry
+from app.response_cache import response_cache
+from app.search_cache import search_cache
+from app.semantic_cache import semantic_cache
+from app.single_flight import single_flight
+from app.tool_calls import tool_call_settings, tool_call_stats
+from db.engine import get_pool_stats
+from teams.delegation import delegation_settings, delegation_stats
+from teams.language_router import language_router_settings, language_router_stats
+from tools.wikipedia_mirror import wikipedia_mirror
+from workflows.checkpoint import workflow_checkpoints
+from workflows.context_budget import prompt_budget
+from workflows.graph import graph_stats, workflow_graph_settings
+from workflows.quality import stream_gate_settings, stream_gate_stats
+from workflows.request_parser import fast_parse_settings, fast_parse_stats
+
+metrics_router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@metrics_router.get("/db-pool")
+def db_pool_metrics() -> Dict[str, Any]:
+    """Connection pool status, checkout wait times and overflow usage per engine."""
+    return {"engines": get_pool_stats()}
+
+
+@metrics_router.get("/entities")
+def entity_metrics() -> Dict[str, Any]:
+    """Which agents, teams and workflows have been materialized, and how long each took to load."""
+    return {"entities": registry.status()}
+
+
+@metrics_router.get("/models")
+def model_metrics() -> Dict[str, Any]:
+    """In-flight, queued and completed calls per model profile, and how many shared clients are open."""
+    return model_registry.status()
+
+
+@metrics_router.get("/admission")
+def admission_metrics() -> Dict[str, Any]:
+    """Active runs, queue depth per priority and queue wait-time histograms per model profile."""
+    return {"settings": admission.settings.model_dump(), "models": admission.status()}
+
+
+@metrics_router.get("/response-cache")
+def response_cache_metrics() -> Dict[str, Any]:
+    """Hit, miss and eviction counters per cache namespace, and entries held in each tier."""
+    return response_cache.status()
+
+
+@metrics_router.get("/semantic-cache")
+def semantic_cache_metrics() -> Dict[str, Any]:
+    """Lookups, hits and lookup latency per namespace, and rows stored in pgvector."""
+    return semantic_cache.status()
+
+
+@metrics_router.get("/single-flight")
+def single_flight_metrics() -> Dict[str, Any]:
+    """Run requests, executions started and requests coalesced into an in-flight run."""
+    return single_flight.status()
+
+
+@metrics_router.get("/search-cache")
+def search_cache_metrics() -> Dict[str, Any]:
+    """Hit rate, live versus cached latency and time saved per search tool."""
+    return search_cache.status()
+
+
+@metrics_router.get("/rate-limits")
+def rate_limit_metrics() -> Dict[str, Any]:
+    """Calls, queued calls, retries and queue-wait histograms per outbound search service."""
+    return rate_limiter.status()
+
+
+@metrics_router.get("/wikipedia-mirror")
+def wikipedia_mirror_metrics() -> Dict[str, Any]:
+    """Pages in the offline Wikipedia mirror, lookups served from it and lookup latency."""
+    return wikipedia_mirror.status() if wikipedia_mirror is not None else {"enabled": False}
+
+
+@metrics_router.get("/tool-calls")
+def tool_call_metrics() -> Dict[str, Any]:
+    """Tool call batches run side by side, timeouts per tool, and time saved over running them one by one."""
+    return {"settings": tool_call_settings.model_dump(), **tool_call_stats.snapshot()}
+
+
+@metrics_router.get("/workflow-graphs")
+def workflow_graph_metrics() -> Dict[str, Any]:
+    """Step graph runs, time saved over running their steps one by one, and each graph's last critical path."""
+    return {"settings": workflow_graph_settings.model_dump(), **graph_stats.snapshot()}
+
+
+@metrics_router.get("/workflow-checkpoints")
+def workflow_checkpoint_metrics() -> Dict[str, Any]:
+    """Workflow steps saved and restored from checkpoints, model time saved, and rows per workflow."""
+    return {"settings": workflow_checkpoints.settings.model_dump(), **workflow_checkpoints.status()}
+
+
+@metrics_router.get("/prompt-budget")
+def prompt_budget_metrics() -> Dict[str, Any]:
+    """Prompt tokens per workflow step, and tokens removed by deduping and trimming upstream outputs."""
+    return prompt_budget.status()
+
+
+@metrics_router.get("/stream-gates")
+def stream_gate_metrics() -> Dict[str, Any]:
+    """Gated generations per workflow step, how many were stopped or aborted, and the tokens saved."""
+    return {"settings": stream_gate_settings.model_dump(), "steps": stream_gate_stats.snapshot()}
+
+
+@metrics_router.get("/fast-parse")
+def fast_parse_metrics() -> Dict[str, Any]:
+    """Investment requests parsed without the model, fallbacks to the model by reason, and parse latency."""
+    return {"settings": fast_parse_settings.model_dump(), **fast_parse_stats.snapshot()}
+
+
+@metrics_router.get("/language-router")
+def language_router_metrics() -> Dict[str, Any]:
+    """Multilingual team requests routed to a specialist without the coordinator, and fallbacks by reason."""
+    return {"settings": language_router_settings.model_dump(), **language_router_stats.snapshot()}
+
+
+@metrics_router.get("/delegation")
+def delegation_metrics() -> Dict[str, Any]:
+    """Concurrent team delegations: member outcomes, and wall-clock time against running members one by one."""
+    return {"settings": delegation_settings.model_dump(), **delegation_stats.snapshot()}
+
+
+@metrics_router.get("/jobs")
+def job_metrics() -> Dict[str, Any]:
+    """Workflow jobs per status, and jobs claimed, retried, lost and their wait and run times in this process."""
+    return {"settings": job_queue.settings.model_dump(), **job_queue.status()}
@@ -1,4 +1,52 @@
-# Placeholder for model IDs while we add a Registry for models
+"""
+Model registry.
+
+Agents, teams and workflow steps ask the registry for a model by profile name instead of building
+their own Ollama(id, host). Every model for a given host shares one keep-alive HTTP client, each
+profile carries its own num_ctx/keep_alive/concurrency settings, and the number of in-flight calls
+per profile is tracked so it can be inspected at runtime.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+import httpx
+from agno.agent import RunOutput
+from agno.knowledge.embedder.ollama import OllamaEmbedder
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.tools.function import FunctionCall, FunctionExecutionResult
+from agno.utils.reasoning import extract_thinking_content
+from agno.utils.timer import Timer
+from ollama import AsyncClient, Client
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from app.prompt_layout import prompt_layout, stabilize_messages
+from app.response_cache import CachedResponse, build_cache_key, replay_chunks, response_cache
+from app.semantic_cache import SemanticQuery, semantic_cache, semantic_query
+from app.tool_calls import (
+    ToolBatch,
+    current_batch,
+    mark_timed_out,
+    needs_pause,
+    run_in_parallel,
+    tool_call_settings,
+    tool_call_stats,
+)
+
+log = logging.getLogger("app")
 
 OPENAI_MODEL_ID = "gpt-5-mini"
 OPENAI_EMBEDDER_MODEL_ID = "text-embedding-3-small"
@@ -8,3 +56,732 @@ GOOGLE_MODEL_ID = "gemini-2.5-pro"
 OLLAMA_BASE_URL = "http://host.docker.internal:11434"  # Access Ollama from Docker
 OLLAMA_MODEL_ID = "qwen3:latest"
 OLLAMA_EMBEDDER_MODEL_ID = "nomic-embed-text:v1.5"
+
+
+class ModelSettings(BaseSettings):
+    """Ollama registry settings loaded from OLLAMA_* environment variables."""
+
+    # Single place to point every profile at another Ollama daemon
+    host: str = OLLAMA_BASE_URL
+    model_id: str = OLLAMA_MODEL_ID
+    embedder_model_id: str = OLLAMA_EMBEDDER_MODEL_ID
+    num_ctx: int = 8192
+    keep_alive: str = "30m"
+    # Calls allowed in flight per profile; keep in line with the daemon's OLLAMA_NUM_PARALLEL
+    max_concurrency: int = 4
+    # Shared HTTP client settings
+    timeout: float = 300.0
+    max_connections: int = 32
+    keepalive_expiry: float = 120.0  # seconds an idle connection is kept open
+
+    model_config = SettingsConfigDict(env_prefix="OLLAMA_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """Named model configuration handed out by the registry."""
+
+    name: str
+    model_id: str
+    num_ctx: int
+    keep_alive: str
+    max_concurrency: int
+    host: Optional[str] = None  # None uses ModelSettings.host
+
+
+class _Waiter:
+    """A queued acquire: a thread blocked on an event, or a coroutine awaiting a future on its loop."""
+
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(
+        self,
+        event: Optional[threading.Event] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        future: Optional[asyncio.Future] = None,
+    ):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+
+class ModelGate:
+    """
+    Per-profile concurrency limit and in-flight counters.
+
+    Sync and async callers wait in one FIFO queue, so the limit holds across threads and event
+    loops. A release hands its slot straight to the first waiter and wakes only that one; a
+    coroutine cancelled after being handed a slot passes it on to the next waiter.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._waiters: Deque[_Waiter] = deque()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.errors = 0
+
+    def _has_slot(self) -> bool:
+        return self.limit <= 0 or self.in_flight < self.limit
+
+    def _enter(self) -> None:
+        self.in_flight += 1
+        self.calls += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _try_enter(self, waiter: _Waiter) -> bool:
+        # Lock held. Free slots go to queued callers first, so a newcomer never overtakes them
+        if self._has_slot() and not self._waiters:
+            self._enter()
+            return True
+        self._waiters.append(waiter)
+        self.waiting += 1
+        return False
+
+    def _grant_next(self) -> None:
+        # Lock held
+        while self._waiters and self._has_slot():
+            waiter = self._waiters.popleft()
+            self.waiting -= 1
+            if waiter.event is not None:
+                self._enter()
+                waiter.granted = True
+                waiter.event.set()
+            elif waiter.loop is not None and waiter.future is not None:
+                if waiter.future.done() or waiter.loop.is_closed():
+                    continue  # cancelled while queued
+                self._enter()
+                waiter.granted = True
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+
+    def acquire(self) -> None:
+        event = threading.Event()
+        waiter = _Waiter(event=event)
+        with self._lock:
+            if self._try_enter(waiter):
+                return
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        waiter = _Waiter(loop=loop, future=future)
+        with self._lock:
+            if self._try_enter(waiter):
+                return
+        try:
+            await future
+        except BaseException:
+            with self._lock:
+                granted = waiter.granted
+                if not granted and waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self.waiting -= 1
+            if granted:
+                # Handed a slot while being cancelled: pass it on rather than leak it
+                self.release()
+            raise
+
+    def release(self, failed: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+            self._grant_next()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # GeneratorExit (a stream closed early) is a normal release, not an error
+            self.release(failed)
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        await self.aacquire()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # Cancellation and GeneratorExit (aclose() on a stream, e.g. by a quality gate) are normal releases
+            self.release(failed)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_concurrency": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "peak_in_flight": self.peak_in_flight,
+                "calls": self.calls,
+                "errors": self.errors,
+            }
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ModelRegistry:
+    """Holds the model profiles, their gates and the shared Ollama clients."""
+
+    def __init__(self, settings: ModelSettings, profiles: Dict[str, ModelProfile]):
+        self.settings = settings
+        self._profiles = profiles
+        self._gates = {name: ModelGate(profile.max_concurrency) for name, profile in profiles.items()}
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Client] = {}
+        # httpx async connections belong to the event loop that opened them, so pool per loop
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def profile(self, name: str) -> ModelProfile:
+        if name not in self._profiles:
+            raise ValueError(f"Unknown model profile: {name!r}. Available: {sorted(self._profiles)}")
+        return self._profiles[name]
+
+    def gate(self, name: str) -> ModelGate:
+        self.profile(name)
+        return self._gates[name]
+
+    def host_for(self, name: str) -> str:
+        return self.profile(name).host or self.settings.host
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "timeout": self.settings.timeout,
+            "limits": httpx.Limits(
+                max_connections=self.settings.max_connections,
+                max_keepalive_connections=self.settings.max_connections,
+                keepalive_expiry=self.settings.keepalive_expiry,
+            ),
+        }
+
+    def client(self, host: str) -> Client:
+        """The shared sync client for a host."""
+        with self._lock:
+            if host not in self._clients:
+                self._clients[host] = Client(host=host, **self._client_kwargs())
+            return self._clients[host]
+
+    def async_client(self, host: str) -> AsyncClient:
+        """The shared async client for a host on the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            if host not in clients:
+                clients[host] = AsyncClient(host=host, **self._client_kwargs())
+            return clients[host]
+
+    def get_model(self, profile: str = "default", **overrides: Any) -> "RegistryOllama":
+        """
+        Build an Ollama model for a profile, wired to the shared clients.
+
+        Args:
+            profile: Name of the model profile
+            **overrides: Extra RegistryOllama fields (e.g. cache_namespace, format, request_params)
+
+        Returns:
+            RegistryOllama: Model that routes its calls through the profile's gate
+        """
+        spec = self.profile(profile)
+        return RegistryOllama(
+            id=spec.model_id,
+            host=self.host_for(profile),
+            options={"num_ctx": spec.num_ctx},
+            keep_alive=spec.keep_alive,
+            profile=profile,
+            **overrides,
+        )
+
+    def get_embedder(self, profile: str = "embedder", **overrides: Any) -> OllamaEmbedder:
+        """Build an Ollama embedder for a profile using the shared sync client."""
+        spec = self.profile(profile)
+        host = self.host_for(profile)
+        return OllamaEmbedder(id=spec.model_id, host=host, ollama_client=self.client(host), **overrides)
+
+    def embed(self, text: str, profile: str = "embedder") -> List[float]:
+        """Embed a text with an embedder profile over the shared sync client."""
+        spec = self.profile(profile)
+        response = self.client(self.host_for(profile)).embed(
+            model=spec.model_id, input=text, keep_alive=spec.keep_alive
+        )
+        return list(response.embeddings[0])
+
+    async def aembed(self, text: str, profile: str = "embedder") -> List[float]:
+        """Embed a text with an embedder profile over the shared async client."""
+        spec = self.profile(profile)
+        client = self.async_client(self.host_for(profile))
+        response = await client.embed(model=spec.model_id, input=text, keep_alive=spec.keep_alive)
+        return list(response.embeddings[0])
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            async_clients = sum(len(clients) for clients in self._async_clients.values())
+            sync_clients = len(self._clients)
+        return {
+            "clients": {"sync": sync_clients, "async": async_clients},
+            "profiles": {
+                name: {"model": profile.model_id, "host": self.host_for(name), **self._gates[name].snapshot()}
+                for name, profile in self._profiles.items()
+            },
+        }
+
+
+@dataclass
+class RegistryOllama(Ollama):
+    """
+    Ollama model that uses the registry's shared clients and counts in-flight calls per profile.
+
+    With a cache_namespace set, final text answers are served from (and stored in) the response
+    cache, and with semantic_cache also from the semantic cache; cache hits never take a slot from
+    the profile's gate.
+
+    With parallel_tool_calls, the tool calls from one model turn run concurrently with a per-call
+    timeout (app.tool_calls), in sync as well as async runs.
+
+    With a router, turns whose tool call the router can decide locally (e.g. the member a team
+    leader delegates to, teams.language_router) are answered with that call, without Ollama.
+    """
+
+    profile: str = "default"
+    cache_namespace: Optional[str] = None
+    # Also serve paraphrased first-turn questions from the semantic cache (needs cache_namespace)
+    semantic_cache: bool = False
+    # Run independent tool calls from one turn side by side, each with its own timeout
+    parallel_tool_calls: bool = False
+    # Returns the tool call ({"name", "arguments"}) for a turn's messages, or None to ask the model
+    router: Optional[Callable[[List[Message]], Optional[Dict[str, Any]]]] = None
+
+    # Clients are resolved from the registry on every call rather than stored on the model, so
+    # copies made by agno (e.g. deepcopy for reasoning) keep sharing the same connection pools
+    def get_client(self) -> Client:
+        return model_registry.client(self.host or model_registry.settings.host)
+
+    def get_async_client(self) -> AsyncClient:
+        return model_registry.async_client(self.host or model_registry.settings.host)
+
+    def invoke(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[RunOutput] = None,
+        compress_tool_results: bool = False,
+    ) -> ModelResponse:
+        routed = self._routed_response(messages, tools, assistant_message)
+        if routed is not None:
+            return routed
+        request = self._cache_request(messages, response_format, tools, compress_tool_results)
+        cached = self._cache_lookup(request)
+        if cached is not None:
+            return _cached_model_response(cached, assistant_message)
+        messages = _stable_layout(messages, run_response)
+
+        with model_registry.gate(self.profile).slot():
+            response = super().invoke(
+                messages=messages,
+                assistant_message=assistant_message,
+                response_format=response_format,
+                tools=tools,
+                tool_choice=tool_choice,
+                run_response=run_response,
+                compress_tool_results=compress_tool_results,
+            )
+        self._cache_store(request, response.content, bool(response.tool_calls), response.reasoning_content)
+        return response
+
+    async def ainvoke(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[RunOutput] = None,
+        compress_tool_results: bool = False,
+    ) -> ModelResponse:
+        routed = self._routed_response(messages, tools, assistant_message)
+        if routed is not None:
+            return routed
+        request = self._cache_request(messages, response_format, tools, compress_tool_results)
+        cached = await self._acache_lookup(request)
+        if cached is not None:
+            return _cached_model_response(cached, assistant_message)
+        messages = _stable_layout(messages, run_response)
+
+        async with model_registry.gate(self.profile).aslot():
+            response = await super().ainvoke(
+                messages=messages,
+                assistant_message=assistant_message,
+                response_format=response_format,
+                tools=tools,
+                tool_choice=tool_choice,
+                run_response=run_response,
+                compress_tool_results=compress_tool_results,
+            )
+        await self._acache_store(request, response.content, bool(response.tool_calls), response.reasoning_content)
+        return response
+
+    def invoke_stream(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[RunOutput] = None,
+        compress_tool_results: bool = False,
+    ) -> Iterator[ModelResponse]:
+        routed = self._routed_response(messages, tools, assistant_message)
+        if routed is not None:
+            yield routed
+            return
+        request = self._cache_request(messages, response_format, tools, compress_tool_results)
+        cached = self._cache_lookup(request)
+        if cached is not None:
+            yield from _replay_stream(cached, assistant_message)
+            return
+        messages = _stable_layout(messages, run_response)
+
+        parts: List[str] = []
+        reasoning: List[str] = []
+        called_tools = False
+        with model_registry.gate(self.profile).slot():
+            for chunk in super().invoke_stream(
+                messages=messages,
+                assistant_message=assistant_message,
+                response_format=response_format,
+                tools=tools,
+                tool_choice=tool_choice,
+                run_response=run_response,
+                compress_tool_results=compress_tool_results,
+            ):
+                parts.append(chunk.content or "")
+                reasoning.append(chunk.reasoning_content or "")
+                called_tools = called_tools or bool(chunk.tool_calls)
+                yield chunk
+        self._cache_store(request, "".join(parts), called_tools, "".join(reasoning) or None)
+
+    async def ainvoke_stream(  # type: ignore[override]
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[RunOutput] = None,
+        compress_tool_results: bool = False,
+    ) -> AsyncIterator[ModelResponse]:
+        routed = self._routed_response(messages, tools, assistant_message)
+        if routed is not None:
+            yield routed
+            return
+        request = self._cache_request(messages, response_format, tools, compress_tool_results)
+        cached = await self._acache_lookup(request)
+        if cached is not None:
+            for replayed in _replay_stream(cached, assistant_message):
+                yield replayed
+            return
+        messages = _stable_layout(messages, run_response)
+
+        parts: List[str] = []
+        reasoning: List[str] = []
+        called_tools = False
+        async with model_registry.gate(self.profile).aslot():
+            async for chunk in super().ainvoke_stream(
+                messages=messages,
+                assistant_message=assistant_message,
+                response_format=response_format,
+                tools=tools,
+                tool_choice=tool_choice,
+                run_response=run_response,
+                compress_tool_results=compress_tool_results,
+            ):
+                parts.append(chunk.content or "")
+                reasoning.append(chunk.reasoning_content or "")
+                called_tools = called_tools or bool(chunk.tool_calls)
+                yield chunk
+        await self._acache_store(request, "".join(parts), called_tools, "".join(reasoning) or None)
+
+    # ************* Tool calls *************
+
+    def run_function_calls(
+        self,
+        function_calls: List[FunctionCall],
+        function_call_results: List[Message],
+        additional_input: Optional[List[Message]] = None,
+        current_function_call_count: int = 0,
+        function_call_limit: Optional[int] = None,
+    ) -> Iterator[Any]:
+        # Batches that pause the run or hit the call limit keep agno's one-by-one handling
+        limited = (
+            function_call_limit is not None and current_function_call_count + len(function_calls) > function_call_limit
+        )
+        if not self.parallel_tool_calls or limited or any(map(needs_pause, function_calls)):
+            yield from super().run_function_calls(
+                function_calls,
+                function_call_results,
+                additional_input,
+                current_function_call_count,
+                function_call_limit,
+            )
+            return
+
+        additional_input = additional_input if additional_input is not None else []
+        yield from run_in_parallel(
+            lambda fc, results, extra: self.run_function_call(fc, results, extra),
+            self.create_function_call_result,
+            function_calls,
+            function_call_results,
+            additional_input,
+            tool_call_settings,
+        )
+        if additional_input:
+            function_call_results.extend(additional_input)
+
+    async def arun_function_calls(
+        self,
+        function_calls: List[FunctionCall],
+        function_call_results: List[Message],
+        additional_input: Optional[List[Message]] = None,
+        current_function_call_count: int = 0,
+        function_call_limit: Optional[int] = None,
+        skip_pause_check: bool = False,
+    ) -> AsyncIterator[Any]:
+        # agno already gathers the calls; the batch adds the bound, timeouts and timings
+        batch = (
+            ToolBatch(slots=asyncio.Semaphore(max(1, tool_call_settings.max_parallel)))
+            if self.parallel_tool_calls
+            else None
+        )
+        token = current_batch.set(batch)
+        try:
+            async for event in super().arun_function_calls(
+                function_calls,
+                function_call_results,
+                additional_input,
+                current_function_call_count,
+                function_call_limit,
+                skip_pause_check,
+            ):
+                yield event
+        finally:
+            if batch is not None:
+                tool_call_stats.record(batch)
+            try:
+                current_batch.reset(token)
+            except ValueError:
+                pass  # generator closed from another context
+
+    async def arun_function_call(
+        self, function_call: FunctionCall
+    ) -> Tuple[Any, Timer, FunctionCall, FunctionExecutionResult]:
+        batch = current_batch.get()
+        if batch is None or batch.slots is None:
+            return await super().arun_function_call(function_call)
+
+        timeout = tool_call_settings.timeout_seconds
+        async with batch.slots:
+            started = time.perf_counter()
+            try:
+                if timeout <= 0:
+                    return await super().arun_function_call(function_call)
+                return await asyncio.wait_for(super().arun_function_call(function_call), timeout)
+            except asyncio.TimeoutError:
+                batch.timeouts.append(function_call.function.name)
+                timer = mark_timed_out(function_call, timeout)
+                return False, timer, function_call, FunctionExecutionResult(status="failure", error=function_call.error)
+            finally:
+                batch.add(started, time.perf_counter())
+
+    # ************* Local routing *************
+
+    def _routed_response(
+        self, messages: List[Message], tools: Optional[List[Dict[str, Any]]], assistant_message: Message
+    ) -> Optional[ModelResponse]:
+        if self.router is None or not tools:
+            return None
+        call = self.router(messages)
+        offered = {tool.get("function", {}).get("name") for tool in tools}
+        if call is None or call["name"] not in offered:
+            return None
+        assistant_message.metrics.start_timer()
+        assistant_message.metrics.stop_timer()
+        return ModelResponse(
+            role="assistant", tool_calls=[{"type": "function", "function": call}], response_usage=Metrics()
+        )
+
+    # ************* Response cache *************
+
+    def _cache_request(
+        self,
+        messages: List[Message],
+        response_format: Optional[Any],
+        tools: Optional[List[Dict[str, Any]]],
+        compress_tool_results: bool,
+    ) -> Optional[_CacheRequest]:
+        # Structured outputs are parsed downstream from the live response, so they are not cached
+        if self.cache_namespace is None or response_format is not None or not response_cache.settings.enabled:
+            return None
+        formatted = [self._format_message(message, compress_tool_results) for message in messages]
+        params = self.get_request_params()
+        semantic = None
+        if self.semantic_cache and semantic_cache.settings.enabled:
+            semantic = semantic_query(self.cache_namespace, self.id, formatted, params, tools)
+        return _CacheRequest(
+            namespace=self.cache_namespace,
+            key=build_cache_key(self.cache_namespace, self.id, formatted, params, tools),
+            semantic=semantic,
+        )
+
+    def _cache_lookup(self, request: Optional[_CacheRequest]) -> Optional[CachedResponse]:
+        if request is None:
+            return None
+        cached = response_cache.get(request.namespace, request.key)
+        if cached is not None or request.semantic is None:
+            return cached
+        try:
+            request.embedding = model_registry.embed(semantic_cache.embedding_input(request.semantic.question))
+        except Exception as e:  # noqa: BLE001
+            log.warning(f"Embedding for the semantic cache failed: {e}")
+            return None
+        match = semantic_cache.lookup(request.namespace, request.semantic, request.embedding)
+        return match.response if match is not None else None
+
+    async def _acache_lookup(self, request: Optional[_CacheRequest]) -> Optional[CachedResponse]:
+        if request is None:
+            return None
+        cached = await response_cache.aget(request.namespace, request.key)
+        if cached is not None or request.semantic is None:
+            return cached
+        try:
+            request.embedding = await model_registry.aembed(semantic_cache.embedding_input(request.semantic.question))
+        except Exception as e:  # noqa: BLE001
+            log.warning(f"Embedding for the semantic cache failed: {e}")
+            return None
+        match = await asyncio.to_thread(semantic_cache.lookup, request.namespace, request.semantic, request.embedding)
+        return match.response if match is not None else None
+
+    def _cache_store(
+        self,
+        request: Optional[_CacheRequest],
+        content: Any,
+        called_tools: bool,
+        reasoning_content: Optional[str] = None,
+    ) -> None:
+        cacheable = _cacheable(request, content, called_tools, reasoning_content)
+        if request is None or cacheable is None:
+            return
+        response_cache.put(request.namespace, request.key, self.id, cacheable)
+        if request.semantic is not None and request.embedding is not None:
+            semantic_cache.store(request.namespace, request.semantic, request.embedding, cacheable)
+
+    async def _acache_store(
+        self,
+        request: Optional[_CacheRequest],
+        content: Any,
+        called_tools: bool,
+        reasoning_content: Optional[str] = None,
+    ) -> None:
+        if _cacheable(request, content, called_tools, reasoning_content) is not None:
+            await asyncio.to_thread(self._cache_store, request, content, called_tools, reasoning_content)
+
+
+@dataclass
+class _CacheRequest:
+    """Cache keys for one model call; the embedding is filled in by the semantic lookup."""
+
+    namespace: str
+    key: str
+    semantic: Optional[SemanticQuery] = None
+    embedding: Optional[List[float]] = None
+
+
+def _cacheable(
+    request: Optional[_CacheRequest], content: Any, called_tools: bool, reasoning_content: Optional[str] = None
+) -> Optional[CachedResponse]:
+    # Only final text answers are cached; tool calls must always reach the model
+    if request is None or called_tools or not isinstance(content, str) or not content.strip():
+        return None
+    if reasoning_content is None and "<think>" in content:
+        reasoning_content, content = extract_thinking_content(content)
+    return CachedResponse(content=content, reasoning_content=reasoning_content)
+
+
+def _stable_layout(messages: List[Message], run_response: Optional[RunOutput]) -> List[Message]:
+    # Applied after the cache lookup, so cache keys are computed on the messages agno built
+    return stabilize_messages(messages, getattr(run_response, "user_id", None), prompt_layout)
+
+
+def _cached_model_response(cached: CachedResponse, assistant_message: Message) -> ModelResponse:
+    assistant_message.metrics.start_timer()
+    assistant_message.metrics.stop_timer()
+    return ModelResponse(
+        role="assistant",
+        content=cached.content,
+        reasoning_content=cached.reasoning_content,
+        response_usage=Metrics(),
+    )
+
+
+def _replay_stream(cached: CachedResponse, assistant_message: Message) -> Iterator[ModelResponse]:
+    # Replay in word-aligned chunks so streaming clients (the Chainlit UI) see a normal stream
+    assistant_message.metrics.start_timer()
+    if cached.reasoning_content:
+        yield ModelResponse(reasoning_content=cached.reasoning_content)
+    for chunk in replay_chunks(cached.content, response_cache.settings.replay_chunk_chars):
+        yield ModelResponse(content=chunk)
+    assistant_message.metrics.stop_timer()
+    yield ModelResponse(response_usage=Metrics())
+
+
+def _default_profiles(settings: ModelSettings) -> Dict[str, ModelProfile]:
+    return {
+        "default": ModelProfile(
+            name="default",
+            model_id=settings.model_id,
+            num_ctx=settings.num_ctx,
+            keep_alive=settings.keep_alive,
+            max_concurrency=settings.max_concurrency,
+        ),
+        "embedder": ModelProfile(
+            name="embedder",
+            model_id=settings.embedder_model_id,
+            num_ctx=settings.num_ctx,
+            keep_alive=settings.keep_alive,
+            max_concurrency=0,  # embeddings are short; do not gate them
+        ),
+    }
+
+
+# Global registry so every agent, team and workflow shares the same clients and gates
+_settings = ModelSettings()
+model_registry = ModelRegistry(_settings, _default_profiles(_settings))
+
+
+def get_model(profile: str = "default", **overrides: Any) -> RegistryOllama:
+    """Shortcut for model_registry.get_model()."""
+    return model_registry.get_model(profile, **overrides)
+
+
+def get_embedder(profile: str = "embedder", **overrides: Any) -> OllamaEmbedder:
+    """Shortcut for model_registry.get_embedder()."""
+    return model_registry.get_embedder(profile, **overrides)
@@ -0,0 +1,103 @@
+"""
+Prefix-cache-friendly prompt layout.
+
+Ollama reuses the KV cache of the longest prompt prefix it has already processed. agno puts the
+current time (add_datetime_to_context) and, through {current_user_id}, the user id into the
+system message, ahead of the tool instructions, the history and the question, so every call
+re-evaluates almost the whole prompt. In stable-prefix mode these volatile fields are lifted out
+of the system message into a trailing <request_context> block on the latest user message, and the
+time is rounded down to a configurable granularity, leaving the system message and history
+byte-identical between calls. Only the copy sent to Ollama is rewritten; stored runs and cache
+keys see the messages as agno built them.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from agno.models.message import Message
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Line added by agno's add_datetime_to_context inside <additional_information>
+CURRENT_TIME = re.compile(r"\n- The current time is (?P<time>[^\n]+)\.(?=\n)")
+EMPTY_ADDITIONAL_INFORMATION = "<additional_information>\n</additional_information>\n\n"
+CONTEXT_REFERENCE = "given in <request_context>"
+
+
+class PromptLayoutSettings(BaseSettings):
+    """Prompt layout settings loaded from PROMPT_LAYOUT_* environment variables."""
+
+    stable_prefix: bool = True
+    # The time shown to the model is rounded down to this many seconds (0 keeps it exact)
+    time_granularity: int = 3600
+
+    model_config = SettingsConfigDict(env_prefix="PROMPT_LAYOUT_", case_sensitive=False)
+
+
+def round_time(value: str, granularity: int) -> str:
+    """Round a str(datetime) down to the granularity; unparsable values are returned unchanged."""
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if granularity <= 0:
+        return value
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = int((moment - midnight).total_seconds())
+    rounded = midnight + timedelta(seconds=elapsed - elapsed % granularity)
+    return rounded.isoformat(sep=" ", timespec="minutes" if granularity % 60 == 0 else "seconds")
+
+
+def stabilize_messages(
+    messages: List[Message], user_id: Optional[str], settings: PromptLayoutSettings
+) -> List[Message]:
+    """
+    Move the volatile parts of the system message to a block after the latest user message.
+
+    Args:
+        messages: Messages of one model call, as built by agno
+        user_id: User of the run, if any
+        settings: Layout settings
+
+    Returns:
+        List[Message]: The messages to send; the input list and its messages are not modified
+    """
+    if not settings.stable_prefix:
+        return messages
+    system_index = next((i for i, m in enumerate(messages) if m.role == "system"), None)
+    user_index = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].role == "user"), None)
+    if system_index is None or user_index is None:
+        return messages
+    system, user = messages[system_index], messages[user_index]
+    if not isinstance(system.content, str) or not isinstance(user.content, str):
+        return messages
+
+    content = system.content
+    context: List[str] = []
+    time_match = CURRENT_TIME.search(content)
+    if time_match is not None:
+        content = content[: time_match.start()] + content[time_match.end() :]
+        content = content.replace(EMPTY_ADDITIONAL_INFORMATION, "")
+        context.append(f"The current time is {round_time(time_match.group('time'), settings.time_granularity)}.")
+    if user_id:
+        content, replaced = re.subn(
+            rf"\buser_id: {re.escape(user_id)}(?=\s|$)", f"user_id: {CONTEXT_REFERENCE}", content
+        )
+        if replaced:
+            context.append(f"You are interacting with the user_id: {user_id}")
+    if not context:
+        return messages
+
+    block = "\n".join(f"- {line}" for line in context)
+    stable = list(messages)
+    stable[system_index] = system.model_copy(update={"content": content})
+    stable[user_index] = user.model_copy(
+        update={"content": f"{user.content}\n\n<request_context>\n{block}\n</request_context>"}
+    )
+    return stable
+
+
+# Global settings used by every registry model
+prompt_layout = PromptLayoutSettings()
@@ -0,0 +1,268 @@
+"""
+Global rate limiter for outbound search tools.
+
+DuckDuckGo and Wikipedia calls from every toolkit instance draw from one token bucket per
+service. With the Postgres backend the bucket is a row updated atomically by each call, so all
+worker processes share it; the local backend keeps it in memory for single-process setups.
+A call that finds the bucket empty reserves the next token and sleeps until it is due instead
+of failing, up to max_wait. The search toolkits stay sync (agno refuses async tools in sync
+runs), so a queued call sleeps on the thread agno runs the tool on; max_wait bounds how long.
+Throttling errors from the service are retried with jittered
+exponential backoff rather than surfacing to the model, which would otherwise retry with even
+more tool calls.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Column, DateTime, Float, MetaData, String, Table, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateSchema
+
+from modules.metrics import Histogram
+
+log = logging.getLogger("app")
+
+T = TypeVar("T")
+
+# Queue waits are usually sub-second to tens of seconds
+WAIT_BUCKETS = (0.0, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class RateLimitSettings(BaseSettings):
+    """Rate limit settings loaded from RATE_LIMIT_* environment variables."""
+
+    enabled: bool = True
+    # "postgres" shares the buckets between workers; "local" keeps them per process
+    backend: str = "postgres"
+    duckduckgo_per_second: float = 0.5
+    duckduckgo_burst: int = 3
+    wikipedia_per_second: float = 2.0
+    wikipedia_burst: int = 5
+    # Calls that would have to queue longer than this fail instead
+    max_wait: float = 60.0
+    retries: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 16.0
+    db_schema: str = "ai"
+
+    model_config = SettingsConfigDict(env_prefix="RATE_LIMIT_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    name: str
+    per_second: float
+    burst: int
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than max_wait for a token."""
+
+
+class LocalBuckets:
+    """In-process token buckets that allow reservations below zero (queued calls)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def reserve(self, spec: BucketSpec) -> float:
+        """Take one token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(spec.name, (float(spec.burst), now))
+            tokens = min(float(spec.burst), tokens + spec.per_second * (now - updated)) - 1
+            self._buckets[spec.name] = (tokens, now)
+        return max(0.0, -tokens / spec.per_second)
+
+    def refund(self, spec: BucketSpec) -> None:
+        with self._lock:
+            tokens, updated = self._buckets[spec.name]
+            self._buckets[spec.name] = (tokens + 1, updated)
+
+
+class PostgresBuckets:
+    """Token buckets stored as rows, refilled and decremented in a single upsert per call."""
+
+    def __init__(self, engine: Engine, schema: str):
+        self.engine = engine
+        self.schema = schema
+        self.table = Table(
+            "rate_limit_buckets",
+            MetaData(schema=schema),
+            Column("name", String(64), primary_key=True),
+            Column("tokens", Float, nullable=False),
+            Column("updated_at", DateTime(timezone=True), nullable=False),
+        )
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(CreateSchema(self.schema, if_not_exists=True))
+                self.table.create(conn, checkfirst=True)
+            self._ready = True
+
+    def reserve(self, spec: BucketSpec) -> float:
+        """Take one token and return how long to wait before using it."""
+        self._ensure_table()
+        now = func.clock_timestamp()
+        refilled = func.least(
+            float(spec.burst),
+            self.table.c.tokens + spec.per_second * func.extract("epoch", now - self.table.c.updated_at),
+        )
+        statement = (
+            insert(self.table)
+            .values(name=spec.name, tokens=float(spec.burst) - 1, updated_at=now)
+            .on_conflict_do_update(index_elements=[self.table.c.name], set_={"tokens": refilled - 1, "updated_at": now})
+            .returning(self.table.c.tokens)
+        )
+        with self.engine.begin() as conn:
+            tokens = conn.execute(statement).scalar_one()
+        return max(0.0, -float(tokens) / spec.per_second)
+
+    def refund(self, spec: BucketSpec) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(
+                self.table.update().where(self.table.c.name == spec.name).values(tokens=self.table.c.tokens + 1)
+            )
+
+
+class RateLimitStats:
+    """Thread-safe per-bucket counters, queue-wait histogram and recent throughput."""
+
+    FIELDS = ("calls", "queued", "retries", "failures", "rejected", "errors")
+
+    def __init__(self, window_seconds: float = 60.0):
+        self._lock = threading.Lock()
+        self._window = window_seconds
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._waited: Dict[str, float] = {}
+        self._waits: Dict[str, Histogram] = {}
+        self._recent: Dict[str, Deque[float]] = {}
+
+    def incr(self, bucket: str, counter: str) -> None:
+        with self._lock:
+            self._counters.setdefault(bucket, dict.fromkeys(self.FIELDS, 0))[counter] += 1
+
+    def record_call(self, bucket: str, waited: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            counters = self._counters.setdefault(bucket, dict.fromkeys(self.FIELDS, 0))
+            counters["calls"] += 1
+            counters["queued"] += waited > 0
+            self._waited[bucket] = self._waited.get(bucket, 0.0) + waited
+            recent = self._recent.setdefault(bucket, deque())
+            recent.append(now)
+            while recent and recent[0] < now - self._window:
+                recent.popleft()
+            histogram = self._waits.setdefault(bucket, Histogram(WAIT_BUCKETS))
+        histogram.observe(waited)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                bucket: {
+                    **counters,
+                    "waited_seconds": round(self._waited.get(bucket, 0.0), 3),
+                    "calls_per_minute": sum(1 for t in self._recent.get(bucket, ()) if t >= now - self._window),
+                    "wait_seconds": self._waits[bucket].snapshot() if bucket in self._waits else None,
+                }
+                for bucket, counters in self._counters.items()
+            }
+
+
+class RateLimiter:
+    """Shared limiter: one bucket per outbound service, used by every toolkit instance."""
+
+    def __init__(self, settings: RateLimitSettings, buckets: Any):
+        self.settings = settings
+        self.buckets = buckets
+        self.stats = RateLimitStats()
+        self.specs = {
+            "duckduckgo": BucketSpec("duckduckgo", settings.duckduckgo_per_second, settings.duckduckgo_burst),
+            "wikipedia": BucketSpec("wikipedia", settings.wikipedia_per_second, settings.wikipedia_burst),
+        }
+
+    def acquire(self, bucket: str) -> float:
+        """Block until the bucket grants a token; returns the seconds waited."""
+        spec = self.specs[bucket]
+        try:
+            wait = self.buckets.reserve(spec)
+        except Exception as e:  # noqa: BLE001
+            # Never let the limiter's own storage take the tools down
+            self.stats.incr(bucket, "errors")
+            log.warning(f"Rate limiter unavailable, calling {bucket} unthrottled: {e}")
+            return 0.0
+        if wait > self.settings.max_wait:
+            self.buckets.refund(spec)
+            self.stats.incr(bucket, "rejected")
+            raise RateLimitExceeded(f"{bucket} is rate limited; try again in {wait:.0f}s")
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def call(self, bucket: str, fn: Callable[[], T], retry_on: Tuple[Type[BaseException], ...] = ()) -> T:
+        """
+        Run fn once a token is available, retrying throttling errors with jittered backoff.
+
+        Args:
+            bucket: Bucket name, "duckduckgo" or "wikipedia"
+            fn: The outbound call
+            retry_on: Exception types that mean "throttled or flaky, try again"
+
+        Returns:
+            The result of fn
+        """
+        if not self.settings.enabled:
+            return fn()
+        for attempt in range(self.settings.retries + 1):
+            self.stats.record_call(bucket, self.acquire(bucket))
+            try:
+                return fn()
+            except retry_on as e:
+                if attempt == self.settings.retries:
+                    self.stats.incr(bucket, "failures")
+                    raise
+                # Full jitter keeps workers that were throttled together from retrying together
+                delay = random.uniform(0, min(self.settings.backoff_max, self.settings.backoff_base * 2**attempt))
+                self.stats.incr(bucket, "retries")
+                log.info(f"{bucket} call throttled ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.settings.backend if self.settings.enabled else "disabled",
+            "buckets": {name: {"per_second": s.per_second, "burst": s.burst} for name, s in self.specs.items()},
+            "stats": self.stats.snapshot(),
+        }
+
+
+def _build_rate_limiter(settings: Optional[RateLimitSettings] = None) -> RateLimiter:
+    settings = settings or RateLimitSettings()
+    if settings.backend == "postgres":
+        from db.session import db_engine
+
+        return RateLimiter(settings, PostgresBuckets(db_engine, settings.db_schema))
+    return RateLimiter(settings, LocalBuckets())
+
+
+# Global limiter shared by every search toolkit in the process
+rate_limiter = _build_rate_limiter()
@@ -0,0 +1,332 @@
+"""
+Lazy entity registry for the AgentOS.
+
+Agents, teams and workflows are declared here by id and metadata. In lazy mode the AgentOS is
+built from lightweight stand-ins, and an entity's module (with its models, tools, knowledge and
+databases) is only imported on the entity's first run or config request. Descriptions are not
+repeated here: a stand-in reads the description= literal from its module's source, without
+importing it, so /config shows the same text before and after the entity is loaded.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib
+import importlib.util
+import logging
+import textwrap
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from db.session import get_postgres_db
+
+log = logging.getLogger("app")
+
+EntityType = Literal["agent", "team", "workflow"]
+
+
+class RegistrySettings(BaseSettings):
+    """Entity loading settings loaded from AGENTOS_* environment variables."""
+
+    lazy_entities: bool = True
+    # Comma-separated entity ids to materialize in the background at startup
+    warmup: str = ""
+
+    model_config = SettingsConfigDict(env_prefix="AGENTOS_", case_sensitive=False)
+
+    @property
+    def warmup_ids(self) -> List[str]:
+        return [entity_id.strip() for entity_id in self.warmup.split(",") if entity_id.strip()]
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """Declaration of an AgentOS entity that can be imported on demand."""
+
+    id: str
+    type: EntityType
+    target: str  # "package.module:attribute"
+    name: str
+    # Empty reads the description the entity's module declares
+    description: str = ""
+    model_profile: str = "default"  # app.models profile the entity runs on
+    # Identical concurrent runs may share one execution; only for entities without per-user instructions,
+    # memory or session history (add_history_to_context), which the coalescing key does not include
+    coalesce: bool = False
+
+
+@lru_cache(maxsize=1)
+def _shared_db() -> Any:
+    return get_postgres_db()
+
+
+@lru_cache(maxsize=None)
+def _declared_description(target: str) -> str:
+    """The description= string literal (or dedent() of one) the target's module passes to its entity."""
+    module_path, _, attribute = target.partition(":")
+    try:
+        spec = importlib.util.find_spec(module_path)
+    except (ImportError, ValueError):
+        return ""
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return ""
+    with open(spec.origin, encoding="utf-8") as source:
+        tree = ast.parse(source.read())
+    for node in tree.body:
+        if not (
+            isinstance(node, ast.Assign)
+            and any(isinstance(name, ast.Name) and name.id == attribute for name in node.targets)
+            and isinstance(node.value, ast.Call)
+        ):
+            continue
+        for keyword in node.value.keywords:
+            if keyword.arg != "description":
+                continue
+            value, dedent = keyword.value, False
+            if isinstance(value, ast.Call) and getattr(value.func, "id", None) == "dedent" and value.args:
+                value, dedent = value.args[0], True
+            if not (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+                return ""
+            return textwrap.dedent(value.value) if dedent else value.value
+    return ""
+
+
+def _entity_class(entity_type: EntityType) -> type:
+    if entity_type == "agent":
+        from agno.agent import Agent
+
+        return Agent
+    if entity_type == "team":
+        from agno.team.team import Team
+
+        return Team
+    from agno.workflow.workflow import Workflow
+
+    return Workflow
+
+
+class LazyEntity:
+    """
+    Stand-in for an Agent, Team or Workflow that imports the real object on first use.
+
+    Answers the metadata the AgentOS reads at startup and in /config (id, name, description, db)
+    from its spec, records the setup the AgentOS applies, and replays it once materialized.
+    Any other attribute access materializes the entity and is forwarded to it.
+    """
+
+    # Attributes the AgentOS inspects at startup, answered without importing the entity
+    _UNLOADED_DEFAULTS: Dict[str, Any] = {"tools": None, "members": (), "steps": None, "knowledge": None}
+    _DEFERRED_CALLS = ("initialize_agent", "initialize_team", "propagate_run_hooks_in_background")
+
+    def __init__(self, spec: EntitySpec):
+        object.__setattr__(self, "_spec", spec)
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_pending_attrs", {})
+        object.__setattr__(self, "_hooks_in_background", None)
+        object.__setattr__(self, "load_seconds", None)
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> type:
+        # Keeps isinstance(entity, Agent/Team/Workflow) checks in the AgentOS routers working
+        return _entity_class(self._spec.type)
+
+    @property
+    def id(self) -> str:
+        return self._spec.id
+
+    @property
+    def name(self) -> str:
+        return self._target.name if self._target is not None else self._spec.name
+
+    @property
+    def description(self) -> str:
+        if self._target is not None:
+            return self._target.description
+        return self._spec.description or _declared_description(self._spec.target)
+
+    @property
+    def db(self) -> Any:
+        # Every entity stores sessions in the shared agent-os database
+        return self._target.db if self._target is not None else _shared_db()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._target is not None
+
+    def materialize(self) -> Any:
+        """Import the entity, replay the AgentOS setup on it and return it."""
+        if self._target is not None:
+            return self._target
+
+        with self._lock:
+            if self._target is not None:
+                return self._target
+
+            started = time.perf_counter()
+            module_path, _, attribute = self._spec.target.partition(":")
+            entity = getattr(importlib.import_module(module_path), attribute)
+            self._prepare(entity)
+            object.__setattr__(self, "load_seconds", time.perf_counter() - started)
+            object.__setattr__(self, "_target", entity)
+            return entity
+
+    def _prepare(self, entity: Any) -> None:
+        """Apply the same initialization AgentOS performs for eagerly registered entities."""
+        if self._spec.type == "workflow" and not entity.id:
+            entity.id = self._spec.id
+        if entity.id != self._spec.id:
+            raise ValueError(f"Entity {self._spec.target} has id {entity.id!r}, declared as {self._spec.id!r}")
+
+        if self._spec.type == "agent":
+            entity.initialize_agent()
+        elif self._spec.type == "team":
+            from agno.agent import Agent
+
+            entity.initialize_team()
+            for member in entity.members:
+                if isinstance(member, Agent):
+                    member.team_id = None
+                    member.initialize_agent()
+                else:
+                    member.initialize_team()
+
+        for attribute, value in self._pending_attrs.items():
+            setattr(entity, attribute, value)
+        if self._hooks_in_background is not None:
+            entity.propagate_run_hooks_in_background(self._hooks_in_background)
+
+    def __getattr__(self, attribute: str) -> Any:
+        if self._target is None:
+            if attribute in self._UNLOADED_DEFAULTS:
+                return self._UNLOADED_DEFAULTS[attribute]
+            if attribute in self._DEFERRED_CALLS:
+                return self._defer_call(attribute)
+            if attribute.startswith("__"):
+                raise AttributeError(attribute)
+        return getattr(self.materialize(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        if self._target is not None:
+            setattr(self._target, attribute, value)
+        else:
+            self._pending_attrs[attribute] = value
+
+    def _defer_call(self, method: str) -> Any:
+        def deferred(*args: Any, **kwargs: Any) -> None:
+            if method == "propagate_run_hooks_in_background":
+                value = args[0] if args else kwargs.get("run_in_background", True)
+                object.__setattr__(self, "_hooks_in_background", value)
+
+        return deferred
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"LazyEntity({self._spec.type}:{self._spec.id}, {state})"
+
+
+class EntityRegistry:
+    """Holds the declared entities and hands them to the AgentOS, lazily or eagerly."""
+
+    def __init__(self, specs: List[EntitySpec]):
+        self._entities: Dict[str, LazyEntity] = {}
+        for spec in specs:
+            if spec.id in self._entities:
+                raise ValueError(f"Duplicate entity id in registry: {spec.id!r}")
+            self._entities[spec.id] = LazyEntity(spec)
+
+    def get(self, entity_id: str) -> Optional[LazyEntity]:
+        return self._entities.get(entity_id)
+
+    def model_profile(self, entity_id: str) -> str:
+        """Model profile an entity runs on, without materializing it."""
+        entity = self._entities.get(entity_id)
+        return entity._spec.model_profile if entity is not None else "default"
+
+    def coalescable(self, entity_id: str) -> bool:
+        """Whether identical concurrent runs of an entity may be coalesced, without materializing it."""
+        entity = self._entities.get(entity_id)
+        return entity is not None and entity._spec.coalesce
+
+    def entities(self, entity_type: EntityType, lazy: bool = True) -> List[Any]:
+        """Entities of one type: stand-ins when lazy, otherwise the materialized objects."""
+        entities = [entity for entity in self._entities.values() if entity._spec.type == entity_type]
+        if lazy:
+            return entities
+        return [entity.materialize() for entity in entities]
+
+    def warm_up(self, entity_ids: List[str]) -> None:
+        """Materialize the given entities, e.g. from a background thread at startup; unknown ids are skipped."""
+        for entity_id in entity_ids:
+            entity = self._entities.get(entity_id)
+            if entity is None:
+                log.warning(f"Skipping unknown entity id in warm-up list: {entity_id!r}")
+                continue
+            entity.materialize()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            entity_id: {
+                "type": entity._spec.type,
+                "loaded": entity.is_loaded,
+                "load_ms": round(1000 * entity.load_seconds, 1) if entity.load_seconds is not None else None,
+            }
+            for entity_id, entity in self._entities.items()
+        }
+
+
+# ************* Entity Declarations *************
+registry = EntityRegistry(
+    [
+        EntitySpec(
+            id="agno-simple",
+            type="agent",
+            target="agents.simple_agent:agno_simple",
+            name="Agno Simple Agent",
+            coalesce=True,
+        ),
+        EntitySpec(
+            id="web-search-agent",
+            type="agent",
+            target="agents.web_agent:web_agent",
+            name="Web Search Agent",
+        ),
+        EntitySpec(
+            id="agno-assist",
+            type="agent",
+            target="agents.agno_assist:agno_assist",
+            name="Agno Assist",
+        ),
+        EntitySpec(
+            id="multilingual-team",
+            type="team",
+            target="teams.multilingual_team:multilingual_team",
+            name="Professional Multilingual Consultation Team",
+        ),
+        EntitySpec(
+            id="reasoning-research-team",
+            type="team",
+            target="teams.reasoning_finance_team:reasoning_research_team",
+            name="Advanced Research & Analysis Team",
+        ),
+        EntitySpec(
+            id="investment-analyst-pro",
+            type="workflow",
+            target="workflows.investment_workflow:investment_workflow",
+            name="Investment Analyst Pro",
+            coalesce=True,
+        ),
+        EntitySpec(
+            id="advanced-research-analyst",
+            type="workflow",
+            target="workflows.research_workflow:research_workflow",
+            name="Advanced Research Analyst",
+            coalesce=True,
+        ),
+    ]
+)
@@ -0,0 +1,354 @@
+"""
+Exact-match LLM response cache.
+
+Models built with get_model(cache_namespace=...) look up each chat request here before calling
+Ollama. The key is a hash of the model id, request options, normalized system prompt, message
+history and tool set. Entries live in a bounded in-memory LRU in front of a Postgres table with
+TTL and per-namespace size limits. Only final text answers are cached, never tool calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateSchema
+
+log = logging.getLogger("app")
+
+V = TypeVar("V")
+
+# Parts of agno's system message that change on every run and would defeat the cache
+VOLATILE_PATTERNS = (
+    re.compile(r"^\s*-?\s*The current time is .*$", re.MULTILINE),
+    re.compile(r"^\s*-?\s*Your approximate location is: .*$", re.MULTILINE),
+)
+
+
+class ResponseCacheSettings(BaseSettings):
+    """Response cache settings loaded from RESPONSE_CACHE_* environment variables."""
+
+    enabled: bool = True
+    memory_entries: int = 512
+    ttl_seconds: int = 24 * 3600
+    # Rows kept per namespace in Postgres; least recently used rows beyond this are evicted
+    max_rows: int = 5000
+    postgres: bool = True
+    db_schema: str = "ai"
+    # Characters per chunk when replaying a cached answer as a stream
+    replay_chunk_chars: int = 24
+
+    model_config = SettingsConfigDict(env_prefix="RESPONSE_CACHE_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    content: str
+    reasoning_content: Optional[str] = None
+
+
+def normalize_system_prompt(content: str) -> str:
+    """Drop volatile lines (current time, location) and collapse whitespace."""
+    for pattern in VOLATILE_PATTERNS:
+        content = pattern.sub("", content)
+    return " ".join(content.split())
+
+
+def build_cache_key(
+    namespace: str,
+    model_id: str,
+    messages: List[Dict[str, Any]],
+    request_params: Dict[str, Any],
+    tools: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Hash a chat request into a cache key.
+
+    Args:
+        namespace: Cache namespace, usually the entity id
+        model_id: Ollama model id
+        messages: Messages as sent to Ollama (role, content, tool calls)
+        request_params: Request parameters such as format and options; keep_alive is ignored
+        tools: Tool definitions offered to the model
+
+    Returns:
+        str: Hex sha256 digest
+    """
+    normalized = []
+    for message in messages:
+        content = message.get("content") or ""
+        if message.get("role") == "system":
+            content = normalize_system_prompt(content)
+        normalized.append({**message, "content": content})
+    payload = {
+        "namespace": namespace,
+        "model": model_id,
+        "messages": normalized,
+        "params": {key: value for key, value in request_params.items() if key not in ("keep_alive", "tools")},
+        "tools": sorted(tools or [], key=lambda tool: json.dumps(tool, sort_keys=True, default=str)),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def replay_chunks(content: str, chunk_chars: int) -> Iterator[str]:
+    """Split a cached answer into word-aligned chunks so it can be streamed like a live answer."""
+    chunk = ""
+    for word in re.findall(r"\S+\s*|\s+", content):
+        chunk += word
+        if len(chunk) >= chunk_chars:
+            yield chunk
+            chunk = ""
+    if chunk:
+        yield chunk
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters per namespace."""
+
+    FIELDS = ("memory_hits", "db_hits", "misses", "stores", "evictions", "errors")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def incr(self, namespace: str, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(namespace, dict.fromkeys(self.FIELDS, 0))
+            counters[counter] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for namespace, counters in self._counters.items():
+                lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+                hits = counters["memory_hits"] + counters["db_hits"]
+                result[namespace] = {**counters, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+            return result
+
+
+class MemoryLRU(Generic[V]):
+    """Bounded LRU of cached values with per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: str) -> Tuple[Optional[V], int]:
+        """Return the entry (or None) and the number of expired entries dropped."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None, 0
+            expires_at, response = item
+            if expires_at < time.time():
+                del self._entries[key]
+                return None, 1
+            self._entries.move_to_end(key)
+            return response, 0
+
+    def put(self, key: str, response: V, expires_at: Optional[float] = None) -> int:
+        """Store an entry and return how many entries were evicted to make room."""
+        with self._lock:
+            self._entries[key] = (expires_at or time.time() + self.ttl_seconds, response)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PostgresResponseStore:
+    """Postgres tier: one row per cached response, with expiry and hit tracking."""
+
+    def __init__(self, engine: Engine, schema: str, ttl_seconds: int, max_rows: int):
+        self.engine = engine
+        self.schema = schema
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.table = Table(
+            "llm_response_cache",
+            MetaData(schema=schema),
+            Column("key", String(64), primary_key=True),
+            Column("namespace", String(128), nullable=False, index=True),
+            Column("model", String(256), nullable=False),
+            Column("content", Text, nullable=False),
+            Column("reasoning_content", Text),
+            Column("hits", Integer, nullable=False, default=0),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Column("last_hit_at", DateTime(timezone=True), nullable=False),
+            Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+        )
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(CreateSchema(self.schema, if_not_exists=True))
+                self.table.create(conn, checkfirst=True)
+            self._ready = True
+
+    def get(self, key: str) -> Optional[Tuple[CachedResponse, float]]:
+        """Return a live entry and its expiry timestamp, recording the hit."""
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                update(self.table)
+                .where(and_(self.table.c.key == key, self.table.c.expires_at > now))
+                .values(hits=self.table.c.hits + 1, last_hit_at=now)
+                .returning(self.table.c.content, self.table.c.reasoning_content, self.table.c.expires_at)
+            ).first()
+        if row is None:
+            return None
+        return CachedResponse(row.content, row.reasoning_content), row.expires_at.timestamp()
+
+    def put(self, key: str, namespace: str, model: str, response: CachedResponse) -> int:
+        """Upsert an entry and evict expired and excess rows; returns the number of rows evicted."""
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        values = {
+            "key": key,
+            "namespace": namespace,
+            "model": model,
+            "content": response.content,
+            "reasoning_content": response.reasoning_content,
+            "hits": 0,
+            "created_at": now,
+            "last_hit_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds),
+        }
+        statement = insert(self.table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_={name: statement.excluded[name] for name in values if name != "key"},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+            return self._evict(conn, namespace, now)
+
+    def _evict(self, conn: Any, namespace: str, now: datetime) -> int:
+        expired = conn.execute(delete(self.table).where(self.table.c.expires_at <= now)).rowcount
+        excess = (
+            select(self.table.c.key)
+            .where(self.table.c.namespace == namespace)
+            .order_by(self.table.c.last_hit_at.desc())
+            .offset(self.max_rows)
+            .scalar_subquery()
+        )
+        overflow = conn.execute(delete(self.table).where(self.table.c.key.in_(excess))).rowcount
+        return int(expired or 0) + int(overflow or 0)
+
+    def size(self) -> Dict[str, int]:
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(self.table.c.namespace, func.count()).group_by(self.table.c.namespace)).all()
+        return {namespace: int(count) for namespace, count in rows}
+
+
+class ResponseCache:
+    """Two-tier cache: the memory LRU answers first, Postgres backs it and survives restarts."""
+
+    def __init__(self, settings: ResponseCacheSettings, store: Optional[PostgresResponseStore] = None):
+        self.settings = settings
+        self.memory: MemoryLRU[CachedResponse] = MemoryLRU(settings.memory_entries, settings.ttl_seconds)
+        self.store = store
+        self.stats = CacheStats()
+
+    def get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        response = self._memory_get(namespace, key)
+        if response is not None:
+            return response
+        return self._store_get(namespace, key)
+
+    def _memory_get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        response, expired = self.memory.get(key)
+        if expired:
+            self.stats.incr(namespace, "evictions", expired)
+        if response is not None:
+            self.stats.incr(namespace, "memory_hits")
+        return response
+
+    def _store_get(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        found = None
+        if self.store is not None:
+            try:
+                found = self.store.get(key)
+            except Exception as e:  # noqa: BLE001
+                self.stats.incr(namespace, "errors")
+                log.warning(f"Response cache lookup failed, continuing without it: {e}")
+        if found is None:
+            self.stats.incr(namespace, "misses")
+            return None
+        response, expires_at = found
+        self.stats.incr(namespace, "db_hits")
+        self.stats.incr(namespace, "evictions", self.memory.put(key, response, expires_at))
+        return response
+
+    def put(self, namespace: str, key: str, model: str, response: CachedResponse) -> None:
+        self.stats.incr(namespace, "stores")
+        self.stats.incr(namespace, "evictions", self.memory.put(key, response))
+        if self.store is not None:
+            try:
+                self.stats.incr(namespace, "evictions", self.store.put(key, namespace, model, response))
+            except Exception as e:  # noqa: BLE001
+                self.stats.incr(namespace, "errors")
+                log.warning(f"Response cache store failed: {e}")
+
+    async def aget(self, namespace: str, key: str) -> Optional[CachedResponse]:
+        # Memory hits stay on the event loop; only the Postgres round trip goes to a thread
+        response = self._memory_get(namespace, key)
+        if response is not None:
+            return response
+        if self.store is None:
+            return self._store_get(namespace, key)
+        return await asyncio.to_thread(self._store_get, namespace, key)
+
+    async def aput(self, namespace: str, key: str, model: str, response: CachedResponse) -> None:
+        await asyncio.to_thread(self.put, namespace, key, model, response)
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"memory_entries": len(self.memory), "namespaces": self.stats.snapshot()}
+        if self.store is not None:
+            try:
+                status["postgres_rows"] = self.store.size()
+            except Exception as e:  # noqa: BLE001
+                status["postgres_error"] = str(e)
+        return status
+
+
+def _build_response_cache() -> ResponseCache:
+    settings = ResponseCacheSettings()
+    store = None
+    if settings.postgres:
+        from db.session import db_engine
+
+        store = PostgresResponseStore(db_engine, settings.db_schema, settings.ttl_seconds, settings.max_rows)
+    return ResponseCache(settings, store)
+
+
+# Global cache shared by every model that opts in
+response_cache = _build_response_cache()
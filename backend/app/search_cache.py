@@ -0,0 +1,296 @@
+"""
+Shared web search result cache.
+
+Every DuckDuckGo toolkit (tools.duckduckgo) goes through one process-wide cache keyed on the
+tool, the normalized query and the search parameters, so the near-identical searches issued by
+the research and investment loops, and by concurrent users, hit the network once. Results live
+in a bounded in-memory LRU with TTL in front of an optional Postgres table that survives
+restarts and is shared between workers. Identical searches issued while the first one is still
+running (the items of a batch researching the same ticker) wait for it instead of going to the
+network too. Failed searches are never cached.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateSchema
+
+from app.response_cache import MemoryLRU
+from modules.metrics import summarize_ms
+
+log = logging.getLogger("app")
+
+
+class SearchCacheSettings(BaseSettings):
+    """Search cache settings loaded from SEARCH_CACHE_* environment variables."""
+
+    enabled: bool = True
+    memory_entries: int = 2048
+    ttl_seconds: int = 6 * 3600
+    # News goes stale faster than general web results
+    news_ttl_seconds: int = 1800
+    postgres: bool = True
+    max_rows: int = 20_000
+    db_schema: str = "ai"
+
+    model_config = SettingsConfigDict(env_prefix="SEARCH_CACHE_", case_sensitive=False)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+def search_cache_key(tool: str, query: str, params: Dict[str, Any]) -> str:
+    """Hash the tool name, normalized query and search parameters."""
+    payload = json.dumps({"tool": tool, "query": normalize_query(query), "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SearchCacheStats:
+    """Thread-safe counters and latencies per tool; hits are credited with the average live latency."""
+
+    # coalesced: searches that waited for the same search already running
+    FIELDS = ("memory_hits", "db_hits", "misses", "coalesced", "errors")
+
+    def __init__(self, max_samples: int = 10_000):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._live_seconds: Dict[str, Deque[float]] = {}
+        self._hit_seconds: Dict[str, Deque[float]] = {}
+        self._max_samples = max_samples
+
+    def incr(self, tool: str, counter: str) -> None:
+        with self._lock:
+            self._counters.setdefault(tool, dict.fromkeys(self.FIELDS, 0))[counter] += 1
+
+    def record(self, tool: str, seconds: float, hit: bool) -> None:
+        samples = self._hit_seconds if hit else self._live_seconds
+        with self._lock:
+            samples.setdefault(tool, deque(maxlen=self._max_samples)).append(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for tool, counters in self._counters.items():
+                hits = counters["memory_hits"] + counters["db_hits"]
+                calls = hits + counters["misses"] + counters["coalesced"]
+                live = list(self._live_seconds.get(tool, ()))
+                cached = list(self._hit_seconds.get(tool, ()))
+                avg_live = sum(live) / len(live) if live else 0.0
+                avg_hit = sum(cached) / len(cached) if cached else 0.0
+                result[tool] = {
+                    **counters,
+                    "calls": calls,
+                    "hit_rate": round(hits / calls, 4) if calls else 0.0,
+                    "live_ms": summarize_ms(live),
+                    "hit_ms": summarize_ms(cached),
+                    "saved_seconds": round(hits * max(0.0, avg_live - avg_hit), 3),
+                    "saved_ms_per_call": round(1000 * hits * max(0.0, avg_live - avg_hit) / calls, 1) if calls else 0.0,
+                }
+            return result
+
+
+class PostgresSearchStore:
+    """Postgres tier: one row per cached search result, with expiry and hit tracking."""
+
+    def __init__(self, engine: Engine, schema: str, max_rows: int):
+        self.engine = engine
+        self.schema = schema
+        self.max_rows = max_rows
+        self.table = Table(
+            "search_cache",
+            MetaData(schema=schema),
+            Column("key", String(64), primary_key=True),
+            Column("tool", String(64), nullable=False, index=True),
+            Column("query", Text, nullable=False),
+            Column("result", Text, nullable=False),
+            Column("hits", Integer, nullable=False, default=0),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+        )
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(CreateSchema(self.schema, if_not_exists=True))
+                self.table.create(conn, checkfirst=True)
+            self._ready = True
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return a live result and its expiry timestamp, recording the hit."""
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                update(self.table)
+                .where(and_(self.table.c.key == key, self.table.c.expires_at > now))
+                .values(hits=self.table.c.hits + 1)
+                .returning(self.table.c.result, self.table.c.expires_at)
+            ).first()
+        return (row.result, row.expires_at.timestamp()) if row is not None else None
+
+    def put(self, key: str, tool: str, query: str, result: str, ttl_seconds: int) -> None:
+        """Upsert a result and evict expired rows and the oldest rows beyond max_rows."""
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        values = {
+            "key": key,
+            "tool": tool,
+            "query": query,
+            "result": result,
+            "hits": 0,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+        }
+        statement = insert(self.table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_={name: statement.excluded[name] for name in values if name != "key"},
+        )
+        excess = select(self.table.c.key).order_by(self.table.c.created_at.desc()).offset(self.max_rows)
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= now))
+            conn.execute(delete(self.table).where(self.table.c.key.in_(excess.scalar_subquery())))
+
+    def size(self) -> Dict[str, int]:
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(self.table.c.tool, func.count()).group_by(self.table.c.tool)).all()
+        return {tool: int(count) for tool, count in rows}
+
+
+class SearchCache:
+    """Two-tier cache of search tool results, shared by every toolkit instance in the process."""
+
+    def __init__(self, settings: SearchCacheSettings, store: Optional[PostgresSearchStore] = None):
+        self.settings = settings
+        self.memory: MemoryLRU[str] = MemoryLRU(settings.memory_entries, settings.ttl_seconds)
+        self.store = store
+        self.stats = SearchCacheStats()
+        # Searches being fetched, which identical concurrent searches wait for
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def get_or_fetch(
+        self, tool: str, query: str, params: Dict[str, Any], fetch: Callable[[], str], ttl_seconds: Optional[int] = None
+    ) -> str:
+        """
+        Return the cached result of a search, or run it and cache the result.
+
+        Args:
+            tool: Tool function name, e.g. duckduckgo_search
+            query: Search query as given by the model
+            params: Every other parameter that changes the result (max_results, backend, ...)
+            fetch: Runs the live search; exceptions propagate and nothing is cached
+            ttl_seconds: Expiry for this result, defaults to the configured TTL
+
+        Returns:
+            str: The search result as returned by the tool
+        """
+        if not self.settings.enabled:
+            return fetch()
+        started = time.perf_counter()
+        key = search_cache_key(tool, query, params)
+        result = self._get(tool, key)
+        if result is not None:
+            self.stats.record(tool, time.perf_counter() - started, hit=True)
+            return result
+
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if pending is None:
+                pending = self._inflight[key] = Future()
+        if not leader:
+            self.stats.incr(tool, "coalesced")
+            # Raises the leader's exception if its search failed
+            return pending.result()
+
+        self.stats.incr(tool, "misses")
+        live_started = time.perf_counter()
+        try:
+            result = fetch()
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(result)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        self.stats.record(tool, time.perf_counter() - live_started, hit=False)
+        self._put(tool, key, query, result, ttl_seconds or self.settings.ttl_seconds)
+        return result
+
+    def _get(self, tool: str, key: str) -> Optional[str]:
+        result, _ = self.memory.get(key)
+        if result is not None:
+            self.stats.incr(tool, "memory_hits")
+            return result
+        if self.store is None:
+            return None
+        try:
+            found = self.store.get(key)
+        except Exception as e:  # noqa: BLE001
+            self.stats.incr(tool, "errors")
+            log.warning(f"Search cache lookup failed, continuing without it: {e}")
+            return None
+        if found is None:
+            return None
+        result, expires_at = found
+        self.memory.put(key, result, expires_at)
+        self.stats.incr(tool, "db_hits")
+        return result
+
+    def _put(self, tool: str, key: str, query: str, result: str, ttl_seconds: int) -> None:
+        self.memory.put(key, result, time.time() + ttl_seconds)
+        if self.store is None:
+            return
+        try:
+            self.store.put(key, tool, query, result, ttl_seconds)
+        except Exception as e:  # noqa: BLE001
+            self.stats.incr(tool, "errors")
+            log.warning(f"Search cache store failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"memory_entries": len(self.memory), "tools": self.stats.snapshot()}
+        if self.store is not None:
+            try:
+                status["postgres_rows"] = self.store.size()
+            except Exception as e:  # noqa: BLE001
+                status["postgres_error"] = str(e)
+        return status
+
+
+def _build_search_cache() -> SearchCache:
+    settings = SearchCacheSettings()
+    store = None
+    if settings.postgres:
+        from db.session import db_engine
+
+        store = PostgresSearchStore(db_engine, settings.db_schema, settings.max_rows)
+    return SearchCache(settings, store)
+
+
+# Global cache shared by every search toolkit
+search_cache = _build_search_cache()
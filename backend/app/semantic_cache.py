@@ -0,0 +1,300 @@
+"""
+Semantic LLM response cache.
+
+Second cache stage behind the exact-match cache: the user's question is embedded with the
+embedder profile (nomic-embed-text) and the nearest cached answer in pgvector is served when its
+cosine similarity clears a threshold. Only first-turn requests (system prompt plus a single user
+message) are eligible, and matches are scoped to the same namespace and the same context (model,
+normalized system prompt, options and tools), so a paraphrase never picks up an answer written
+for a different conversation or agent configuration.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from pgvector.sqlalchemy import Vector
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    delete,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateSchema
+
+from app.response_cache import CachedResponse, build_cache_key
+from modules.metrics import summarize_ms
+
+log = logging.getLogger("app")
+
+
+class SemanticCacheSettings(BaseSettings):
+    """Semantic cache settings loaded from SEMANTIC_CACHE_* environment variables."""
+
+    enabled: bool = True
+    # Minimum cosine similarity between questions for a cached answer to be served
+    threshold: float = 0.9
+    ttl_seconds: int = 7 * 24 * 3600
+    max_rows: int = 5000  # per namespace
+    dimensions: int = 768  # nomic-embed-text
+    # nomic-embed-text task prefix; the same prefix on both sides keeps the comparison symmetric
+    query_prefix: str = "search_query: "
+    db_schema: str = "ai"
+
+    model_config = SettingsConfigDict(env_prefix="SEMANTIC_CACHE_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class SemanticQuery:
+    """What the semantic stage needs from a chat request."""
+
+    context_key: str
+    question: str
+
+
+@dataclass(frozen=True)
+class SemanticMatch:
+    response: CachedResponse
+    question: str
+    similarity: float
+
+
+def semantic_query(
+    namespace: str,
+    model_id: str,
+    messages: List[Dict[str, Any]],
+    request_params: Dict[str, Any],
+    tools: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[SemanticQuery]:
+    """
+    Extract the question and its context from a first-turn chat request.
+
+    Args:
+        namespace: Cache namespace, usually the entity id
+        model_id: Ollama model id
+        messages: Messages as sent to Ollama
+        request_params: Request parameters such as format and options
+        tools: Tool definitions offered to the model
+
+    Returns:
+        Optional[SemanticQuery]: None when the request carries history or tool results
+    """
+    system = [message for message in messages if message.get("role") == "system"]
+    conversation = [message for message in messages if message.get("role") != "system"]
+    if len(conversation) != 1 or conversation[0].get("role") != "user":
+        return None
+    question = (conversation[0].get("content") or "").strip()
+    if not question or conversation[0].get("images"):
+        return None
+    return SemanticQuery(build_cache_key(namespace, model_id, system, request_params, tools), question)
+
+
+class SemanticCacheStats:
+    """Thread-safe counters and lookup latency per namespace."""
+
+    FIELDS = ("lookups", "hits", "misses", "stores", "evictions", "errors")
+
+    def __init__(self, max_samples: int = 10_000):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lookup_seconds: Dict[str, Deque[float]] = {}
+        self._max_samples = max_samples
+
+    def incr(self, namespace: str, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(namespace, dict.fromkeys(self.FIELDS, 0))
+            counters[counter] += amount
+
+    def record_lookup(self, namespace: str, seconds: float) -> None:
+        with self._lock:
+            self._lookup_seconds.setdefault(namespace, deque(maxlen=self._max_samples)).append(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for namespace, counters in self._counters.items():
+                lookups = counters["lookups"]
+                result[namespace] = {
+                    **counters,
+                    "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                    "lookup_ms": summarize_ms(list(self._lookup_seconds.get(namespace, ()))),
+                }
+            return result
+
+
+class SemanticCache:
+    """pgvector-backed nearest-neighbour cache of answers, keyed by question embedding."""
+
+    def __init__(self, settings: SemanticCacheSettings, engine: Engine):
+        self.settings = settings
+        self.engine = engine
+        self.stats = SemanticCacheStats()
+        self.table = Table(
+            "llm_semantic_cache",
+            MetaData(schema=settings.db_schema),
+            Column("id", BigInteger, primary_key=True, autoincrement=True),
+            Column("namespace", String(128), nullable=False),
+            Column("context_key", String(64), nullable=False),
+            Column("question", Text, nullable=False),
+            Column("embedding", Vector(settings.dimensions), nullable=False),
+            Column("content", Text, nullable=False),
+            Column("reasoning_content", Text),
+            Column("hits", Integer, nullable=False, default=0),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+            Index("ix_llm_semantic_cache_scope", "namespace", "context_key"),
+            Index(
+                "ix_llm_semantic_cache_embedding",
+                "embedding",
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding": "vector_cosine_ops"},
+            ),
+        )
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def embedding_input(self, question: str) -> str:
+        return f"{self.settings.query_prefix}{question}"
+
+    def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+                conn.execute(CreateSchema(self.settings.db_schema, if_not_exists=True))
+                self.table.create(conn, checkfirst=True)
+            self._ready = True
+
+    def lookup(self, namespace: str, query: SemanticQuery, embedding: Sequence[float]) -> Optional[SemanticMatch]:
+        """
+        Find the closest live answer for a question in the same namespace and context.
+
+        Returns:
+            Optional[SemanticMatch]: The match, if its similarity clears the threshold
+        """
+        started = time.perf_counter()
+        self.stats.incr(namespace, "lookups")
+        try:
+            match = self._lookup(namespace, query, embedding)
+        except Exception as e:  # noqa: BLE001
+            self.stats.incr(namespace, "errors")
+            log.warning(f"Semantic cache lookup failed, continuing without it: {e}")
+            match = None
+        self.stats.record_lookup(namespace, time.perf_counter() - started)
+        self.stats.incr(namespace, "hits" if match is not None else "misses")
+        return match
+
+    def _lookup(self, namespace: str, query: SemanticQuery, embedding: Sequence[float]) -> Optional[SemanticMatch]:
+        self._ensure_table()
+        distance = self.table.c.embedding.cosine_distance(list(embedding))
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                select(
+                    self.table.c.id,
+                    self.table.c.question,
+                    self.table.c.content,
+                    self.table.c.reasoning_content,
+                    distance.label("distance"),
+                )
+                .where(
+                    and_(
+                        self.table.c.namespace == namespace,
+                        self.table.c.context_key == query.context_key,
+                        self.table.c.expires_at > now,
+                    )
+                )
+                .order_by(distance)
+                .limit(1)
+            ).first()
+            if row is None or 1 - row.distance < self.settings.threshold:
+                return None
+            conn.execute(update(self.table).where(self.table.c.id == row.id).values(hits=self.table.c.hits + 1))
+        return SemanticMatch(CachedResponse(row.content, row.reasoning_content), row.question, 1 - row.distance)
+
+    def store(self, namespace: str, query: SemanticQuery, embedding: Sequence[float], response: CachedResponse) -> None:
+        """Store an answer and evict expired and excess rows of the namespace."""
+        try:
+            self._ensure_table()
+            now = datetime.now(timezone.utc)
+            with self.engine.begin() as conn:
+                conn.execute(
+                    self.table.insert().values(
+                        namespace=namespace,
+                        context_key=query.context_key,
+                        question=query.question,
+                        embedding=list(embedding),
+                        content=response.content,
+                        reasoning_content=response.reasoning_content,
+                        hits=0,
+                        created_at=now,
+                        expires_at=now + timedelta(seconds=self.settings.ttl_seconds),
+                    )
+                )
+                evicted = self._evict(conn, namespace, now)
+        except Exception as e:  # noqa: BLE001
+            self.stats.incr(namespace, "errors")
+            log.warning(f"Semantic cache store failed: {e}")
+            return
+        self.stats.incr(namespace, "stores")
+        self.stats.incr(namespace, "evictions", evicted)
+
+    def _evict(self, conn: Any, namespace: str, now: datetime) -> int:
+        expired = conn.execute(delete(self.table).where(self.table.c.expires_at <= now)).rowcount
+        excess = (
+            select(self.table.c.id)
+            .where(self.table.c.namespace == namespace)
+            .order_by(self.table.c.created_at.desc())
+            .offset(self.settings.max_rows)
+            .scalar_subquery()
+        )
+        overflow = conn.execute(delete(self.table).where(self.table.c.id.in_(excess))).rowcount
+        return int(expired or 0) + int(overflow or 0)
+
+    def clear(self, namespace: str) -> int:
+        self._ensure_table()
+        with self.engine.begin() as conn:
+            return int(conn.execute(delete(self.table).where(self.table.c.namespace == namespace)).rowcount or 0)
+
+    def status(self) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"threshold": self.settings.threshold, "namespaces": self.stats.snapshot()}
+        try:
+            self._ensure_table()
+            with self.engine.connect() as conn:
+                rows = conn.execute(select(self.table.c.namespace, func.count()).group_by(self.table.c.namespace)).all()
+            status["postgres_rows"] = {namespace: int(count) for namespace, count in rows}
+        except Exception as e:  # noqa: BLE001
+            status["postgres_error"] = str(e)
+        return status
+
+
+def _build_semantic_cache() -> SemanticCache:
+    from db.session import db_engine
+
+    return SemanticCache(SemanticCacheSettings(), db_engine)
+
+
+# Global cache shared by every model built with semantic_cache=True
+semantic_cache = _build_semantic_cache()
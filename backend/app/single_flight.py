@@ -0,0 +1,265 @@
+"""
+Single-flight coalescing of identical concurrent runs.
+
+When several clients start the same run at the same time (a quick prompt from config.yaml, the
+same workflow input), only the first request executes. The others attach to it and receive the
+same response, streamed events included, replayed from the start. Only entities declared
+user-independent in the entity registry (no per-user instructions, memory or session history)
+are coalesced; the teams, which answer from their session's history, never are. The key ignores
+user_id, and session_id for agents.
+
+Followers receive the leader's response as-is, including its run_id and session_id, and the run
+is stored only in the leader's session. That is fine for agent runs, whose answer is the response
+itself, but the frontend shows a workflow's result from its session (get_session), so workflow
+runs only coalesce within one session.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+log = logging.getLogger("app")
+
+# Run endpoints that can be coalesced (continuing a paused run is always caller specific)
+RUN_PATH = re.compile(r"^/(?P<type>agents|teams|workflows)/(?P<id>[^/]+)/runs/?$")
+
+# Form fields that identify the caller rather than the work to be done
+CALLER_FIELDS = frozenset({"session_id", "user_id"})
+
+# Workflow runs are read back from their session, so followers must share the leader's
+WORKFLOW_CALLER_FIELDS = frozenset({"user_id"})
+
+
+class SingleFlightSettings(BaseSettings):
+    """Single-flight settings loaded from SINGLE_FLIGHT_* environment variables."""
+
+    enabled: bool = True
+    # Larger request bodies (e.g. uploads) are never coalesced
+    max_body_bytes: int = 64 * 1024
+
+    model_config = SettingsConfigDict(env_prefix="SINGLE_FLIGHT_", case_sensitive=False)
+
+
+def normalize_message(message: str) -> str:
+    return " ".join(message.split())
+
+
+def flight_key(entity_type: str, entity_id: str, fields: Dict[str, List[str]]) -> str:
+    """Hash the entity and the caller-independent form fields of a run request."""
+    caller_fields = WORKFLOW_CALLER_FIELDS if entity_type == "workflows" else CALLER_FIELDS
+    work = {name: sorted(values) for name, values in fields.items() if name not in caller_fields}
+    work["message"] = [normalize_message(message) for message in work.get("message", [])]
+    payload = json.dumps({"entity": f"{entity_type}/{entity_id}", "fields": work}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Flight:
+    """One in-flight execution whose ASGI messages are recorded and fanned out to subscribers."""
+
+    def __init__(self) -> None:
+        self.messages: List[Message] = []
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def started(self) -> bool:
+        return bool(self.messages)
+
+    async def publish(self, message: Message) -> None:
+        async with self._changed:
+            self.messages.append(message)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def fan_out(self, send: Send) -> int:
+        """Send every recorded and future message to one subscriber; returns messages sent."""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: sent < len(self.messages) or self.done)
+                batch = self.messages[sent:]
+                finished = self.done
+            for message in batch:
+                await send(message)
+            sent += len(batch)
+            if finished and sent == len(self.messages):
+                return sent
+
+
+class SingleFlightStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.flights = 0
+        self.coalesced = 0
+        self.bypassed: Dict[str, int] = {}
+        self.max_subscribers = 0
+        self.fanned_out_messages = 0
+
+    def bypass(self, reason: str) -> None:
+        self.bypassed[reason] = self.bypassed.get(reason, 0) + 1
+
+    def snapshot(self, in_flight: int) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / self.requests, 4) if self.requests else 0.0,
+            "bypassed": dict(self.bypassed),
+            "in_flight": in_flight,
+            "max_subscribers": self.max_subscribers,
+            "fanned_out_messages": self.fanned_out_messages,
+        }
+
+
+class SingleFlight:
+    """Registry of in-flight executions keyed by flight_key(); used from the server's event loop."""
+
+    def __init__(self, settings: SingleFlightSettings):
+        self.settings = settings
+        self.stats = SingleFlightStats()
+        self._flights: Dict[str, Flight] = {}
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """Subscribe to the flight of key, creating it if there is none; returns it and whether it is new."""
+        flight = self._flights.get(key)
+        created = flight is None
+        if flight is None:
+            flight = Flight()
+            self._flights[key] = flight
+            self.stats.flights += 1
+        else:
+            self.stats.coalesced += 1
+        flight.subscribers += 1
+        self.stats.max_subscribers = max(self.stats.max_subscribers, flight.subscribers)
+        return flight, created
+
+    def remove(self, key: str, flight: Flight) -> None:
+        """Stop new requests joining flight once it has finished executing."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def status(self) -> Dict[str, Any]:
+        return {"enabled": self.settings.enabled, **self.stats.snapshot(len(self._flights))}
+
+
+class SingleFlightMiddleware:
+    """ASGI middleware that coalesces identical concurrent POST run requests."""
+
+    def __init__(self, app: ASGIApp, flights: SingleFlight, is_coalescable: Callable[[str], bool]):
+        self.app = app
+        self.flights = flights
+        self.is_coalescable = is_coalescable
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        match = RUN_PATH.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if match is None or scope.get("method") != "POST" or not self.flights.settings.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = self.flights.stats
+        stats.requests += 1
+        if not self.is_coalescable(match.group("id")):
+            stats.bypass("entity")
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fields = await self._form_fields(scope, body)
+        if fields is None:
+            stats.bypass("body")
+            await self.app(scope, _replay(body, receive), send)
+            return
+        if fields.get("background", ["false"])[0].lower() == "true":
+            stats.bypass("background")
+            await self.app(scope, _replay(body, receive), send)
+            return
+
+        key = flight_key(match.group("type"), match.group("id"), fields)
+        flight, created = self.flights.join(key)
+        if created:
+            flight.task = asyncio.create_task(self._execute(key, flight, dict(scope), body))
+
+        sent = await flight.fan_out(send)
+        if flight.subscribers > 1:
+            stats.fanned_out_messages += sent
+
+    async def _form_fields(self, scope: Scope, body: bytes) -> Optional[Dict[str, List[str]]]:
+        """Text form fields of the request, or None if it carries files or is too large."""
+        if len(body) > self.flights.settings.max_body_bytes:
+            return None
+        try:
+            form = await Request(scope, _replay(body, None)).form()
+        except Exception:  # noqa: BLE001
+            return None
+        fields: Dict[str, List[str]] = {}
+        try:
+            for name, value in form.multi_items():
+                if not isinstance(value, str):
+                    return None
+                fields.setdefault(name, []).append(value)
+        finally:
+            await form.close()
+        return fields if fields.get("message") else None
+
+    async def _execute(self, key: str, flight: Flight, scope: Scope, body: bytes) -> None:
+        # Detached from every client connection, so one subscriber leaving does not cancel the run
+        try:
+            await self.app(scope, _replay(body, None), flight.publish)
+        except Exception as e:  # noqa: BLE001
+            log.error(f"Coalesced run failed: {e}")
+            if not flight.started:
+                await flight.publish(
+                    {"type": "http.response.start", "status": 500, "headers": [(b"content-type", b"application/json")]}
+                )
+                await flight.publish({"type": "http.response.body", "body": b'{"detail":"Internal Server Error"}'})
+        finally:
+            self.flights.remove(key, flight)
+            await flight.finish()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _replay(body: bytes, receive: Optional[Receive]) -> Receive:
+    """A receive callable that returns the buffered body, then defers to receive (or waits forever)."""
+    delivered = False
+
+    async def replay() -> Message:
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if receive is not None:
+            return await receive()
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    return replay
+
+
+# Global registry shared by the middleware and the /metrics/single-flight endpoint
+single_flight = SingleFlight(SingleFlightSettings())
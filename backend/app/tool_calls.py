@@ -0,0 +1,254 @@
+"""
+Concurrent execution of the tool calls from one model turn.
+
+When the model asks for several tools in one assistant message (three duckduckgo_search calls,
+or a search plus search_knowledge_base), models built with parallel_tool_calls=True run them side
+by side: async runs (AgentOS) gather them on the event loop with sync tools in worker threads,
+and sync runs (Agent.run) execute them on a thread pool. Results still go back to the model in
+call order. Each call has its own timeout, after which the model gets an error result instead of
+holding up the turn, and every batch records how long it would have taken run one by one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agno.models.message import Message
+from agno.models.response import ModelResponse, ModelResponseEvent, ToolExecution
+from agno.tools.function import FunctionCall
+from agno.utils.timer import Timer
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from modules.metrics import Histogram
+
+log = logging.getLogger("app")
+
+# Upper bounds in seconds for the time saved per batch
+SAVED_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class ToolCallSettings(BaseSettings):
+    """Parallel tool call settings loaded from TOOL_CALLS_* environment variables."""
+
+    # Calls from one turn allowed to run at once
+    max_parallel: int = 4
+    # Seconds a single call may run before the model gets a timeout error; 0 disables the timeout
+    timeout_seconds: float = 60.0
+
+    model_config = SettingsConfigDict(env_prefix="TOOL_CALLS_", case_sensitive=False)
+
+
+def mark_timed_out(fc: FunctionCall, seconds: float) -> Timer:
+    """Set the error the model sees for a timed-out call; returns a timer showing the time spent."""
+    fc.error = f"Tool call {fc.function.name} timed out after {seconds:g}s"
+    log.warning(fc.error)
+    timer = Timer()
+    timer.start_time, timer.elapsed_time = time.perf_counter() - seconds, seconds
+    return timer
+
+
+def needs_pause(fc: FunctionCall) -> bool:
+    """Whether agno has to stop the run for this call (confirmation, user input, external run)."""
+    function = fc.function
+    return bool(
+        function.requires_confirmation
+        or function.requires_user_input
+        or function.external_execution
+        or function.name == "get_user_input"
+    )
+
+
+@dataclass
+class ToolBatch:
+    """Start and end times of the calls from one model turn."""
+
+    spans: List[Tuple[float, float]] = field(default_factory=list)
+    timeouts: List[str] = field(default_factory=list)
+    # Bounds the gathered calls of an async run; created on the run's event loop
+    slots: Optional[asyncio.Semaphore] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, started: float, ended: float) -> None:
+        with self._lock:
+            self.spans.append((started, ended))
+
+    @property
+    def serial_seconds(self) -> float:
+        return sum(ended - started for started, ended in self.spans)
+
+    @property
+    def wall_seconds(self) -> float:
+        if not self.spans:
+            return 0.0
+        return max(ended for _, ended in self.spans) - min(started for started, _ in self.spans)
+
+
+class ToolCallStats:
+    """Thread-safe counters for batched tool calls and the time saved by running them together."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.parallel_batches = 0
+        self.calls = 0
+        self.serial_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.timeouts: Dict[str, int] = {}
+        self.saved = Histogram(SAVED_BUCKETS)
+
+    def record(self, batch: ToolBatch) -> None:
+        if not batch.spans:
+            return
+        serial, wall = batch.serial_seconds, batch.wall_seconds
+        with self._lock:
+            self.batches += 1
+            self.parallel_batches += len(batch.spans) > 1
+            self.calls += len(batch.spans)
+            self.serial_seconds += serial
+            self.wall_seconds += wall
+            for name in batch.timeouts:
+                self.timeouts[name] = self.timeouts.get(name, 0) + 1
+        if len(batch.spans) > 1:
+            self.saved.observe(max(0.0, serial - wall))
+            log.debug(f"Ran {len(batch.spans)} tool calls in {wall:.3f}s ({serial:.3f}s one by one)")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "parallel_batches": self.parallel_batches,
+                "calls": self.calls,
+                "timeouts": dict(self.timeouts),
+                "serial_seconds": round(self.serial_seconds, 3),
+                "wall_seconds": round(self.wall_seconds, 3),
+                "saved_seconds": round(max(0.0, self.serial_seconds - self.wall_seconds), 3),
+                "speedup": round(self.serial_seconds / self.wall_seconds, 2) if self.wall_seconds else None,
+                "saved_per_batch": self.saved.snapshot(),
+            }
+
+
+# Batch of the model turn being executed; set by the async runner, read by each gathered call
+current_batch: ContextVar[Optional[ToolBatch]] = ContextVar("tool_call_batch", default=None)
+
+
+# ************* Sync runs *************
+
+
+@dataclass
+class _Call:
+    """One call running on the pool, with the events agno produced for it."""
+
+    fc: FunctionCall
+    results: List[Message] = field(default_factory=list)
+    additional_input: List[Message] = field(default_factory=list)
+    events: List[Any] = field(default_factory=list)
+    started: Optional[float] = None
+    ended: Optional[float] = None
+    future: Optional[Future] = None
+
+
+def run_in_parallel(
+    run_one: Callable[[FunctionCall, List[Message], List[Message]], Iterator[Any]],
+    create_result: Callable[..., Message],
+    function_calls: List[FunctionCall],
+    function_call_results: List[Message],
+    additional_input: List[Message],
+    settings: ToolCallSettings,
+) -> Iterator[Any]:
+    """
+    Run agno's per-call executor for every call on a thread pool and replay its events in call order.
+
+    Args:
+        run_one: The model's run_function_call, called with (fc, results, additional_input)
+        create_result: The model's create_function_call_result, used for timed-out calls
+        function_calls: Calls from one model turn, none of which needs to pause the run
+        function_call_results: Tool result messages of the turn, appended in call order
+        additional_input: Extra messages produced by the calls, appended in call order
+        settings: Parallelism and timeout
+
+    Yields:
+        The events agno would have yielded running the calls one by one
+    """
+    calls = [_Call(fc) for fc in function_calls]
+    batch = ToolBatch()
+
+    def work(call: _Call) -> None:
+        call.started = time.perf_counter()
+        try:
+            call.events = list(run_one(call.fc, call.results, call.additional_input))
+        finally:
+            call.ended = time.perf_counter()
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(settings.max_parallel, len(calls))), thread_name_prefix="tool")
+    try:
+        for call in calls:
+            call.future = pool.submit(work, call)
+        for call in calls:
+            if _wait(call, settings.timeout_seconds):
+                batch.add(call.started or 0.0, call.ended or 0.0)
+                yield from call.events
+                function_call_results.extend(call.results)
+                additional_input.extend(call.additional_input)
+            else:
+                batch.add(call.started or 0.0, time.perf_counter())
+                batch.timeouts.append(call.fc.function.name)
+                yield from _timed_out(call.fc, create_result, function_call_results, settings.timeout_seconds)
+    finally:
+        # Timed-out calls cannot be interrupted; let them finish in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+        tool_call_stats.record(batch)
+
+
+def _wait(call: _Call, timeout: float) -> bool:
+    """Wait for a call, counting its timeout from when it left the queue; False if it timed out."""
+    assert call.future is not None
+    while True:
+        if timeout <= 0:
+            call.future.result()
+            return True
+        remaining = timeout if call.started is None else call.started + timeout - time.perf_counter()
+        try:
+            call.future.result(timeout=max(0.0, remaining))
+            return True
+        except FuturesTimeoutError:
+            if call.started is not None and time.perf_counter() - call.started >= timeout:
+                return False
+
+
+def _timed_out(
+    fc: FunctionCall, create_result: Callable[..., Message], function_call_results: List[Message], seconds: float
+) -> Iterator[ModelResponse]:
+    result = create_result(fc, success=False, timer=mark_timed_out(fc, seconds))
+    yield ModelResponse(
+        content=fc.get_call_str(),
+        tool_executions=[ToolExecution(tool_call_id=fc.call_id, tool_name=fc.function.name, tool_args=fc.arguments)],
+        event=ModelResponseEvent.tool_call_started.value,
+    )
+    yield ModelResponse(
+        content=f"{fc.get_call_str()} timed out after {seconds:g}s. ",
+        tool_executions=[
+            ToolExecution(
+                tool_call_id=result.tool_call_id,
+                tool_name=result.tool_name,
+                tool_args=result.tool_args,
+                tool_call_error=True,
+                result=str(result.content),
+                metrics=result.metrics,
+            )
+        ],
+        event=ModelResponseEvent.tool_call_completed.value,
+    )
+    function_call_results.append(result)
+
+
+# Global settings and stats shared by every model built with parallel_tool_calls
+tool_call_settings = ToolCallSettings()
+tool_call_stats = ToolCallStats()
@@ -0,0 +1,50 @@
+"""
+Workflow job worker.
+
+Claims queued workflow jobs (app.jobs) and runs them until stopped. Start any number of workers,
+on any node that reaches the database; each runs --concurrency jobs at a time.
+
+Usage:
+    python -m app.worker
+    python -m app.worker --concurrency 4 --workflow investment-analyst-pro
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.jobs import job_queue
+from modules.langfuse import init_tracing
+
+log = logging.getLogger("app")
+
+
+async def serve(concurrency: int, workflow_ids: list[str]) -> None:
+    worker = job_queue.new_worker(workflow_ids=workflow_ids)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Stop claiming and cancel running attempts; their leases expire and other workers retry them
+        loop.add_signal_handler(sig, lambda: asyncio.ensure_future(worker.stop()))
+    await asyncio.gather(worker.start(concurrency), return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--concurrency", type=int, default=job_queue.settings.worker_concurrency, help="jobs run at the same time"
+    )
+    parser.add_argument("--workflow", action="append", default=[], help="only run jobs of this workflow id")
+    args = parser.parse_args()
+
+    if not job_queue.enabled:
+        raise SystemExit("Workflow jobs are disabled (WORKFLOW_JOBS_ENABLED=false)")
+    logging.basicConfig(level=logging.INFO)
+    init_tracing()
+    asyncio.run(serve(args.concurrency, args.workflow))
+
+
+if __name__ == "__main__":
+    main()
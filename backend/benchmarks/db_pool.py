@@ -0,0 +1,106 @@
+"""
+Benchmark: per-entity engines vs the shared engine registry.
+
+Simulates N concurrent agent runs that each check out a connection, run a short query and
+return it. "before" gives every entity its own engine (what calling PostgresDb(db_url=...)
+per agent used to do); "after" routes every entity through db.engine.get_engine().
+
+Usage (against the compose database):
+    python -m benchmarks.db_pool --concurrency 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.pool import NullPool
+
+from db.engine import InstrumentedQueuePool, PoolSettings, create_instrumented_engine
+from db.url import get_db_url
+from modules.metrics import percentile
+
+# One entry per get_postgres_db()/PgVector call made by the agent, team and workflow modules
+ENTITY_COUNT = 22
+
+
+def _count_backend_connections(db_url: str) -> int:
+    probe = create_engine(db_url, poolclass=NullPool)
+    with probe.connect() as conn:
+        count = conn.execute(
+            text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()")
+        ).scalar_one()
+    probe.dispose()
+    return int(count)
+
+
+def _run(engines: List[Engine], concurrency: int, runs: int, query_ms: float, db_url: str) -> Dict[str, float]:
+    waits: List[float] = []
+    errors = 0
+    peak_connections = 0
+
+    def one_run(i: int) -> float:
+        engine = engines[i % len(engines)]
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            waited = time.perf_counter() - started
+            conn.execute(text("SELECT pg_sleep(:s)"), {"s": query_ms / 1000})
+        return waited
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(one_run, i) for i in range(runs)]
+        # Sample the server-side connection count while the burst is in flight
+        while not all(f.done() for f in futures):
+            peak_connections = max(peak_connections, _count_backend_connections(db_url))
+            time.sleep(0.05)
+        for future in futures:
+            try:
+                waits.append(future.result())
+            except Exception:  # noqa: BLE001
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    opened = sum(engine.pool.stats.connects for engine in engines if isinstance(engine.pool, InstrumentedQueuePool))
+    return {
+        "pools": len(engines),
+        "connections_opened": opened,
+        "peak_server_connections": peak_connections,
+        "p95_checkout_ms": round(1000 * percentile(waits, 95), 2),
+        "errors": errors,
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--query-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    db_url = get_db_url()
+
+    # Before: SQLAlchemy defaults (pool_size=5, max_overflow=10) for every entity
+    legacy = PoolSettings(size=5, max_overflow=10, pre_ping=False)
+    before_engines = [create_instrumented_engine(db_url, legacy) for _ in range(ENTITY_COUNT)]
+    before = _run(before_engines, args.concurrency, args.runs, args.query_ms, db_url)
+    for engine in before_engines:
+        engine.dispose()
+
+    # After: a single shared engine using the configured DB_POOL_* settings
+    shared = create_instrumented_engine(db_url)
+    after = _run([shared], args.concurrency, args.runs, args.query_ms, db_url)
+    shared.dispose()
+
+    print(f"{'mode':<8}" + "".join(f"{key:>26}" for key in before))
+    for name, row in (("before", before), ("after", after)):
+        print(f"{name:<8}" + "".join(f"{value:>26}" for value in row.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: workflow job throughput as the number of worker processes grows.
+
+Starts 1, 2 and 4 worker processes (app.jobs.JobWorker, one job at a time each) against the
+Postgres job queue, submits the same number of investment workflow jobs for every worker count and
+measures how long the workers take to finish them all. The model is stubbed to answer every call
+after a fixed delay, so the numbers show how claiming with SKIP LOCKED spreads the jobs rather than
+model or network variance. Jobs are submitted under a benchmark workflow id, so workers of a
+running API or app.worker never pick them up. Needs the database from the DB_* settings. Each worker process
+also spends CPU on agent setup, so throughput only grows with the workers while there is a core
+for each of them.
+
+Usage:
+    python -m benchmarks.job_queue
+    python -m benchmarks.job_queue --jobs 32 --workers 1 2 4 8 --model-latency 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+from typing import Any, AsyncIterator, List
+from uuid import uuid4
+
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+REQUEST = "Analyze NVIDIA stock"
+# Passes the research and analysis quality checks, so every loop runs once
+ANSWER = (
+    "Share price and market cap, revenue and earnings, with valuation and a buy recommendation. "
+    f"Risk analysis and beta calculation. {'Supporting detail. ' * 60} Source: https://example.com/report"
+)
+
+
+def stub_model(latency: float) -> None:
+    async def ainvoke(self: Any, **kwargs: Any) -> ModelResponse:
+        await asyncio.sleep(latency)
+        return ModelResponse(role="assistant", content=ANSWER)
+
+    async def ainvoke_stream(self: Any, **kwargs: Any) -> AsyncIterator[ModelResponse]:
+        yield await ainvoke(self, **kwargs)
+
+    Ollama.ainvoke = ainvoke  # type: ignore[method-assign,assignment]
+    Ollama.ainvoke_stream = ainvoke_stream  # type: ignore[method-assign,assignment]
+
+
+def worker_process(workflow_id: str, latency: float, ready: Any) -> None:
+    """One worker process running the investment workflow for the benchmark's jobs, one at a time."""
+    from agno.workflow.workflow import Workflow
+
+    from app.jobs import JobSettings, job_queue
+    from workflows.investment_workflow import InvestmentWorkflowInput, investment_graph
+
+    stub_model(latency)
+    # Every job has the same input; restoring checkpoints would skip the model calls being measured
+    investment_graph.checkpoints = None
+    workflow = Workflow(name="Benchmark jobs", steps=[investment_graph], input_schema=InvestmentWorkflowInput)
+    settings = JobSettings(poll_seconds=0.05, event_flush_seconds=0.5)
+    worker = job_queue.new_worker(resolve=lambda _: workflow, workflow_ids=[workflow_id])
+    worker.settings = settings
+    ready.release()
+    asyncio.run(worker.run(1))
+
+
+def run(workers: int, jobs: int, latency: float) -> float:
+    """Seconds `workers` worker processes take to finish `jobs` jobs."""
+    from app.jobs import job_queue
+
+    assert job_queue.store is not None
+    store = job_queue.store
+    workflow_id = f"benchmark-jobs-{uuid4().hex[:8]}"
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    processes = [context.Process(target=worker_process, args=(workflow_id, latency, ready)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+    try:
+        started = time.perf_counter()
+        for _ in range(jobs):
+            store.submit(workflow_id, {"investment_request": REQUEST}, max_attempts=1)
+        while True:
+            counts = store.counts(workflow_id)
+            if counts.get("succeeded", 0) + counts.get("failed", 0) >= jobs:
+                break
+            time.sleep(0.05)
+        seconds = time.perf_counter() - started
+        if counts.get("failed"):
+            print(f"  {counts['failed']} jobs failed")
+        return seconds
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=16, help="jobs submitted per worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker process counts")
+    parser.add_argument("--model-latency", type=float, default=1.0, help="seconds per stubbed model call")
+    args = parser.parse_args()
+
+    print(f"{args.jobs} jobs per row, {args.model_latency:g}s per model call")
+    print(f"{'workers':<10}{'seconds':>10}{'jobs/min':>12}{'speedup':>10}")
+    baseline: List[float] = []
+    for workers in args.workers:
+        seconds = run(workers, args.jobs, args.model_latency)
+        per_minute = 60 * args.jobs / seconds
+        baseline = baseline or [per_minute]
+        print(f"{workers:<10}{seconds:>10.2f}{per_minute:>12.1f}{per_minute / baseline[0]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
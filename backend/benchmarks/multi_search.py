@@ -0,0 +1,109 @@
+"""
+Benchmark: wall-clock time of the research step with one search per tool call versus batched.
+
+Runs comprehensive_research_step (workflows/research_workflow.py) for each topic twice: once with
+the research coordinator limited to duckduckgo_search ("sequential", one model round trip per
+query) and once with duckduckgo_multi_search enabled ("batched"). The search cache is disabled so
+both modes pay for every search. With --search-latency the live DuckDuckGo call is replaced by a
+sleep of that many seconds, which isolates the round-trip savings from network variance.
+
+Usage:
+    python -m benchmarks.multi_search
+    python -m benchmarks.multi_search --topics 2 --search-latency 1.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+from agno.tools.duckduckgo import DuckDuckGoTools as AgnoDuckDuckGoTools
+from agno.workflow.types import WorkflowExecutionInput
+
+from app.rate_limit import RateLimitSettings, rate_limiter
+from app.search_cache import search_cache
+from modules.metrics import summarize_ms
+from tools.duckduckgo import DuckDuckGoTools
+from tools.wikipedia import WikipediaTools
+from workflows.research_workflow import ResearchTopic, comprehensive_research_step, research_coordinator
+
+TOPICS = [
+    "The impact of AI on software engineering jobs",
+    "Solid-state batteries for electric vehicles",
+    "Remote work and urban real estate prices",
+]
+
+
+def simulate_search(latency: float) -> None:
+    """Replace the live search with a fixed delay and distinct URLs per query."""
+
+    def search(self, query: str, max_results: int = 5) -> str:
+        time.sleep(latency)
+        slug = query.lower().replace(" ", "-")
+        return json.dumps(
+            [
+                {"title": f"{query} #{i}", "href": f"https://example.com/{slug}/{i}", "body": query}
+                for i in range(max_results)
+            ]
+        )
+
+    AgnoDuckDuckGoTools.duckduckgo_search = search  # type: ignore[method-assign]
+    rate_limiter.settings = RateLimitSettings(enabled=False)
+
+
+def run(mode: str, topics: List[str]) -> Dict[str, Any]:
+    research_coordinator.tools = [DuckDuckGoTools(enable_multi_search=mode == "batched"), WikipediaTools()]
+    outputs: List[Any] = []
+    arun = research_coordinator.arun
+
+    async def recording_arun(*args: Any, **kwargs: Any) -> Any:
+        output = await arun(*args, **kwargs)
+        outputs.append(output)
+        return output
+
+    research_coordinator.arun = recording_arun  # type: ignore[method-assign,assignment]
+    seconds: List[float] = []
+    tool_calls: List[int] = []
+    model_calls: List[int] = []
+    for topic in topics:
+        started = time.perf_counter()
+        asyncio.run(comprehensive_research_step(WorkflowExecutionInput(input=ResearchTopic(research_request=topic))))
+        seconds.append(time.perf_counter() - started)
+        run_output = outputs[-1]
+        tool_calls.append(len(run_output.tools or []))
+        model_calls.append(sum(1 for message in run_output.messages or [] if message.role == "assistant"))
+    research_coordinator.arun = arun  # type: ignore[method-assign]
+    return {
+        "mode": mode,
+        "tool_calls": sum(tool_calls) / len(topics),
+        "model_calls": sum(model_calls) / len(topics),
+        "wall_ms": summarize_ms(seconds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=len(TOPICS), help="how many of the built-in topics to run")
+    parser.add_argument("--search-latency", type=float, help="simulated seconds per search instead of DuckDuckGo")
+    args = parser.parse_args()
+
+    search_cache.settings.enabled = False
+    if args.search_latency is not None:
+        simulate_search(args.search_latency)
+    topics = TOPICS[: args.topics]
+
+    print(f"{len(topics)} topics")
+    print(f"{'mode':<12}{'tool calls':>12}{'model calls':>13}{'avg ms':>12}{'p50 ms':>12}{'max ms':>12}")
+    for mode in ("sequential", "batched"):
+        row = run(mode, topics)
+        print(
+            f"{row['mode']:<12}{row['tool_calls']:>12.1f}{row['model_calls']:>13.1f}"
+            f"{row['wall_ms']['avg']:>12}{row['wall_ms']['p50']:>12}{row['wall_ms']['max']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: Ollama prompt evaluation and time to first token with and without the stable prefix.
+
+Replays a sequence of questions to the WebX system prompt (web_agent.py) the way agno builds it,
+with add_datetime_to_context, and a simulated clock that advances --interval seconds per
+request. In "baseline" mode the messages are sent as built, so the timestamp changes the system
+prompt on every call; in "stable" mode they go through stabilize_messages() first. For each
+request Ollama reports how many prompt tokens it had to evaluate and how long that took, which
+drops sharply once the prefix is served from its KV cache.
+
+Usage:
+    python -m benchmarks.prompt_prefix --requests 10
+    python -m benchmarks.prompt_prefix --interval 30 --granularity 900
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from agno.models.message import Message
+
+from agents.web_agent import web_agent
+from app.models import model_registry
+from app.prompt_layout import PromptLayoutSettings, stabilize_messages
+from modules.metrics import summarize_ms
+
+QUESTIONS = [
+    "What is Data Science?",
+    "Who is the president of Brazil?",
+    "Describe Machine Learning.",
+    "What is the capital of France?",
+    "What is deep learning?",
+]
+
+USER_ID = "benchmark-user"
+
+
+def build_messages(now: datetime, question: str) -> List[Message]:
+    """System and user message laid out like agno's default system message for WebX."""
+    system = (
+        f"{web_agent.description}\n"
+        f"<instructions>\n{web_agent.instructions}\n</instructions>\n\n"
+        "<additional_information>\n- Use markdown to format your answers.\n"
+        f"- The current time is {now}.\n</additional_information>\n\n"
+    ).replace("{current_user_id}", USER_ID)
+    return [Message(role="system", content=system), Message(role="user", content=question)]
+
+
+def run(mode: str, requests: int, interval: float, granularity: int) -> Dict[str, Any]:
+    settings = PromptLayoutSettings(stable_prefix=mode == "stable", time_granularity=granularity)
+    profile = model_registry.profile("default")
+    client = model_registry.client(model_registry.host_for("default"))
+    clock = datetime.now()
+    evaluated: List[int] = []
+    prompt_eval: List[float] = []
+    ttft: List[float] = []
+    for index in range(requests):
+        clock += timedelta(seconds=interval, microseconds=index)
+        messages = stabilize_messages(build_messages(clock, QUESTIONS[index % len(QUESTIONS)]), USER_ID, settings)
+        started = time.perf_counter()
+        first_token = None
+        final: Any = None
+        for chunk in client.chat(
+            model=profile.model_id,
+            messages=[{"role": m.role, "content": m.content} for m in messages],
+            options={"num_ctx": profile.num_ctx, "num_predict": 16},
+            keep_alive=profile.keep_alive,
+            stream=True,
+        ):
+            if first_token is None and (chunk.message.content or chunk.message.thinking):
+                first_token = time.perf_counter() - started
+            final = chunk
+        ttft.append(first_token if first_token is not None else time.perf_counter() - started)
+        evaluated.append(final.prompt_eval_count or 0)
+        prompt_eval.append((final.prompt_eval_duration or 0) / 1e9)
+    return {
+        "mode": mode,
+        "prompt_tokens": round(sum(evaluated) / len(evaluated)),
+        "prompt_eval_ms": summarize_ms(prompt_eval),
+        "ttft_ms": summarize_ms(ttft),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=90, help="simulated seconds between requests")
+    parser.add_argument("--granularity", type=int, default=3600, help="time rounding in stable mode, in seconds")
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<10}{'prompt tokens':>15}{'eval p50 ms':>14}{'eval p95 ms':>14}{'ttft p50 ms':>14}{'ttft p95 ms':>14}"
+    )
+    for mode in ("baseline", "stable"):
+        row = run(mode, args.requests, args.interval, args.granularity)
+        print(
+            f"{row['mode']:<10}{row['prompt_tokens']:>15}"
+            f"{row['prompt_eval_ms']['p50']:>14}{row['prompt_eval_ms']['p95']:>14}"
+            f"{row['ttft_ms']['p50']:>14}{row['ttft_ms']['p95']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: semantic cache hit rate versus latency saved on a replayed query log.
+
+Replays a labelled query log (paraphrase group + question) against the semantic cache at several
+similarity thresholds. Every miss is answered by the model and stored; every hit is checked
+against its group, so a hit on an answer written for another group counts as a false hit.
+Embeddings always come from the configured Ollama embedder; pass --llm-ms to simulate the
+generation latency instead of calling the chat model.
+
+Usage:
+    python -m benchmarks.semantic_cache --thresholds 0.85,0.9,0.95
+    python -m benchmarks.semantic_cache --log queries.tsv --llm-ms 4000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.models import model_registry
+from app.response_cache import CachedResponse
+from app.semantic_cache import SemanticCache, SemanticCacheSettings, semantic_query
+from db.session import db_engine
+
+SYSTEM_PROMPT = "You are a helpful assistant. All your responses must be brief and concise."
+
+# (group, question) pairs modelled on the agno-simple quick prompts and their usual paraphrases
+DEFAULT_LOG: List[Tuple[str, str]] = [
+    ("data-science", "What  is Data Science?"),
+    ("brazil-president", "Who is the president of Brazil?"),
+    ("machine-learning", "Describe Machine Learning."),
+    ("data-science", "explain data science"),
+    ("data-science", "What is data science?"),
+    ("machine-learning", "What is machine learning?"),
+    ("brazil-president", "who's Brazil's current president"),
+    ("deep-learning", "What is deep learning?"),
+    ("machine-learning", "Can you describe machine learning?"),
+    ("data-science", "Could you explain what data science is?"),
+    ("brazil-president", "Who is the president of Brazil?"),
+    ("deep-learning", "Explain deep learning in simple terms."),
+    ("france-capital", "What is the capital of France?"),
+    ("france-capital", "Which city is the capital of France?"),
+    ("machine-learning", "Describe Machine Learning."),
+    ("data-engineering", "What is data engineering?"),
+    ("data-science", "Define data science."),
+    ("argentina-president", "Who is the president of Argentina?"),
+    ("deep-learning", "What does deep learning mean?"),
+    ("france-capital", "France's capital city?"),
+]
+
+
+def load_log(path: Optional[str]) -> List[Tuple[str, str]]:
+    if path is None:
+        return DEFAULT_LOG
+    entries = []
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            group, _, question = line.partition("\t")
+            entries.append((group.strip(), question.strip()))
+    return entries
+
+
+def generate(question: str, llm_ms: Optional[float]) -> Tuple[str, float]:
+    started = time.perf_counter()
+    if llm_ms is not None:
+        time.sleep(llm_ms / 1000)
+        return f"simulated answer to: {question}", llm_ms / 1000
+    profile = model_registry.profile("default")
+    response = model_registry.client(model_registry.host_for("default")).chat(
+        model=profile.model_id,
+        messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": question}],
+        options={"num_ctx": profile.num_ctx},
+        keep_alive=profile.keep_alive,
+    )
+    return response.message.content or "", time.perf_counter() - started
+
+
+def replay(entries: List[Tuple[str, str]], threshold: float, llm_ms: Optional[float]) -> Dict[str, float]:
+    cache = SemanticCache(SemanticCacheSettings(threshold=threshold), db_engine)
+    namespace = f"benchmark-{uuid.uuid4().hex[:8]}"
+    answer_groups: Dict[str, str] = {}
+    hits = false_hits = 0
+    lookup_seconds: List[float] = []
+    generation_seconds: List[float] = []
+    try:
+        for group, question in entries:
+            query = semantic_query(
+                namespace,
+                model_registry.profile("default").model_id,
+                [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": question}],
+                {},
+            )
+            assert query is not None
+            started = time.perf_counter()
+            embedding = model_registry.embed(cache.embedding_input(question))
+            match = cache.lookup(namespace, query, embedding)
+            lookup_seconds.append(time.perf_counter() - started)
+
+            if match is not None:
+                hits += 1
+                false_hits += answer_groups[match.response.content] != group
+                continue
+            answer, seconds = generate(question, llm_ms)
+            generation_seconds.append(seconds)
+            answer = f"{answer}\n[{uuid.uuid4().hex[:6]}]"  # keep answers distinct so hits map to one group
+            answer_groups[answer] = group
+            cache.store(namespace, query, embedding, CachedResponse(answer))
+    finally:
+        cache.clear(namespace)
+
+    avg_lookup = sum(lookup_seconds) / len(lookup_seconds)
+    avg_generation = sum(generation_seconds) / len(generation_seconds) if generation_seconds else 0.0
+    return {
+        "hit_rate": round(hits / len(entries), 3),
+        "false_hit_rate": round(false_hits / hits, 3) if hits else 0.0,
+        "avg_lookup_ms": round(1000 * avg_lookup, 1),
+        "avg_llm_ms": round(1000 * avg_generation, 1),
+        "saved_s": round(hits * (avg_generation - avg_lookup), 2),
+        "added_s": round((len(entries) - hits) * avg_lookup, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", help="TSV file with one '<group>\\t<question>' per line")
+    parser.add_argument("--thresholds", default="0.8,0.85,0.9,0.95")
+    parser.add_argument("--llm-ms", type=float, help="simulate generation latency instead of calling the model")
+    args = parser.parse_args()
+
+    entries = load_log(args.log)
+    print(f"{len(entries)} queries, {len({group for group, _ in entries})} distinct intents")
+    rows = [(float(t), replay(entries, float(t), args.llm_ms)) for t in args.thresholds.split(",")]
+    columns = list(rows[0][1])
+    print(f"{'threshold':<10}" + "".join(f"{column:>16}" for column in columns))
+    for threshold, row in rows:
+        print(f"{threshold:<10}" + "".join(f"{row[column]:>16}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: AgentOS cold start with eager vs lazy entity loading.
+
+For each mode, measures the time to import app.main in a fresh interpreter and the time from
+launching uvicorn until /health first answers 200.
+
+Usage:
+    python -m benchmarks.startup --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import requests
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _env(lazy: bool) -> Dict[str, str]:
+    return {**os.environ, "AGENTOS_LAZY_ENTITIES": str(lazy).lower(), "AGENTOS_WARMUP": ""}
+
+
+def measure_import(lazy: bool) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=_env(lazy),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def measure_first_healthy(lazy: bool, timeout: float = 60.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        env=_env(lazy),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.exceptions.ConnectionError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"/health not ready within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'import_s (median)':>20}{'first_healthy_s (median)':>28}")
+    for name, lazy in (("eager", False), ("lazy", True)):
+        imports = [measure_import(lazy) for _ in range(args.repeat)]
+        healthy = [measure_first_healthy(lazy) for _ in range(args.repeat)]
+        print(f"{name:<8}{statistics.median(imports):>20.3f}{statistics.median(healthy):>28.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: search_wikipedia latency from the offline mirror versus wikipedia.org.
+
+Runs the same topics through WikipediaTools with the mirror (no online fallback) and through
+agno's online WikipediaTools, and reports hits and latency for each. Skip the online side with
+--offline, e.g. when benchmarking the research workflow without network access.
+
+Usage:
+    python -m benchmarks.wikipedia_mirror --db data/wikipedia.db
+    python -m benchmarks.wikipedia_mirror --db data/wikipedia.db --topics topics.txt --offline
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from agno.tools.wikipedia import WikipediaTools as OnlineWikipediaTools
+
+from modules.metrics import summarize_ms
+from tools.wikipedia import WikipediaTools
+from tools.wikipedia_mirror import WikipediaMirror
+
+# Background topics the research coordinator typically looks up
+DEFAULT_TOPICS = [
+    "Renewable energy",
+    "Artificial intelligence",
+    "Electric vehicle",
+    "Inflation",
+    "Semiconductor industry",
+    "Machine learning",
+    "Climate change",
+    "Supply chain",
+]
+
+
+def measure(search: Callable[[str], str], topics: List[str]) -> Dict[str, Any]:
+    seconds: List[float] = []
+    hits = 0
+    for topic in topics:
+        started = time.perf_counter()
+        try:
+            search(topic)
+            hits += 1
+        except Exception:  # noqa: BLE001
+            pass
+        seconds.append(time.perf_counter() - started)
+    return {"hits": hits, **summarize_ms(seconds)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="mirror built with `python -m tools.wikipedia_mirror ingest`")
+    parser.add_argument("--topics", help="file with one topic per line")
+    parser.add_argument("--offline", action="store_true", help="only measure the mirror")
+    args = parser.parse_args()
+
+    topics = Path(args.topics).read_text().split("\n") if args.topics else DEFAULT_TOPICS
+    topics = [topic.strip() for topic in topics if topic.strip()]
+    mirrored = WikipediaTools(online_fallback=False)
+    mirrored.mirror = WikipediaMirror(args.db)
+
+    rows = {"mirror": measure(mirrored.search_wikipedia, topics)}
+    if not args.offline:
+        rows["online"] = measure(OnlineWikipediaTools().search_wikipedia, topics)
+
+    print(f"{len(topics)} topics")
+    print(f"{'source':<8}{'hits':>6}{'avg ms':>12}{'p50 ms':>12}{'p95 ms':>12}")
+    for source, row in rows.items():
+        print(f"{source:<8}{row['hits']:>6}{row['avg']:>12}{row['p50']:>12}{row['p95']:>12}")
+
+
+if __name__ == "__main__":
+    main()
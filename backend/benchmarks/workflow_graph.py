@@ -0,0 +1,99 @@
+"""
+Benchmark: end-to-end latency of the investment workflow as a step graph versus one step at a time.
+
+Runs investment_graph (workflows/investment_workflow.py) against a stubbed model that answers every
+call after a fixed delay, so the numbers show scheduling rather than model or network variance.
+"one by one" runs the same nodes in declaration order, each waiting for every node before it;
+"graph" starts each node as soon as the nodes it reads from are done. Both modes make the same model
+calls. The critical path of the last graph run is printed below the table.
+
+Usage:
+    python -m benchmarks.workflow_graph
+    python -m benchmarks.workflow_graph --model-latency 2 --runs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.workflow.workflow import Workflow
+
+from modules.metrics import summarize_ms
+from workflows.graph import Node, StepGraph, graph_stats
+from workflows.investment_workflow import InvestmentWorkflowInput, investment_graph
+
+REQUEST = "Analyze NVIDIA stock"
+# Passes the research and analysis quality checks, so every loop runs once
+ANSWER = (
+    "Share price and market cap, revenue and earnings, with valuation and a buy recommendation. "
+    f"Risk analysis and beta calculation. {'Supporting detail. ' * 60} Source: https://example.com/report"
+)
+
+
+def stub_model(latency: float, calls: List[float]) -> None:
+    async def ainvoke(self: Any, **kwargs: Any) -> ModelResponse:
+        calls.append(time.perf_counter())
+        await asyncio.sleep(latency)
+        return ModelResponse(role="assistant", content=ANSWER)
+
+    async def ainvoke_stream(self: Any, **kwargs: Any) -> AsyncIterator[ModelResponse]:
+        # Gated steps stream; the whole answer arrives as one chunk after the same delay
+        yield await ainvoke(self, **kwargs)
+
+    Ollama.ainvoke = ainvoke  # type: ignore[method-assign,assignment]
+    Ollama.ainvoke_stream = ainvoke_stream  # type: ignore[method-assign,assignment]
+
+
+def one_by_one(graph: StepGraph) -> StepGraph:
+    """The same nodes, each also waiting for every node listed before it."""
+    nodes: List[Node] = []
+    for node in graph.nodes:
+        earlier = tuple(previous.name for previous in nodes if previous.name not in node.needs)
+        nodes.append(Node(node.name, node.step, needs=earlier + node.needs))
+    return StepGraph(name=f"{graph.name} (one by one)", nodes=nodes)
+
+
+def run(mode: str, graph: StepGraph, runs: int, calls: List[float]) -> Dict[str, Any]:
+    workflow = Workflow(name=f"Benchmark {mode}", steps=[graph])
+    seconds: List[float] = []
+    calls.clear()
+    for _ in range(runs):
+        started = time.perf_counter()
+        asyncio.run(workflow.arun(input=InvestmentWorkflowInput(investment_request=REQUEST)))
+        seconds.append(time.perf_counter() - started)
+    return {"mode": mode, "model_calls": len(calls) / runs, "wall_ms": summarize_ms(seconds)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-latency", type=float, default=1.0, help="seconds per stubbed model call")
+    parser.add_argument("--runs", type=int, default=3, help="workflow runs per mode")
+    args = parser.parse_args()
+
+    calls: List[float] = []
+    stub_model(args.model_latency, calls)
+    # Every run has the same input; restoring checkpoints would skip the model calls being measured
+    investment_graph.checkpoints = None
+
+    print(f"{args.runs} runs, {args.model_latency:g}s per model call")
+    print(f"{'mode':<12}{'model calls':>13}{'avg ms':>12}{'p50 ms':>12}{'max ms':>12}")
+    for mode, graph in (("one by one", one_by_one(investment_graph)), ("graph", investment_graph)):
+        row = run(mode, graph, args.runs, calls)
+        print(
+            f"{row['mode']:<12}{row['model_calls']:>13.1f}"
+            f"{row['wall_ms']['avg']:>12}{row['wall_ms']['p50']:>12}{row['wall_ms']['max']:>12}"
+        )
+
+    report = graph_stats.snapshot()["last_run"][investment_graph.name]
+    print(f"critical path: {' -> '.join(report['critical_path'])} ({report['critical_path_seconds']}s)")
+    for name, span in report["nodes"].items():
+        print(f"  {name:<20}{span['start']:>8.2f}s -> {span['end']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Process-wide SQLAlchemy engine registry.
+
+Every PostgresDb, PgVector and SessionLocal in the backend shares a single engine (and
+therefore a single connection pool) per database URL. The pool is instrumented so that
+checkout latency, overflow usage and timeouts can be inspected at runtime.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
+
+from modules.metrics import summarize_ms
+
+
+class PoolSettings(BaseSettings):
+    """Connection pool settings loaded from DB_POOL_* environment variables."""
+
+    size: int = 10
+    max_overflow: int = 20
+    recycle: int = 1800  # seconds
+    timeout: float = 30.0  # seconds to wait for a free connection
+    pre_ping: bool = True
+
+    model_config = SettingsConfigDict(env_prefix="DB_POOL_", case_sensitive=False)
+
+
+class PoolStats:
+    """Thread-safe counters collected by InstrumentedQueuePool."""
+
+    def __init__(self, max_samples: int = 10_000):
+        self._lock = threading.Lock()
+        self._wait_samples: Deque[float] = deque(maxlen=max_samples)
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def record_checkout(self, wait: float, checked_out: int, overflow: int) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._wait_samples.append(wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._wait_samples)
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "wait_ms": summarize_ms(samples),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time, overflow and timeouts."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record_checkout(time.perf_counter() - started, self.checkedout(), self.overflow())
+        return connection
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # Keep counters across Engine.dispose(), which swaps in a fresh pool
+        pool = super().recreate()
+        pool.stats = self.stats  # type: ignore[attr-defined]
+        return pool  # type: ignore[return-value]
+
+    def live_status(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+        }
+
+
+# Global state so every module reuses the same engine for a given URL
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def _attach_listeners(engine: Engine) -> None:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):  # noqa: ANN001
+        _pool_stats(engine).record_connect()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):  # noqa: ANN001
+        _pool_stats(engine).record_checkin()
+
+
+def _pool_stats(engine: Engine) -> PoolStats:
+    return engine.pool.stats  # type: ignore[attr-defined]
+
+
+def create_instrumented_engine(db_url: str, settings: Optional[PoolSettings] = None) -> Engine:
+    """Create a new engine backed by an InstrumentedQueuePool (not registered)."""
+    settings = settings or PoolSettings()
+    engine = create_engine(
+        db_url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.size,
+        max_overflow=settings.max_overflow,
+        pool_recycle=settings.recycle,
+        pool_timeout=settings.timeout,
+        pool_pre_ping=settings.pre_ping,
+    )
+    _attach_listeners(engine)
+    return engine
+
+
+def get_engine(db_url: str, settings: Optional[PoolSettings] = None) -> Engine:
+    """
+    Get the shared engine for a database URL, creating it on first use.
+
+    Args:
+        db_url: SQLAlchemy database URL
+        settings: Pool settings, only used when the engine is first created
+
+    Returns:
+        Engine: The process-wide engine for db_url
+    """
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        if db_url not in _engines:
+            _engines[db_url] = create_instrumented_engine(db_url, settings)
+        return _engines[db_url]
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Live pool status and counters for every registered engine, keyed by masked URL."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for engine in list(_engines.values()):
+        pool = engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            continue
+        stats[engine.url.render_as_string(hide_password=True)] = {
+            **pool.live_status(),
+            **pool.stats.snapshot(),
+        }
+    return stats
+
+
+def dispose_engines() -> None:
+    """Close all pooled connections, e.g. on shutdown or after forking a worker."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
@@ -1,14 +1,15 @@
 from typing import Generator
 
 from agno.db.postgres import PostgresDb
-from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from db.engine import get_engine
 from db.url import get_db_url
 
-# Create SQLAlchemy Engine using a database URL
+# Shared SQLAlchemy Engine: every session, PostgresDb and vector db reuses its connection pool
 db_url: str = get_db_url()
-db_engine: Engine = create_engine(db_url, pool_pre_ping=True)
+db_engine: Engine = get_engine(db_url)
 
 # Create a SessionLocal class
 # https://fastapi.tiangolo.com/tutorial/sql-databases/#create-a-sessionlocal-class
@@ -17,7 +18,13 @@ SessionLocal: sessionmaker[Session] = sessionmaker(autocommit=False, autoflush=F
 
 def get_postgres_db(session_table: str = "agno_sessions", knowledge_table: str = "agno_knowledge") -> PostgresDb:
     """Create a PostgresDb instance with specific table names for agent isolation."""
-    return PostgresDb(db_url=db_url, id="agent-os", session_table=session_table, knowledge_table=knowledge_table)
+    return PostgresDb(
+        db_url=db_url,
+        db_engine=db_engine,
+        id="agent-os",
+        session_table=session_table,
+        knowledge_table=knowledge_table,
+    )
 
 
 def get_db() -> Generator[Session, None, None]:
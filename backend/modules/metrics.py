@@ -0,0 +1,65 @@
+"""
+Lightweight in-process metrics helpers.
+
+Shared by the subsystems that expose counters and latency summaries on the /metrics routes.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+# Default latency buckets in seconds, upper bounds of a cumulative histogram
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sequence of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize_ms(samples: Sequence[float]) -> Dict[str, float]:
+    """Summarize latency samples given in seconds as avg/p50/p95/max milliseconds."""
+    if not samples:
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "avg": round(1000 * sum(samples) / len(samples), 3),
+        "p50": round(1000 * percentile(samples, 50), 3),
+        "p95": round(1000 * percentile(samples, 95), 3),
+        "max": round(1000 * max(samples), 3),
+    }
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with fixed upper bounds (Prometheus style)."""
+
+    def __init__(self, buckets: Optional[Sequence[float]] = None):
+        self._bounds: List[float] = sorted(buckets or DEFAULT_BUCKETS)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += value
+            for index, bound in enumerate(self._bounds):
+                if value <= bound:
+                    self._counts[index] += 1
+                    return
+            self._counts[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = 0
+            buckets: Dict[str, int] = {}
+            for bound, count in zip(self._bounds, self._counts):
+                cumulative += count
+                buckets[f"le_{bound:g}"] = cumulative
+            buckets["le_inf"] = cumulative + self._counts[-1]
+            return {"count": self.count, "sum": round(self.total, 6), "buckets": buckets}
@@ -0,0 +1,178 @@
+"""
+Concurrent member delegation for teams.
+
+reasoning_research_team's leader consulted web_agent and research_agent one after another, so a
+request took two full member runs (each with its own DuckDuckGo research) plus the leader's
+think steps. ConcurrentTeam gives the leader one tool, delegate_task_to_members, that hands the
+same task to every member at once: at most max_concurrency members run at a time, each within
+member_timeout_seconds. A member that fails or runs out of time does not fail the delegation;
+its share of the result says so, and the leader consolidates what the other members found.
+Members run through agno's own single-member delegation, so their runs, history and session
+state are recorded as before. Every delegation records its wall-clock time against the time the
+same member runs take one after another.
+
+Members answer as whole results rather than token streams, so the leader receives one section
+per member in member order. Sync runs (Team.run) keep agno's sequential delegation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from agno.agent import Agent
+from agno.team.team import Team
+from agno.tools.function import Function
+from agno.utils.team import get_member_id
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from modules.metrics import Histogram
+
+log = logging.getLogger("app")
+
+# Upper bounds in seconds for the time saved per delegation
+SAVED_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class DelegationSettings(BaseSettings):
+    """Concurrent delegation settings loaded from TEAM_DELEGATION_* environment variables."""
+
+    enabled: bool = True
+    # Members of one delegation running at the same time
+    max_concurrency: int = 4
+    # A member still running after this long is left out of the delegation's result
+    member_timeout_seconds: float = 300.0
+
+    model_config = SettingsConfigDict(env_prefix="TEAM_DELEGATION_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class MemberRun:
+    """How one member of a delegation did."""
+
+    member: str
+    status: str  # "ok", "timed_out" or "failed"
+    seconds: float
+
+
+class DelegationStats:
+    """Thread-safe counters of concurrent delegations and the time saved over running members one by one."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.delegations = 0
+        self.members: Dict[str, int] = {}
+        self.sequential_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.saved = Histogram(SAVED_BUCKETS)
+
+    def record(self, wall: float, runs: List[MemberRun]) -> None:
+        sequential = sum(run.seconds for run in runs)
+        with self._lock:
+            self.delegations += 1
+            self.sequential_seconds += sequential
+            self.wall_seconds += wall
+            for run in runs:
+                self.members[run.status] = self.members.get(run.status, 0) + 1
+        self.saved.observe(max(0.0, sequential - wall))
+        log.debug(f"Delegated to {len(runs)} members in {wall:.3f}s ({sequential:.3f}s one by one)")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "delegations": self.delegations,
+                "members": dict(self.members),
+                "sequential_seconds": round(self.sequential_seconds, 3),
+                "wall_seconds": round(self.wall_seconds, 3),
+                "saved_seconds": round(max(0.0, self.sequential_seconds - self.wall_seconds), 3),
+                "speedup": round(self.sequential_seconds / self.wall_seconds, 2) if self.wall_seconds else None,
+                "saved_per_delegation": self.saved.snapshot(),
+            }
+
+
+async def _collect(results: AsyncIterator[Any]) -> str:
+    return "".join([str(item) async for item in results])
+
+
+@dataclass(init=False)
+class ConcurrentTeam(Team):
+    """
+    Team whose leader delegates one task to all members concurrently (delegate_to_all_members).
+
+    Args:
+        max_concurrency: Members of one delegation running at a time (default: TEAM_DELEGATION_MAX_CONCURRENCY)
+        member_timeout_seconds: Time each member gets (default: TEAM_DELEGATION_MEMBER_TIMEOUT_SECONDS)
+        **kwargs: Team arguments
+    """
+
+    max_concurrency: Optional[int] = None
+    member_timeout_seconds: Optional[float] = None
+
+    def __init__(
+        self, *, max_concurrency: Optional[int] = None, member_timeout_seconds: Optional[float] = None, **kwargs: Any
+    ):
+        kwargs.setdefault("delegate_to_all_members", True)
+        super().__init__(**kwargs)
+        self.max_concurrency = max_concurrency
+        self.member_timeout_seconds = member_timeout_seconds
+
+    # agno passes every argument by keyword
+    def _get_delegate_task_function(self, **kwargs: Any) -> Function:  # type: ignore[override]
+        if not (self.delegate_to_all_members and kwargs.get("async_mode") and delegation_settings.enabled):
+            return super()._get_delegate_task_function(**kwargs)
+
+        # agno's single-member delegation, which records each member run in the team run and session
+        self.delegate_to_all_members = False
+        try:
+            delegate = super()._get_delegate_task_function(**{**kwargs, "stream": False, "stream_events": False})
+        finally:
+            self.delegate_to_all_members = True
+        delegate_to_member = delegate.entrypoint
+        assert delegate_to_member is not None
+        concurrency = self.max_concurrency or delegation_settings.max_concurrency
+        timeout = self.member_timeout_seconds or delegation_settings.member_timeout_seconds
+
+        async def run_member(member: Union[Agent, Team], task: str, limit: asyncio.Semaphore) -> Tuple[str, MemberRun]:
+            name = member.name or get_member_id(member)
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(
+                        _collect(delegate_to_member(member_id=get_member_id(member), task=task)), timeout
+                    )
+                    status = "ok"
+                except asyncio.TimeoutError:
+                    result = f"No answer within {timeout:g}s; rely on the other members' findings."
+                    status = "timed_out"
+                except Exception as e:  # noqa: BLE001
+                    log.warning(f"Team member {name} failed: {e}")
+                    result = f"Failed ({e}); rely on the other members' findings."
+                    status = "failed"
+                return f"Agent {name}: {result}\n\n", MemberRun(name, status, time.perf_counter() - started)
+
+        async def adelegate_task_to_members(task: str) -> AsyncIterator[str]:
+            """Use this function to delegate a task to all the member agents at once and return their responses.
+            You must provide a clear and concise description of the task to send to member agents.
+
+            Args:
+                task (str): A clear and concise description of the task to send to member agents.
+            Returns:
+                str: The response of each member agent.
+            """
+            limit = asyncio.Semaphore(concurrency)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(run_member(member, task, limit) for member in self.members))
+            delegation_stats.record(time.perf_counter() - started, [run for _, run in results])
+            for text, _ in results:
+                yield text
+
+        return Function.from_callable(adelegate_task_to_members, name="delegate_task_to_members")
+
+
+# Global settings and counters shared by every concurrent team
+delegation_settings = DelegationSettings()
+delegation_stats = DelegationStats()
@@ -0,0 +1,357 @@
+"""
+Local language routing for the multilingual team.
+
+Before answering, the multilingual team's coordinator spent a whole qwen3 generation on most
+requests just to pick one of its five specialists, although the language is usually explicit
+("in French", "auf Deutsch", "日本語で") or plain from the script and spelling of the request.
+route_to_specialist() decides from three signals, compiled once at import: languages and regions
+named in the request, the writing system (kana, Devanagari), and a character n-gram identifier
+trained on the sample texts below, which tells Spanish, French and German from English and from
+languages no specialist speaks. Its confidence comes from the per-n-gram margin over the
+runner-up, so a few accented words in an English request do not make it Spanish. When the
+signals agree with enough confidence, the coordinator's first turn is answered locally with the
+delegate_task_to_member call (app.models.RegistryOllama's router), and the specialist answers
+directly. Requests naming several languages, contradicting signals, unknown languages and plain
+English requests without a target language still go to the coordinator model.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Set, Tuple
+
+from agno.models.message import Message
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from modules.metrics import Histogram
+
+# Upper bounds in seconds for routing latencies
+ROUTE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+DELEGATE_TOOL = "delegate_task_to_member"
+
+
+class LanguageRouterSettings(BaseSettings):
+    """Local routing settings loaded from LANGUAGE_ROUTER_* environment variables."""
+
+    enabled: bool = True
+    # Requests routed with less confidence go to the coordinator model
+    min_confidence: float = 0.8
+    # Fewer letters than this are too little for the n-gram identifier
+    min_letters: int = 12
+
+    model_config = SettingsConfigDict(env_prefix="LANGUAGE_ROUTER_", case_sensitive=False)
+
+
+# ************* Tables *************
+# Member id of the specialist for each language (teams.multilingual_team)
+SPECIALISTS: Dict[str, str] = {
+    "ja": "japanese-language-specialist",
+    "es": "spanish-language-specialist",
+    "fr": "french-language-specialist",
+    "hi": "hindi-language-specialist",
+    "de": "german-language-specialist",
+}
+# Names of each language, in English and in the team's languages
+LANGUAGE_NAMES: Dict[str, Sequence[str]] = {
+    "ja": ("japanese", "nihongo", "japonés", "japones", "japonais", "japanisch", "日本語", "जापानी"),
+    "es": ("spanish", "castilian", "español", "espanol", "castellano", "espagnol", "spanisch", "スペイン語", "स्पेनिश"),
+    "fr": ("french", "français", "francais", "francés", "frances", "französisch", "フランス語", "फ्रेंच", "फ़्रेंच"),
+    "hi": ("hindi", "हिंदी", "हिन्दी", "ヒンディー語", "hindú"),
+    "de": ("german", "deutsch", "alemán", "aleman", "allemand", "ドイツ語", "जर्मन"),
+}
+# Countries and cities whose language and business culture the specialist covers
+REGIONS: Dict[str, Sequence[str]] = {
+    "ja": ("japan", "tokyo", "osaka", "kyoto", "日本", "東京", "大阪"),
+    "es": ("spain", "mexico", "méxico", "argentina", "colombia", "chile", "peru", "perú", "madrid", "latin america"),
+    "fr": ("france", "paris", "quebec", "québec", "lyon", "marseille"),
+    "hi": ("india", "delhi", "new delhi", "mumbai", "bangalore", "भारत"),
+    "de": ("germany", "deutschland", "austria", "österreich", "berlin", "munich", "münchen", "frankfurt", "vienna"),
+}
+# Writing systems only one specialist reads; Han characters alone could as well be Chinese
+SCRIPTS: Dict[str, Pattern[str]] = {
+    "ja": re.compile(r"[぀-ヿ]"),
+    "hi": re.compile(r"[ऀ-ॿ]"),
+}
+# Sample text of each language for the n-gram identifier. English stands for "no target language";
+# Italian and Portuguese, which no specialist speaks, give close relatives of Spanish and French a
+# profile of their own, so they come out as an unknown language rather than as Spanish
+SAMPLES: Dict[str, str] = {
+    "en": """
+        How should I greet a business partner at the first meeting, and what should I avoid saying?
+        Please translate this email for our new client and keep the tone formal and polite.
+        What are the most important cultural differences when negotiating a contract with them?
+        Can you help me write a short presentation about our company and the products we sell?
+        I need to prepare for a job interview next week and would like some advice on etiquette.
+        Explain the difference between the formal and the informal way of addressing people.
+        Our team is opening an office there and we want to understand the local working culture.
+        What is the best way to thank someone for a gift, and is it rude to open it right away?
+        Could you check the grammar of this letter and suggest a more natural way to say it?
+        The meeting was moved to Thursday afternoon because the manager is travelling this week.
+    """,
+    "es": """
+        ¿Cómo debo saludar a un socio de negocios en la primera reunión y qué debo evitar decir?
+        Por favor, traduce este correo para nuestro nuevo cliente y mantén un tono formal y cortés.
+        ¿Cuáles son las diferencias culturales más importantes al negociar un contrato con ellos?
+        ¿Puedes ayudarme a escribir una presentación breve sobre nuestra empresa y los productos que vendemos?
+        Necesito prepararme para una entrevista de trabajo la próxima semana y quisiera algunos consejos.
+        Explica la diferencia entre la forma formal y la informal de dirigirse a las personas.
+        Nuestro equipo va a abrir una oficina allí y queremos entender la cultura laboral local.
+        ¿Cuál es la mejor manera de agradecer un regalo, y es de mala educación abrirlo enseguida?
+        ¿Podrías revisar la gramática de esta carta y sugerir una forma más natural de decirlo?
+        La reunión se cambió al jueves por la tarde porque el gerente está de viaje esta semana.
+    """,
+    "fr": """
+        Comment dois-je saluer un partenaire d'affaires lors de la première réunion, et que dois-je éviter de dire ?
+        Merci de traduire ce courriel pour notre nouveau client en gardant un ton formel et poli.
+        Quelles sont les différences culturelles les plus importantes quand on négocie un contrat avec eux ?
+        Peux-tu m'aider à écrire une courte présentation de notre entreprise et des produits que nous vendons ?
+        Je dois me préparer pour un entretien d'embauche la semaine prochaine et j'aimerais quelques conseils.
+        Explique la différence entre la façon formelle et la façon familière de s'adresser aux gens.
+        Notre équipe ouvre un bureau là-bas et nous voulons comprendre la culture de travail locale.
+        Quelle est la meilleure façon de remercier quelqu'un pour un cadeau,
+        et est-il impoli de l'ouvrir tout de suite ?
+        Pourrais-tu vérifier la grammaire de cette lettre et proposer une tournure plus naturelle ?
+        La réunion a été déplacée à jeudi après-midi parce que le directeur est en voyage cette semaine.
+    """,
+    "de": """
+        Wie sollte ich einen Geschäftspartner beim ersten Treffen begrüßen, und was sollte ich lieber nicht sagen?
+        Bitte übersetze diese E-Mail für unseren neuen Kunden und halte den Ton förmlich und höflich.
+        Was sind die wichtigsten kulturellen Unterschiede, wenn man mit ihnen einen Vertrag verhandelt?
+        Kannst du mir helfen, eine kurze Präsentation über unser Unternehmen und unsere Produkte zu schreiben?
+        Ich muss mich nächste Woche auf ein Vorstellungsgespräch vorbereiten und hätte gern ein paar Tipps.
+        Erkläre den Unterschied zwischen der förmlichen und der informellen Anrede von Menschen.
+        Unser Team eröffnet dort ein Büro und wir wollen die örtliche Arbeitskultur verstehen.
+        Wie bedankt man sich am besten für ein Geschenk, und ist es unhöflich, es sofort zu öffnen?
+        Könntest du die Grammatik dieses Briefes prüfen und eine natürlichere Formulierung vorschlagen?
+        Das Treffen wurde auf Donnerstagnachmittag verschoben, weil der Leiter diese Woche auf Reisen ist.
+    """,
+    "it": """
+        Come devo salutare un partner commerciale al primo incontro, e che cosa dovrei evitare di dire?
+        Per favore, traduci questa email per il nostro nuovo cliente e mantieni un tono formale e cortese.
+        Quali sono le differenze culturali più importanti quando si negozia un contratto con loro?
+        Puoi aiutarmi a scrivere una breve presentazione della nostra azienda e dei prodotti che vendiamo?
+        Devo prepararmi per un colloquio di lavoro la prossima settimana e vorrei qualche consiglio.
+        Spiega la differenza tra il modo formale e quello informale di rivolgersi alle persone.
+        Il nostro team apre un ufficio lì e vogliamo capire la cultura del lavoro locale.
+        Qual è il modo migliore per ringraziare qualcuno per un regalo, ed è scortese aprirlo subito?
+        Potresti controllare la grammatica di questa lettera e suggerire un modo più naturale di dirlo?
+        La riunione è stata spostata a giovedì pomeriggio perché il direttore è in viaggio questa settimana.
+    """,
+    "pt": """
+        Como devo cumprimentar um parceiro de negócios na primeira reunião, e o que devo evitar dizer?
+        Por favor, traduza este e-mail para o nosso novo cliente e mantenha um tom formal e educado.
+        Quais são as diferenças culturais mais importantes ao negociar um contrato com eles?
+        Você pode me ajudar a escrever uma apresentação curta sobre a nossa empresa e os produtos que vendemos?
+        Preciso me preparar para uma entrevista de emprego na próxima semana e gostaria de alguns conselhos.
+        Explique a diferença entre a forma formal e a informal de se dirigir às pessoas.
+        A nossa equipe vai abrir um escritório lá e queremos entender a cultura de trabalho local.
+        Qual é a melhor maneira de agradecer um presente, e é falta de educação abri-lo na hora?
+        Você poderia revisar a gramática desta carta e sugerir uma forma mais natural de dizer isso?
+        A reunião foi remarcada para quinta-feira à tarde porque o gerente está viajando esta semana.
+    """,
+}
+NGRAM_SIZES = (1, 2, 3)
+
+
+def _phrase_pattern(phrases: Sequence[str]) -> Pattern[str]:
+    # Longest first, so "new delhi" wins over "delhi"; no word boundaries inside Japanese text
+    alternation = "|".join(re.escape(phrase) for phrase in sorted(set(phrases), key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)|(?:{alternation})(?=[぀-ヿ])", re.IGNORECASE)
+
+
+def _ngrams(text: str) -> Counter:
+    counts: Counter = Counter()
+    for word in re.findall(r"[^\W\d_]+", text.lower()):
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            counts.update(padded[i : i + size] for i in range(len(padded) - size + 1))
+    return counts
+
+
+class NgramIdentifier:
+    """Naive Bayes language identifier over character 1- to 3-grams, with add-one smoothing."""
+
+    def __init__(self, samples: Dict[str, str]):
+        self.languages = list(samples)
+        profiles = [_ngrams(samples[language]) for language in self.languages]
+        vocabulary = set().union(*profiles)
+        totals = [sum(counts.values()) + len(vocabulary) + 1 for counts in profiles]
+        # One row of log-probabilities per n-gram, so a text is scored in a single pass over its n-grams
+        self.unseen = tuple(math.log(1 / total) for total in totals)
+        self.log_probs: Dict[str, Tuple[float, ...]] = {
+            gram: tuple(math.log((counts[gram] + 1) / total) for counts, total in zip(profiles, totals))
+            for gram in vocabulary
+        }
+
+    def identify(self, text: str) -> Dict[str, float]:
+        """
+        Mean log-likelihood per n-gram of the text under each language's profile.
+
+        Per n-gram rather than summed, so the scores of a long request are not more certain than
+        those of a short one; compare them by their differences, not as probabilities.
+        """
+        grams = _ngrams(text)
+        if not grams:
+            return {}
+        scores = [0.0] * len(self.languages)
+        for gram, count in grams.items():
+            for index, log_prob in enumerate(self.log_probs.get(gram, self.unseen)):
+                scores[index] += count * log_prob
+        total = sum(grams.values())
+        return {language: score / total for language, score in zip(self.languages, scores)}
+
+
+# Compiled once at import
+NAME_PATTERNS = {language: _phrase_pattern(names) for language, names in LANGUAGE_NAMES.items()}
+REGION_PATTERNS = {language: _phrase_pattern(regions) for language, regions in REGIONS.items()}
+IDENTIFIER = NgramIdentifier(SAMPLES)
+LETTER = re.compile(r"[^\W\d_]")
+# Confidence given to a single region named in an English request, and to a specialist's own script
+REGION_CONFIDENCE = 0.85
+SCRIPT_CONFIDENCE = 0.95
+NAMED_CONFIDENCE = 0.95
+# The n-gram confidence is 1 - exp(-margin / MARGIN_SCALE), the margin being how much more likely
+# per n-gram the best language is than the runner-up, English included; 0.8 needs a margin of 0.15
+MARGIN_SCALE = 0.15 / math.log(5)
+
+
+@dataclass(frozen=True)
+class Route:
+    """The specialist language of a request, or why it has none."""
+
+    language: Optional[str]
+    confidence: float
+    reason: str
+
+    @property
+    def member_id(self) -> Optional[str]:
+        return SPECIALISTS.get(self.language) if self.language else None
+
+
+def _found(patterns: Dict[str, Pattern[str]], text: str) -> Set[str]:
+    return {language for language, pattern in patterns.items() if pattern.search(text)}
+
+
+def detect(text: str) -> Route:
+    """
+    Decide which specialist a request is for.
+
+    Args:
+        text: The request as the user wrote it
+
+    Returns:
+        Route: The specialist language with its confidence and the signal that decided it, or no
+            language and the reason the coordinator should decide
+    """
+    named = _found(NAME_PATTERNS, text)
+    if len(named) > 1:
+        return Route(None, 0.0, "several_languages")
+    regions = _found(REGION_PATTERNS, text)
+    if named:
+        # "German cars sold in Japan": the language is a topic, not the target
+        if regions and regions != named:
+            return Route(None, 0.0, "conflicting_signals")
+        return Route(named.pop(), NAMED_CONFIDENCE, "named")
+
+    if len(regions) > 1:
+        return Route(None, 0.0, "several_regions")
+    scripts = {language for language, pattern in SCRIPTS.items() if pattern.search(text)}
+    if len(scripts) > 1:
+        return Route(None, 0.0, "several_scripts")
+
+    source: Optional[Route] = None
+    if scripts:
+        source = Route(scripts.pop(), SCRIPT_CONFIDENCE, "script")
+    elif len(LETTER.findall(text)) >= language_router_settings.min_letters:
+        scores = IDENTIFIER.identify(text)
+        language, runner_up = sorted(scores, key=scores.__getitem__, reverse=True)[:2]
+        if language not in SPECIALISTS and language != "en":
+            return Route(None, 0.0, "unknown_language")
+        if language != "en":
+            margin = scores[language] - scores[runner_up]
+            source = Route(language, 1.0 - math.exp(-margin / MARGIN_SCALE), "ngrams")
+
+    if source is not None:
+        if regions and regions != {source.language}:
+            return Route(None, 0.0, "conflicting_signals")
+        if regions:
+            # A region of the same language backs the source up: both would have to be wrong
+            return Route(source.language, 1.0 - (1.0 - source.confidence) * (1.0 - REGION_CONFIDENCE), source.reason)
+        return source
+    if regions:
+        return Route(regions.pop(), REGION_CONFIDENCE, "region")
+    return Route(None, 0.0, "no_language")
+
+
+class LanguageRouterStats:
+    """Thread-safe counters of requests routed without the coordinator model, and routing latencies."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.routed: Dict[str, int] = {}
+        self.fallbacks: Dict[str, int] = {}
+        self.latency = Histogram(ROUTE_BUCKETS)
+
+    def record(self, seconds: float, route: Route, routed: bool) -> None:
+        self.latency.observe(seconds)
+        with self._lock:
+            if routed and route.language is not None:
+                self.routed[route.language] = self.routed.get(route.language, 0) + 1
+            else:
+                reason = route.reason if route.language is None else "low_confidence"
+                self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            routed = sum(self.routed.values())
+            total = routed + sum(self.fallbacks.values())
+            return {
+                "routed": dict(self.routed),
+                "fallbacks": dict(self.fallbacks),
+                "route_rate": round(routed / total, 4) if total else 0.0,
+                "latency_seconds": self.latency.snapshot(),
+            }
+
+
+def _request_text(messages: List[Message]) -> Optional[str]:
+    # Only the first turn of a run is routed: the last message is the user's, with no tool results after it
+    if not messages or messages[-1].role != "user":
+        return None
+    return messages[-1].get_content_string()
+
+
+def route_to_specialist(messages: List[Message]) -> Optional[Dict[str, Any]]:
+    """
+    Router for the multilingual team coordinator's model (RegistryOllama(router=...)).
+
+    Args:
+        messages: The messages the coordinator model would be called with
+
+    Returns:
+        Optional[Dict[str, Any]]: The delegate_task_to_member call handing the request to its
+            specialist, or None when the coordinator model should decide
+    """
+    if not language_router_settings.enabled:
+        return None
+    text = _request_text(messages)
+    if not text:
+        return None
+    started = time.perf_counter()
+    route = detect(text)
+    routed = route.member_id is not None and route.confidence >= language_router_settings.min_confidence
+    language_router_stats.record(time.perf_counter() - started, route, routed)
+    if not routed:
+        return None
+    return {"name": DELEGATE_TOOL, "arguments": json.dumps({"member_id": route.member_id, "task": text})}
+
+
+# Global settings and counters shared by every copy of the coordinator's model
+language_router_settings = LanguageRouterSettings()
+language_router_stats = LanguageRouterStats()
@@ -1,18 +1,18 @@
 from textwrap import dedent
 
 from agno.agent import Agent
-from agno.models.ollama import Ollama
 from agno.team.team import Team
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_MODEL_ID
+from app.models import get_model
 from db.session import get_postgres_db
+from teams.language_router import route_to_specialist
 
 # ************* Team Members *************
 japanese_specialist = Agent(
     id="japanese-language-specialist",
     name="Japanese Language Specialist",
     role="Expert in Japanese language, culture, and business practices",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(cache_namespace="multilingual-team"),
     instructions=[
         "You are a professional Japanese language and cultural consultant.",
         "Provide accurate translations with appropriate formality levels (keigo, casual, business).",
@@ -30,7 +30,7 @@ spanish_specialist = Agent(
     id="spanish-language-specialist",
     name="Spanish Language Specialist",
     role="Expert in Spanish language across Latin America and Spain",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(cache_namespace="multilingual-team"),
     instructions=[
         "You are a professional Spanish language and cultural consultant.",
         "Provide translations appropriate for specific regions (Mexico, Spain, Argentina, etc.).",
@@ -48,7 +48,7 @@ french_specialist = Agent(
     id="french-language-specialist",
     name="French Language Specialist",
     role="Expert in French language and Francophone culture",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(cache_namespace="multilingual-team"),
     instructions=[
         "You are a professional French language and cultural consultant.",
         "Provide translations with appropriate formality (vous/tu, formal/informal business register).",
@@ -66,7 +66,7 @@ hindi_specialist = Agent(
     id="hindi-language-specialist",
     name="Hindi Language Specialist",
     role="Expert in Hindi language and Indian business culture",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(cache_namespace="multilingual-team"),
     instructions=[
         "You are a professional Hindi language and Indian cultural consultant.",
         "Provide translations with appropriate formality and respect levels.",
@@ -84,7 +84,7 @@ german_specialist = Agent(
     id="german-language-specialist",
     name="German Language Specialist",
     role="Expert in German language and Germanic business culture",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(cache_namespace="multilingual-team"),
     instructions=[
         "You are a professional German language and cultural consultant.",
         "Provide translations with appropriate formality (Sie/du, business protocols).",
@@ -102,7 +102,8 @@ german_specialist = Agent(
 multilingual_team = Team(
     id="multilingual-team",
     name="Professional Multilingual Consultation Team",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    # Requests whose language is plain go straight to its specialist without a coordinator generation
+    model=get_model(cache_namespace="multilingual-team", router=route_to_specialist),
     description=dedent(
         """\
     Expert multilingual team with native specialists in Japanese, Spanish, French, Hindi, and German who provide 
@@ -1,20 +1,19 @@
 from textwrap import dedent
 
 from agno.agent import Agent
-from agno.models.ollama import Ollama
-from agno.team.team import Team
-from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_MODEL_ID
+from app.models import get_model
 from db.session import get_postgres_db
+from teams.delegation import ConcurrentTeam
+from tools.duckduckgo import DuckDuckGoTools
 
 # ************* Team Members Setup *************
 web_agent = Agent(
     id="web-agent",
     name="Web Search Agent",
     role="Handle web search requests and general research",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     instructions=[
         "Search for current and relevant information on financial topics",
         "Always include sources and publication dates",
@@ -30,7 +29,7 @@ research_agent = Agent(
     id="research-agent",
     name="Research Specialist",
     role="Advanced research and analysis using AI-powered search",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     instructions=[
         "You are a professional research specialist using comprehensive web search capabilities.",
         "Conduct thorough research on any topic using DuckDuckGo search to find authoritative sources.",
@@ -46,10 +45,10 @@ research_agent = Agent(
 )
 
 # ************* Reasoning Research Team Setup *************
-reasoning_research_team = Team(
+reasoning_research_team = ConcurrentTeam(
     id="reasoning-research-team",
     name="Advanced Research & Analysis Team",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     description="Strategic research and analysis team combining web intelligence, advanced reasoning tools, and collaborative investigation to deliver evidence-based insights with structured analysis and clear recommendations",
     instructions=dedent("""\
         You are a professional research and analysis team. Collaborate to provide comprehensive research and analysis on any topic.
@@ -69,6 +68,8 @@ reasoning_research_team = Team(
         web_agent,
         research_agent,
     ],
+    # Both members research the task at the same time, each within TEAM_DELEGATION_MEMBER_TIMEOUT_SECONDS
+    delegate_to_all_members=True,
     # -*- Storage -*-
     db=get_postgres_db(),
     add_history_to_context=True,
@@ -1,3 +1,17 @@
+import re
+from typing import Any, AsyncIterator
+
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+
 def get_api_url(path: str) -> str:
     """Helper function to create full API URLs."""
     return f"http://localhost:8000{path}"
+
+
+async def stream_ainvoke(self: Any, **kwargs: Any) -> AsyncIterator[ModelResponse]:
+    """Stand-in for Ollama.ainvoke_stream that streams the (faked) Ollama.ainvoke answer word by word."""
+    response = await Ollama.ainvoke(self, **kwargs)
+    for word in re.findall(r"\S+\s*", response.content or ""):
+        yield ModelResponse(content=word)
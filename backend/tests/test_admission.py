@@ -0,0 +1,131 @@
+"""
+Unit tests for run admission control.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRegistry,
+    AdmissionRejected,
+    AdmissionSettings,
+)
+
+
+def test_interactive_runs_are_admitted_before_batch():
+    """Test that a freed slot goes to the oldest interactive waiter before any batch waiter."""
+    controller = AdmissionController("default", max_active=1, max_queue=10, max_wait=5)
+    order = []
+
+    async def run(name, priority):
+        await controller.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        controller.release()
+
+    async def scenario():
+        await controller.acquire("batch")
+        tasks = [
+            asyncio.create_task(run("batch-1", "batch")),
+            asyncio.create_task(run("chat-1", "interactive")),
+            asyncio.create_task(run("batch-2", "batch")),
+            asyncio.create_task(run("chat-2", "interactive")),
+        ]
+        await asyncio.sleep(0.01)
+        controller.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+    assert order == ["chat-1", "chat-2", "batch-1", "batch-2"]
+    assert controller.active == 0
+    assert controller.snapshot()["wait_seconds"]["interactive"]["count"] == 2
+
+
+def test_full_queue_and_long_wait_are_rejected():
+    """Test that a full queue returns 429 and an expired wait returns 503, both with Retry-After."""
+    controller = AdmissionController("default", max_active=1, max_queue=1, max_wait=0.05)
+
+    async def scenario():
+        await controller.acquire("interactive")
+        waiting = asyncio.create_task(controller.acquire("interactive"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire("interactive")
+        with pytest.raises(AdmissionRejected) as expired:
+            await waiting
+        return full.value, expired.value
+
+    full, expired = asyncio.run(scenario())
+
+    assert (full.status_code, expired.status_code) == (429, 503)
+    assert full.retry_after >= 1 and expired.retry_after >= 1
+    assert controller.queue_depth() == 0
+    assert (controller.rejected_full, controller.rejected_timeout) == (1, 1)
+
+
+def test_slot_handed_over_as_the_wait_expires_is_not_leaked(monkeypatch):
+    """Test that a waiter whose timeout fires in the tick its slot is handed over is admitted, not rejected."""
+    controller = AdmissionController("default", max_active=1, max_queue=10, max_wait=5)
+    wait_for = asyncio.wait_for
+
+    async def racing_wait_for(future, timeout):
+        # release() hands the slot over, then the timeout fires before the waiter resumes
+        controller.release()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        await controller.acquire("interactive")
+        monkeypatch.setattr(asyncio, "wait_for", racing_wait_for)
+        waited = await controller.acquire("interactive")
+        monkeypatch.setattr(asyncio, "wait_for", wait_for)
+        assert controller.active == 1
+        controller.release()
+        return waited
+
+    waited = asyncio.run(scenario())
+
+    assert waited >= 0
+    assert controller.active == 0
+    assert (controller.admitted, controller.rejected_timeout) == (2, 0)
+
+
+def test_middleware_only_gates_run_endpoints():
+    """Test that run requests beyond the limit get a 429 while other routes pass through."""
+    release = asyncio.Event()
+
+    async def slow_run(request):
+        await release.wait()
+        return JSONResponse({"ok": True})
+
+    async def config(request):
+        return JSONResponse({"ok": True})
+
+    inner = Starlette(routes=[Route("/agents/{agent_id}/runs", slow_run, methods=["POST"]), Route("/config", config)])
+    admission = AdmissionRegistry(AdmissionSettings(max_active=1, max_queue=0, max_wait=1))
+    app = AdmissionMiddleware(inner, admission=admission, resolve_profile=lambda entity_id: "default")
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/agents/agno-simple/runs"))
+            await asyncio.sleep(0.01)
+            rejected = await client.post("/agents/agno-simple/runs")
+            passthrough = await client.get("/config")
+            release.set()
+            return await first, rejected, passthrough
+
+    first, rejected, passthrough = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert passthrough.status_code == 200
+    assert admission.status()["default"]["active"] == 0
@@ -0,0 +1,135 @@
+"""
+Unit tests for batch runs of workflow inputs.
+"""
+
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from agno.agent import Agent
+from agno.models.metrics import Metrics
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.workflow.step import Step, StepInput, StepOutput
+from agno.workflow.workflow import Workflow
+from fastapi import HTTPException
+
+from app.batches import dedupe, summarize, validate_items
+from app.jobs import JobSettings, JobStats, JobWorker, PostgresJobQueue
+from db.session import db_engine
+from workflows.checkpoint import run_agent
+from workflows.investment_workflow import InvestmentWorkflowInput
+
+SETTINGS = JobSettings(retry_backoff_seconds=0, event_flush_seconds=0)
+
+
+def new_queue():
+    """A queue and a workflow id no other test submits jobs for."""
+    return PostgresJobQueue(db_engine, "ai"), f"test-batches-{uuid.uuid4().hex[:8]}"
+
+
+def test_items_with_the_same_input_share_one_job():
+    """Test that items differing only in case and whitespace run as one job, and every item gets its result."""
+    queue, workflow_id = new_queue()
+    items = [
+        {"investment_request": "Analyze NVIDIA stock"},
+        {"investment_request": "Analyze AMD stock"},
+        {"investment_request": "  analyze nvidia   STOCK"},
+    ]
+    inputs, item_inputs = dedupe(items)
+    assert inputs == items[:2]
+    assert item_inputs == [0, 1, 0]
+
+    batch_id, job_ids = queue.submit_batch(workflow_id, inputs, item_inputs, max_attempts=1)
+    stored = queue.batch_items(batch_id)
+
+    assert [item["job_id"] for item in stored] == [job_ids[0], job_ids[1], job_ids[0]]
+    assert summarize(queue.batch(batch_id))["deduplicated_items"] == 1
+
+
+def test_requests_that_parse_the_same_share_one_job():
+    """Test that differently worded investment requests with the same parsed fields run as one job."""
+    items = [
+        {"investment_request": "Analyze Apple stock"},
+        {"investment_request": "Analyze AAPL shares"},
+        {"investment_request": "Compare AAPL for long-term growth"},
+        {"investment_request": "Should I buy Apple for long-term growth?"},
+        {"investment_request": "Analyze Rivian and Lucid for EV growth"},
+    ]
+
+    inputs, item_inputs = dedupe(items)
+
+    assert inputs == [items[0], items[2], items[4]]
+    assert item_inputs == [0, 0, 1, 1, 2]
+
+
+def test_batch_runs_at_most_max_concurrency_jobs():
+    """Test that workers claiming at the same time start no more of a batch's jobs than its limit."""
+    queue, workflow_id = new_queue()
+    inputs = [f"request {index}" for index in range(6)]
+    queue.submit_batch(workflow_id, inputs, list(range(6)), max_attempts=1, max_concurrency=2)
+
+    def claim(worker):
+        return worker, queue.claim(worker, 60, [workflow_id])
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        claims = list(pool.map(claim, [f"worker-{index}" for index in range(6)]))
+
+    claimed = [(worker, job) for worker, job in claims if job is not None]
+    assert len(claimed) == 2
+    # A finished job frees a slot for the next one
+    worker, job = claimed[0]
+    assert queue.complete(job, worker, "ok")
+    assert queue.claim("worker-next", 60, [workflow_id]) is not None
+    assert queue.claim("worker-last", 60, [workflow_id]) is None
+
+
+def test_batch_summary_reports_throughput_and_tokens(monkeypatch):
+    """Test that a finished batch reports its items per minute and the model tokens its jobs consumed."""
+
+    async def fake_ainvoke(self, **kwargs):
+        return ModelResponse(
+            role="assistant", content="Buy.", response_usage=Metrics(input_tokens=40, output_tokens=10, total_tokens=50)
+        )
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    analyst = Agent(name="Analyst", model=Ollama(id="test"))
+
+    async def analyze(step_input: StepInput) -> StepOutput:
+        result = await run_agent(analyst, f"Analyze {step_input.input}")
+        return StepOutput(content=result.content)
+
+    workflow = Workflow(name="Analyze", steps=[Step(name="Analyze", executor=analyze, max_retries=0)])
+    queue, workflow_id = new_queue()
+    items = ["NVDA", "AMD", "nvda"]
+    inputs, item_inputs = dedupe(items)
+    batch_id, _ = queue.submit_batch(workflow_id, inputs, item_inputs, max_attempts=1, max_concurrency=2)
+    worker = JobWorker(queue, SETTINGS, JobStats(), resolve=lambda _: workflow)
+
+    async def drain():
+        while (job := await asyncio.to_thread(queue.claim, worker.worker_id, 60, [workflow_id])) is not None:
+            await worker.process(job)
+
+    asyncio.run(drain())
+    summary = summarize(queue.batch(batch_id))
+
+    assert summary["status"] == "finished"
+    assert summary["item_statuses"] == {"succeeded": 3}
+    assert summary["jobs"] == 2
+    assert summary["tokens"] == 100
+    assert summary["items_per_minute"] > 0
+    assert [item["result"] for item in queue.batch_items(batch_id)] == ["Buy."] * 3
+
+
+def test_items_are_validated_against_the_workflow_input_schema():
+    """Test that batch items must match the workflow's input schema."""
+    workflow = Workflow(name="Investment", steps=[], input_schema=InvestmentWorkflowInput)
+
+    assert validate_items(workflow, [{"investment_request": "Analyze NVIDIA"}]) == [
+        {"investment_request": "Analyze NVIDIA"}
+    ]
+    with pytest.raises(HTTPException) as rejected:
+        validate_items(workflow, [{"investment_request": "Analyze NVIDIA"}, {"ticker": "AMD"}])
+    assert rejected.value.status_code == 422
+    assert "Item 1" in rejected.value.detail
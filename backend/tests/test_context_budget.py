@@ -0,0 +1,84 @@
+"""
+Unit tests for the token budget of workflow step prompts.
+"""
+
+import asyncio
+
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.workflow.types import StepInput, StepOutput
+
+from workflows.context_budget import OMITTED, PromptBudget, PromptBudgetSettings, dedupe, prompt_budget
+from workflows.investment_workflow import InvestmentWorkflowInput, portfolio_strategy_step
+
+REQUEST = "Analyze NVIDIA and AMD for a long-term growth portfolio"
+
+
+def upstream(title: str, body: str) -> str:
+    """A step output laid out like the workflow executors' outputs."""
+    return f"""
+            # {title}
+
+            ## Investment Request
+            {REQUEST}
+
+            ## Results
+            {body}
+        """.strip()
+
+
+def test_dedupe_drops_repeated_requests_and_paragraphs():
+    """Test that the request blocks and paragraphs quoted from an earlier section are dropped."""
+    quoted = "NVIDIA reported record data center revenue of $30.8B, up 112% year over year, per its filing."
+    sections = {
+        "Market Research": upstream("Investment Research Findings", quoted),
+        "Financial Analysis": upstream("Financial Analysis", f"{quoted}\n\nValuation: fair value $140."),
+    }
+
+    deduped = dedupe(sections, REQUEST)
+
+    assert REQUEST not in deduped["Market Research"] and REQUEST not in deduped["Financial Analysis"]
+    assert "## Investment Request" not in deduped["Financial Analysis"]
+    assert quoted in deduped["Market Research"] and quoted not in deduped["Financial Analysis"]
+    assert "Valuation: fair value $140." in deduped["Financial Analysis"]
+
+
+def test_over_budget_section_keeps_headers_and_sources_first():
+    """Test that only the section over its share is trimmed, keeping headers and source lines."""
+    budget = PromptBudget(PromptBudgetSettings(context_tokens=300), model_id="qwen3:latest")
+    filler = "\n\n".join(f"Background paragraph {chr(65 + i % 26)} with general commentary." * 3 for i in range(40))
+    research = upstream("Investment Research Findings", f"{filler}\n\nSource: https://example.com/nvda-10k")
+    analysis = upstream("Financial Analysis", "Buy, with a price target of $150.")
+
+    fitted = budget.fit("Portfolio Strategy", REQUEST, {"Market Research": research, "Financial Analysis": analysis})
+
+    assert budget.count(fitted["Market Research"]) + budget.count(fitted["Financial Analysis"]) <= 300
+    assert "Buy, with a price target of $150." in fitted["Financial Analysis"]
+    assert "# Investment Research Findings" in fitted["Market Research"]
+    assert "https://example.com/nvda-10k" in fitted["Market Research"]
+    assert OMITTED in fitted["Market Research"]
+    assert budget.status()["steps"]["Portfolio Strategy"]["trimmed_sections"] == 1
+
+
+def test_step_prompt_stays_within_budget_and_is_counted(monkeypatch):
+    """Test that looping-sized upstream outputs no longer blow up the portfolio strategy prompt."""
+    prompts = []
+
+    async def fake_ainvoke(self, **kwargs):
+        prompts.append(str(kwargs["messages"][-1].content))
+        return ModelResponse(role="assistant", content="Strategy")
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    findings = "\n\n".join(f"Finding {i}: revenue grew {i}% per https://example.com/{i}" for i in range(2000))
+    outputs = {
+        "Market Research": StepOutput(content=upstream("Investment Research Findings", findings)),
+        "Financial Analysis": StepOutput(content=upstream("Financial Analysis", findings)),
+    }
+    step_input = StepInput(input=InvestmentWorkflowInput(investment_request=REQUEST), previous_step_outputs=outputs)
+
+    asyncio.run(portfolio_strategy_step(step_input))
+
+    raw = prompt_budget.count(findings) * 2
+    stats = prompt_budget.status()["steps"]["Portfolio Strategy"]
+    assert stats["last_prompt_tokens"] == prompt_budget.count(prompts[0])
+    assert stats["last_prompt_tokens"] < prompt_budget.settings.context_tokens + 1000 < raw
@@ -0,0 +1,103 @@
+"""
+Unit tests for concurrent member delegation in teams.
+"""
+
+import asyncio
+import json
+import time
+
+from agno.agent import Agent
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from teams.delegation import ConcurrentTeam, DelegationStats
+
+DELAY = 0.5
+
+
+def research_team(members, monkeypatch, **kwargs):
+    """A team of stub members; each member's model sleeps `delay` seconds, or raises when its delay is None."""
+    in_flight = {"now": 0, "max": 0}
+
+    async def fake_ainvoke(self, **kwargs):
+        messages = kwargs["messages"]
+        tools = [tool["function"]["name"] for tool in kwargs.get("tools") or []]
+        if "delegate_task_to_members" in tools:
+            if messages[-1].role == "tool":
+                return ModelResponse(role="assistant", content=str(messages[-1].content))
+            arguments = json.dumps({"task": "Research NVIDIA's data center revenue"})
+            return ModelResponse(
+                role="assistant",
+                tool_calls=[
+                    {"type": "function", "function": {"name": "delegate_task_to_members", "arguments": arguments}}
+                ],
+            )
+        name = next(name for name in members if f"Findings of {name}" in str(messages[0].content))
+        if members[name] is None:
+            raise RuntimeError("search backend unavailable")
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            await asyncio.sleep(members[name])
+        finally:
+            in_flight["now"] -= 1
+        return ModelResponse(role="assistant", content=f"Findings of {name}.")
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    stats = DelegationStats()
+    monkeypatch.setattr("teams.delegation.delegation_stats", stats)
+    team = ConcurrentTeam(
+        name="Research team",
+        model=Ollama(id="test"),
+        members=[
+            Agent(name=name, model=Ollama(id="test"), instructions=[f"Answer with the Findings of {name}."])
+            for name in members
+        ],
+        **kwargs,
+    )
+    return team, stats, in_flight
+
+
+def timed_run(team):
+    started = time.perf_counter()
+    output = asyncio.run(team.arun("How is NVIDIA's data center business doing?"))
+    return str(output.content), time.perf_counter() - started
+
+
+def test_members_research_at_the_same_time(monkeypatch):
+    """Test that a delegation takes about as long as its slowest member, not the sum of all members."""
+    team, stats, in_flight = research_team({"Web": DELAY, "Research": DELAY}, monkeypatch)
+
+    content, seconds = timed_run(team)
+    snapshot = stats.snapshot()
+
+    print(f"\ndelegation {snapshot['wall_seconds']}s, one by one {snapshot['sequential_seconds']}s")
+    assert "Agent Web: Findings of Web." in content and "Agent Research: Findings of Research." in content
+    assert in_flight["max"] == 2
+    assert snapshot["members"] == {"ok": 2}
+    assert snapshot["sequential_seconds"] >= 2 * DELAY
+    assert snapshot["wall_seconds"] < 0.75 * snapshot["sequential_seconds"]
+
+
+def test_max_concurrency_bounds_the_members_running_at_once(monkeypatch):
+    """Test that with max_concurrency=1 members run one after another."""
+    team, stats, in_flight = research_team({"Web": DELAY, "Research": DELAY}, monkeypatch, max_concurrency=1)
+
+    timed_run(team)
+
+    assert in_flight["max"] == 1
+    assert stats.snapshot()["wall_seconds"] >= 2 * DELAY
+
+
+def test_slow_and_failing_members_degrade_gracefully(monkeypatch):
+    """Test that a member past its timeout or failing is reported in the result while the others' findings are kept."""
+    members = {"Web": DELAY, "Slow": 10 * DELAY, "Broken": None}
+    team, stats, _ = research_team(members, monkeypatch, member_timeout_seconds=2 * DELAY)
+
+    content, seconds = timed_run(team)
+
+    assert "Agent Web: Findings of Web." in content
+    assert "Agent Slow: No answer within" in content
+    assert "Agent Broken:" in content and "Findings of Broken" not in content
+    assert stats.snapshot()["members"].get("timed_out") == 1
+    assert seconds < 10 * DELAY
@@ -0,0 +1,68 @@
+"""
+Unit tests for incremental quality loops in the workflows.
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.workflow.types import StepOutput
+from agno.workflow.workflow import Workflow
+
+from workflows.research_workflow import ResearchTopic, check_research_quality, research_loop
+
+from . import stream_ainvoke
+
+FIRST = "Solid-state batteries replace the liquid electrolyte with a solid one."
+SOURCES = " ".join(f"https://example.com/source-{i}" for i in range(5))
+SECOND = f"Expert analysis from recent research: {'energy density keeps improving. ' * 70}Sources: {SOURCES}"
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Answer the first research prompt briefly and any later prompt with sources; records the prompts."""
+    sent: List[str] = []
+
+    async def fake_ainvoke(self, **kwargs):
+        sent.append(str(kwargs["messages"][-1].content))
+        return ModelResponse(role="assistant", content=FIRST if len(sent) == 1 else SECOND)
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(Ollama, "ainvoke_stream", stream_ainvoke)
+    return sent
+
+
+def test_gate_names_the_failed_indicators():
+    """Test that the gate keeps the 4-of-5 rule and reports which indicators failed."""
+    weak = StepOutput(content="A short note with one source: https://example.com")
+    strong = StepOutput(content=SECOND)
+
+    assert not check_research_quality([weak])
+    assert check_research_quality([weak, strong])
+    gaps = [indicator.gap for indicator in check_research_quality.failed(str(weak.content))]
+    assert gaps == [
+        "Add more depth: the findings are too short",
+        "Reference relevant research or studies",
+        "Include expert opinions and analysis",
+        "Add more sources: at least 5 source URLs",
+    ]
+
+
+def test_retry_fills_gaps_and_merges_findings(prompts):
+    """Test that the second iteration gets the previous findings and failed checks, and the outputs are merged."""
+    workflow = Workflow(name="Incremental research", steps=[research_loop])
+
+    run = asyncio.run(workflow.arun(input=ResearchTopic(research_request="Solid-state batteries")))
+
+    assert len(prompts) == 2
+    assert "Multi-Source Research Strategy" in prompts[0]
+    retry = prompts[1]
+    assert "Multi-Source Research Strategy" not in retry
+    assert "- Add more sources: at least 5 source URLs" in retry
+    assert f"**Findings so far**:\n{FIRST}" in retry
+    loop_output = run.step_results[-1]
+    assert isinstance(loop_output, StepOutput) and loop_output.steps
+    findings = str(loop_output.steps[-1].content)
+    assert FIRST in findings and "## Additional Findings" in findings and SOURCES in findings
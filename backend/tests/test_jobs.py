@@ -0,0 +1,159 @@
+"""
+Unit tests for the durable workflow job queue.
+"""
+
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from agno.workflow.step import Step, StepInput, StepOutput
+from agno.workflow.workflow import Workflow
+
+from app.jobs import JobSettings, JobStats, JobWorker, PostgresJobQueue, _follow
+from db.session import db_engine
+
+SETTINGS = JobSettings(retry_backoff_seconds=0, heartbeat_seconds=0.05, event_flush_seconds=0)
+
+
+def new_queue():
+    """A queue and a workflow id no other test submits jobs for."""
+    return PostgresJobQueue(db_engine, "ai"), f"test-jobs-{uuid.uuid4().hex[:8]}"
+
+
+def echo_workflow(failures: int = 0) -> Workflow:
+    """A workflow whose only step echoes its input, after failing `failures` times."""
+    calls = {"count": 0}
+
+    async def echo(step_input: StepInput) -> StepOutput:
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise TimeoutError("Ollama timed out")
+        return StepOutput(content=f"echo: {step_input.input}")
+
+    return Workflow(name="Echo", steps=[Step(name="Echo", executor=echo, max_retries=0)])
+
+
+def test_concurrent_claims_never_take_the_same_job():
+    """Test that workers claiming at the same time get distinct jobs and nothing is claimed twice."""
+    queue, workflow_id = new_queue()
+    submitted = {queue.submit(workflow_id, f"request {index}", max_attempts=3) for index in range(8)}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        jobs = list(pool.map(lambda worker: queue.claim(f"worker-{worker}", 60, [workflow_id]), range(8)))
+
+    assert {job.id for job in jobs} == submitted
+    assert all(job.attempt == 1 for job in jobs)
+    assert queue.claim("worker-late", 60, [workflow_id]) is None
+
+
+def test_worker_runs_job_and_stores_result_and_events():
+    """Test that a worker runs a claimed job to completion and clients can replay its events."""
+    queue, workflow_id = new_queue()
+    job_id = queue.submit(workflow_id, "Analyze NVIDIA stock", max_attempts=3)
+    worker = JobWorker(queue, SETTINGS, JobStats(), resolve=lambda _: echo_workflow(), workflow_ids=[workflow_id])
+
+    job = queue.claim(worker.worker_id, 60, [workflow_id])
+    assert asyncio.run(worker.process(job)) == "succeeded"
+
+    stored = queue.get(job_id)
+    assert stored["status"] == "succeeded"
+    assert stored["result"] == "echo: Analyze NVIDIA stock"
+    assert stored["locked_by"] is None
+
+    async def follow(after):
+        return [chunk async for chunk in _follow(queue, job_id, after)]
+
+    chunks = asyncio.run(follow(0))
+    assert any("event: WorkflowCompleted" in chunk for chunk in chunks)
+    assert chunks[-1].startswith("event: JobFinished")
+    # Re-subscribing after the last seen event only replays what came after it
+    last_id = int(chunks[-2].split("\n")[0].removeprefix("id: "))
+    assert asyncio.run(follow(last_id)) == chunks[-1:]
+
+
+def test_failed_attempt_is_retried_until_it_succeeds():
+    """Test that a failing attempt puts the job back in the queue and the next attempt completes it."""
+    queue, workflow_id = new_queue()
+    job_id = queue.submit(workflow_id, "Analyze NVIDIA stock", max_attempts=2)
+    stats = JobStats()
+    workflow = echo_workflow(failures=1)
+    worker = JobWorker(queue, SETTINGS, stats, resolve=lambda _: workflow, workflow_ids=[workflow_id])
+
+    first = queue.claim(worker.worker_id, 60, [workflow_id])
+    assert asyncio.run(worker.process(first)) == "queued"
+    assert queue.get(job_id)["status"] == "queued"
+
+    second = queue.claim(worker.worker_id, 60, [workflow_id])
+    assert second.id == job_id and second.attempt == 2
+    assert asyncio.run(worker.process(second)) == "succeeded"
+    assert stats.snapshot()["retried"] == 1
+    assert stats.snapshot()["succeeded"] == 1
+
+
+def test_last_failed_attempt_fails_the_job():
+    """Test that a job whose last attempt fails is not queued again."""
+    queue, workflow_id = new_queue()
+    job_id = queue.submit(workflow_id, "Analyze NVIDIA stock", max_attempts=1)
+    worker = JobWorker(queue, SETTINGS, JobStats(), resolve=lambda _: echo_workflow(failures=1))
+
+    job = queue.claim(worker.worker_id, 60, [workflow_id])
+    assert asyncio.run(worker.process(job)) == "failed"
+    assert queue.get(job_id)["status"] == "failed"
+    assert queue.claim(worker.worker_id, 60, [workflow_id]) is None
+
+
+def test_expired_lease_is_claimed_by_another_worker():
+    """Test that a job whose worker stopped heartbeating is claimed again, and the old worker loses it."""
+    queue, workflow_id = new_queue()
+    job_id = queue.submit(workflow_id, "Analyze NVIDIA stock", max_attempts=3)
+
+    stale = queue.claim("worker-a", 0.2, [workflow_id])
+    assert queue.claim("worker-b", 60, [workflow_id]) is None
+    time.sleep(0.4)
+    reclaimed = queue.claim("worker-b", 60, [workflow_id])
+
+    assert reclaimed.id == job_id and reclaimed.attempt == 2
+    assert not queue.heartbeat(stale, "worker-a", 60)
+    assert not queue.complete(stale, "worker-a", "late result")
+    assert queue.complete(reclaimed, "worker-b", "result")
+    assert queue.get(job_id)["result"] == "result"
+
+
+def test_expired_lease_on_last_attempt_fails_the_job():
+    """Test that a job that lost its lease on its last attempt fails instead of running again."""
+    queue, workflow_id = new_queue()
+    job_id = queue.submit(workflow_id, "Analyze NVIDIA stock", max_attempts=1)
+
+    queue.claim("worker-a", 0.2, [workflow_id])
+    time.sleep(0.4)
+
+    assert queue.claim("worker-b", 60, [workflow_id]) is None
+    assert queue.get(job_id)["status"] == "failed"
+
+
+def test_heartbeats_keep_a_long_job_leased():
+    """Test that a job running longer than its visibility timeout keeps its lease while the worker heartbeats."""
+    queue, workflow_id = new_queue()
+    job_id = queue.submit(workflow_id, "Analyze NVIDIA stock", max_attempts=3)
+
+    async def slow(step_input: StepInput) -> StepOutput:
+        await asyncio.sleep(2.0)
+        return StepOutput(content="done")
+
+    workflow = Workflow(name="Slow", steps=[Step(name="Slow", executor=slow)])
+    settings = JobSettings(visibility_timeout_seconds=1, heartbeat_seconds=0.1)
+    worker = JobWorker(queue, settings, JobStats(), resolve=lambda _: workflow)
+
+    async def run():
+        job = await asyncio.to_thread(queue.claim, worker.worker_id, 1, [workflow_id])
+        processing = asyncio.create_task(worker.process(job))
+        await asyncio.sleep(1.3)
+        # Past the first lease, yet heartbeats kept it from being claimed again
+        stolen = await asyncio.to_thread(queue.claim, "worker-b", 60, [workflow_id])
+        return stolen, await processing
+
+    stolen, status = asyncio.run(run())
+    assert stolen is None
+    assert status == "succeeded"
+    assert queue.get(job_id)["attempts"] == 1
@@ -0,0 +1,169 @@
+"""
+Unit tests for local language routing in the multilingual team.
+"""
+
+import asyncio
+import json
+import time
+
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.response_cache import response_cache
+from modules.metrics import summarize_ms
+from teams.language_router import DELEGATE_TOOL, detect, language_router_settings, route_to_specialist
+from teams.multilingual_team import multilingual_team
+
+DELAY = 0.2
+# Sample requests and the language of the specialist they are for; None leaves the choice to the coordinator
+LABELED = [
+    ("Translate 'thank you for your order' into French", "fr"),
+    ("How do I say 'nice to meet you' in Japanese?", "ja"),
+    ("Write a formal business email in German to a supplier", "de"),
+    ("Can you translate our product description to Spanish for the Mexican market?", "es"),
+    ("What is the Hindi word for invoice?", "hi"),
+    ("Explain keigo levels in Japanese business emails", "ja"),
+    ("Please write this apology in Hindi for our Delhi office", "hi"),
+    ("Tradúcelo al japonés, por favor", "ja"),
+    ("Pouvez-vous traduire ce paragraphe en allemand ?", "de"),
+    ("Kannst du mir diesen Satz auf Französisch erklären? Ich meine auf Deutsch, bitte.", "de"),
+    ("これを日本語でビジネスメールにしてください", "ja"),
+    ("東京での会議のマナーを教えてください", "ja"),
+    ("हिंदी में एक औपचारिक ईमेल लिखिए", "hi"),
+    ("मुझे अपने ग्राहक को धन्यवाद पत्र लिखना है", "hi"),
+    ("¿Cómo debo saludar a un cliente en México?", "es"),
+    ("Necesito redactar una carta de presentación para una empresa en Madrid", "es"),
+    ("¿Cuál es la diferencia entre usted y tú en un correo de trabajo?", "es"),
+    ("Comment rédiger un courriel professionnel à un client ?", "fr"),
+    ("Quels sont les usages professionnels au Québec ?", "fr"),
+    ("Est-ce que je dois vouvoyer mon nouveau responsable ?", "fr"),
+    ("Wie schreibe ich eine formelle E-Mail an einen Kunden?", "de"),
+    ("Ist es in Österreich üblich, Geschäftspartner mit Titel anzusprechen?", "de"),
+    ("Welche Grußformel passt am Ende eines Bewerbungsschreibens?", "de"),
+    ("What is business etiquette in Japan?", "ja"),
+    ("Any tips for a first sales meeting in Germany?", "de"),
+    ("How should I dress for a client dinner in Paris?", "fr"),
+    ("What gifts are appropriate for business partners in India?", "hi"),
+    ("How do negotiations usually work in Argentina?", "es"),
+    ("Translate this Spanish email into French", None),
+    ("Compare greetings in German and Japanese business culture", None),
+    ("Help me write a thank-you note", None),
+    ("What does this phrase mean?", None),
+    ("Bonjour", None),
+    ("I am travelling to Tokyo and then to Berlin, what should I know?", None),
+    ("Wie begrüße ich Geschäftspartner in Japan?", None),
+    ("Can you proofread my cover letter?", None),
+    ("我们下周在上海开会", None),
+    ("Which of your specialists should I talk to about localization?", None),
+    ("Give me a résumé template for a café manager", None),
+    ("Ciao, come stai? Ho bisogno di aiuto per scrivere una lettera formale.", None),
+    ("Olá, preciso de ajuda para escrever um e-mail ao meu cliente.", None),
+    ("Tell me about German cars sold in Japan", None),
+]
+
+
+def test_routing_accuracy_and_latency_on_labeled_requests():
+    """Test that nearly every labeled request gets its specialist, or the coordinator, in well under a millisecond."""
+    latencies = []
+    correct = 0
+    routed = 0
+    for request, expected in LABELED:
+        started = time.perf_counter()
+        route = detect(request)
+        latencies.append(time.perf_counter() - started)
+        decided = route.language if route.confidence >= language_router_settings.min_confidence else None
+        correct += decided == expected
+        routed += decided is not None
+
+    accuracy = correct / len(LABELED)
+    latency = summarize_ms(latencies)
+    print(
+        f"\nrouting accuracy {accuracy:.0%} of {len(LABELED)} requests, "
+        f"{routed} routed without the coordinator, latency ms {latency}"
+    )
+    assert accuracy >= 0.9
+    assert latency["p95"] < 2.0
+
+
+def test_named_language_wins_over_the_language_written_in():
+    """Test that a named target language decides the route, and several named languages go to the coordinator."""
+    assert detect("Tradúcelo al japonés, por favor").language == "ja"
+    assert detect("Translate 'good morning' into German").reason == "named"
+    route = detect("Translate this Spanish email into French")
+    assert (route.language, route.reason) == (None, "several_languages")
+
+
+def test_named_language_and_region_must_agree():
+    """Test that a named language is a topic rather than the target when the request names another region."""
+    assert detect("Tell me about German cars sold in Japan").reason == "conflicting_signals"
+    assert detect("Please write this apology in Hindi for our Delhi office").language == "hi"
+
+
+def test_unknown_languages_and_accented_english_are_not_routed():
+    """Test that languages without a specialist, and English with a few accents, are left to the coordinator."""
+    for request in (
+        "Ciao, come stai? Ho bisogno di aiuto per scrivere una lettera formale.",
+        "Olá, preciso de ajuda para escrever um e-mail ao meu cliente.",
+    ):
+        assert detect(request).reason == "unknown_language", request
+    route = detect("Give me a résumé template for a café manager")
+    assert route.language not in ("es", "fr") or route.confidence < language_router_settings.min_confidence
+    spanish = detect("¿Cómo debo saludar a un cliente en México?")
+    assert (spanish.language, spanish.reason) == ("es", "ngrams")
+    assert spanish.confidence >= language_router_settings.min_confidence
+
+
+def test_only_the_first_turn_of_a_run_is_routed():
+    """Test that the router answers a user turn with a delegation, and leaves turns after tool results to the model."""
+    call = route_to_specialist([Message(role="system", content="..."), Message(role="user", content="Hola en español")])
+    assert call is not None and call["name"] == DELEGATE_TOOL
+    assert json.loads(call["arguments"])["member_id"] == "spanish-language-specialist"
+
+    after_tool = [Message(role="user", content="Hola en español"), Message(role="tool", content="Hola")]
+    assert route_to_specialist(after_tool) is None
+
+
+def test_routed_request_skips_the_coordinator_generation(monkeypatch):
+    """Test that a routed request only calls the specialist's model, saving the coordinator's generation."""
+    calls = []
+
+    async def fake_ainvoke(self, **kwargs):
+        system = str(kwargs["messages"][0].content)
+        coordinator = "lead multilingual consultation coordinator" in system
+        calls.append("coordinator" if coordinator else "specialist")
+        await asyncio.sleep(DELAY)
+        if coordinator:
+            arguments = {"member_id": "french-language-specialist", "task": "Translate into French"}
+            return ModelResponse(
+                role="assistant",
+                tool_calls=[
+                    {"type": "function", "function": {"name": DELEGATE_TOOL, "arguments": json.dumps(arguments)}}
+                ],
+            )
+        return ModelResponse(role="assistant", content="Merci pour votre commande.")
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(multilingual_team, "debug_mode", False)
+    # Both runs must reach the (fake) model rather than the team's response cache
+    monkeypatch.setattr(response_cache.settings, "enabled", False)
+    request = "Translate 'thank you for your order' into French"
+
+    def run():
+        started = time.perf_counter()
+        output = asyncio.run(multilingual_team.arun(request))
+        return output, time.perf_counter() - started
+
+    run()  # the first run of the team also sets up its session tables
+    calls.clear()
+    routed, routed_seconds = run()
+    routed_calls = list(calls)
+    calls.clear()
+    monkeypatch.setattr(language_router_settings, "enabled", False)
+    coordinated, coordinated_seconds = run()
+
+    print(f"\nrouted {routed_seconds:.3f}s, through the coordinator {coordinated_seconds:.3f}s")
+    assert routed_calls == ["specialist"]
+    assert calls == ["coordinator", "specialist"]
+    assert routed.content == coordinated.content == "Merci pour votre commande."
+    assert coordinated_seconds - routed_seconds > DELAY * 0.5
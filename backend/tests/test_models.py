@@ -0,0 +1,174 @@
+"""
+Unit tests for the model registry.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.models import ModelGate, ModelProfile, ModelRegistry, ModelSettings, model_registry
+
+
+@pytest.fixture
+def registry():
+    settings = ModelSettings(host="http://ollama.test:11434")
+    profiles = {
+        "default": ModelProfile(
+            name="default", model_id="qwen3:latest", num_ctx=4096, keep_alive="5m", max_concurrency=2
+        )
+    }
+    return ModelRegistry(settings, profiles)
+
+
+def test_models_share_one_client_per_host(registry):
+    """Test that every model built for a host reuses the same HTTP client."""
+    first = registry.get_model()
+    second = registry.get_model()
+
+    assert first is not second
+    assert first.options == {"num_ctx": 4096}
+    assert first.keep_alive == "5m"
+    assert registry.client(first.host) is registry.client(second.host)
+
+
+def test_unknown_profile_raises(registry):
+    """Test that asking for an undeclared profile fails loudly."""
+    with pytest.raises(ValueError, match="Unknown model profile"):
+        registry.get_model("missing")
+
+
+def test_gate_limits_threads():
+    """Test that sync callers never exceed the concurrency limit."""
+    gate = ModelGate(limit=2)
+
+    def call():
+        with gate.slot():
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = gate.snapshot()
+    assert snapshot["peak_in_flight"] == 2
+    assert snapshot["calls"] == 8
+    assert snapshot["in_flight"] == 0
+    assert snapshot["waiting"] == 0
+
+
+def test_gate_limits_coroutines_and_survives_cancellation():
+    """Test that async callers respect the limit and a cancelled waiter does not leak a slot."""
+    gate = ModelGate(limit=1)
+
+    async def call():
+        async with gate.aslot():
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        holder = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(holder, *(call() for _ in range(4)), return_exceptions=False)
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+    asyncio.run(scenario())
+
+    snapshot = gate.snapshot()
+    assert snapshot["peak_in_flight"] == 1
+    assert snapshot["in_flight"] == 0
+    assert snapshot["waiting"] == 0
+
+
+def test_gate_hands_slots_to_waiters_in_order_and_wakes_one():
+    """Test that each release wakes only the first queued caller, and callers enter in arrival order."""
+    gate = ModelGate(limit=1)
+    entered = []
+
+    async def call(name):
+        async with gate.aslot():
+            entered.append(name)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        holder = asyncio.create_task(call("holder"))
+        await asyncio.sleep(0)
+        waiters = []
+        for name in ("first", "second", "third"):
+            waiters.append(asyncio.create_task(call(name)))
+            await asyncio.sleep(0)
+        assert gate.snapshot()["waiting"] == 3
+        await holder
+        # One release, one caller woken; the others are still queued
+        assert gate.snapshot()["waiting"] == 2
+        await asyncio.gather(*waiters)
+
+    asyncio.run(scenario())
+
+    assert entered == ["holder", "first", "second", "third"]
+    assert gate.snapshot()["in_flight"] == 0
+
+
+def test_streams_closed_early_are_not_errors():
+    """Test that closing a stream that holds a slot, or cancelling its task, releases it without an error."""
+    gate = ModelGate(limit=1)
+
+    async def stream():
+        async with gate.aslot():
+            for chunk in range(10):
+                yield chunk
+                await asyncio.sleep(0)
+
+    async def consume_forever():
+        async for _ in stream():
+            await asyncio.sleep(1)
+
+    async def scenario():
+        chunks = stream()
+        assert await chunks.__anext__() == 0
+        await chunks.aclose()
+        task = asyncio.create_task(consume_forever())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    snapshot = gate.snapshot()
+    assert (snapshot["calls"], snapshot["errors"], snapshot["in_flight"]) == (2, 0, 0)
+
+
+def test_model_calls_are_counted_per_profile(monkeypatch):
+    """Test that invoke() is routed through the profile gate and failures are counted."""
+    observed = []
+
+    def fake_invoke(self, *args, **kwargs):
+        observed.append(model_registry.gate("default").in_flight)
+        if kwargs["messages"]:
+            raise RuntimeError("boom")
+        return ModelResponse(content="ok")
+
+    monkeypatch.setattr(Ollama, "invoke", fake_invoke)
+    gate = model_registry.gate("default")
+    before = gate.snapshot()
+    model = model_registry.get_model()
+
+    assert model.invoke(messages=[], assistant_message=Message(role="assistant")).content == "ok"
+    with pytest.raises(RuntimeError):
+        model.invoke(messages=[Message(role="user", content="fail")], assistant_message=Message(role="assistant"))
+
+    after = gate.snapshot()
+    assert observed == [before["in_flight"] + 1] * 2
+    assert after["calls"] == before["calls"] + 2
+    assert after["errors"] == before["errors"] + 1
+    assert after["in_flight"] == before["in_flight"]
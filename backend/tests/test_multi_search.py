@@ -0,0 +1,99 @@
+"""
+Unit tests for the batched DuckDuckGo multi-search tool.
+"""
+
+import json
+import threading
+import time
+from typing import List
+
+import pytest
+from agno.tools.duckduckgo import DuckDuckGoTools as AgnoDuckDuckGoTools
+
+from app.rate_limit import RateLimitSettings, rate_limiter
+from app.search_cache import SearchCache, SearchCacheSettings, search_cache
+from tools.duckduckgo import DuckDuckGoTools, merge_results, normalize_url
+
+RESULTS = {
+    "nvidia earnings": ["https://www.reuters.com/nvidia/", "https://example.com/a?utm_source=x"],
+    "nvidia guidance": ["https://reuters.com/nvidia#top", "https://example.com/b"],
+}
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Serve canned results with a delay, tracking how many searches run at once."""
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fake_search(self, query, max_results=5):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        if query == "broken":
+            raise RuntimeError("search failed")
+        urls = RESULTS.get(query, [f"https://example.com/{query.replace(' ', '-')}"])
+        return json.dumps([{"title": url, "href": url, "body": query} for url in urls])
+
+    monkeypatch.setattr(AgnoDuckDuckGoTools, "duckduckgo_search", fake_search)
+    monkeypatch.setattr(search_cache, "memory", SearchCache(SearchCacheSettings(postgres=False)).memory)
+    monkeypatch.setattr(search_cache, "store", None)
+    monkeypatch.setattr(rate_limiter, "settings", RateLimitSettings(enabled=False))
+    return state
+
+
+def test_normalize_url_collapses_variants():
+    """Test that host case, www, fragments, tracking parameters and trailing slashes are ignored."""
+    assert normalize_url("HTTP://www.Reuters.com/nvidia/#top") == normalize_url("https://reuters.com/nvidia")
+    assert normalize_url("https://example.com/a?utm_source=x&id=1") == "https://example.com/a?id=1"
+    assert normalize_url("https://example.com/a?id=1") != normalize_url("https://example.com/a?id=2")
+
+
+def test_merge_ranks_urls_found_by_several_queries_first():
+    """Test that duplicates merge into one result that ranks above single-query results."""
+    batches = {
+        "q1": [{"href": "https://one.com"}, {"href": "https://shared.com/"}],
+        "q2": [{"href": "https://two.com"}, {"href": "https://www.shared.com"}],
+    }
+
+    merged = merge_results(batches, limit=10)
+
+    assert [result["href"] for result in merged][0] == "https://shared.com/"
+    assert merged[0]["queries"] == ["q1", "q2"]
+    assert len(merged) == 3
+
+
+def test_multi_search_is_opt_in():
+    """Test that the batched tool is only registered when enabled."""
+    assert "duckduckgo_multi_search" not in DuckDuckGoTools().functions
+    assert "duckduckgo_multi_search" in DuckDuckGoTools(enable_multi_search=True).functions
+
+
+def test_multi_search_runs_queries_concurrently_with_a_bound(searches):
+    """Test that queries overlap up to max_parallel and the merged result has unique URLs."""
+    tools = DuckDuckGoTools(enable_multi_search=True, max_parallel=2)
+    queries = ["nvidia earnings", "nvidia guidance", "amd earnings", "intel earnings", "nvidia earnings"]
+
+    started = time.perf_counter()
+    payload = json.loads(tools.duckduckgo_multi_search(queries))
+    elapsed = time.perf_counter() - started
+
+    assert searches["peak"] == 2
+    assert elapsed < 4 * 0.05
+    assert payload["queries"] == queries[:4]
+    urls: List[str] = [normalize_url(result["href"]) for result in payload["results"]]
+    assert len(urls) == len(set(urls)) == 5
+    assert payload["errors"] == {}
+
+
+def test_one_failed_query_does_not_fail_the_batch(searches):
+    """Test that a failing query is reported under errors while the others still return."""
+    tools = DuckDuckGoTools(enable_multi_search=True)
+
+    payload = json.loads(tools.duckduckgo_multi_search(["broken", "amd earnings"]))
+
+    assert "search failed" in payload["errors"]["broken"]
+    assert [result["queries"] for result in payload["results"]] == [["amd earnings"]]
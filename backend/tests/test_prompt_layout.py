@@ -0,0 +1,75 @@
+"""
+Unit tests for the prefix-cache-friendly prompt layout.
+"""
+
+from typing import List
+
+from agno.agent import Agent
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.models import model_registry
+from app.prompt_layout import PromptLayoutSettings, round_time, stabilize_messages
+
+INSTRUCTIONS = "<instructions>\n- You are interacting with the user_id: alice\n</instructions>\n\n"
+
+
+def _messages(now: str, question: str = "What is Data Science?") -> List[Message]:
+    system = (
+        f"You are WebX.\n{INSTRUCTIONS}<additional_information>\n- Use markdown to format your answers.\n"
+        f"- The current time is {now}.\n</additional_information>\n\nSearch tool instructions\n"
+    )
+    return [Message(role="system", content=system), Message(role="user", content=question)]
+
+
+def test_round_time_to_granularity():
+    """Test that times are rounded down and unparsable values are kept."""
+    assert round_time("2025-01-01 10:47:12.123456", 3600) == "2025-01-01 10:00"
+    assert round_time("2025-01-01 10:47:12.123456+02:00", 900) == "2025-01-01 10:45+02:00"
+    assert round_time("2025-01-01 10:47:12.123456", 0) == "2025-01-01 10:47:12.123456"
+    assert round_time("tomorrow", 60) == "tomorrow"
+
+
+def test_system_prompt_is_byte_stable_across_calls():
+    """Test that the time and user id move to a trailing block and the system prompt no longer changes."""
+    settings = PromptLayoutSettings(time_granularity=3600)
+    first_input = _messages("2025-01-01 10:05:00.1")
+    first = stabilize_messages(first_input, "alice", settings)
+    later = stabilize_messages(_messages("2025-01-01 10:55:31.9", "Describe Machine Learning."), "alice", settings)
+    system, question = str(first[0].content), str(first[1].content)
+
+    assert system == later[0].content
+    assert "current time" not in system and "alice" not in system
+    assert system.startswith("You are WebX.") and "Search tool instructions" in system
+    assert question.endswith(
+        "<request_context>\n- The current time is 2025-01-01 10:00.\n"
+        "- You are interacting with the user_id: alice\n</request_context>"
+    )
+    assert "current time" in str(first_input[0].content) and first_input[1].content == "What is Data Science?"
+
+
+def test_layout_can_be_disabled():
+    """Test that the messages are sent unchanged when stable-prefix mode is off."""
+    messages = _messages("2025-01-01 10:05:00")
+
+    assert stabilize_messages(messages, "alice", PromptLayoutSettings(stable_prefix=False)) is messages
+
+
+def test_agent_calls_send_the_stable_layout(monkeypatch):
+    """Test that an agent with add_datetime_to_context sends the time after the question, not in the system prompt."""
+    sent: List[List[Message]] = []
+
+    def fake_invoke(self, **kwargs):
+        sent.append(kwargs["messages"])
+        return ModelResponse(role="assistant", content="Data Science is the study of data.")
+
+    monkeypatch.setattr(Ollama, "invoke", fake_invoke)
+    agent = Agent(model=model_registry.get_model(), instructions="Be brief.", add_datetime_to_context=True)
+
+    run = agent.run("What is Data Science?")
+
+    system, question = sent[0][0], sent[0][-1]
+    assert "current time" not in (system.content or "")
+    assert "<request_context>\n- The current time is" in (question.content or "")
+    assert run.messages is not None and "current time" in (run.messages[0].content or "")
@@ -0,0 +1,122 @@
+"""
+Unit tests for single-pass quality indicators and streaming quality gates.
+"""
+
+import asyncio
+import random
+
+import pytest
+from agno.agent import Agent
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.models import model_registry
+from workflows.quality import Gate, Indicator, KeywordMatcher, stream_agent, stream_gate_settings, stream_gate_stats
+from workflows.research_workflow import check_research_quality
+
+FILLER = "filler "
+PASSING = "Expert research and analysis. Source: https://a.com https://b.com https://c.com https://d.com https://e.com "
+
+
+def test_chunked_scan_counts_like_str_count():
+    """Test that one pass over arbitrary chunks counts every keyword like str.count on the lowercased text."""
+    keywords = ["http", "source", "market cap", "risk", "price", "earnings", "analysis"]
+    rng = random.Random(7)
+    text = "".join(
+        rng.choice(["HTTP://x ", "Sources ", "market cap", "RiskPrice", "earnings", "analysis", "ab "])
+        for _ in range(500)
+    )
+    scan = KeywordMatcher(keywords).scan()
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 7)
+        scan.feed(text[position : position + size])
+        position += size
+
+    assert scan.length == len(text)
+    assert {keyword: scan.count(keyword) for keyword in keywords} == {
+        keyword: text.lower().count(keyword) for keyword in keywords
+    }
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "A short note with one source: https://example.com",
+        PASSING,
+        PASSING + FILLER * 300,
+        "A STUDY by experts " * 150,
+    ],
+)
+def test_research_gate_matches_the_previous_checks(content):
+    """Test that the declarative research gate agrees with the lambda checks it replaced."""
+    lowered = content.lower()
+    previous = [
+        "http" in lowered or "source" in lowered,
+        len(lowered) > 2000,
+        "research" in lowered or "study" in lowered,
+        "expert" in lowered or "analysis" in lowered,
+        lowered.count("http") >= 5,
+    ]
+
+    assert check_research_quality.passed(content) == (sum(previous) >= 4)
+    assert len(check_research_quality.failed(content)) == previous.count(False)
+
+
+@pytest.fixture
+def tokens(monkeypatch):
+    """Stream each prompt's answer one word per token; records how many tokens the model produced."""
+    produced = []
+
+    async def fake_stream(self, **kwargs):
+        prompt = str(kwargs["messages"][-1].content)
+        answer = PASSING + FILLER * 200 if "passing" in prompt else FILLER * 200
+        produced.append(0)
+        for word in answer.split(" "):
+            produced[-1] += 1
+            await asyncio.sleep(0)
+            yield ModelResponse(content=f"{word} ")
+
+    monkeypatch.setattr(Ollama, "ainvoke_stream", fake_stream)
+    monkeypatch.setattr(stream_gate_settings, "grace_tokens", 10)
+    monkeypatch.setattr(stream_gate_settings, "abort_tokens", 50)
+    return produced
+
+
+def gate():
+    return Gate(
+        [
+            Indicator("Cite sources", keywords=("source",)),
+            Indicator("Add 5 URLs", keywords=("http",), min_count=5),
+            Indicator("Add experts", keywords=("expert",)),
+        ],
+        required=3,
+    )
+
+
+def test_generation_stops_once_the_gate_passes(tokens):
+    """Test that a passing generation is cut a few tokens after the gate passes and the saving is recorded."""
+    agent = Agent(name="Gated", model=model_registry.get_model())
+
+    full = asyncio.run(stream_agent(agent, "failing answer", gate(), "Gated Step"))
+    full_tokens = stream_gate_stats.snapshot()["Gated Step"]["tokens"]
+    stopped = asyncio.run(stream_agent(agent, "passing answer", gate(), "Gated Step"))
+    stats = stream_gate_stats.snapshot()["Gated Step"]
+
+    assert stopped.startswith(PASSING) and gate().passed(stopped)
+    assert len(stopped.split()) == len(PASSING.split()) + stream_gate_settings.grace_tokens
+    assert tokens[1] < tokens[0] and len(stopped) < len(full)
+    assert stats["stopped"] == 1 and stats["aborted"] == 0
+    assert stats["tokens_saved"] == 2 * full_tokens - stats["tokens"]
+
+
+def test_hopeless_generation_is_aborted_only_when_a_retry_is_left(tokens):
+    """Test that a generation far from passing is aborted while the loop can retry, and kept otherwise."""
+    agent = Agent(name="Hopeless", model=model_registry.get_model())
+
+    aborted = asyncio.run(stream_agent(agent, "first failing answer", gate(), "Hopeless Step", allow_abort=True))
+    kept = asyncio.run(stream_agent(agent, "last failing answer", gate(), "Hopeless Step"))
+
+    assert len(aborted.split()) == stream_gate_settings.abort_tokens
+    assert len(kept.split()) == 200
+    assert stream_gate_stats.snapshot()["Hopeless Step"]["aborted"] == 1
@@ -0,0 +1,122 @@
+"""
+Unit tests for the shared search rate limiter.
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+from ddgs.exceptions import RatelimitException
+
+from app import rate_limit
+from app.rate_limit import (
+    BucketSpec,
+    LocalBuckets,
+    PostgresBuckets,
+    RateLimiter,
+    RateLimitExceeded,
+    RateLimitSettings,
+)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record sleeps instead of waiting."""
+    recorded: List[float] = []
+    monkeypatch.setattr(rate_limit.time, "sleep", recorded.append)
+    return recorded
+
+
+def test_calls_beyond_the_burst_are_queued_not_rejected():
+    """Test that an empty bucket hands out reservations spaced by the refill rate."""
+    buckets = LocalBuckets()
+    spec = BucketSpec("duckduckgo", per_second=10, burst=2)
+
+    waits = [buckets.reserve(spec) for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.02)
+    assert waits[3] == pytest.approx(0.2, abs=0.02)
+
+
+def test_postgres_bucket_is_shared_between_workers():
+    """Test that two limiter instances (as in two worker processes) draw from the same bucket."""
+    from db.session import db_engine
+
+    spec = BucketSpec(f"test-{uuid.uuid4().hex[:8]}", per_second=1, burst=2)
+    worker_a, worker_b = PostgresBuckets(db_engine, "ai"), PostgresBuckets(db_engine, "ai")
+    try:
+        waits = [worker_a.reserve(spec), worker_b.reserve(spec), worker_a.reserve(spec), worker_b.reserve(spec)]
+
+        assert waits[:2] == [0.0, 0.0]
+        assert waits[2] == pytest.approx(1.0, abs=0.1)
+        assert waits[3] == pytest.approx(2.0, abs=0.1)
+    finally:
+        with db_engine.begin() as conn:
+            conn.execute(worker_a.table.delete().where(worker_a.table.c.name == spec.name))
+
+
+def test_throttled_calls_are_retried_with_backoff(sleeps):
+    """Test that throttling errors are retried with capped, jittered delays and counted."""
+    limiter = RateLimiter(
+        RateLimitSettings(duckduckgo_burst=10, retries=3, backoff_base=1, backoff_max=3), LocalBuckets()
+    )
+    attempts: List[int] = []
+
+    def search():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RatelimitException("202 Ratelimit")
+        return "[]"
+
+    assert limiter.call("duckduckgo", search, (RatelimitException,)) == "[]"
+    assert len(attempts) == 3
+    assert len(sleeps) == 2 and sleeps[0] <= 1 and sleeps[1] <= 2
+    stats = limiter.stats.snapshot()["duckduckgo"]
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (3, 2, 0)
+
+
+def test_other_errors_and_exhausted_retries_propagate(sleeps):
+    """Test that non-retryable errors fail immediately and retryable ones fail after the last retry."""
+    limiter = RateLimiter(RateLimitSettings(duckduckgo_burst=10, retries=1), LocalBuckets())
+
+    def missing_page():
+        raise ValueError("page not found")
+
+    def throttled():
+        raise RatelimitException("202 Ratelimit")
+
+    with pytest.raises(ValueError):
+        limiter.call("duckduckgo", missing_page, (RatelimitException,))
+    with pytest.raises(RatelimitException):
+        limiter.call("duckduckgo", throttled, (RatelimitException,))
+    assert limiter.stats.snapshot()["duckduckgo"]["failures"] == 1
+
+
+def test_waits_beyond_max_wait_are_rejected_and_refunded(sleeps):
+    """Test that a call that would queue too long fails without consuming a token."""
+    buckets = LocalBuckets()
+    limiter = RateLimiter(RateLimitSettings(wikipedia_per_second=1, wikipedia_burst=1, max_wait=1.5), buckets)
+
+    limiter.acquire("wikipedia")
+    limiter.acquire("wikipedia")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("wikipedia")
+
+    assert sleeps == [pytest.approx(1.0, abs=0.05)]
+    assert buckets.reserve(limiter.specs["wikipedia"]) == pytest.approx(2.0, abs=0.05)
+    assert limiter.stats.snapshot()["wikipedia"]["rejected"] == 1
+
+
+def test_a_burst_of_searches_is_queued_until_every_call_finishes(sleeps):
+    """Test that ten concurrent searches with the default rate and burst all run, none rejected."""
+    limiter = RateLimiter(RateLimitSettings(), LocalBuckets())
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda i: limiter.call("duckduckgo", lambda: f"result {i}"), range(10)))
+
+    assert results == [f"result {i}" for i in range(10)]
+    stats = limiter.stats.snapshot()["duckduckgo"]
+    assert (stats["calls"], stats["queued"], stats["rejected"]) == (10, 7, 0)
+    assert max(sleeps) == pytest.approx(14.0, abs=0.1) and max(sleeps) <= limiter.settings.max_wait
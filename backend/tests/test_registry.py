@@ -0,0 +1,90 @@
+"""
+Unit tests for the lazy entity registry.
+"""
+
+import sys
+import types
+
+import pytest
+from agno.agent import Agent
+
+from app.registry import EntityRegistry, EntitySpec
+
+
+@pytest.fixture
+def entity_module():
+    """Register a throwaway module whose import is observable."""
+    module = types.ModuleType("fake_entities")
+    module.agent = Agent(id="fake-agent", name="Fake Agent")  # type: ignore[attr-defined]
+    sys.modules["fake_entities"] = module
+    yield module
+    del sys.modules["fake_entities"]
+
+
+def test_metadata_does_not_materialize(entity_module):
+    """Test that id, name and description are served from the spec."""
+    registry = EntityRegistry([EntitySpec(id="fake-agent", type="agent", target="fake_entities:agent", name="Fake")])
+    entity = registry.entities("agent")[0]
+
+    assert entity.id == "fake-agent"
+    assert entity.name == "Fake"
+    assert entity.tools is None
+    assert not entity.is_loaded
+    assert isinstance(entity, Agent)
+
+
+def test_first_use_replays_agentos_setup(entity_module):
+    """Test that attributes set before loading are applied to the real agent."""
+    registry = EntityRegistry([EntitySpec(id="fake-agent", type="agent", target="fake_entities:agent", name="Fake")])
+    entity = registry.entities("agent")[0]
+    entity.initialize_agent()
+    entity.store_events = True
+
+    assert entity.arun == entity_module.agent.arun
+    assert entity.is_loaded
+    assert entity_module.agent.store_events is True
+    assert entity.name == "Fake Agent"
+
+
+def test_declared_id_must_match(entity_module):
+    """Test that a spec pointing at an entity with another id fails loudly."""
+    registry = EntityRegistry([EntitySpec(id="other-id", type="agent", target="fake_entities:agent", name="Fake")])
+
+    with pytest.raises(ValueError, match="declared as 'other-id'"):
+        registry.warm_up(["other-id"])
+
+
+def test_eager_mode_returns_real_objects(entity_module):
+    """Test that lazy=False hands the materialized entities to the AgentOS."""
+    registry = EntityRegistry([EntitySpec(id="fake-agent", type="agent", target="fake_entities:agent", name="Fake")])
+
+    assert registry.entities("agent", lazy=False) == [entity_module.agent]
+
+
+def test_unknown_warm_up_ids_are_skipped(entity_module):
+    """Test that a typo in the warm-up list does not stop the other entities from loading."""
+    registry = EntityRegistry([EntitySpec(id="fake-agent", type="agent", target="fake_entities:agent", name="Fake")])
+
+    registry.warm_up(["no-such-agent", "fake-agent"])
+
+    assert registry.entities("agent")[0].is_loaded
+
+
+def test_description_is_read_from_the_module_source(tmp_path, monkeypatch):
+    """Test that an unloaded entity describes itself with its module's description, without importing it."""
+    source = [
+        "from textwrap import dedent",
+        "agent = Agent(",
+        '    description=dedent("""\\',
+        "        Answers briefly.",
+        '    """),',
+        ")",
+    ]
+    (tmp_path / "described_entities.py").write_text("\n".join(source))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    registry = EntityRegistry(
+        [EntitySpec(id="described", type="agent", target="described_entities:agent", name="Described")]
+    )
+
+    assert registry.entities("agent")[0].description == "Answers briefly.\n"
+    assert "described_entities" not in sys.modules
@@ -0,0 +1,123 @@
+"""
+Unit tests for the deterministic investment request parser.
+"""
+
+import asyncio
+import time
+
+from agno.models.ollama import Ollama
+from agno.workflow.types import WorkflowExecutionInput
+
+from modules.metrics import summarize_ms
+from workflows.investment_workflow import InvestmentWorkflowInput, parse_investment_request_step
+from workflows.request_parser import extract, parse_request
+
+# Sample requests, and whether the tables should parse them without the model
+CORPUS = [
+    ("Compare AAPL and MSFT for long-term growth", True),
+    ("Analyze NVIDIA stock for a 5 year horizon", True),
+    ("Should I buy Tesla? I'm an aggressive investor", True),
+    ("I have $10,000 to invest in JPMorgan or Goldman Sachs for dividend income", True),
+    ("Evaluate AMD vs Intel in the semiconductor space", True),
+    ("Is Microsoft a good value play right now?", True),
+    ("Research Amazon and Shopify for e-commerce exposure over 3 years", True),
+    ("Compare Pfizer, Merck and Eli Lilly for a conservative healthcare portfolio", True),
+    ("Analyze $NVDA and $TSM ahead of earnings", True),
+    ("What is the outlook for Netflix and Disney in streaming?", True),
+    ("Is Exxon a good dividend stock for retirement income?", True),
+    ("Build a low risk position in Johnson & Johnson and Procter & Gamble", True),
+    ("Analyze Coinbase for speculative short-term trading", True),
+    ("Compare Visa and Mastercard on ESG and free cash flow", True),
+    ("Give me an investment thesis on Palantir with moderate risk", True),
+    ("Analyze Google and Meta for advertising growth", True),
+    ("Should I hold Berkshire Hathaway for the next 10 years?", True),
+    ("Evaluate Broadcom and Qualcomm dividend yield", True),
+    ("Analyze Apple's valuation after the latest iPhone launch", True),
+    ("Compare Oracle, Salesforce and Adobe for enterprise software growth", True),
+    ("Is Uber profitable enough to invest in for the medium term?", True),
+    ("Compare Walmart and Costco for defensive income", True),
+    ("Analyze ASML as a long-term semiconductor holding", True),
+    ("Analyze Rivian and Lucid for EV growth", False),
+    ("What are the best AI stocks to buy?", False),
+    ("Suggest some dividend stocks for a conservative investor", False),
+    ("Analyze Snowflake versus Datadog for long-term growth", False),
+    ("I want exposure to renewable energy with $50k", False),
+    ("Analyze Palantir and SoundHound for speculative AI bets", False),
+    ("Analyze Nvidia, AMD and Arm Holdings", False),
+]
+
+
+def test_fast_path_hit_rate_and_latency_on_sample_requests():
+    """Test that the tables parse the requests naming known companies, in well under a millisecond each."""
+    latencies = []
+    hits = []
+    for request, expected in CORPUS:
+        started = time.perf_counter()
+        parsed = parse_request(request)
+        latencies.append(time.perf_counter() - started)
+        assert (parsed is not None) == expected, request
+        hits.append(parsed is not None)
+
+    hit_rate = sum(hits) / len(hits)
+    latency = summarize_ms(latencies)
+    print(f"\nfast-path hit rate {hit_rate:.0%} of {len(CORPUS)} requests, latency ms {latency}")
+    assert hit_rate >= 0.75
+    assert latency["p95"] < 1.0
+
+
+def test_fields_are_extracted_from_tickers_and_keywords():
+    """Test that tickers, names, goals, horizon, risk, budget and criteria all fill their fields."""
+    parsed = extract("Compare AAPL and MSFT for long-term growth")
+    assert [company.ticker for company in parsed.companies] == ["AAPL", "MSFT"]
+    assert (parsed.sectors, parsed.goals, parsed.horizon) == (["Technology"], ["Growth"], "Long-term")
+    assert parsed.confidence == 1.0
+
+    parsed = extract("I have $10,000 for 5 years in Johnson & Johnson, conservative, dividend yield and ESG")
+    assert [company.ticker for company in parsed.companies] == ["JNJ"]
+    assert (parsed.budget, parsed.horizon, parsed.risk) == ("$10,000", "Long-term", "Conservative")
+    assert parsed.criteria == ["Dividend yield", "ESG"]
+    assert "- **Companies**: Johnson & Johnson (JNJ)" in parsed.to_markdown()
+
+
+def test_common_words_that_are_company_names_need_a_capital():
+    """Test that "apple" or "meta" in lower case are not read as companies, but "Apple" is."""
+    assert extract("Which apple orchard funds beat the meta trend?").companies == []
+    assert [company.ticker for company in extract("Analyze Apple's margins").companies] == ["AAPL"]
+
+
+def test_lower_case_company_names_send_the_request_to_the_model():
+    """Test that a lower-case name that may be a common word is not silently dropped from the companies."""
+    parsed = extract("compare apple and microsoft")
+    assert [company.ticker for company in parsed.companies] == ["MSFT"]
+    assert parsed.unknown == ["apple"]
+    assert parse_request("compare apple and microsoft") is None
+
+
+def test_unknown_company_names_lower_the_confidence():
+    """Test that names and symbols missing from the index send the request to the model."""
+    parsed = extract("Analyze Apple's valuation and Rivian")
+    assert parsed.unknown == ["Rivian"]
+    assert parsed.confidence < 0.7
+    assert parse_request("Analyze Apple's valuation and Rivian") is None
+    assert extract("Analyze AAPL and RIVN").unknown == ["RIVN"]
+
+
+def test_parse_step_skips_the_model_on_the_fast_path(monkeypatch):
+    """Test that the parse step answers from the tables without calling the model."""
+    calls = []
+
+    async def fake_ainvoke_stream(self, **kwargs):
+        calls.append(kwargs)
+        raise AssertionError("the model should not be called")
+        yield
+
+    monkeypatch.setattr(Ollama, "ainvoke_stream", fake_ainvoke_stream)
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke_stream)
+    request = InvestmentWorkflowInput(investment_request="Compare AAPL and MSFT for long-term growth")
+
+    output = asyncio.run(parse_investment_request_step(WorkflowExecutionInput(input=request)))
+
+    content = str(output.content)
+    assert calls == []
+    assert "- **Companies**: Apple (AAPL), Microsoft (MSFT)" in content
+    assert "- **Horizon**: Long-term" in content
@@ -0,0 +1,153 @@
+"""
+Unit tests for the exact-match response cache.
+"""
+
+import uuid
+
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.models import model_registry
+from app.response_cache import (
+    CachedResponse,
+    PostgresResponseStore,
+    ResponseCache,
+    ResponseCacheSettings,
+    build_cache_key,
+    response_cache,
+)
+
+
+def _messages(now: str, question: str = "What is Data Science?"):
+    system = (
+        f"You are a helpful assistant.\n<additional_information>\n- The current time is {now}.\n"
+        "</additional_information>"
+    )
+    return [{"role": "system", "content": system}, {"role": "user", "content": question}]
+
+
+def test_key_ignores_volatile_system_prompt_parts():
+    """Test that the current time in the system prompt does not change the key, but the question does."""
+    params = {"options": {"num_ctx": 8192}, "keep_alive": "30m"}
+    first = build_cache_key("agno-simple", "qwen3", _messages("2025-01-01 10:00:00"), params)
+    later = build_cache_key("agno-simple", "qwen3", _messages("2025-01-02 18:30:12"), {**params, "keep_alive": "5m"})
+    other = build_cache_key(
+        "agno-simple", "qwen3", _messages("2025-01-01 10:00:00", "Describe Machine Learning."), params
+    )
+    other_namespace = build_cache_key("agno-assist", "qwen3", _messages("2025-01-01 10:00:00"), params)
+
+    assert first == later
+    assert len({first, other, other_namespace}) == 3
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """Test that the LRU keeps recently read entries and counts evictions."""
+    cache = ResponseCache(ResponseCacheSettings(memory_entries=2, postgres=False))
+    cache.put("ns", "a", "qwen3", CachedResponse("A"))
+    cache.put("ns", "b", "qwen3", CachedResponse("B"))
+    assert cache.get("ns", "a") == CachedResponse("A")
+    cache.put("ns", "c", "qwen3", CachedResponse("C"))
+
+    assert cache.get("ns", "b") is None
+    assert cache.get("ns", "a") is not None
+    stats = cache.stats.snapshot()["ns"]
+    assert (stats["memory_hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+
+def test_memory_tier_expires_entries():
+    """Test that an entry past its TTL is treated as a miss."""
+    cache = ResponseCache(ResponseCacheSettings(ttl_seconds=-1, postgres=False))
+    cache.put("ns", "a", "qwen3", CachedResponse("A"))
+
+    assert cache.get("ns", "a") is None
+    assert cache.stats.snapshot()["ns"]["evictions"] == 1
+
+
+def test_postgres_tier_survives_a_cold_memory_tier():
+    """Test that a fresh process (empty LRU) is served from Postgres and size limits are enforced."""
+    from db.session import db_engine
+
+    namespace = f"test-{uuid.uuid4().hex[:8]}"
+    store = PostgresResponseStore(db_engine, "ai", ttl_seconds=60, max_rows=2)
+    writer = ResponseCache(ResponseCacheSettings(), store)
+    for index in range(3):
+        writer.put(namespace, f"{namespace}-{index}", "qwen3", CachedResponse(f"answer {index}", "thinking"))
+
+    reader = ResponseCache(ResponseCacheSettings(), store)
+    try:
+        assert reader.get(namespace, f"{namespace}-2") == CachedResponse("answer 2", "thinking")
+        assert reader.get(namespace, f"{namespace}-0") is None
+        assert store.size()[namespace] == 2
+        assert reader.stats.snapshot()[namespace]["db_hits"] == 1
+    finally:
+        with db_engine.begin() as conn:
+            conn.execute(store.table.delete().where(store.table.c.namespace == namespace))
+
+
+def test_cached_answer_replays_as_stream(monkeypatch):
+    """Test that a repeated question is streamed from the cache without calling the model."""
+    calls = []
+
+    def fake_stream(self, **kwargs):
+        calls.append(kwargs["messages"])
+        yield ModelResponse(content="<think>short</think>Data Science is the study ")
+        yield ModelResponse(content="of extracting insight from data.")
+
+    monkeypatch.setattr(Ollama, "invoke_stream", fake_stream)
+    monkeypatch.setattr(response_cache, "store", None)
+    model = model_registry.get_model(cache_namespace=f"test-{uuid.uuid4().hex[:8]}")
+    messages = [Message(role="user", content="What is Data Science?")]
+
+    live = "".join(
+        r.content or "" for r in model.invoke_stream(messages=messages, assistant_message=Message(role="assistant"))
+    )
+    replayed = list(model.invoke_stream(messages=messages, assistant_message=Message(role="assistant")))
+
+    assert len(calls) == 1
+    assert "".join(r.content or "" for r in replayed) == "Data Science is the study of extracting insight from data."
+    assert live.endswith("".join(r.content or "" for r in replayed))
+    assert len(replayed) > 2
+    assert replayed[-1].response_usage is not None
+
+
+def test_streamed_reasoning_is_cached_with_the_answer(monkeypatch):
+    """Test that reasoning streamed in its own chunks is stored and replayed with the answer."""
+    calls = []
+
+    def fake_stream(self, **kwargs):
+        calls.append(kwargs["messages"])
+        yield ModelResponse(reasoning_content="The user wants ")
+        yield ModelResponse(reasoning_content="a definition.")
+        yield ModelResponse(content="Data Science is the study of data.")
+
+    monkeypatch.setattr(Ollama, "invoke_stream", fake_stream)
+    monkeypatch.setattr(response_cache, "store", None)
+    model = model_registry.get_model(cache_namespace=f"test-{uuid.uuid4().hex[:8]}")
+    messages = [Message(role="user", content="What is Data Science?")]
+
+    list(model.invoke_stream(messages=messages, assistant_message=Message(role="assistant")))
+    replayed = list(model.invoke_stream(messages=messages, assistant_message=Message(role="assistant")))
+
+    assert len(calls) == 1
+    assert "".join(r.reasoning_content or "" for r in replayed) == "The user wants a definition."
+    assert "".join(r.content or "" for r in replayed) == "Data Science is the study of data."
+
+
+def test_tool_calls_are_not_cached(monkeypatch):
+    """Test that responses asking for tool calls are always fetched live."""
+    calls = []
+
+    def fake_invoke(self, **kwargs):
+        calls.append(1)
+        return ModelResponse(content="", tool_calls=[{"type": "function", "function": {"name": "search"}}])
+
+    monkeypatch.setattr(Ollama, "invoke", fake_invoke)
+    monkeypatch.setattr(response_cache, "store", None)
+    model = model_registry.get_model(cache_namespace=f"test-{uuid.uuid4().hex[:8]}")
+    messages = [Message(role="user", content="latest news?")]
+
+    model.invoke(messages=messages, assistant_message=Message(role="assistant"))
+    model.invoke(messages=messages, assistant_message=Message(role="assistant"))
+
+    assert len(calls) == 2
@@ -0,0 +1,117 @@
+"""
+Unit tests for the shared search result cache.
+"""
+
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+from agno.tools.duckduckgo import DuckDuckGoTools as AgnoDuckDuckGoTools
+
+from app.rate_limit import RateLimitSettings, rate_limiter
+from app.search_cache import PostgresSearchStore, SearchCache, SearchCacheSettings, search_cache, search_cache_key
+from tools.duckduckgo import DuckDuckGoTools
+
+
+@pytest.fixture
+def live_searches(monkeypatch):
+    """Replace the network search with a counter, and the shared cache with a memory-only one."""
+    queries: List[str] = []
+
+    def fake_search(self, query, max_results=5):
+        queries.append(query)
+        return json.dumps([{"title": f"result for {query}", "href": "https://example.com"}])
+
+    monkeypatch.setattr(AgnoDuckDuckGoTools, "duckduckgo_search", fake_search)
+    monkeypatch.setattr(search_cache, "memory", SearchCache(SearchCacheSettings(postgres=False)).memory)
+    monkeypatch.setattr(search_cache, "store", None)
+    monkeypatch.setattr(rate_limiter, "settings", RateLimitSettings(enabled=False))
+    return queries
+
+
+def test_key_normalizes_query_but_not_parameters():
+    """Test that case and whitespace do not change the key, but the result count does."""
+    first = search_cache_key("duckduckgo_search", "Nvidia  stock news", {"max_results": 5})
+    same = search_cache_key("duckduckgo_search", " nvidia stock NEWS", {"max_results": 5})
+    more = search_cache_key("duckduckgo_search", "nvidia stock news", {"max_results": 10})
+    news = search_cache_key("duckduckgo_news", "nvidia stock news", {"max_results": 5})
+
+    assert first == same
+    assert len({first, more, news}) == 3
+
+
+def test_toolkits_share_one_cache(live_searches):
+    """Test that separate toolkit instances reuse each other's results."""
+    researcher, analyst = DuckDuckGoTools(), DuckDuckGoTools()
+
+    first = researcher.duckduckgo_search("NVDA earnings")
+    second = analyst.duckduckgo_search("nvda  earnings")
+    analyst.duckduckgo_search("NVDA earnings", max_results=10)
+
+    assert live_searches == ["NVDA earnings", "NVDA earnings"]
+    assert first == second
+    stats = search_cache.stats.snapshot()["duckduckgo_search"]
+    assert stats["memory_hits"] >= 1 and stats["hit_rate"] > 0
+
+
+def test_failed_searches_are_not_cached(monkeypatch):
+    """Test that an exception from the live search propagates and the next call retries."""
+    cache = SearchCache(SearchCacheSettings(postgres=False))
+    attempts: List[int] = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("202 Ratelimit")
+        return "[]"
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("duckduckgo_search", "q", {}, flaky)
+    assert cache.get_or_fetch("duckduckgo_search", "q", {}, flaky) == "[]"
+    assert cache.get_or_fetch("duckduckgo_search", "q", {}, flaky) == "[]"
+    assert len(attempts) == 2
+
+
+def test_concurrent_identical_searches_fetch_once():
+    """Test that identical searches issued while the first is running wait for it instead of fetching too."""
+    cache = SearchCache(SearchCacheSettings(postgres=False))
+    fetches: List[int] = []
+    release = threading.Event()
+
+    def slow():
+        fetches.append(1)
+        release.wait(5)
+        return "[]"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(cache.get_or_fetch, "duckduckgo_search", "NVDA earnings", {}, slow) for _ in range(4)]
+        while cache.stats.snapshot().get("duckduckgo_search", {}).get("coalesced", 0) < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["[]"] * 4
+    assert len(fetches) == 1
+    assert cache.stats.snapshot()["duckduckgo_search"]["misses"] == 1
+
+
+def test_postgres_tier_is_shared_between_processes():
+    """Test that a cache with a cold memory tier (another worker) is served from Postgres."""
+    from db.session import db_engine
+
+    tool = f"test-{uuid.uuid4().hex[:8]}"
+    store = PostgresSearchStore(db_engine, "ai", max_rows=1000)
+    writer, reader = SearchCache(SearchCacheSettings(), store), SearchCache(SearchCacheSettings(), store)
+    try:
+        writer.get_or_fetch(tool, "brazil gdp", {}, lambda: "writer result")
+        result = reader.get_or_fetch(tool, "Brazil GDP", {}, lambda: "live result")
+
+        assert result == "writer result"
+        assert reader.stats.snapshot()[tool]["db_hits"] == 1
+    finally:
+        with db_engine.begin() as conn:
+            conn.execute(store.table.delete().where(store.table.c.tool == tool))
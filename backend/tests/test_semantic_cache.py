@@ -0,0 +1,97 @@
+"""
+Unit tests for the semantic response cache.
+"""
+
+import uuid
+
+import pytest
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.models import model_registry
+from app.response_cache import CachedResponse, response_cache
+from app.semantic_cache import SemanticCache, SemanticCacheSettings, semantic_cache, semantic_query
+
+
+def _vector(*head):
+    """A 768-dimension vector whose direction is set by its first components."""
+    return list(head) + [0.0] * (768 - len(head))
+
+
+@pytest.fixture
+def namespace():
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    yield name
+    semantic_cache.clear(name)
+
+
+def test_only_first_turn_questions_are_eligible():
+    """Test that requests with history or tool results skip the semantic stage."""
+    system = {"role": "system", "content": "You are helpful."}
+    question = {"role": "user", "content": "What is Data Science?"}
+    answer = {"role": "assistant", "content": "A field."}
+
+    first_turn = semantic_query("ns", "qwen3", [system, question], {})
+    follow_up = semantic_query("ns", "qwen3", [system, question, answer, question], {})
+    other_prompt = semantic_query("ns", "qwen3", [{"role": "system", "content": "Be terse."}, question], {})
+
+    assert first_turn is not None and first_turn.question == "What is Data Science?"
+    assert follow_up is None
+    assert other_prompt is not None and other_prompt.context_key != first_turn.context_key
+
+
+def test_lookup_respects_threshold_namespace_and_context(namespace):
+    """Test that only a close enough vector in the same namespace and context is served."""
+    cache = SemanticCache(SemanticCacheSettings(threshold=0.9), semantic_cache.engine)
+    query = semantic_query(namespace, "qwen3", [{"role": "user", "content": "What is Data Science?"}], {})
+    other_context = semantic_query(namespace, "llama3", [{"role": "user", "content": "What is Data Science?"}], {})
+    assert query is not None and other_context is not None
+    cache.store(namespace, query, _vector(1.0, 0.0), CachedResponse("Data Science is ..."))
+
+    close = cache.lookup(namespace, query, _vector(1.0, 0.2))
+    far = cache.lookup(namespace, query, _vector(1.0, 1.0))
+
+    assert close is not None and close.response.content == "Data Science is ..."
+    assert close.similarity > 0.9
+    assert far is None
+    assert cache.lookup(namespace, other_context, _vector(1.0, 0.0)) is None
+    assert cache.lookup(f"{namespace}-other", query, _vector(1.0, 0.0)) is None
+    semantic_cache.clear(f"{namespace}-other")
+
+
+def test_expired_answers_are_not_served(namespace):
+    """Test that rows past their TTL are ignored and evicted."""
+    cache = SemanticCache(SemanticCacheSettings(ttl_seconds=-1), semantic_cache.engine)
+    query = semantic_query(namespace, "qwen3", [{"role": "user", "content": "What is Data Science?"}], {})
+    assert query is not None
+    cache.store(namespace, query, _vector(1.0), CachedResponse("stale"))
+
+    assert cache.lookup(namespace, query, _vector(1.0)) is None
+    assert cache.stats.snapshot()[namespace]["evictions"] == 1
+
+
+def test_paraphrase_is_served_without_calling_the_model(monkeypatch, namespace):
+    """Test that a paraphrased question is answered from the semantic cache."""
+    embeddings = {"What is Data Science?": _vector(1.0, 0.1), "explain data science": _vector(1.0, 0.15)}
+    calls = []
+
+    def fake_invoke(self, **kwargs):
+        calls.append(kwargs["messages"][-1].content)
+        return ModelResponse(role="assistant", content="Data Science turns data into insight.")
+
+    monkeypatch.setattr(Ollama, "invoke", fake_invoke)
+    monkeypatch.setattr(model_registry, "embed", lambda text: embeddings[text.removeprefix("search_query: ")])
+    monkeypatch.setattr(response_cache, "store", None)
+    model = model_registry.get_model(cache_namespace=namespace, semantic_cache=True)
+
+    first = model.invoke(
+        messages=[Message(role="user", content="What is Data Science?")], assistant_message=Message(role="assistant")
+    )
+    second = model.invoke(
+        messages=[Message(role="user", content="explain data science")], assistant_message=Message(role="assistant")
+    )
+
+    assert calls == ["What is Data Science?"]
+    assert second.content == first.content
+    assert semantic_cache.stats.snapshot()[namespace]["hits"] == 1
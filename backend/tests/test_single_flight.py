@@ -0,0 +1,107 @@
+"""
+Unit tests for single-flight coalescing of run requests.
+"""
+
+import asyncio
+from typing import Any, List
+
+import httpx
+from agno.agent import Agent
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.os import AgentOS
+
+from app.models import model_registry
+from app.single_flight import SingleFlight, SingleFlightMiddleware, SingleFlightSettings, flight_key
+
+
+def _stub_app(monkeypatch, calls):
+    async def fake_stream(self, **kwargs):
+        calls.append(kwargs["messages"][-1].content)
+        for word in ["Data ", "Science ", "is ", "the ", "study ", "of ", "data."]:
+            await asyncio.sleep(0.02)
+            yield ModelResponse(content=word)
+
+    async def fake_invoke(self, **kwargs):
+        calls.append(kwargs["messages"][-1].content)
+        await asyncio.sleep(0.05)
+        return ModelResponse(role="assistant", content="Data Science is the study of data.")
+
+    monkeypatch.setattr(Ollama, "ainvoke_stream", fake_stream)
+    monkeypatch.setattr(Ollama, "ainvoke", fake_invoke)
+    agents: List[Any] = [
+        Agent(id="stub", name="Stub", model=model_registry.get_model()),
+        Agent(id="stub-personal", name="Stub Personal", model=model_registry.get_model()),
+    ]
+    app = AgentOS(id="single-flight-test", agents=agents).get_app()
+    flights = SingleFlight(SingleFlightSettings())
+    return SingleFlightMiddleware(app, flights, is_coalescable=lambda entity_id: entity_id == "stub"), flights
+
+
+def _post_runs(app, requests):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post(f"/agents/{agent_id}/runs", data=data, timeout=30) for agent_id, data in requests)
+            )
+
+    return asyncio.run(scenario())
+
+
+def test_key_ignores_caller_fields_and_whitespace():
+    """Test that session, user and whitespace differences map to the same flight."""
+    first = flight_key("agents", "agno-simple", {"message": ["What is  Data Science?"], "session_id": ["a"]})
+    second = flight_key("agents", "agno-simple", {"message": ["What is Data Science? "], "user_id": ["bob"]})
+    other_entity = flight_key("teams", "agno-simple", {"message": ["What is Data Science?"]})
+    not_streamed = flight_key("agents", "agno-simple", {"message": ["What is Data Science?"], "stream": ["false"]})
+
+    assert first == second
+    assert len({first, other_entity, not_streamed}) == 3
+
+
+def test_workflow_runs_are_keyed_on_their_session():
+    """Test that workflow runs only coalesce within a session, whose history the frontend reads back."""
+    fields = {"message": ["Analyze NVIDIA stock"], "user_id": ["alice"]}
+    same_session = flight_key("workflows", "investment", {**fields, "session_id": ["a"]})
+    other_user = flight_key("workflows", "investment", {**fields, "session_id": ["a"], "user_id": ["bob"]})
+    other_session = flight_key("workflows", "investment", {**fields, "session_id": ["b"]})
+
+    assert same_session == other_user
+    assert same_session != other_session
+
+
+def test_identical_concurrent_streams_share_one_model_call(monkeypatch):
+    """Test that concurrent identical runs call the model once and every client gets the full stream."""
+    calls: List[str] = []
+    app, flights = _stub_app(monkeypatch, calls)
+    data = {"message": "What is Data Science?", "stream": "true"}
+
+    responses = _post_runs(app, [("stub", {**data, "session_id": f"session-{i}"}) for i in range(5)])
+
+    assert calls == ["What is Data Science?"]
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses}) == 1
+    assert "RunCompleted" in responses[0].text and "study " in responses[0].text
+    status = flights.status()
+    assert (status["flights"], status["coalesced"], status["max_subscribers"], status["in_flight"]) == (1, 4, 5, 0)
+
+
+def test_different_inputs_and_personal_entities_are_not_coalesced(monkeypatch):
+    """Test that different messages, and entities not marked coalescable, run separately."""
+    calls: List[str] = []
+    app, flights = _stub_app(monkeypatch, calls)
+
+    responses = _post_runs(
+        app,
+        [
+            ("stub", {"message": "What is Data Science?", "stream": "false"}),
+            ("stub", {"message": "Describe Machine Learning.", "stream": "false"}),
+            ("stub-personal", {"message": "What is Data Science?", "stream": "false"}),
+            ("stub-personal", {"message": "What is Data Science?", "stream": "false"}),
+        ],
+    )
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len(calls) == 4
+    status = flights.status()
+    assert (status["flights"], status["coalesced"], status["bypassed"]) == (2, 0, {"entity": 2})
@@ -0,0 +1,144 @@
+"""
+Unit tests for running the tool calls of one model turn concurrently.
+"""
+
+import asyncio
+import json
+import time
+from typing import List
+
+import pytest
+from agno.agent import Agent
+from agno.models.message import Message
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+
+from app.models import model_registry
+from app.tool_calls import tool_call_settings, tool_call_stats
+
+DELAY = 0.3
+
+
+def lookup(topic: str) -> str:
+    """Look up a topic.
+
+    Args:
+        topic (str): The topic to look up.
+    """
+    time.sleep(1.5 if topic == "slow" else DELAY)
+    return f"facts about {topic}"
+
+
+def _tool_turn(topics: List[str]) -> ModelResponse:
+    return ModelResponse(
+        role="assistant",
+        tool_calls=[
+            {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": "lookup", "arguments": json.dumps({"topic": t})},
+            }
+            for i, t in enumerate(topics)
+        ],
+    )
+
+
+@pytest.fixture
+def scripted_model(monkeypatch):
+    """Model that asks for one batch of lookups, then answers; returns the tool messages it was sent."""
+    topics: List[str] = []
+    tool_messages: List[Message] = []
+
+    def respond(messages: List[Message]) -> ModelResponse:
+        if not any(message.role == "tool" for message in messages):
+            return _tool_turn(topics)
+        tool_messages.extend(message for message in messages if message.role == "tool")
+        return ModelResponse(role="assistant", content="done")
+
+    def fake_invoke(self, **kwargs):
+        return respond(kwargs["messages"])
+
+    async def fake_ainvoke(self, **kwargs):
+        return respond(kwargs["messages"])
+
+    monkeypatch.setattr(Ollama, "invoke", fake_invoke)
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(tool_call_settings, "max_parallel", 4)
+    monkeypatch.setattr(tool_call_settings, "timeout_seconds", 60.0)
+    return topics, tool_messages
+
+
+def _agent(parallel: bool) -> Agent:
+    return Agent(model=model_registry.get_model(parallel_tool_calls=parallel), tools=[lookup])
+
+
+def test_sync_run_executes_calls_concurrently_in_call_order(scripted_model):
+    """Test that Agent.run overlaps the calls of one turn and returns the results in call order."""
+    topics, tool_messages = scripted_model
+    topics.extend(["gdp", "inflation", "rates"])
+    batches = tool_call_stats.snapshot()["parallel_batches"]
+
+    started = time.perf_counter()
+    run = _agent(parallel=True).run("Compare them")
+    elapsed = time.perf_counter() - started
+
+    assert run.content == "done"
+    assert elapsed < 2 * DELAY
+    assert [message.tool_call_id for message in tool_messages] == ["call_0", "call_1", "call_2"]
+    assert [message.content for message in tool_messages] == [f"facts about {t}" for t in topics]
+    stats = tool_call_stats.snapshot()
+    assert stats["parallel_batches"] == batches + 1 and stats["saved_seconds"] > 0
+
+
+def test_sync_run_stays_serial_without_the_mode(scripted_model):
+    """Test that models built without parallel_tool_calls keep agno's one-by-one execution."""
+    topics, _ = scripted_model
+    topics.extend(["gdp", "inflation"])
+
+    started = time.perf_counter()
+    _agent(parallel=False).run("Compare them")
+
+    assert time.perf_counter() - started >= 2 * DELAY
+
+
+@pytest.mark.parametrize("run_async", [False, True])
+def test_slow_call_times_out_without_blocking_the_turn(scripted_model, monkeypatch, run_async):
+    """Test that a call past the timeout returns an error result while the other calls succeed."""
+    topics, tool_messages = scripted_model
+    topics.extend(["slow", "gdp"])
+    monkeypatch.setattr(tool_call_settings, "timeout_seconds", 0.6)
+    timeouts = tool_call_stats.snapshot()["timeouts"].get("lookup", 0)
+    agent = _agent(parallel=True)
+
+    async def timed_arun():
+        started = time.perf_counter()
+        run = await agent.arun("Compare them")
+        return run, time.perf_counter() - started
+
+    # asyncio.run() itself waits for the abandoned worker thread on shutdown, so time the run inside the loop
+    if run_async:
+        run, elapsed = asyncio.run(timed_arun())
+    else:
+        started = time.perf_counter()
+        run = agent.run("Compare them")
+        elapsed = time.perf_counter() - started
+
+    assert run.content == "done"
+    assert elapsed < 1.2
+    assert tool_messages[0].tool_call_error and "timed out after 0.6s" in str(tool_messages[0].content)
+    assert tool_messages[1].content == "facts about gdp"
+    assert tool_call_stats.snapshot()["timeouts"]["lookup"] == timeouts + 1
+
+
+def test_async_run_bounds_parallelism(scripted_model, monkeypatch):
+    """Test that an async run never has more than max_parallel calls of one turn in flight."""
+    topics, tool_messages = scripted_model
+    topics.extend(["a", "b", "c", "d"])
+    monkeypatch.setattr(tool_call_settings, "max_parallel", 2)
+
+    started = time.perf_counter()
+    asyncio.run(_agent(parallel=True).arun("Compare them"))
+    elapsed = time.perf_counter() - started
+
+    assert 2 * DELAY <= elapsed < 3 * DELAY
+    assert [message.content for message in tool_messages] == [f"facts about {t}" for t in topics]
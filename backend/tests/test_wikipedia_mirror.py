@@ -0,0 +1,137 @@
+"""
+Unit tests for the offline Wikipedia mirror.
+"""
+
+import bz2
+import json
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+from wikipedia.exceptions import PageError
+
+from tools.wikipedia import WikipediaTools
+from tools.wikipedia_mirror import WikipediaMirror, read_jsonl, read_xml_dump, strip_wikitext
+
+DUMP = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.11/">
+  <page>
+    <title>Solar power</title>
+    <ns>0</ns>
+    <revision><text>{{Short description|Conversion of sunlight}}
+'''Solar power''' is the conversion of energy from [[sunlight]] into [[electricity|electrical power]].\
+&lt;ref&gt;IEA&lt;/ref&gt;
+
+It is a form of [[renewable energy]].
+
+== History ==
+Early solar cells were inefficient.
+[[Category:Energy]]</text></revision>
+  </page>
+  <page>
+    <title>Photovoltaics</title>
+    <ns>0</ns>
+    <revision><text>'''Photovoltaics''' converts light into electricity using semiconductors.</text></revision>
+  </page>
+  <page>
+    <title>Solar energy</title>
+    <ns>0</ns>
+    <redirect title="Solar power" />
+    <revision><text>#REDIRECT [[Solar power]]</text></revision>
+  </page>
+  <page>
+    <title>Talk:Solar power</title>
+    <ns>1</ns>
+    <revision><text>Discussion</text></revision>
+  </page>
+</mediawiki>
+"""
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    dump = tmp_path / "dump.xml.bz2"
+    dump.write_bytes(bz2.compress(DUMP.encode()))
+    mirror = WikipediaMirror(str(tmp_path / "wikipedia.db"))
+    assert mirror.ingest(read_xml_dump(dump)) == 2
+    return mirror
+
+
+def test_strip_wikitext_keeps_readable_text():
+    """Test that templates, references, links and emphasis are reduced to plain text."""
+    text = strip_wikitext(
+        "{{Infobox|a={{b}}}}'''Brazil''' is in [[South America|the south]].<ref>x</ref>\n== Economy ==\nBig."
+    )
+
+    assert text == "Brazil is in the south.\n\n== Economy ==\n\nBig."
+
+
+def test_lookup_by_title_redirect_and_full_text(mirror):
+    """Test exact titles, redirects and ranked full-text search, skipping other namespaces."""
+    page = mirror.page("solar power")
+    assert page is not None and page.summary.startswith("Solar power is the conversion of energy from sunlight")
+    assert "History" not in page.summary and "It is a form of renewable energy." in page.summary
+
+    redirected = mirror.page("Solar energy")
+    assert redirected is not None and redirected.title == "Solar power"
+    assert mirror.page("Talk:Solar power") is None
+
+    assert mirror.search("semiconductor light")[0] == "Photovoltaics"
+    assert set(mirror.search("electricity")) == {"Photovoltaics", "Solar power"}
+    found = mirror.lookup("how do solar cells work")
+    assert found is not None and found.title == "Solar power"
+    assert mirror.lookup("quantum chromodynamics") is None
+
+
+def test_jsonl_subsets_can_be_ingested(tmp_path):
+    """Test that plain-text JSONL pages are indexed with their first paragraph as the summary."""
+    subset = tmp_path / "subset.jsonl"
+    subset.write_text(json.dumps({"title": "Brazil", "text": "Brazil is a country.\n\nIt is large."}) + "\n")
+    mirror = WikipediaMirror(str(tmp_path / "wikipedia.db"))
+
+    assert mirror.ingest(read_jsonl(subset), wikitext=False) == 1
+    page = mirror.lookup("brazil")
+    assert page is not None and page.summary == "Brazil is a country."
+
+
+def test_tool_serves_from_the_mirror_offline(mirror):
+    """Test that the drop-in tool answers in agno's format and reports missing pages without going online."""
+    tool = WikipediaTools(online_fallback=False)
+    tool.mirror = mirror
+
+    result = json.loads(tool.search_wikipedia("Solar energy"))
+
+    assert result["name"] == "Solar energy"
+    assert result["content"].startswith("Solar power is the conversion")
+    with pytest.raises(PageError):
+        tool.search_wikipedia("quantum chromodynamics")
+    assert mirror.status()["hits"] == 1 and mirror.status()["pages"] == 2
+
+
+def test_one_shared_word_is_not_a_match(mirror):
+    """Test that pages sharing a single word with the query are not returned as its topic."""
+    for query in ("Nuclear power", "Quantum computing power", "Tesla electricity prices"):
+        assert mirror.search(query) == [], query
+        assert mirror.lookup(query) is None, query
+    assert mirror.search("solar cells history prices") == ["Solar power"]
+
+
+def test_xml_dump_reader_releases_parsed_pages(tmp_path, monkeypatch):
+    """Test that pages already yielded are dropped from the parsed tree while a dump is read."""
+    pages = "".join(
+        f"<page><title>Page {i}</title><ns>0</ns><revision><text>Text {i}</text></revision></page>" for i in range(50)
+    )
+    dump = tmp_path / "dump.xml"
+    dump.write_text(f"<mediawiki>{pages}</mediawiki>")
+    parsed = []
+    iterparse = ElementTree.iterparse
+
+    def recording_iterparse(source, events):
+        for event, element in iterparse(source, events):
+            parsed.append(element)
+            yield event, element
+
+    monkeypatch.setattr(ElementTree, "iterparse", recording_iterparse)
+
+    titles = [title for title, _, _ in read_xml_dump(dump)]
+
+    assert titles == [f"Page {i}" for i in range(50)]
+    assert len(parsed[0]) == 0  # the root no longer holds the pages
@@ -0,0 +1,79 @@
+"""
+Unit tests for exclusive report branches and step memoization in the workflows.
+"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.run.base import RunContext
+from agno.workflow.types import StepInput, StepOutput
+from agno.workflow.workflow import Workflow
+
+from workflows.research_workflow import (
+    ResearchTopic,
+    analysis_condition,
+    report_branch,
+    report_writing_step,
+    research_loop,
+)
+
+from . import stream_ainvoke
+
+SOURCES = " ".join(f"https://example.com/source-{i}" for i in range(5))
+# Passes every research and analysis quality check, so each loop runs once
+ANSWER = (
+    f"Expert analysis of recent research and studies. {'Key insight on a trend and pattern. ' * 60}"
+    f"Implications and impact, with a recommendation and conclusion. Sources: {SOURCES}"
+)
+AGENTS = ("research coordinator", "content analyst", "research report writer")
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    """Answer every model call with ANSWER, counting calls per agent (found in the system prompt)."""
+    calls: Counter = Counter()
+
+    async def fake_ainvoke(self, **kwargs):
+        system = str(kwargs["messages"][0].content).lower()
+        calls[next((agent for agent in AGENTS if agent in system), "other")] += 1
+        return ModelResponse(role="assistant", content=ANSWER)
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(Ollama, "ainvoke_stream", stream_ainvoke)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "request_text, branch",
+    [
+        ("Comprehensive analysis of solid-state battery trends", "Comprehensive Research Report"),
+        ("Solid-state batteries", "Basic Research Report"),
+    ],
+)
+def test_each_path_writes_the_report_once(model_calls, request_text, branch):
+    """Test that the deep and basic paths each make exactly one report-writer call."""
+    workflow = Workflow(name="Research branches", steps=[research_loop, analysis_condition, report_branch])
+
+    run = asyncio.run(workflow.arun(input=ResearchTopic(research_request=request_text)))
+
+    assert model_calls["research coordinator"] == 1
+    assert model_calls["research report writer"] == 1
+    report = run.step_results[-1]
+    assert isinstance(report, StepOutput) and report.steps
+    assert [step.step_name for step in report.steps] == [branch]
+
+
+def test_memoized_step_reuses_output_within_a_run(model_calls):
+    """Test that a second identical call in the same run reuses the output, and another run does not."""
+    step_input = StepInput(input=ResearchTopic(research_request="Solid-state batteries"))
+    first_run = RunContext(run_id="run-1", session_id="session")
+
+    first = asyncio.run(report_writing_step(step_input, run_context=first_run))
+    again = asyncio.run(report_writing_step(step_input, run_context=first_run))
+    asyncio.run(report_writing_step(step_input, run_context=RunContext(run_id="run-2", session_id="session")))
+
+    assert again is first
+    assert model_calls["research report writer"] == 2
@@ -0,0 +1,136 @@
+"""
+Unit tests for step checkpoints and resuming workflow runs.
+"""
+
+import asyncio
+import uuid
+from collections import Counter
+
+import pytest
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.workflow.workflow import Workflow
+
+from db.session import db_engine
+from workflows.checkpoint import CheckpointSettings, PostgresCheckpointStore, WorkflowCheckpoints
+from workflows.graph import graph_stats
+from workflows.investment_workflow import InvestmentWorkflowInput, investment_graph
+from workflows.request_parser import fast_parse_settings
+
+from . import stream_ainvoke
+
+# Passes the research and analysis quality checks, so each loop runs once
+ANSWER = (
+    "Share price and market cap, revenue and earnings, with valuation and a buy recommendation. "
+    f"Risk analysis and beta calculation. {'Supporting detail. ' * 60} Source: https://example.com/report"
+)
+PROMPTS = {
+    "parse": "Parse this investment request",
+    "research": "Conduct comprehensive investment research",
+    "analysis": "Conduct detailed financial analysis",
+    "strategy": "Create a comprehensive investment strategy",
+}
+
+
+def use_checkpoints(monkeypatch, ttl_seconds: int = 3600) -> WorkflowCheckpoints:
+    checkpoints = WorkflowCheckpoints(
+        CheckpointSettings(ttl_seconds=ttl_seconds), PostgresCheckpointStore(db_engine, "ai")
+    )
+    monkeypatch.setattr(investment_graph, "checkpoints", checkpoints)
+    return checkpoints
+
+
+class ModelCalls(Counter):
+    """Model calls per step, and the steps whose model calls fail."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = set()
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    """Answer every model call with ANSWER, counting calls per step; steps in `failing` time out instead."""
+    calls = ModelCalls()
+
+    async def fake_ainvoke(self, **kwargs):
+        prompt = str(kwargs["messages"][-1].content)
+        step = next(step for step, marker in PROMPTS.items() if marker in prompt)
+        calls[step] += 1
+        if step in calls.failing:
+            raise TimeoutError("Ollama timed out")
+        await asyncio.sleep(0.01)
+        return ModelResponse(role="assistant", content=ANSWER)
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(Ollama, "ainvoke_stream", stream_ainvoke)
+    # The model parses the request, as it does for requests the tables cannot parse
+    monkeypatch.setattr(fast_parse_settings, "enabled", False)
+    return calls
+
+
+def run_workflow(request: str):
+    workflow = Workflow(name="Checkpointed investment", steps=[investment_graph])
+    return asyncio.run(workflow.arun(input=InvestmentWorkflowInput(investment_request=request)))
+
+
+def test_failed_run_resumes_from_the_last_good_step(monkeypatch, model_calls):
+    """Test that retrying a run whose last step failed restores the earlier steps without model calls."""
+    checkpoints = use_checkpoints(monkeypatch)
+    request = f"Analyze NVIDIA stock ({uuid.uuid4()})"
+    model_calls.failing.add("strategy")
+
+    failed = run_workflow(request)
+    done_before = {step: model_calls[step] for step in ("parse", "research", "analysis")}
+    model_calls.failing.clear()
+    resumed = run_workflow(request)
+
+    assert "Strategic Recommendations" not in str(failed.content)
+    assert done_before == {"parse": 1, "research": 1, "analysis": 1}
+    assert {step: model_calls[step] for step in done_before} == done_before
+    assert "Strategic Recommendations" in str(resumed.content)
+    report = graph_stats.snapshot()["last_run"]["Investment Analysis"]
+    assert set(report["restored"]) == {"Parse Request", "Market Research", "Financial Analysis"}
+    assert checkpoints.status()["restored"] == 3
+
+
+def test_interrupted_run_resumes_without_repeating_finished_steps(monkeypatch, model_calls):
+    """Test that a run killed during the financial analysis resumes with only the unfinished steps."""
+    use_checkpoints(monkeypatch)
+    request = f"Analyze AMD stock ({uuid.uuid4()})"
+    analysis_started = asyncio.Event()
+    ainvoke = Ollama.ainvoke
+
+    async def hanging_analysis(self, **kwargs):
+        if PROMPTS["analysis"] in str(kwargs["messages"][-1].content):
+            analysis_started.set()
+            await asyncio.sleep(60)
+        return await ainvoke(self, **kwargs)
+
+    async def interrupted_run():
+        workflow = Workflow(name="Checkpointed investment", steps=[investment_graph])
+        run = asyncio.create_task(workflow.arun(input=InvestmentWorkflowInput(investment_request=request)))
+        await analysis_started.wait()
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+
+    monkeypatch.setattr(Ollama, "ainvoke", hanging_analysis)
+    asyncio.run(interrupted_run())
+    monkeypatch.setattr(Ollama, "ainvoke", ainvoke)
+    resumed = run_workflow(request)
+
+    # The killed analysis call never returned, so only the resumed run's calls are counted for it
+    assert model_calls == {"parse": 1, "research": 1, "analysis": 1, "strategy": 1}
+    assert "Strategic Recommendations" in str(resumed.content)
+
+
+def test_expired_checkpoints_are_not_reused(monkeypatch, model_calls):
+    """Test that an identical input after the TTL runs every step again."""
+    use_checkpoints(monkeypatch, ttl_seconds=0)
+    request = f"Analyze Intel stock ({uuid.uuid4()})"
+
+    run_workflow(request)
+    run_workflow(request)
+
+    assert model_calls == {"parse": 2, "research": 2, "analysis": 2, "strategy": 2}
@@ -0,0 +1,111 @@
+"""
+Unit tests for dependency-graph scheduling of workflow steps.
+"""
+
+import asyncio
+import time
+
+import pytest
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.run.workflow import WorkflowCompletedEvent
+from agno.workflow.step import Step
+from agno.workflow.types import StepInput, StepOutput
+from agno.workflow.workflow import Workflow
+
+from workflows.graph import Node, StepGraph, graph_stats
+from workflows.investment_workflow import InvestmentWorkflowInput, investment_graph
+from workflows.request_parser import fast_parse_settings
+
+from . import stream_ainvoke
+
+DELAY = 0.2
+# Passes the research and analysis quality checks, so each loop runs once
+ANSWER = (
+    "Share price and market cap, revenue and earnings, with valuation and a buy recommendation. "
+    f"Risk analysis and beta calculation. {'Supporting detail. ' * 60} Source: https://example.com/report"
+)
+PROMPTS = {
+    "parse": "Parse this investment request",
+    "research": "Conduct comprehensive investment research",
+    "analysis": "Conduct detailed financial analysis",
+    "strategy": "Create a comprehensive investment strategy",
+}
+
+
+def sleeping_step(name: str) -> Step:
+    async def executor(step_input: StepInput) -> StepOutput:
+        await asyncio.sleep(DELAY)
+        upstream = {key: step_input.get_step_content(key) for key in ("A", "B")}
+        return StepOutput(content=f"{name} saw {upstream} after {step_input.previous_step_content}")
+
+    return Step(name=f"Step {name}", executor=executor)
+
+
+def fan_in_graph() -> StepGraph:
+    return StepGraph(
+        name="Fan in",
+        nodes=[
+            Node("A", sleeping_step("A")),
+            Node("B", sleeping_step("B")),
+            Node("C", sleeping_step("C"), needs=("A", "B")),
+        ],
+    )
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_ready_nodes_run_together_and_see_their_needs(stream):
+    """Test that independent nodes overlap and a node waits for, and reads, every node it needs."""
+
+    async def run():
+        workflow = Workflow(name="Graph", steps=[fan_in_graph()])
+        if not stream:
+            return await workflow.arun(input="go")
+        events = [event async for event in workflow.arun(input="go", stream=True)]
+        return next(event for event in events if isinstance(event, WorkflowCompletedEvent))
+
+    output = asyncio.run(run())
+
+    assert "'A': \"A saw" in output.content and "'B': \"B saw" in output.content
+    assert output.content.endswith("} after B saw {'A': None, 'B': None} after None")
+    timing = graph_stats.snapshot()["last_run"]["Fan in"]
+    assert timing["wall_seconds"] < 3 * DELAY <= timing["serial_seconds"]
+    assert timing["critical_path"][-1] == "C"
+    assert timing["nodes"]["C"]["start"] >= max(timing["nodes"]["A"]["end"], timing["nodes"]["B"]["end"])
+
+
+def test_needs_must_be_listed_first():
+    """Test that a node cannot need a node declared after it, which keeps the graph acyclic."""
+    with pytest.raises(ValueError):
+        StepGraph(name="Cycle", nodes=[Node("A", sleeping_step("A"), needs=("B",)), Node("B", sleeping_step("B"))])
+
+
+def test_investment_graph_parses_while_researching(monkeypatch):
+    """Test that the investment graph overlaps parsing with research and feeds the research downstream."""
+    spans = {}
+    prompts = {}
+
+    async def fake_ainvoke(self, **kwargs):
+        prompt = str(kwargs["messages"][-1].content)
+        step = next(step for step, marker in PROMPTS.items() if marker in prompt)
+        started = time.perf_counter()
+        await asyncio.sleep(DELAY)
+        spans[step], prompts[step] = (started, time.perf_counter()), prompt
+        return ModelResponse(role="assistant", content=ANSWER)
+
+    monkeypatch.setattr(Ollama, "ainvoke", fake_ainvoke)
+    monkeypatch.setattr(Ollama, "ainvoke_stream", stream_ainvoke)
+    monkeypatch.setattr(investment_graph, "checkpoints", None)
+    # The model parses the request, as it does for requests the tables cannot parse
+    monkeypatch.setattr(fast_parse_settings, "enabled", False)
+    workflow = Workflow(name="Investment graph", steps=[investment_graph])
+
+    output = asyncio.run(workflow.arun(input=InvestmentWorkflowInput(investment_request="Analyze NVIDIA stock")))
+
+    assert spans["parse"][0] < spans["research"][1] and spans["research"][0] < spans["parse"][1]
+    assert spans["analysis"][0] >= spans["research"][1]
+    assert ANSWER in prompts["analysis"]
+    assert "Strategic Recommendations" in str(output.content)
+    report = graph_stats.snapshot()["last_run"]["Investment Analysis"]
+    assert report["critical_path"] == ["Market Research", "Financial Analysis", "Portfolio Strategy"]
+    assert report["wall_seconds"] < report["serial_seconds"]
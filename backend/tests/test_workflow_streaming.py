@@ -0,0 +1,74 @@
+"""
+Unit tests for token streaming from workflow step executors.
+"""
+
+import asyncio
+import time
+
+from agno.models.ollama import Ollama
+from agno.models.response import ModelResponse
+from agno.workflow.workflow import Workflow
+
+from workflows.graph import graph_stats
+from workflows.investment_workflow import InvestmentWorkflowInput, investment_graph
+from workflows.request_parser import fast_parse_settings
+
+TOKEN_DELAY = 0.005
+# Passes the research and analysis quality checks, so each loop runs once
+ANSWER = (
+    "Share price and market cap, revenue and earnings, with valuation and a buy recommendation. "
+    f"Risk analysis and beta calculation. {'Supporting detail. ' * 60} Source: https://example.com/report"
+)
+
+
+def test_workflow_streams_step_tokens_before_the_step_completes(monkeypatch):
+    """Test that the first token of the first step reaches the client long before that step finishes."""
+
+    async def fake_stream(self, **kwargs):
+        for word in ANSWER.split(" "):
+            await asyncio.sleep(TOKEN_DELAY)
+            yield ModelResponse(content=f"{word} ")
+
+    monkeypatch.setattr(Ollama, "ainvoke_stream", fake_stream)
+    monkeypatch.setattr(investment_graph, "checkpoints", None)
+    # The model parses the request, as it does for requests the tables cannot parse
+    monkeypatch.setattr(fast_parse_settings, "enabled", False)
+    workflow = Workflow(name="Streamed investment", steps=[investment_graph])
+
+    async def run():
+        started = time.perf_counter()
+        timeline = []
+        request = InvestmentWorkflowInput(investment_request="Analyze NVIDIA stock")
+        async for event in workflow.arun(input=request, stream=True, stream_events=True):
+            timeline.append((time.perf_counter() - started, event))
+        return timeline
+
+    timeline = asyncio.run(run())
+
+    def first(kind, step=None):
+        return next(
+            (seconds, event)
+            for seconds, event in timeline
+            if event.event == kind and (step is None or event.step_name == step)
+        )
+
+    first_token, token = first("RunContent")
+    parse_done, _ = first("StepCompleted", "Parse Investment Request")
+    parse_started, _ = first("StepStarted", "Parse Investment Request")
+    one_generation = TOKEN_DELAY * len(ANSWER.split(" "))
+    assert token.step_name in ("Parse Request", "Market Research")
+    # Agent setup varies, so time to first token is measured against the rest of the generation
+    assert parse_started < first_token < parse_done - one_generation * 0.8
+
+    # Each step's tokens arrive in order and add up to its agent's answer, after the steps it reads
+    strategy = "".join(
+        event.content
+        for _, event in timeline
+        if event.event == "RunContent" and event.step_name == "Portfolio Strategy"
+    )
+    assert strategy.split() == ANSWER.split()
+    analysis_token, _ = first("RunContent", "Financial Analysis")
+    research_done, research = first("StepCompleted", "Market Research")
+    assert ANSWER in str(research.content)
+    assert analysis_token > research_done
+    assert graph_stats.snapshot()["first_token_seconds"]["count"] >= 1
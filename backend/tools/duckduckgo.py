@@ -0,0 +1,171 @@
+"""
+DuckDuckGo toolkit backed by the shared search cache.
+
+Drop-in replacement for agno's DuckDuckGoTools: same tool names, parameters and docstrings, so
+the model sees the same tools, but every search goes through app.search_cache first, and cache
+misses wait for the shared DuckDuckGo rate limit (app.rate_limit).
+
+With enable_multi_search the toolkit also offers duckduckgo_multi_search: one tool call that runs
+a list of queries concurrently, drops duplicate URLs and returns a single ranked result set, so a
+research step needs one model round trip instead of one per query.
+"""
+
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from agno.tools.duckduckgo import DuckDuckGoTools as AgnoDuckDuckGoTools
+from ddgs.exceptions import RatelimitException, TimeoutException
+
+from app.rate_limit import rate_limiter
+from app.search_cache import search_cache
+
+# Errors worth retrying after a backoff; anything else goes back to the model
+RETRYABLE = (RatelimitException, TimeoutException)
+
+# Reciprocal rank fusion constant: dampens the weight of the top few ranks of a single query
+RRF_K = 60
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref_src")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a result URL for de-duplication.
+
+    Lowercases the scheme and host, drops "www.", the fragment, tracking parameters and a trailing
+    slash, so the same article found by different queries collapses to one result.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    return urlunsplit(
+        (
+            "https" if parts.scheme in ("http", "https") else parts.scheme,
+            host,
+            parts.path.rstrip("/"),
+            urlencode(query),
+            "",
+        )
+    )
+
+
+def merge_results(batches: Dict[str, List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """Merge per-query result lists into one list ranked by reciprocal rank fusion.
+
+    A URL found by several queries gets the sum of its per-query scores, so results that answer
+    more of the batch rank first.
+
+    Args:
+        batches: Results per query, each in the order the search engine returned them.
+        limit: Maximum number of merged results.
+
+    Returns:
+        The merged results, each with a "queries" list naming the queries that found it.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for query, results in batches.items():
+        for rank, result in enumerate(results):
+            url = result.get("href") or result.get("url")
+            if not url:
+                continue
+            key = normalize_url(url)
+            if key not in merged:
+                merged[key] = {**result, "queries": []}
+                scores[key] = 0.0
+            if query not in merged[key]["queries"]:
+                merged[key]["queries"].append(query)
+                scores[key] += 1.0 / (RRF_K + rank + 1)
+    ranked = sorted(merged, key=lambda key: scores[key], reverse=True)
+    return [merged[key] for key in ranked[:limit]]
+
+
+class DuckDuckGoTools(AgnoDuckDuckGoTools):
+    def __init__(self, *args: Any, enable_multi_search: bool = False, max_parallel: int = 4, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.max_parallel = max(1, max_parallel)
+        if enable_multi_search:
+            self.register(self.duckduckgo_multi_search)
+
+    def duckduckgo_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search DDGS for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The result from DDGS.
+        """
+        return search_cache.get_or_fetch(
+            "duckduckgo_search",
+            query,
+            self._cache_params(max_results),
+            lambda: rate_limiter.call(
+                "duckduckgo", lambda: super(DuckDuckGoTools, self).duckduckgo_search(query, max_results), RETRYABLE
+            ),
+        )
+
+    def duckduckgo_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from DDGS.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from DDGS.
+        """
+        return search_cache.get_or_fetch(
+            "duckduckgo_news",
+            query,
+            self._cache_params(max_results),
+            lambda: rate_limiter.call(
+                "duckduckgo", lambda: super(DuckDuckGoTools, self).duckduckgo_news(query, max_results), RETRYABLE
+            ),
+            ttl_seconds=search_cache.settings.news_ttl_seconds,
+        )
+
+    def duckduckgo_multi_search(self, queries: List[str], max_results: int = 5) -> str:
+        """Use this function to run several DDGS searches at once. Prefer it over repeated
+        duckduckgo_search calls when you need more than one search.
+
+        Args:
+            queries (list[str]): The queries to search for, one per angle of the topic.
+            max_results (optional, default=5): The maximum number of results per query.
+
+        Returns:
+            One merged list of unique results ranked across all queries, with the queries that found each.
+        """
+        unique = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        errors: Dict[str, str] = {}
+
+        def run(query: str) -> List[Dict[str, Any]]:
+            results = json.loads(self.duckduckgo_search(query, max_results))
+            return results if isinstance(results, list) else []
+
+        # Cache hits return at once; misses still queue on the shared rate limit
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(unique) or 1)) as pool:
+            futures = {query: pool.submit(run, query) for query in unique}
+            for query, future in futures.items():
+                try:
+                    batches[query] = future.result()
+                except Exception as e:  # noqa: BLE001
+                    errors[query] = f"{type(e).__name__}: {e}"
+
+        results = merge_results(batches, limit=max_results * max(1, len(unique)))
+        return json.dumps({"queries": unique, "results": results, "errors": errors}, indent=2)
+
+    def _cache_params(self, max_results: int) -> dict:
+        return {
+            "max_results": self.fixed_max_results or max_results,
+            "modifier": self.modifier,
+            "backend": self.backend,
+        }
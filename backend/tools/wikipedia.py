@@ -0,0 +1,44 @@
+"""
+Wikipedia toolkit that serves from the offline mirror and shares the global Wikipedia rate limit.
+
+Drop-in replacement for agno's WikipediaTools with the same tool name, parameters, docstring and
+result format. With WIKIPEDIA_MIRROR_PATH set, queries are answered from the local SQLite mirror
+(tools.wikipedia_mirror); topics it lacks go to wikipedia.org unless the online fallback is off.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+import requests
+from agno.knowledge.document import Document
+from agno.tools.wikipedia import WikipediaTools as AgnoWikipediaTools
+from wikipedia.exceptions import HTTPTimeoutError, PageError
+
+from app.rate_limit import rate_limiter
+from tools.wikipedia_mirror import WikipediaMirrorSettings, wikipedia_mirror
+
+# Errors worth retrying after a backoff; missing or ambiguous pages go back to the model
+RETRYABLE = (HTTPTimeoutError, requests.RequestException)
+
+
+class WikipediaTools(AgnoWikipediaTools):
+    def __init__(self, *args: Any, online_fallback: Optional[bool] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.mirror = wikipedia_mirror
+        self.online_fallback = WikipediaMirrorSettings().online_fallback if online_fallback is None else online_fallback
+
+    def search_wikipedia(self, query: str) -> str:
+        """Searches Wikipedia for a query.
+
+        :param query: The query to search for.
+        :return: Relevant documents from wikipedia.
+        """
+        if self.mirror is not None:
+            page = self.mirror.lookup(query)
+            if page is not None:
+                return json.dumps(Document(name=query, content=page.summary).to_dict())
+            if not self.online_fallback:
+                raise PageError(query)
+        return rate_limiter.call("wikipedia", lambda: super(WikipediaTools, self).search_wikipedia(query), RETRYABLE)
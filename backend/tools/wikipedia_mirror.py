@@ -0,0 +1,354 @@
+"""
+Offline Wikipedia mirror backed by SQLite FTS5.
+
+Ingests a MediaWiki XML dump (pages-articles*.xml[.bz2|.gz]) or a JSONL subset with one
+{"title", "text"} object per line into a single on-disk database: the page intro (what
+wikipedia.summary() returns), the plain text, redirects, and a porter-stemmed full-text index
+over title and text. tools.wikipedia serves search_wikipedia from it when WIKIPEDIA_MIRROR_PATH
+is set, so the research workflow can run without network access or Wikipedia rate limits.
+
+Usage:
+    python -m tools.wikipedia_mirror ingest enwiki-latest-pages-articles1.xml.bz2 --db data/wikipedia.db
+    python -m tools.wikipedia_mirror search "renewable energy storage" --db data/wikipedia.db
+"""
+
+from __future__ import annotations
+
+import argparse
+import bz2
+import gzip
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, cast
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from modules.metrics import summarize_ms
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    summary TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS redirects (
+    title TEXT PRIMARY KEY COLLATE NOCASE,
+    target TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    title, content, content='pages', content_rowid='id', tokenize='porter unicode61'
+);
+"""
+
+# Title matches weigh more than body matches when ranking (bm25 column weights)
+TITLE_WEIGHT = 10.0
+# A page matching only some of the query's terms must share at least this many, and this share, of them
+MIN_SHARED_TERMS = 2
+MIN_SHARED_SHARE = 0.5
+# Best any-term matches checked against those minimums
+PARTIAL_CANDIDATES = 20
+# Question and filler words left out of full-text queries
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or tell the to was what when where "
+    "which who why with work works".split()
+)
+
+
+class WikipediaMirrorSettings(BaseSettings):
+    """Mirror settings loaded from WIKIPEDIA_MIRROR_* environment variables."""
+
+    # SQLite database built by `python -m tools.wikipedia_mirror ingest`; empty disables the mirror
+    path: str = ""
+    # Ask wikipedia.org for topics the mirror does not have (off for fully offline runs)
+    online_fallback: bool = True
+    # SQLite memory-mapped I/O size per connection
+    mmap_bytes: int = 256 * 1024 * 1024
+
+    model_config = SettingsConfigDict(env_prefix="WIKIPEDIA_MIRROR_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class MirrorPage:
+    title: str
+    summary: str
+    content: str
+
+
+# ************* Wikitext to plain text *************
+
+_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+_REFS = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+_TEMPLATES = re.compile(r"\{\{[^{}]*\}\}")
+_TABLES = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+_FILE_LINKS = re.compile(r"\[\[(?:File|Image|Category):(?:[^\[\]]|\[\[[^\[\]]*\]\])*\]\]", re.IGNORECASE)
+_LINKS = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_EXTERNAL_LINKS = re.compile(r"\[https?://[^\s\]]+\s?([^\]]*)\]")
+_EMPHASIS = re.compile(r"'{2,}")
+_HEADING = re.compile(r"^\s*(=+)\s*(.*?)\s*\1\s*$", re.MULTILINE)
+
+
+def strip_wikitext(text: str) -> str:
+    """Reduce wikitext to readable plain text, keeping section headings as their own lines."""
+    text = _COMMENTS.sub("", text)
+    text = _REFS.sub("", text)
+    previous = None
+    while previous != text:  # templates nest
+        previous, text = text, _TEMPLATES.sub("", text)
+    text = _TABLES.sub("", text)
+    text = _FILE_LINKS.sub("", text)
+    text = _LINKS.sub(r"\1", text)
+    text = _EXTERNAL_LINKS.sub(r"\1", text)
+    text = _TAGS.sub("", text)
+    text = _EMPHASIS.sub("", text)
+    text = _HEADING.sub(r"\n== \2 ==\n", text)
+    paragraphs = [" ".join(paragraph.split()) for paragraph in re.split(r"\n\s*\n", text)]
+    return "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def intro(text: str) -> str:
+    """The lead section of a plain-text page: everything before the first heading."""
+    lead = text.split("\n\n== ", 1)[0].strip()
+    return lead if not lead.startswith("== ") else ""
+
+
+# ************* Dump readers *************
+
+
+def _open(path: Path) -> IO[bytes]:
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rb")
+    if path.suffix == ".gz":
+        return cast(IO[bytes], gzip.open(path, "rb"))
+    return open(path, "rb")
+
+
+def read_xml_dump(path: Path) -> Iterator[Tuple[str, Optional[str], str]]:
+    """Yield (title, redirect target or None, wikitext) for every main-namespace page of a dump."""
+    with _open(path) as stream:
+        title: Optional[str] = None
+        namespace: Optional[str] = None
+        redirect: Optional[str] = None
+        text = ""
+        events = ElementTree.iterparse(stream, events=("start", "end"))
+        _, root = next(events)
+        for event, element in events:
+            if event != "end":
+                continue
+            tag = element.tag.rsplit("}", 1)[-1]
+            if tag == "title":
+                title = element.text
+            elif tag == "ns":
+                namespace = element.text
+            elif tag == "redirect":
+                redirect = element.get("title")
+            elif tag == "text":
+                text = element.text or ""
+            elif tag == "page":
+                if title and namespace == "0":
+                    yield title, redirect, text
+                title = namespace = redirect = None
+                text = ""
+                # The root keeps every parsed page as a child; drop them so memory stays flat over a whole dump
+                root.clear()
+
+
+def read_jsonl(path: Path) -> Iterator[Tuple[str, Optional[str], str]]:
+    """Yield (title, None, plain text) from a JSONL file of {"title", "text"} objects."""
+    with _open(path) as stream:
+        for line in stream:
+            if line.strip():
+                record = json.loads(line)
+                yield record["title"], None, record["text"]
+
+
+# ************* Mirror *************
+
+
+class WikipediaMirror:
+    """Read-mostly SQLite mirror; one connection per thread, memory-mapped reads."""
+
+    def __init__(self, path: str, mmap_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"lookups": 0, "hits": 0, "misses": 0}
+        self._lookup_seconds: List[float] = []
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def ingest(self, pages: Iterable[Tuple[str, Optional[str], str]], wikitext: bool = True, batch: int = 1000) -> int:
+        """
+        Add pages and redirects to the mirror, replacing pages with the same title.
+
+        Args:
+            pages: (title, redirect target or None, text) tuples, e.g. from read_xml_dump()
+            wikitext: Whether the text is wikitext (dumps) or already plain text (JSONL)
+            batch: Pages per transaction
+
+        Returns:
+            int: Number of pages (not counting redirects) ingested
+        """
+        conn = self._connection()
+        count = 0
+        pending: List[Tuple[str, str, str]] = []
+        redirects: List[Tuple[str, str]] = []
+
+        def flush() -> None:
+            with conn:
+                for title, summary, content in pending:
+                    old = conn.execute("SELECT id, title, content FROM pages WHERE title = ?", (title,)).fetchone()
+                    if old is not None:
+                        conn.execute(
+                            "INSERT INTO pages_fts(pages_fts, rowid, title, content) VALUES('delete', ?, ?, ?)", old
+                        )
+                        conn.execute("DELETE FROM pages WHERE id = ?", (old[0],))
+                    cursor = conn.execute(
+                        "INSERT INTO pages(title, summary, content) VALUES(?, ?, ?)", (title, summary, content)
+                    )
+                    conn.execute(
+                        "INSERT INTO pages_fts(rowid, title, content) VALUES(?, ?, ?)",
+                        (cursor.lastrowid, title, content),
+                    )
+                conn.executemany("INSERT OR REPLACE INTO redirects(title, target) VALUES(?, ?)", redirects)
+            pending.clear()
+            redirects.clear()
+
+        for title, redirect, text in pages:
+            if redirect:
+                redirects.append((title, redirect))
+            else:
+                content = strip_wikitext(text) if wikitext else text.strip()
+                pending.append((title, intro(content) if wikitext else content.split("\n\n", 1)[0], content))
+                count += 1
+            if len(pending) + len(redirects) >= batch:
+                flush()
+        flush()
+        with conn:
+            conn.execute("INSERT INTO pages_fts(pages_fts) VALUES('optimize')")
+        return count
+
+    def page(self, title: str) -> Optional[MirrorPage]:
+        """Exact (case-insensitive) title lookup, following one redirect."""
+        conn = self._connection()
+        row = conn.execute("SELECT title, summary, content FROM pages WHERE title = ?", (title,)).fetchone()
+        if row is None:
+            target = conn.execute("SELECT target FROM redirects WHERE title = ?", (title,)).fetchone()
+            if target is not None:
+                row = conn.execute("SELECT title, summary, content FROM pages WHERE title = ?", target).fetchone()
+        return MirrorPage(*row) if row is not None else None
+
+    def _match(self, conn: sqlite3.Connection, match: str, limit: int) -> List[Tuple[int, str]]:
+        return conn.execute(
+            f"SELECT rowid, title FROM pages_fts WHERE pages_fts MATCH ? ORDER BY bm25(pages_fts, {TITLE_WEIGHT}, 1.0) "
+            "LIMIT ?",
+            (match, limit),
+        ).fetchall()
+
+    def search(self, query: str, limit: int = 5) -> List[str]:
+        """
+        Titles of the best full-text matches for a query.
+
+        Pages matching all of the query's terms come first. If there are none, a page matching only
+        some terms counts when it shares at least MIN_SHARED_TERMS of them and MIN_SHARED_SHARE of the
+        query, so a single shared word ("power", "electricity") does not stand in for the topic.
+
+        Args:
+            query: Free-text query; stopwords are left out
+            limit: Most titles to return
+
+        Returns:
+            List[str]: Matching titles, best first; empty when no page matches closely enough
+        """
+        words = re.findall(r"\w+", query)
+        terms = [word for word in words if word.lower() not in STOPWORDS] or words
+        if not terms:
+            return []
+        conn = self._connection()
+        quoted = [f'"{term}"' for term in terms]
+        rows = self._match(conn, " ".join(quoted), limit)
+        if rows or len(terms) < MIN_SHARED_TERMS:
+            return [title for _, title in rows]
+
+        candidates = self._match(conn, " OR ".join(quoted), max(limit, PARTIAL_CANDIDATES))
+        if not candidates:
+            return []
+        rowids = ",".join(str(rowid) for rowid, _ in candidates)
+        shared: Dict[int, int] = {}
+        for term in quoted:
+            for (rowid,) in conn.execute(
+                f"SELECT rowid FROM pages_fts WHERE pages_fts MATCH ? AND rowid IN ({rowids})", (term,)
+            ):
+                shared[rowid] = shared.get(rowid, 0) + 1
+        needed = max(MIN_SHARED_TERMS, math.ceil(len(terms) * MIN_SHARED_SHARE))
+        return [title for rowid, title in candidates if shared.get(rowid, 0) >= needed][:limit]
+
+    def lookup(self, query: str) -> Optional[MirrorPage]:
+        """The page for a search_wikipedia query: the exact title if it exists, else the best match."""
+        started = time.perf_counter()
+        page = self.page(query.strip())
+        if page is None:
+            titles = self.search(query, limit=1)
+            page = self.page(titles[0]) if titles else None
+        with self._lock:
+            self._counters["lookups"] += 1
+            self._counters["hits" if page is not None else "misses"] += 1
+            self._lookup_seconds = self._lookup_seconds[-9999:] + [time.perf_counter() - started]
+        return page
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            status: Dict[str, Any] = {"path": self.path, **self._counters}
+            status["lookup_ms"] = summarize_ms(self._lookup_seconds)
+        status["pages"] = self._connection().execute("SELECT count(*) FROM pages").fetchone()[0]
+        return status
+
+
+def _build_mirror() -> Optional[WikipediaMirror]:
+    settings = WikipediaMirrorSettings()
+    return WikipediaMirror(settings.path, settings.mmap_bytes) if settings.path else None
+
+
+# Global mirror used by tools.wikipedia; None unless WIKIPEDIA_MIRROR_PATH is set
+wikipedia_mirror = _build_mirror()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["ingest", "search"])
+    parser.add_argument("source", help="dump or JSONL file to ingest, or the query to search for")
+    parser.add_argument("--db", default=WikipediaMirrorSettings().path or "wikipedia.db")
+    args = parser.parse_args()
+
+    mirror = WikipediaMirror(args.db)
+    if args.command == "ingest":
+        source = Path(args.source)
+        is_jsonl = ".jsonl" in source.suffixes
+        started = time.perf_counter()
+        count = mirror.ingest(read_jsonl(source) if is_jsonl else read_xml_dump(source), wikitext=not is_jsonl)
+        print(f"Ingested {count} pages into {args.db} in {time.perf_counter() - started:.1f}s")
+    else:
+        for title in mirror.search(args.source):
+            print(title)
+        page = mirror.lookup(args.source)
+        print(f"\n{page.title}\n{page.summary}" if page is not None else "\nNo page found")
+
+
+if __name__ == "__main__":
+    main()
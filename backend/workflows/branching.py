@@ -0,0 +1,42 @@
+"""
+Mutually exclusive branches for workflows.
+
+agno's Condition has no else branch, so a "deep or basic" choice written as a Condition followed by
+an unconditional step runs both whenever the condition holds. if_else() builds the choice as a
+Router instead: exactly one of the two branches runs.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional
+
+from agno.workflow.router import Router
+from agno.workflow.step import Step
+from agno.workflow.types import StepInput
+
+
+def if_else(
+    name: str,
+    evaluator: Callable[[StepInput], bool],
+    then: Step,
+    otherwise: Step,
+    description: Optional[str] = None,
+) -> Router:
+    """
+    Run `then` when the evaluator holds for the step input, otherwise run `otherwise`.
+
+    Args:
+        name: Name of the branch in the workflow
+        evaluator: Predicate on the step input, as for a Condition
+        then: Step run when the evaluator returns True
+        otherwise: Step run when it returns False
+        description: Optional description shown for the branch
+
+    Returns:
+        Router: A workflow step that runs exactly one of the two branches
+    """
+
+    def select(step_input: StepInput) -> List[Any]:
+        return [then] if evaluator(step_input) else [otherwise]
+
+    return Router(name=name, description=description, selector=select, choices=[then, otherwise])
@@ -0,0 +1,241 @@
+"""
+Step checkpoints for the workflows' step graphs.
+
+A failure late in a workflow (an Ollama timeout in the portfolio strategy) used to throw away
+minutes of finished research and analysis, and a retry redid all of it. Every node of a StepGraph
+with checkpoints now stores its StepOutput in Postgres as soon as it succeeds, keyed by a hash of
+the workflow input, the node and the upstream content it read, together with the id of the run
+that produced it. Running the same input again within the TTL, whether to retry a failed or
+interrupted run or as a new request, restores the finished nodes instead of calling the model and
+runs only the rest. A node whose upstream content changed gets a new key, so restored results
+always match the inputs they were computed from.
+
+agno agents do not raise when the model call fails: the run ends with an error status and the
+error message as its content. Step executors run their agents through run_agent() (streamed runs
+through workflows.quality.stream_agent(), which checks their events the same way), which raises
+instead, so the step is retried and a failure is never saved as a finished step.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from agno.agent import Agent
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.workflow.types import StepInput, StepOutput
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import Column, DateTime, Float, MetaData, String, Table, Text, and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateSchema
+
+from workflows.usage import record_usage
+
+log = logging.getLogger("app")
+
+
+class CheckpointSettings(BaseSettings):
+    """Workflow checkpoint settings loaded from WORKFLOW_CHECKPOINT_* environment variables."""
+
+    enabled: bool = True
+    # How long finished steps can be resumed or reused by a run with the same input
+    ttl_seconds: int = 3600
+    db_schema: str = "ai"
+
+    model_config = SettingsConfigDict(env_prefix="WORKFLOW_CHECKPOINT_", case_sensitive=False)
+
+
+async def run_agent(agent: Agent, prompt: str) -> RunOutput:
+    """Run a step's agent, raising if the run ended in an error or was cancelled."""
+    result = await agent.arun(prompt)
+    if result.status in (RunStatus.error, RunStatus.cancelled):
+        raise RuntimeError(f"{agent.name} run {result.status.value.lower()}: {result.content}")
+    record_usage(result.metrics)
+    return result
+
+
+def _hash(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def input_hash(workflow: str, step_input: StepInput) -> str:
+    """Hash the workflow (graph) name and the run's input."""
+    return _hash({"workflow": workflow, "input": step_input.get_input_as_string()})
+
+
+def checkpoint_key(input_hash: str, node: str, upstream: Dict[str, Any]) -> str:
+    """Hash a node of a run with the given input and the content of the nodes it reads."""
+    return _hash({"input": input_hash, "node": node, "upstream": upstream})
+
+
+class PostgresCheckpointStore:
+    """One row per finished node, with the run that produced it and an expiry."""
+
+    def __init__(self, engine: Engine, schema: str):
+        self.engine = engine
+        self.schema = schema
+        self.table = Table(
+            "workflow_checkpoints",
+            MetaData(schema=schema),
+            Column("key", String(64), primary_key=True),
+            Column("run_id", String(64), nullable=False, index=True),
+            Column("input_hash", String(64), nullable=False, index=True),
+            Column("workflow", String(255), nullable=False),
+            Column("node", String(255), nullable=False),
+            Column("output", Text, nullable=False),
+            # How long the node took, credited as saved time when it is restored
+            Column("seconds", Float, nullable=False),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+        )
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _ensure_table(self) -> None:
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(CreateSchema(self.schema, if_not_exists=True))
+                self.table.create(conn, checkfirst=True)
+            self._ready = True
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the live row for a key (run_id, output, seconds), if any."""
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(self.table.c.run_id, self.table.c.output, self.table.c.seconds).where(
+                    and_(self.table.c.key == key, self.table.c.expires_at > now)
+                )
+            ).first()
+
+    def put(self, key: str, values: Dict[str, Any], ttl_seconds: int) -> None:
+        """Upsert a node's checkpoint and evict expired rows."""
+        self._ensure_table()
+        now = datetime.now(timezone.utc)
+        values = {**values, "key": key, "created_at": now, "expires_at": now + timedelta(seconds=ttl_seconds)}
+        statement = insert(self.table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_={name: statement.excluded[name] for name in values if name != "key"},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= now))
+
+    def size(self) -> Dict[str, int]:
+        self._ensure_table()
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(self.table.c.workflow, func.count()).group_by(self.table.c.workflow)).all()
+        return {workflow: int(count) for workflow, count in rows}
+
+
+class WorkflowCheckpoints:
+    """Saves and restores the finished nodes of step graph runs."""
+
+    def __init__(self, settings: CheckpointSettings, store: Optional[PostgresCheckpointStore] = None):
+        self.settings = settings
+        self.store = store
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.restored = 0
+        self.errors = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled and self.store is not None
+
+    def load(self, key: str, workflow: str, node: str, run_id: Optional[str]) -> Optional[StepOutput]:
+        """Return the checkpointed output of a node, or None to run it."""
+        if not self.enabled:
+            return None
+        assert self.store is not None
+        try:
+            row = self.store.get(key)
+            if row is None:
+                return None
+            output = StepOutput.from_dict(json.loads(row.output))
+        except Exception as e:  # noqa: BLE001
+            self._count_error()
+            log.warning(f"Checkpoint lookup failed, running {node} again: {e}")
+            return None
+        with self._lock:
+            self.restored += 1
+            self.saved_seconds += row.seconds
+        log.info(f"Restored {workflow} / {node} from run {row.run_id} into run {run_id}")
+        return output
+
+    def save(
+        self,
+        key: str,
+        workflow: str,
+        node: str,
+        run_id: Optional[str],
+        input_hash: str,
+        output: StepOutput,
+        seconds: float,
+    ) -> None:
+        if not self.enabled or not output.success:
+            return
+        assert self.store is not None
+        values = {
+            "run_id": run_id or "",
+            "input_hash": input_hash,
+            "workflow": workflow,
+            "node": node,
+            "output": json.dumps(output.to_dict(), default=str),
+            "seconds": seconds,
+        }
+        try:
+            self.store.put(key, values, self.settings.ttl_seconds)
+        except Exception as e:  # noqa: BLE001
+            self._count_error()
+            log.warning(f"Checkpoint store failed for {workflow} / {node}: {e}")
+            return
+        with self._lock:
+            self.saved += 1
+
+    def _count_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            status: Dict[str, Any] = {
+                "enabled": self.enabled,
+                "saved": self.saved,
+                "restored": self.restored,
+                "errors": self.errors,
+                "saved_seconds": round(self.saved_seconds, 3),
+            }
+        if self.store is not None:
+            try:
+                status["postgres_rows"] = self.store.size()
+            except Exception as e:  # noqa: BLE001
+                status["postgres_error"] = str(e)
+        return status
+
+
+def _build_workflow_checkpoints() -> WorkflowCheckpoints:
+    settings = CheckpointSettings()
+    store = None
+    if settings.enabled:
+        from db.session import db_engine
+
+        store = PostgresCheckpointStore(db_engine, settings.db_schema)
+    return WorkflowCheckpoints(settings, store)
+
+
+# Global checkpoints shared by the workflows' step graphs
+workflow_checkpoints = _build_workflow_checkpoints()
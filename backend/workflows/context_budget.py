@@ -0,0 +1,267 @@
+"""
+Token budget for the upstream step outputs pasted into step prompts.
+
+portfolio_strategy_step and report_writing_step paste the full research and analysis outputs into
+one prompt, and the analysis steps paste the full research. Every upstream output repeats the
+original request under its own header, the analysis often quotes the research, and the research
+grows with each loop iteration, so these prompts can outgrow the model's context window
+(OLLAMA_NUM_CTX) and prompt evaluation time grows with them. fit_context() drops blocks that repeat
+the request or text already included, then trims the remaining sections to a token budget:
+sections that fit their fair share are kept whole, and the others keep their headers, source
+lines and figures first, then their leading paragraphs. Every step logs its prompt's token count
+through log_prompt().
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from agno.utils.tokens import count_text_tokens
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from app.models import ModelSettings
+
+log = logging.getLogger("app")
+
+# Paragraphs shorter than this are never dropped as duplicates (list bullets, "N/A", ...)
+MIN_DUPLICATE_CHARS = 80
+OMITTED = "[...]"
+HEADER = re.compile(r"^#{1,6}\s")
+URL = re.compile(r"https?://")
+FIGURE = re.compile(r"\d")
+STEP_FIELDS = (
+    "prompts",
+    "prompt_tokens",
+    "last_prompt_tokens",
+    "max_prompt_tokens",
+    "deduped_tokens",
+    "trimmed_tokens",
+    "trimmed_sections",
+)
+
+
+class PromptBudgetSettings(BaseSettings):
+    """Step prompt budget settings loaded from PROMPT_BUDGET_* environment variables."""
+
+    enabled: bool = True
+    # Tokens the upstream sections of one step prompt may use together; leave room in OLLAMA_NUM_CTX
+    # for the system prompt, tool definitions, the step's instructions and the answer
+    context_tokens: int = 3072
+
+    model_config = SettingsConfigDict(env_prefix="PROMPT_BUDGET_", case_sensitive=False)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+@dataclass
+class Block:
+    """A markdown header and the paragraphs under it."""
+
+    header: Optional[str]
+    paragraphs: List[str]
+
+
+def split_blocks(text: str) -> List[Block]:
+    blocks = [Block(None, [])]
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        lines = [line.rstrip() for line in paragraph.strip().split("\n")]
+        # A header may be followed directly by its first paragraph
+        while lines and HEADER.match(lines[0].strip()):
+            blocks.append(Block(lines.pop(0).strip(), []))
+        body = "\n".join(lines).strip()
+        if body:
+            blocks[-1].paragraphs.append(body)
+    return [block for block in blocks if block.header or block.paragraphs]
+
+
+def join_blocks(blocks: List[Block]) -> str:
+    parts: List[str] = []
+    for block in blocks:
+        parts.extend(([block.header] if block.header else []) + block.paragraphs)
+    return "\n\n".join(parts)
+
+
+def dedupe(sections: Dict[str, str], request: str) -> Dict[str, str]:
+    """
+    Drop what the prompt already contains from the upstream sections.
+
+    Removes blocks whose body is the request (the "## Investment Request" of every upstream
+    output; the step prompt states the request itself) and paragraphs that appeared in an earlier
+    section or earlier in the same section.
+    """
+    seen = set()
+    request_text = normalize(request)
+    deduped: Dict[str, str] = {}
+    for name, text in sections.items():
+        kept: List[Block] = []
+        for block in split_blocks(text):
+            if block.paragraphs and normalize("\n".join(block.paragraphs)) == request_text:
+                continue
+            paragraphs = []
+            for paragraph in block.paragraphs:
+                key = normalize(paragraph)
+                if len(key) >= MIN_DUPLICATE_CHARS and key in seen:
+                    continue
+                seen.add(key)
+                paragraphs.append(paragraph)
+            if paragraphs or block.header:
+                kept.append(Block(block.header, paragraphs))
+        # Drop headers left with nothing under them
+        kept = [block for i, block in enumerate(kept) if block.paragraphs or _has_body_below(kept, i)]
+        deduped[name] = join_blocks(kept)
+    return deduped
+
+
+def _has_body_below(blocks: List[Block], index: int) -> bool:
+    """Whether a header-only block introduces deeper headers that still have content."""
+    header = blocks[index].header or ""
+    level = len(header) - len(header.lstrip("#"))
+    for block in blocks[index + 1 :]:
+        block_level = len(block.header or "") - len((block.header or "").lstrip("#"))
+        if block_level <= level:
+            return False
+        if block.paragraphs:
+            return True
+    return False
+
+
+def allocate(tokens: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Split a budget so sections under their fair share keep all their tokens and the rest share the remainder."""
+    shares: Dict[str, int] = {}
+    remaining = dict(tokens)
+    left = budget
+    while remaining:
+        share = left // len(remaining)
+        small = {name: count for name, count in remaining.items() if count <= share}
+        if not small:
+            shares.update(dict.fromkeys(remaining, share))
+            break
+        for name, count in small.items():
+            shares[name] = count
+            left -= count
+            del remaining[name]
+    return shares
+
+
+class PromptBudget:
+    """Fits step prompt sections to a token budget and keeps per-step prompt sizes."""
+
+    def __init__(self, settings: PromptBudgetSettings, model_id: str):
+        self.settings = settings
+        self.model_id = model_id
+        self._lock = threading.Lock()
+        self.steps: Dict[str, Dict[str, int]] = {}
+
+    def count(self, text: str) -> int:
+        return count_text_tokens(text, self.model_id)
+
+    def trim(self, text: str, budget: int) -> str:
+        """
+        Keep the most useful paragraphs of a section within a token budget, in their original order.
+
+        Headers come first, then paragraphs with source URLs, then paragraphs with figures, each
+        group from the top of the section down; gaps are marked with [...].
+        """
+        units = []
+        for block in split_blocks(text):
+            if block.header:
+                units.append((0, block.header))
+            for paragraph in block.paragraphs:
+                units.append((1 if URL.search(paragraph) else 2 if FIGURE.search(paragraph) else 3, paragraph))
+
+        tokens = [self.count(unit) for _, unit in units]
+        order = sorted(range(len(units)), key=lambda i: (units[i][0], i))
+        target = budget
+        # Separators and [...] markers cost tokens too; tighten the target until the joined text fits
+        for _ in range(4):
+            keep = set()
+            used = 0
+            for index in order:
+                if used + tokens[index] <= target:
+                    keep.add(index)
+                    used += tokens[index]
+            if not keep and units:
+                # Not even one paragraph fits; cut the first one
+                return units[0][1][: max(0, budget) * 4] + f" {OMITTED}"
+            parts: List[str] = []
+            for index, (_, unit) in enumerate(units):
+                if index in keep:
+                    parts.append(unit)
+                elif not parts or parts[-1] != OMITTED:
+                    parts.append(OMITTED)
+            trimmed = "\n\n".join(parts)
+            over = self.count(trimmed) - budget
+            if over <= 0:
+                break
+            target -= over
+        return trimmed
+
+    def fit(self, step: str, request: str, sections: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Dedupe the upstream sections of a step prompt and trim them to the context budget.
+
+        Args:
+            step: Step name, for the log and metrics
+            request: The user's request, which the step prompt states itself
+            sections: Upstream content by name, e.g. {"Market Research": ..., "Financial Analysis": ...}
+
+        Returns:
+            Dict[str, str]: The sections to paste into the prompt, under the same names
+        """
+        texts = {name: "" if content is None else str(content) for name, content in sections.items()}
+        if not self.settings.enabled:
+            return texts
+        before = {name: self.count(text) for name, text in texts.items()}
+        texts = dedupe(texts, request)
+        deduped = {name: self.count(text) for name, text in texts.items()}
+        shares = allocate(deduped, self.settings.context_tokens)
+        fitted = {
+            name: text if deduped[name] <= shares[name] else self.trim(text, shares[name])
+            for name, text in texts.items()
+        }
+        after = {name: self.count(text) for name, text in fitted.items()}
+        log.info(
+            f"{step} context: "
+            + ", ".join(f"{name} {before[name]} -> {after[name]} tokens" for name in fitted)
+            + f" (budget {self.settings.context_tokens})"
+        )
+        with self._lock:
+            stats = self._step(step)
+            stats["deduped_tokens"] += sum(before.values()) - sum(deduped.values())
+            stats["trimmed_tokens"] += sum(deduped.values()) - sum(after.values())
+            stats["trimmed_sections"] += sum(1 for name in fitted if after[name] < deduped[name])
+        return fitted
+
+    def log_prompt(self, step: str, prompt: str) -> str:
+        """Log and record the token count of a step prompt; returns the prompt unchanged."""
+        tokens = self.count(prompt)
+        log.info(f"{step} prompt: {tokens} tokens")
+        with self._lock:
+            stats = self._step(step)
+            stats["prompts"] += 1
+            stats["prompt_tokens"] += tokens
+            stats["last_prompt_tokens"] = tokens
+            stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], tokens)
+        return prompt
+
+    def _step(self, step: str) -> Dict[str, int]:
+        return self.steps.setdefault(step, dict.fromkeys(STEP_FIELDS, 0))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = {step: dict(stats) for step, stats in self.steps.items()}
+        for stats in steps.values():
+            stats["avg_prompt_tokens"] = round(stats["prompt_tokens"] / stats["prompts"]) if stats["prompts"] else 0
+        return {"settings": self.settings.model_dump(), "model_id": self.model_id, "steps": steps}
+
+
+# Global budget shared by every workflow step
+prompt_budget = PromptBudget(PromptBudgetSettings(), ModelSettings().model_id)
+fit_context = prompt_budget.fit
+log_prompt = prompt_budget.log_prompt
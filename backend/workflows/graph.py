@@ -0,0 +1,427 @@
+"""
+Dependency-graph scheduling for workflow steps.
+
+A plain workflow runs its steps one after another, even when a step does not read the output of
+the one before it: the investment workflow parses the request and only then starts the market
+research, although the research never looks at the parsed request. A StepGraph lists the same
+steps as nodes that name the nodes they read (the get_step_content() calls of their executors),
+and starts every node as soon as those have finished. Each run records when every node started and
+ended, the critical path through the graph, and how long the same nodes would have taken one by one.
+A streamed run forwards its nodes' events as they happen, including the tokens their executors
+stream (workflows.streaming) and a started/completed event per node, and records the time to its
+first token.
+With checkpoints (workflows.checkpoint), finished nodes are saved as they complete and restored
+instead of run again when the same input comes back, e.g. to retry a run that failed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from agno.run.agent import RunEvent
+from agno.run.workflow import StepCompletedEvent, StepStartedEvent
+from agno.workflow import workflow as agno_workflow
+from agno.workflow.steps import Steps
+from agno.workflow.types import StepInput, StepOutput, StepType
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from modules.metrics import Histogram
+from workflows.checkpoint import WorkflowCheckpoints, checkpoint_key, input_hash
+from workflows.streaming import token_sink
+
+log = logging.getLogger("app")
+
+# Upper bounds in seconds for the time saved per run
+SAVED_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class WorkflowGraphSettings(BaseSettings):
+    """Step graph settings loaded from WORKFLOW_GRAPH_* environment variables."""
+
+    # Run the workflows as dependency graphs; off runs their steps one after another
+    enabled: bool = True
+
+    model_config = SettingsConfigDict(env_prefix="WORKFLOW_GRAPH_", case_sensitive=False)
+
+
+@dataclass(frozen=True)
+class Node:
+    """A workflow step in a graph, and the nodes whose output it reads."""
+
+    # Name other nodes' executors pass to get_step_content()
+    name: str
+    step: Any
+    needs: Tuple[str, ...] = ()
+
+
+def final_content(output: StepOutput) -> Any:
+    """Content of the innermost last step of an output (a Loop's last iteration, a Router's choice)."""
+    while output.steps:
+        output = output.steps[-1]
+    return output.content
+
+
+@dataclass
+class GraphTiming:
+    """When each node of one graph run started and ended."""
+
+    graph: str
+    needs: Dict[str, Tuple[str, ...]]
+    spans: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    # Nodes restored from checkpoints instead of run
+    restored: List[str] = field(default_factory=list)
+
+    @property
+    def serial_seconds(self) -> float:
+        return sum(ended - started for started, ended in self.spans.values())
+
+    @property
+    def wall_seconds(self) -> float:
+        if not self.spans:
+            return 0.0
+        return max(ended for _, ended in self.spans.values()) - min(started for started, _ in self.spans.values())
+
+    def critical_path(self) -> List[str]:
+        """Nodes that set the run's length: the last to finish, then the last-finishing node it waited on."""
+        if not self.spans:
+            return []
+        path = [max(self.spans, key=lambda name: self.spans[name][1])]
+        while True:
+            needs = [need for need in self.needs[path[-1]] if need in self.spans]
+            if not needs:
+                return path[::-1]
+            path.append(max(needs, key=lambda name: self.spans[name][1]))
+
+    def report(self) -> Dict[str, Any]:
+        started = min((started for started, _ in self.spans.values()), default=0.0)
+        path = self.critical_path()
+        return {
+            "graph": self.graph,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "serial_seconds": round(self.serial_seconds, 3),
+            "critical_path": path,
+            "critical_path_seconds": round(sum(self.spans[name][1] - self.spans[name][0] for name in path), 3),
+            "restored": list(self.restored),
+            "nodes": {
+                name: {"start": round(start - started, 3), "end": round(end - started, 3)}
+                for name, (start, end) in self.spans.items()
+            },
+        }
+
+
+class GraphStats:
+    """Thread-safe counters for graph runs and the time saved over running their nodes one by one."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.runs: Dict[str, int] = {}
+        self.serial_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.last: Dict[str, Dict[str, Any]] = {}
+        self.saved = Histogram(SAVED_BUCKETS)
+        # Seconds from the start of a streamed run to the first token it forwarded
+        self.first_token = Histogram()
+
+    def record(self, timing: GraphTiming) -> Dict[str, Any]:
+        report = timing.report()
+        with self._lock:
+            self.runs[timing.graph] = self.runs.get(timing.graph, 0) + 1
+            self.serial_seconds += timing.serial_seconds
+            self.wall_seconds += timing.wall_seconds
+            self.last[timing.graph] = report
+        self.saved.observe(max(0.0, timing.serial_seconds - timing.wall_seconds))
+        log.info(
+            f"Step graph {timing.graph}: {report['wall_seconds']}s ({report['serial_seconds']}s one by one), "
+            f"critical path {' -> '.join(report['critical_path'])} ({report['critical_path_seconds']}s)"
+        )
+        return report
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": dict(self.runs),
+                "serial_seconds": round(self.serial_seconds, 3),
+                "wall_seconds": round(self.wall_seconds, 3),
+                "saved_seconds": round(max(0.0, self.serial_seconds - self.wall_seconds), 3),
+                "speedup": round(self.serial_seconds / self.wall_seconds, 2) if self.wall_seconds else None,
+                "saved_per_run": self.saved.snapshot(),
+                "first_token_seconds": self.first_token.snapshot(),
+                "last_run": dict(self.last),
+            }
+
+
+RunNode = Callable[[Node, StepInput], Awaitable[Optional[StepOutput]]]
+
+
+class StepGraph(Steps):
+    """
+    Steps that run as soon as the nodes they read from have finished.
+
+    Each node sees the workflow's input, the outputs of the nodes it needs under their node names,
+    and, as previous_step_content, the final content of its last need. Nodes may only need nodes
+    listed before them, so the declaration order is also a valid order to run them one by one.
+    The graph's content is the final content of its last node.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        nodes: Sequence[Node],
+        description: Optional[str] = None,
+        checkpoints: Optional[WorkflowCheckpoints] = None,
+    ):
+        seen: List[str] = []
+        for node in nodes:
+            unknown = [need for need in node.needs if need not in seen]
+            if unknown:
+                raise ValueError(f"Node {node.name!r} needs {unknown}, which are not listed before it")
+            seen.append(node.name)
+        super().__init__(name=name, description=description, steps=[node.step for node in nodes])
+        self.nodes = list(nodes)
+        self.checkpoints = checkpoints
+
+    def node_input(self, step_input: StepInput, node: Node, outputs: Dict[str, StepOutput]) -> StepInput:
+        upstream = {need: outputs[need] for need in node.needs}
+        return dataclasses.replace(
+            step_input,
+            previous_step_outputs={**(step_input.previous_step_outputs or {}), **upstream},
+            previous_step_content=(
+                final_content(upstream[node.needs[-1]]) if node.needs else step_input.previous_step_content
+            ),
+        )
+
+    async def schedule(
+        self, step_input: StepInput, run_node: RunNode, run_id: Optional[str] = None
+    ) -> Tuple[Dict[str, StepOutput], GraphTiming]:
+        """
+        Run every node once its needs are done, with all ready nodes running at the same time.
+
+        Args:
+            step_input: Input of the graph as a whole
+            run_node: Runs one node's step on the input built for it
+            run_id: Workflow run the checkpoints are saved for
+
+        Returns:
+            Tuple[Dict[str, StepOutput], GraphTiming]: Outputs by node name, in completion order,
+            and the timing of the run
+        """
+        timing = GraphTiming(self.name or "Steps", {node.name: node.needs for node in self.nodes})
+        outputs: Dict[str, StepOutput] = {}
+        waiting = list(self.nodes)
+        running: Dict[asyncio.Task, Node] = {}
+        stopped = False
+        checkpoints = self.checkpoints if self.checkpoints is not None and self.checkpoints.enabled else None
+        run_input = input_hash(timing.graph, step_input) if checkpoints is not None else ""
+
+        async def run(node: Node, node_input: StepInput) -> StepOutput:
+            started = time.perf_counter()
+            if checkpoints is None:
+                try:
+                    return await run_node(node, node_input) or StepOutput(step_name=node.name, content=None)
+                finally:
+                    timing.spans[node.name] = (started, time.perf_counter())
+
+            upstream = {need: final_content(outputs[need]) for need in node.needs}
+            key = checkpoint_key(run_input, node.name, upstream)
+            restored = await asyncio.to_thread(checkpoints.load, key, timing.graph, node.name, run_id)
+            if restored is not None:
+                timing.spans[node.name] = (started, time.perf_counter())
+                timing.restored.append(node.name)
+                return restored
+            try:
+                output = await run_node(node, node_input) or StepOutput(step_name=node.name, content=None)
+            finally:
+                timing.spans[node.name] = (started, time.perf_counter())
+            seconds = timing.spans[node.name][1] - started
+            await asyncio.to_thread(checkpoints.save, key, timing.graph, node.name, run_id, run_input, output, seconds)
+            return output
+
+        try:
+            while waiting or running:
+                ready = [] if stopped else [node for node in waiting if all(need in outputs for need in node.needs)]
+                for node in ready:
+                    waiting.remove(node)
+                    log.debug(f"Step graph {self.name}: starting {node.name}")
+                    running[asyncio.create_task(run(node, self.node_input(step_input, node, outputs)))] = node
+                if not running:
+                    break
+                done, _ = await asyncio.wait(set(running), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    outputs[node.name] = task.result()
+                    if outputs[node.name].stop:
+                        log.info(f"Early termination requested by {node.name}")
+                        stopped = True
+        finally:
+            for task in running:
+                task.cancel()
+        return outputs, timing
+
+    def graph_output(self, outputs: Dict[str, StepOutput], timing: GraphTiming) -> StepOutput:
+        graph_stats.record(timing)
+        last = outputs.get(self.nodes[-1].name)
+        results = [outputs[node.name] for node in self.nodes if node.name in outputs]
+        return StepOutput(
+            step_name=self.name,
+            step_id=str(uuid4()),
+            step_type=StepType.STEPS,
+            content=final_content(last) if last is not None else f"Steps {self.name} stopped early",
+            success=all(result.success for result in results),
+            stop=any(result.stop for result in results),
+            steps=results,
+        )
+
+    def failed_output(self, error: Exception) -> StepOutput:
+        log.error(f"Step graph {self.name} failed: {error}")
+        return StepOutput(
+            step_name=self.name or "Steps",
+            content=f"Steps execution failed: {error}",
+            success=False,
+            error=str(error),
+        )
+
+    # ************* Execution *************
+
+    def execute(self, step_input: StepInput, *args: Any, **kwargs: Any) -> StepOutput:
+        """Run the nodes' sync execute() in worker threads, as many at once as are ready."""
+        self._prepare_steps()
+
+        async def run_node(node: Node, node_input: StepInput) -> Optional[StepOutput]:
+            return _last_output(await asyncio.to_thread(node.step.execute, node_input, *args, **kwargs))
+
+        try:
+            return self.graph_output(*asyncio.run(self.schedule(step_input, run_node, _run_id(kwargs))))
+        except Exception as e:  # noqa: BLE001
+            return self.failed_output(e)
+
+    async def aexecute(self, step_input: StepInput, *args: Any, **kwargs: Any) -> StepOutput:
+        self._prepare_steps()
+
+        async def run_node(node: Node, node_input: StepInput) -> Optional[StepOutput]:
+            return _last_output(await node.step.aexecute(node_input, *args, **kwargs))
+
+        try:
+            return self.graph_output(*await self.schedule(step_input, run_node, _run_id(kwargs)))
+        except Exception as e:  # noqa: BLE001
+            return self.failed_output(e)
+
+    def execute_stream(self, step_input: StepInput, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """Sync streaming runs the graph without forwarding the nodes' events."""
+        kwargs = {key: value for key, value in kwargs.items() if key in _NON_STREAM_KWARGS}
+        yield self.execute(step_input, **kwargs)
+
+    async def aexecute_stream(self, step_input: StepInput, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """Stream the events and tokens of all running nodes as they arrive, then yield the graph's output."""
+        self._prepare_steps()
+        started = time.perf_counter()
+        first_token = True
+        graph_id = str(uuid4())
+        step_index = kwargs.pop("step_index", None)
+        kwargs.pop("parent_step_id", None)
+        position = {node.name: i for i, node in enumerate(self.nodes)}
+        events: asyncio.Queue = asyncio.Queue()
+        # Nodes are announced under their node names, the step names their executors' tokens carry
+        announce = _announce(kwargs, graph_id)
+
+        async def run_node(node: Node, node_input: StepInput) -> Optional[StepOutput]:
+            child_index = (step_index if step_index is not None else 1, position[node.name])
+            if isinstance(step_index, tuple):
+                child_index = step_index + (position[node.name],)
+            if announce is not None:
+                await events.put(StepStartedEvent(**announce, step_name=node.name, step_index=child_index))
+            output = None
+            async for event in node.step.aexecute_stream(
+                node_input, *args, step_index=child_index, parent_step_id=graph_id, **kwargs
+            ):
+                if isinstance(event, StepOutput):
+                    output = event
+                else:
+                    await events.put(event)
+            if announce is not None and output is not None:
+                await events.put(
+                    StepCompletedEvent(
+                        **announce,
+                        step_name=node.name,
+                        step_index=child_index,
+                        content=final_content(output),
+                        step_response=output,
+                    )
+                )
+            return output
+
+        # Node tasks inherit the sink, so their executors' tokens join the node events
+        with token_sink(events.put_nowait):
+            scheduled = asyncio.create_task(self.schedule(step_input, run_node, _run_id(kwargs)))
+        try:
+            while not scheduled.done() or not events.empty():
+                event = asyncio.ensure_future(events.get())
+                await asyncio.wait({event, scheduled}, return_when=asyncio.FIRST_COMPLETED)
+                if event.done():
+                    if first_token and getattr(event.result(), "event", None) == RunEvent.run_content.value:
+                        first_token = False
+                        graph_stats.first_token.observe(time.perf_counter() - started)
+                    yield event.result()
+                else:
+                    event.cancel()
+            try:
+                output = self.graph_output(*scheduled.result())
+            except Exception as e:  # noqa: BLE001
+                output = self.failed_output(e)
+            yield output
+        finally:
+            scheduled.cancel()
+
+
+# Keyword arguments of the non-streaming execute(); the rest only apply to streaming
+_NON_STREAM_KWARGS = {
+    "session_id",
+    "user_id",
+    "workflow_run_response",
+    "run_context",
+    "session_state",
+    "store_executor_outputs",
+    "workflow_session",
+    "add_workflow_history_to_steps",
+    "num_history_runs",
+    "background_tasks",
+}
+
+
+def _run_id(kwargs: Dict[str, Any]) -> Optional[str]:
+    run_context = kwargs.get("run_context") or kwargs.get("workflow_run_response")
+    return getattr(run_context, "run_id", None)
+
+
+def _announce(kwargs: Dict[str, Any], graph_id: str) -> Optional[Dict[str, Any]]:
+    """Fields of the node started/completed events of a streamed run, or None without stream_events."""
+    run = kwargs.get("workflow_run_response")
+    if not (kwargs.get("stream_events") or kwargs.get("stream_intermediate_steps")) or run is None:
+        return None
+    return {
+        "run_id": run.run_id or "",
+        "workflow_name": run.workflow_name or "",
+        "workflow_id": run.workflow_id or "",
+        "session_id": run.session_id or "",
+        "parent_step_id": graph_id,
+    }
+
+
+def _last_output(output: Any) -> Optional[StepOutput]:
+    if isinstance(output, list):
+        return output[-1] if output else None
+    return output
+
+
+# agno looks up step types by exact class when it describes a workflow (AgentOS /workflows)
+agno_workflow.STEP_TYPE_MAPPING[StepGraph] = StepType.STEPS
+
+# Global settings and stats shared by the workflows' step graphs
+workflow_graph_settings = WorkflowGraphSettings()
+graph_stats = GraphStats()
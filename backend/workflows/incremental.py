@@ -0,0 +1,178 @@
+"""
+Incremental quality loops for workflow steps.
+
+research_loop and market_research_loop repeat a step until its quality check passes. A plain agno
+Loop re-runs the step with the same prompt, so every iteration repeats all of its searches and
+regenerates the whole answer. An IncrementalLoop instead hands the next iteration the findings so
+far and the quality indicators they failed; steps that call refine() ask the agent to fill only
+those gaps and merge the new material into the previous findings. refine() streams each answer
+through the loop's gate (workflows/quality.py), which stops it once the findings pass and aborts
+it early when it is hopeless and another iteration is left.
+"""
+
+from __future__ import annotations
+
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from agno.agent import Agent
+from agno.workflow import workflow as agno_workflow
+from agno.workflow.loop import Loop
+from agno.workflow.types import StepOutput, StepType
+
+from workflows.context_budget import fit_context, log_prompt
+from workflows.quality import Gate, stream_agent
+
+log = logging.getLogger("app")
+
+
+class QualityGate(Gate):
+    """End condition that passes when enough indicators hold for the latest output."""
+
+    def __call__(self, outputs: List[StepOutput]) -> bool:
+        if not outputs:
+            return False
+        content = str(outputs[-1].content or "")
+        refinement = current_refinement.get()
+        if refinement is not None:
+            refinement.last_output = content
+        return self.passed(content)
+
+
+@dataclass
+class Refinement:
+    """What one execution of an IncrementalLoop has produced so far."""
+
+    gate: QualityGate
+    # Merged agent answers of the previous iterations
+    findings: Optional[str] = None
+    # Full step output the gate last checked
+    last_output: str = ""
+    iterations: int = 0
+    max_iterations: int = 3
+    gaps: List[str] = field(default_factory=list)
+
+    def failed_gaps(self) -> List[str]:
+        return [indicator.gap for indicator in self.gate.failed(self.last_output)]
+
+
+# Refinement of the loop being executed; steps inside it read and update it through refine()
+current_refinement: ContextVar[Optional[Refinement]] = ContextVar("workflow_refinement", default=None)
+
+
+def gap_prompt(request: str, findings: str, gaps: List[str]) -> str:
+    """Prompt asking the agent to fill only the failed quality indicators of its previous findings."""
+    missing = "\n".join(f"- {gap}" for gap in gaps)
+    return (
+        "Your previous findings for the request below did not pass these quality checks:\n"
+        f"{missing}\n\n"
+        "Fill only these gaps. Do not repeat searches or rewrite material already covered; run only the "
+        "searches the gaps need and reply with the new material alone, with its source URLs. It will be "
+        "appended to the findings below.\n\n"
+        f"**Request**: {request}\n\n"
+        f"**Findings so far**:\n{findings}\n"
+    )
+
+
+def merge_findings(findings: str, addition: str) -> str:
+    return f"{findings.rstrip()}\n\n## Additional Findings\n\n{addition.strip()}"
+
+
+async def refine(agent: Agent, prompt: str, request: str, step: Optional[str] = None) -> str:
+    """
+    Run one iteration of a step inside an IncrementalLoop.
+
+    The first iteration sends the step's full prompt. Later iterations send the previous findings
+    and the indicators they failed, and merge the agent's answer into the findings. Outside an
+    IncrementalLoop this is a plain agent run. The findings in the gap-filling prompt are fitted to
+    the prompt budget; the merged findings keep everything. Inside a loop the answer streams through
+    the loop's gate, counted together with the previous findings.
+
+    Args:
+        agent: Agent doing the step's work
+        prompt: The step's full prompt for a first attempt
+        request: The user's request, repeated in the gap-filling prompt
+        step: Step name for the prompt token log, defaults to the agent's name
+
+    Returns:
+        str: The findings so far, to be wrapped in the step's output
+    """
+    step = step or agent.name or "Step"
+    refinement = current_refinement.get()
+    gate = refinement.gate if refinement is not None else None
+    # The last iteration's answer is kept whatever it scores, so it is never aborted
+    retry_left = refinement is not None and refinement.iterations + 1 < refinement.max_iterations
+    if refinement is None or refinement.findings is None:
+        findings = await stream_agent(agent, log_prompt(step, prompt), gate, step, allow_abort=retry_left)
+    else:
+        refinement.gaps = refinement.failed_gaps()
+        log.info(f"Refining {agent.name} findings, iteration {refinement.iterations + 1}: {refinement.gaps}")
+        previous = fit_context(step, request, {"Findings": refinement.findings})["Findings"]
+        addition = await stream_agent(
+            agent,
+            log_prompt(step, gap_prompt(request, previous, refinement.gaps)),
+            gate,
+            step,
+            prefix=refinement.findings,
+            allow_abort=retry_left,
+        )
+        findings = merge_findings(refinement.findings, addition)
+    if refinement is not None:
+        refinement.findings = findings
+        refinement.iterations += 1
+    return findings
+
+
+class IncrementalLoop(Loop):
+    """Loop whose iterations refine the previous iteration's output instead of starting over."""
+
+    def __init__(
+        self, steps: Any, gate: QualityGate, name: Optional[str] = None, max_iterations: int = 3, **kwargs: Any
+    ):
+        super().__init__(steps=steps, name=name, max_iterations=max_iterations, end_condition=gate, **kwargs)
+        self.gate = gate
+
+    def _refinement(self) -> Refinement:
+        return Refinement(self.gate, max_iterations=self.max_iterations)
+
+    def execute(self, *args: Any, **kwargs: Any) -> StepOutput:
+        token = current_refinement.set(self._refinement())
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            current_refinement.reset(token)
+
+    async def aexecute(self, *args: Any, **kwargs: Any) -> StepOutput:
+        token = current_refinement.set(self._refinement())
+        try:
+            return await super().aexecute(*args, **kwargs)
+        finally:
+            current_refinement.reset(token)
+
+    def execute_stream(self, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        token = current_refinement.set(self._refinement())
+        try:
+            yield from super().execute_stream(*args, **kwargs)
+        finally:
+            _reset(token)
+
+    async def aexecute_stream(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        token = current_refinement.set(self._refinement())
+        try:
+            async for event in super().aexecute_stream(*args, **kwargs):
+                yield event
+        finally:
+            _reset(token)
+
+
+def _reset(token: Any) -> None:
+    try:
+        current_refinement.reset(token)
+    except ValueError:
+        pass  # generator closed from another context
+
+
+# agno looks up step types by exact class when it describes a workflow (AgentOS /workflows)
+agno_workflow.STEP_TYPE_MAPPING[IncrementalLoop] = StepType.LOOP
@@ -1,9 +1,6 @@
 from textwrap import dedent
-from typing import List
 
 from agno.agent import Agent
-from agno.models.ollama import Ollama
-from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.workflow.condition import Condition
 from agno.workflow.loop import Loop
 from agno.workflow.step import Step
@@ -11,8 +8,17 @@ from agno.workflow.types import StepInput, StepOutput, WorkflowExecutionInput
 from agno.workflow.workflow import Workflow
 from pydantic import BaseModel
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_MODEL_ID
+from app.models import get_model
 from db.session import get_postgres_db
+from tools.duckduckgo import DuckDuckGoTools
+from workflows.branching import if_else
+from workflows.checkpoint import workflow_checkpoints
+from workflows.context_budget import fit_context, log_prompt
+from workflows.graph import Node, StepGraph, workflow_graph_settings
+from workflows.incremental import IncrementalLoop, QualityGate, refine
+from workflows.quality import Indicator, stream_agent
+from workflows.request_parser import parse_request
+from workflows.step_memo import memoize_step
 
 
 # ************* Input Schema *************
@@ -23,8 +29,8 @@ class InvestmentWorkflowInput(BaseModel):
 # ************* Agents *************
 market_researcher = Agent(
     name="Financial Market Researcher",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
-    tools=[DuckDuckGoTools()],
+    model=get_model(),
+    tools=[DuckDuckGoTools(enable_multi_search=True)],
     description=dedent("""\
         Expert financial researcher specializing in comprehensive market analysis, 
         company research, and investment opportunity identification.
@@ -70,7 +76,7 @@ market_researcher = Agent(
 
 financial_analyst = Agent(
     name="Financial Analyst",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     tools=[DuckDuckGoTools()],
     description=dedent("""\
         Expert financial analyst specializing in quantitative analysis, 
@@ -113,7 +119,7 @@ financial_analyst = Agent(
 
 portfolio_strategist = Agent(
     name="Portfolio Strategist",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     tools=[DuckDuckGoTools()],
     description=dedent("""\
         Expert portfolio strategist specializing in asset allocation, 
@@ -188,7 +194,12 @@ async def parse_investment_request_step(
     - **Criteria**: [special requirements]
     """
 
-    result = await market_researcher.arun(parse_prompt)
+    # Most requests name their companies plainly; the model only parses the ones the tables cannot
+    fast = parse_request(search_input.investment_request)
+    if fast is not None:
+        parsed = fast.to_markdown()
+    else:
+        parsed = await stream_agent(market_researcher, log_prompt("Parse Request", parse_prompt), None, "Parse Request")
 
     return StepOutput(
         content=f"""
@@ -198,7 +209,7 @@ async def parse_investment_request_step(
             {search_input.investment_request}
 
             ## Parsed Investment Criteria
-            {result.content}
+            {parsed}
         """.strip(),
         success=True,
     )
@@ -229,6 +240,9 @@ async def conduct_market_research_step(
     - Economic factors affecting the investments
     - Regulatory changes and policy impacts
     
+    **Batch your searches:** run each phase as one `duckduckgo_multi_search` call with all of its
+    queries (one per company and topic) instead of one `duckduckgo_search` call per query.
+    
     **Quality Standards:**
     - Include specific numbers and data points
     - Cite recent sources (within last 6 months preferred)
@@ -243,7 +257,8 @@ async def conduct_market_research_step(
     Focus on finding credible, recent information from reputable financial sources.
     """
 
-    result = await market_researcher.arun(research_prompt)
+    # Inside the research loop, retries only fill the gaps the quality check found
+    findings = await refine(market_researcher, research_prompt, search_input.investment_request, step="Market Research")
 
     return StepOutput(
         content=f"""
@@ -253,7 +268,7 @@ async def conduct_market_research_step(
             {search_input.investment_request}
 
             ## Research Results
-            {result.content}
+            {findings}
         """.strip(),
         success=True,
     )
@@ -264,7 +279,13 @@ async def financial_analysis_step(
 ) -> StepOutput:
     """Conduct financial analysis and valuation"""
     search_input = execution_input.input
-    research_content = execution_input.get_step_content("Market Research")
+    # Research without the repeated request and headers, trimmed to the prompt budget
+    context = fit_context(
+        "Financial Analysis",
+        search_input.investment_request,
+        {"Market Research": execution_input.get_step_content("Market Research")},
+    )
+    research_content = context["Market Research"]
 
     analysis_prompt = f"""
     Conduct detailed financial analysis based on the market research:
@@ -313,7 +334,13 @@ async def financial_analysis_step(
     Use DuckDuckGo search for additional financial data.
     """
 
-    result = await financial_analyst.arun(analysis_prompt)
+    # Stops generating once the analysis passes its quality check
+    analysis = await stream_agent(
+        financial_analyst,
+        log_prompt("Financial Analysis", analysis_prompt),
+        check_analysis_quality,
+        "Financial Analysis",
+    )
 
     return StepOutput(
         content=f"""
@@ -323,20 +350,29 @@ async def financial_analysis_step(
             {search_input.investment_request}       
 
             ## Financial Analysis
-            {result.content}        
+            {analysis}        
         """.strip(),
         success=True,
     )
 
 
+@memoize_step("Market Research", "Financial Analysis")
 async def portfolio_strategy_step(
     execution_input: WorkflowExecutionInput,
 ) -> StepOutput:
     """Create comprehensive portfolio strategy and implementation plan"""
 
     search_input = execution_input.input
-    research_content = execution_input.get_step_content("Market Research")
-    analysis_content = execution_input.get_step_content("Financial Analysis")
+    # Upstream outputs without the repeated request and headers, trimmed to the prompt budget
+    context = fit_context(
+        "Portfolio Strategy",
+        search_input.investment_request,
+        {
+            "Market Research": execution_input.get_step_content("Market Research"),
+            "Financial Analysis": execution_input.get_step_content("Financial Analysis"),
+        },
+    )
+    research_content, analysis_content = context["Market Research"], context["Financial Analysis"]
 
     strategy_prompt = f"""
     Create a comprehensive investment strategy based on all research and analysis:
@@ -361,7 +397,9 @@ async def portfolio_strategy_step(
     Include comprehensive references to all research sources.
     """
 
-    result = await portfolio_strategist.arun(strategy_prompt)
+    strategy = await stream_agent(
+        portfolio_strategist, log_prompt("Portfolio Strategy", strategy_prompt), None, "Portfolio Strategy"
+    )
 
     return StepOutput(
         content=f"""
@@ -371,7 +409,7 @@ async def portfolio_strategy_step(
             {search_input.investment_request}
             
             ## Strategic Recommendations
-            {result.content}
+            {strategy}
             
             ## Disclaimer
             This analysis is for educational purposes only and should not be considered as financial advice.
@@ -382,45 +420,29 @@ async def portfolio_strategy_step(
 
 
 # ************* Quality Check Functions *************
-def check_research_quality(outputs: List[StepOutput]) -> bool:
-    """Check if research quality is sufficient"""
-    if not outputs:
-        return False
-
-    latest_output = outputs[-1]
-    content = latest_output.content.lower()
-
-    # Quality indicators
-    quality_indicators = [
-        "price" in content or "market cap" in content,
-        "revenue" in content or "earnings" in content,
-        "http" in content or "source" in content,  # URLs/references
-        len(content) > 1000,  # Substantial content
-        "risk" in content or "analysis" in content,
-    ]
-
+check_research_quality = QualityGate(
+    [
+        Indicator("Include share prices or market capitalization", keywords=("price", "market cap")),
+        Indicator("Include revenue and earnings figures", keywords=("revenue", "earnings")),
+        Indicator("Cite your sources with URLs", keywords=("http", "source")),
+        Indicator("Add more depth: the findings are too short", min_length=1000),
+        Indicator("Cover the key risks", keywords=("risk", "analysis")),
+    ],
     # Need at least 3 out of 5 quality indicators
-    return sum(quality_indicators) >= 3
-
-
-def check_analysis_quality(outputs: List[StepOutput]) -> bool:
-    """Check if financial analysis quality is sufficient"""
-    if not outputs:
-        return False
-
-    latest_output = outputs[-1]
-    content = latest_output.content.lower()
-
-    # Analysis quality indicators
-    analysis_indicators = [
-        "valuation" in content or "value" in content,
-        "recommendation" in content or "buy" in content or "sell" in content,
-        "risk" in content or "beta" in content,
-        "python" in content or "calculation" in content,
-    ]
+    required=3,
+)
 
+# Financial analysis quality indicators
+check_analysis_quality = QualityGate(
+    [
+        Indicator("Estimate the valuation", keywords=("valuation", "value")),
+        Indicator("Give a buy, hold or sell recommendation", keywords=("recommendation", "buy", "sell")),
+        Indicator("Quantify the risks", keywords=("risk", "beta")),
+        Indicator("Show the calculations", keywords=("python", "calculation")),
+    ],
     # Need at least 3 out of 4 analysis indicators
-    return sum(analysis_indicators) >= 3
+    required=3,
+)
 
 
 def should_conduct_deep_analysis(step_input) -> bool:
@@ -452,10 +474,10 @@ parse_request_step = Step(
 )
 
 # Step 2: Market research with quality validation loop
-market_research_loop = Loop(
+market_research_loop = IncrementalLoop(
     name="Market Research Loop",
     steps=[conduct_market_research_step],
-    end_condition=check_research_quality,
+    gate=check_research_quality,
     max_iterations=3,
 )
 
@@ -485,30 +507,41 @@ financial_analysis_condition = Condition(
     ],
 )
 
-# Step 4: Conditional deep portfolio strategy
-portfolio_strategy_condition = Condition(
+# Step 4: Deep portfolio strategy for complex requests, basic strategy otherwise (never both)
+portfolio_branch = if_else(
+    name="Portfolio Strategy",
     evaluator=should_conduct_deep_analysis,
-    steps=[portfolio_strategy_step],
+    then=Step(name="Deep Portfolio Strategy", executor=portfolio_strategy_step),
+    otherwise=Step(name="Basic Portfolio Strategy", executor=portfolio_strategy_step),
 )
 
-# Step 5: Basic portfolio strategy
-basic_portfolio_step = Step(
-    name="Basic Portfolio Strategy",
-    executor=portfolio_strategy_step,
+# ************* Workflow *************
+# The steps one after another, in declaration order
+investment_steps = [
+    parse_request_step,
+    market_research_loop,
+    financial_analysis_condition,
+    portfolio_branch,
+]
+
+# The same steps, each started once the steps it reads from are done: the request is parsed while
+# the market research runs, and node names are the names the executors pass to get_step_content()
+investment_graph = StepGraph(
+    name="Investment Analysis",
+    nodes=[
+        Node("Parse Request", parse_request_step),
+        Node("Market Research", market_research_loop),
+        Node("Financial Analysis", financial_analysis_condition, needs=("Market Research",)),
+        Node("Portfolio Strategy", portfolio_branch, needs=("Market Research", "Financial Analysis")),
+    ],
+    checkpoints=workflow_checkpoints,
 )
 
-# ************* Workflow *************
 investment_workflow = Workflow(
     name="Investment Analyst Pro",
     description="Professional investment analysis engine that evaluates market opportunities, conducts financial due diligence with adaptive research steps, and delivers strategic portfolio recommendations",
     db=get_postgres_db(),
-    steps=[
-        parse_request_step,
-        market_research_loop,
-        financial_analysis_condition,
-        portfolio_strategy_condition,
-        basic_portfolio_step,
-    ],
+    steps=[investment_graph] if workflow_graph_settings.enabled else investment_steps,
     input_schema=InvestmentWorkflowInput,
     session_state={},
     debug_mode=True,
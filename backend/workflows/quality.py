@@ -0,0 +1,261 @@
+"""
+Quality indicators checked in one pass, and gates that watch a generation as it streams.
+
+The quality checks of the workflow loops used to lowercase the whole output and scan it once per
+keyword, and only after the agent had finished. Indicators are now declared as keywords, counts
+and lengths, and a KeywordMatcher (Aho-Corasick) counts every keyword and URL of a gate in a
+single pass that can be fed chunk by chunk. stream_agent() runs a step's agent with streaming and
+feeds its tokens to the gate: once the gate passes, the generation gets a few more tokens to wrap
+up and is then stopped; a generation that is still far from passing after many tokens is aborted
+so the loop can retry with a gap-filling prompt. Tokens not generated are recorded per step.
+stream_agent() also forwards the tokens of every step, gated or not, to a streamed workflow run.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from agno.agent import Agent
+from agno.run.agent import RunEvent
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from workflows.checkpoint import run_agent
+from workflows.streaming import emit, streaming
+from workflows.usage import record_usage
+
+log = logging.getLogger("app")
+
+
+class StreamGateSettings(BaseSettings):
+    """Streaming quality gate settings loaded from STREAM_GATES_* environment variables."""
+
+    enabled: bool = True
+    # Tokens a generation may add after its gate passes, to finish the sentence or source list
+    grace_tokens: int = 512
+    # Tokens after which a generation passing fewer than half the required indicators is aborted;
+    # only when the loop has an iteration left to retry, 0 never aborts
+    abort_tokens: int = 1500
+
+    model_config = SettingsConfigDict(env_prefix="STREAM_GATES_", case_sensitive=False)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton counting many lowercase keywords in one pass."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[str]] = [[]]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(keyword)
+        # Breadth-first failure links, each state inheriting the matches of its failure state
+        queue: Deque[int] = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self.fail[state]
+                    while fallback and char not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def scan(self, text: str = "") -> "Scan":
+        scan = Scan(self)
+        scan.feed(text)
+        return scan
+
+
+@dataclass
+class Scan:
+    """Keyword counts and length of a text fed to a matcher, possibly in chunks."""
+
+    matcher: KeywordMatcher
+    counts: Dict[str, int] = field(default_factory=dict)
+    length: int = 0
+    state: int = 0
+
+    def feed(self, text: str) -> None:
+        goto, fail, output = self.matcher.goto, self.matcher.fail, self.matcher.output
+        state = self.state
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                self.counts[keyword] = self.counts.get(keyword, 0) + 1
+        self.state = state
+        self.length += len(text)
+
+    def count(self, *keywords: str) -> int:
+        return sum(self.counts.get(keyword, 0) for keyword in keywords)
+
+
+@dataclass(frozen=True)
+class Indicator:
+    """
+    One quality indicator and the gap to fill when it fails.
+
+    Holds when the output is longer than min_length characters and, if keywords are given,
+    contains them at least min_count times in total (case-insensitive).
+    """
+
+    gap: str
+    keywords: Tuple[str, ...] = ()
+    min_count: int = 1
+    min_length: int = 0
+
+    def holds(self, scan: Scan) -> bool:
+        if self.min_length and scan.length <= self.min_length:
+            return False
+        return not self.keywords or scan.count(*self.keywords) >= self.min_count
+
+
+class Gate:
+    """Passes when at least `required` of its indicators hold for an output."""
+
+    def __init__(self, indicators: Sequence[Indicator], required: int):
+        self.indicators = list(indicators)
+        self.required = required
+        self.matcher = KeywordMatcher(keyword for indicator in self.indicators for keyword in indicator.keywords)
+
+    def scan(self, content: str = "") -> Scan:
+        return self.matcher.scan(content)
+
+    def holding(self, scan: Scan) -> int:
+        return sum(indicator.holds(scan) for indicator in self.indicators)
+
+    def failed(self, content: str) -> List[Indicator]:
+        scan = self.scan(content)
+        return [indicator for indicator in self.indicators if not indicator.holds(scan)]
+
+    def passed(self, content: str) -> bool:
+        return self.holding(self.scan(content)) >= self.required
+
+
+class StreamGateStats:
+    """Thread-safe per-step counters for gated generations and the tokens they did not generate."""
+
+    FIELDS = ("generations", "tokens", "stopped", "aborted", "tokens_saved")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.steps: Dict[str, Dict[str, int]] = {}
+        # Tokens of generations that ran to the end, the estimate of what a stopped one would have used
+        self._full: Dict[str, Deque[int]] = {}
+
+    def record(self, step: str, tokens: int, outcome: Optional[str]) -> int:
+        """Record a generation; outcome is "stopped", "aborted" or None. Returns the tokens saved."""
+        with self._lock:
+            stats = self.steps.setdefault(step, dict.fromkeys(self.FIELDS, 0))
+            full = self._full.setdefault(step, deque(maxlen=100))
+            stats["generations"] += 1
+            stats["tokens"] += tokens
+            saved = 0
+            if outcome is None:
+                full.append(tokens)
+            else:
+                stats[outcome] += 1
+                saved = max(0, round(sum(full) / len(full)) - tokens) if full else 0
+                stats["tokens_saved"] += saved
+            return saved
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {step: dict(stats) for step, stats in self.steps.items()}
+
+
+async def stream_agent(
+    agent: Agent, prompt: str, gate: Optional[Gate], step: str, prefix: str = "", allow_abort: bool = False
+) -> str:
+    """
+    Run a step's agent with its output streamed through a quality gate and to the client.
+
+    Only the prefix and the generated text are scanned, not the headers the step wraps them in, so
+    a generation is stopped only once the step's full output is sure to pass. Inside a streamed
+    workflow run every token is also forwarded to the client (workflows.streaming). Without a gate
+    or a client to stream to, the agent runs without streaming.
+
+    Args:
+        agent: Agent doing the step's work
+        prompt: The step prompt
+        gate: Gate the step's output is checked against; None never stops the generation early
+        step: Step name for the metrics and the streamed events
+        prefix: Output the generation will be appended to, counted towards the gate
+        allow_abort: Whether a generation far from passing may be aborted (the loop can retry)
+
+    Returns:
+        str: The generated content, cut short if the gate stopped it
+    """
+    if not stream_gate_settings.enabled:
+        gate = None
+    if gate is None and not streaming():
+        result = await run_agent(agent, prompt)
+        return str(result.content or "")
+
+    settings = stream_gate_settings
+    scan = gate.scan(prefix) if gate is not None else None
+    parts: List[str] = []
+    tokens = 0
+    passed_at: Optional[int] = None
+    outcome: Optional[str] = None
+    completed = None
+    # With its events, the stream ends with the run's metrics (token usage)
+    stream = agent.arun(prompt, stream=True, stream_events=True)
+    try:
+        async for event in stream:
+            kind = getattr(event, "event", None)
+            if kind in (RunEvent.run_error.value, RunEvent.run_cancelled.value):
+                raise RuntimeError(f"{agent.name} run {kind}: {getattr(event, 'content', None) or ''}")
+            if kind == RunEvent.run_completed.value:
+                completed = event
+            if kind != RunEvent.run_content.value or not isinstance(event.content, str) or not event.content:
+                continue
+            emit(event, step)
+            parts.append(event.content)
+            tokens += 1
+            if gate is None or scan is None:
+                continue
+            scan.feed(event.content)
+            if passed_at is None and gate.holding(scan) >= gate.required:
+                passed_at = tokens
+            if passed_at is not None and tokens - passed_at >= settings.grace_tokens:
+                outcome = "stopped"
+                break
+            if (
+                allow_abort
+                and passed_at is None
+                and settings.abort_tokens
+                and tokens >= settings.abort_tokens
+                and gate.holding(scan) < gate.required / 2
+            ):
+                outcome = "aborted"
+                break
+    finally:
+        await stream.aclose()  # type: ignore[attr-defined]
+    record_usage(getattr(completed, "metrics", None), output_tokens=tokens)
+
+    if gate is not None:
+        saved = stream_gate_stats.record(step, tokens, outcome)
+        if outcome is not None:
+            log.info(f"{step}: {outcome} generation after {tokens} tokens (~{saved} tokens saved)")
+    return "".join(parts)
+
+
+# Global settings and stats shared by every gated step
+stream_gate_settings = StreamGateSettings()
+stream_gate_stats = StreamGateStats()
@@ -0,0 +1,450 @@
+"""
+Deterministic parsing of investment requests, with the model as the fallback.
+
+parse_investment_request_step used to spend a whole market_researcher generation extracting the
+companies, sectors, goals, horizon and risk of requests that usually state them plainly ("Compare
+AAPL and MSFT for long-term growth"). parse_request() fills the same fields from tables compiled
+into regular expressions once, at import: a ticker and company index, and keyword sets for
+sectors, goals, horizons, risk levels and criteria. It answers in microseconds, and returns None so
+the step asks the model when its confidence is low: when the request names no company (the model
+is asked to suggest some), or names capitalized words and ticker-like symbols that are in none of
+the tables, which are most likely companies missing from the index.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from modules.metrics import Histogram
+
+# Upper bounds in seconds for parse latencies
+PARSE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+class FastParseSettings(BaseSettings):
+    """Deterministic request parsing settings loaded from FAST_PARSE_* environment variables."""
+
+    enabled: bool = True
+    # Requests parsed with less confidence go to the model; each unknown name costs UNKNOWN_PENALTY
+    min_confidence: float = 0.7
+
+    model_config = SettingsConfigDict(env_prefix="FAST_PARSE_", case_sensitive=False)
+
+
+# ************* Tables *************
+# Ticker, company name, sector, and the other names the company goes by
+COMPANIES: Tuple[Tuple[str, str, str, Tuple[str, ...]], ...] = (
+    ("AAPL", "Apple", "Technology", ()),
+    ("MSFT", "Microsoft", "Technology", ()),
+    ("GOOGL", "Alphabet", "Communication Services", ("Google",)),
+    ("AMZN", "Amazon", "Consumer Discretionary", ()),
+    ("META", "Meta Platforms", "Communication Services", ("Meta", "Facebook")),
+    ("NVDA", "NVIDIA", "Semiconductors", ()),
+    ("TSLA", "Tesla", "Automotive", ()),
+    ("AMD", "AMD", "Semiconductors", ("Advanced Micro Devices",)),
+    ("INTC", "Intel", "Semiconductors", ()),
+    ("TSM", "TSMC", "Semiconductors", ("Taiwan Semiconductor",)),
+    ("AVGO", "Broadcom", "Semiconductors", ()),
+    ("QCOM", "Qualcomm", "Semiconductors", ()),
+    ("ASML", "ASML", "Semiconductors", ()),
+    ("ORCL", "Oracle", "Technology", ()),
+    ("CRM", "Salesforce", "Technology", ()),
+    ("ADBE", "Adobe", "Technology", ()),
+    ("IBM", "IBM", "Technology", ()),
+    ("PLTR", "Palantir", "Technology", ()),
+    ("SNOW", "Snowflake", "Technology", ()),
+    ("SHOP", "Shopify", "Technology", ()),
+    ("UBER", "Uber", "Technology", ()),
+    ("NFLX", "Netflix", "Communication Services", ()),
+    ("DIS", "Disney", "Communication Services", ("Walt Disney",)),
+    ("T", "AT&T", "Communication Services", ()),
+    ("VZ", "Verizon", "Communication Services", ()),
+    ("JPM", "JPMorgan Chase", "Financials", ("JPMorgan", "JP Morgan")),
+    ("BAC", "Bank of America", "Financials", ()),
+    ("GS", "Goldman Sachs", "Financials", ()),
+    ("MS", "Morgan Stanley", "Financials", ()),
+    ("V", "Visa", "Financials", ()),
+    ("MA", "Mastercard", "Financials", ()),
+    ("PYPL", "PayPal", "Financials", ()),
+    ("COIN", "Coinbase", "Financials", ()),
+    ("BRK.B", "Berkshire Hathaway", "Financials", ("Berkshire",)),
+    ("JNJ", "Johnson & Johnson", "Healthcare", ("Johnson and Johnson",)),
+    ("PFE", "Pfizer", "Healthcare", ()),
+    ("MRK", "Merck", "Healthcare", ()),
+    ("LLY", "Eli Lilly", "Healthcare", ("Lilly",)),
+    ("UNH", "UnitedHealth", "Healthcare", ("UnitedHealth Group",)),
+    ("ABBV", "AbbVie", "Healthcare", ()),
+    ("MRNA", "Moderna", "Healthcare", ()),
+    ("XOM", "ExxonMobil", "Energy", ("Exxon", "Exxon Mobil")),
+    ("CVX", "Chevron", "Energy", ()),
+    ("ENPH", "Enphase Energy", "Clean Energy", ("Enphase",)),
+    ("FSLR", "First Solar", "Clean Energy", ()),
+    ("NEE", "NextEra Energy", "Utilities", ("NextEra",)),
+    ("DUK", "Duke Energy", "Utilities", ()),
+    ("KO", "Coca-Cola", "Consumer Staples", ("Coca Cola",)),
+    ("PEP", "PepsiCo", "Consumer Staples", ("Pepsi",)),
+    ("PG", "Procter & Gamble", "Consumer Staples", ("Procter and Gamble", "P&G")),
+    ("WMT", "Walmart", "Consumer Staples", ()),
+    ("COST", "Costco", "Consumer Staples", ()),
+    ("HD", "Home Depot", "Consumer Discretionary", ()),
+    ("MCD", "McDonald's", "Consumer Discretionary", ("McDonalds",)),
+    ("NKE", "Nike", "Consumer Discretionary", ()),
+    ("SBUX", "Starbucks", "Consumer Discretionary", ()),
+    ("BABA", "Alibaba", "Consumer Discretionary", ()),
+    ("BA", "Boeing", "Industrials", ()),
+    ("CAT", "Caterpillar", "Industrials", ()),
+    ("GE", "General Electric", "Industrials", ()),
+    ("LMT", "Lockheed Martin", "Industrials", ()),
+    ("UPS", "UPS", "Industrials", ("United Parcel Service",)),
+    ("O", "Realty Income", "Real Estate", ()),
+    ("PLD", "Prologis", "Real Estate", ()),
+    ("SPY", "S&P 500 ETF", "Index Funds", ("S&P 500", "SP500")),
+    ("QQQ", "Nasdaq-100 ETF", "Index Funds", ("Nasdaq-100", "Nasdaq 100")),
+)
+# Company names that are also common words only count when capitalized; in lower case they are unknown
+CASE_SENSITIVE_NAMES = {"apple", "meta", "visa", "oracle", "snowflake", "shopify", "uber", "intel", "lilly"}
+
+SECTORS: Dict[str, Tuple[str, ...]] = {
+    "Technology": ("tech", "technology", "software", "cloud", "saas", "cybersecurity", "big tech"),
+    "Artificial Intelligence": ("ai", "artificial intelligence", "machine learning", "generative ai"),
+    "Semiconductors": ("semiconductor", "semiconductors", "chip", "chips", "chipmaker", "chipmakers"),
+    "Healthcare": ("healthcare", "health care", "pharma", "pharmaceutical", "pharmaceuticals", "biotech", "medical"),
+    "Financials": ("bank", "banks", "banking", "financials", "financial services", "fintech", "insurance"),
+    "Energy": ("oil", "natural gas", "energy", "oil and gas"),
+    "Clean Energy": ("renewable", "renewables", "clean energy", "solar", "wind energy", "green energy"),
+    "Consumer": ("retail", "retailers", "consumer", "e-commerce", "ecommerce", "consumer staples", "consumer goods"),
+    "Real Estate": ("real estate", "reit", "reits", "property"),
+    "Utilities": ("utility", "utilities"),
+    "Industrials": ("industrial", "industrials", "aerospace", "defense", "defence", "manufacturing"),
+    "Communication Services": ("media", "streaming", "telecom", "telecommunications", "social media"),
+    "Automotive": ("ev", "evs", "electric vehicle", "electric vehicles", "automotive", "automaker", "automakers"),
+    "Crypto": ("crypto", "cryptocurrency", "bitcoin", "blockchain"),
+}
+GOALS: Dict[str, Tuple[str, ...]] = {
+    "Growth": ("growth", "grow", "appreciation", "capital gains", "upside"),
+    "Income": ("income", "dividend", "dividends", "yield", "passive income"),
+    "Value": ("value", "undervalued", "bargain", "value investing"),
+    "Speculation": ("speculative", "speculation", "moonshot", "quick gains", "trading"),
+    "Capital preservation": ("capital preservation", "preserve", "safe haven"),
+    "Diversification": ("diversify", "diversification", "diversified"),
+}
+HORIZONS: Dict[str, Tuple[str, ...]] = {
+    "Long-term": ("long-term", "long term", "retirement", "decade", "decades", "buy and hold", "buy-and-hold"),
+    "Medium-term": ("medium-term", "medium term", "mid-term", "next few years"),
+    "Short-term": ("short-term", "short term", "near-term", "near term", "next quarter", "this quarter", "swing trade"),
+}
+RISKS: Dict[str, Tuple[str, ...]] = {
+    "Conservative": (
+        "conservative",
+        "low risk",
+        "low-risk",
+        "safe",
+        "stable",
+        "defensive",
+        "risk-averse",
+        "risk averse",
+    ),
+    "Moderate": ("moderate", "balanced", "medium risk", "moderate risk"),
+    "Aggressive": ("aggressive", "high risk", "high-risk", "risky", "volatile"),
+}
+CRITERIA: Dict[str, Tuple[str, ...]] = {
+    "ESG": ("esg", "sustainable", "sustainability", "ethical", "socially responsible"),
+    "Dividend yield": ("dividend yield", "high yield", "dividend growth", "dividend"),
+    "Large cap": ("large cap", "large-cap", "blue chip", "blue-chip", "mega cap", "mega-cap"),
+    "Mid cap": ("mid cap", "mid-cap"),
+    "Small cap": ("small cap", "small-cap", "micro cap", "micro-cap"),
+    "Valuation": ("p/e", "pe ratio", "price to earnings", "price-to-earnings", "valuation"),
+    "Balance sheet strength": ("low debt", "debt-free", "strong balance sheet"),
+    "ETFs / index funds": ("etf", "etfs", "index fund", "index funds"),
+}
+# Upper-case words that are not tickers
+NON_TICKERS = set(
+    """
+    AI IT ESG ETF ETFS REIT REITS EV EVS USA US UK EU CEO CFO IPO EPS ROI ROE GDP USD EUR YTD SAAS PE FCF DCF
+    AND OR VS NYSE NASDAQ SEC FED CPI Q1 Q2 Q3 Q4 API
+    """.split()
+)
+# Capitalized words that are not names: request verbs, pronouns and investing vocabulary
+COMMON_WORDS = set(
+    """
+    a about across after all also an analyse analyze analysis and any are as assess at be best between build buy
+    can check companies company compare comparison could create deep detailed dive do does evaluate find for
+    from fund funds get give good help hold how i if in into invest investing investment investments is it its
+    let look looking me my need next now of on or our outlook please portfolio position positions recommend
+    recommendation research review sell share shares should show stock stocks suggest tell than that the their
+    them these this those to top versus vs want we what when where whether which who why will with worth would
+    you your year years month months week weeks today tomorrow
+    january february march april may june july august september october november december
+    """.split()
+)
+# Each name the tables do not know lowers the confidence by this much
+UNKNOWN_PENALTY = 0.35
+NOT_SPECIFIED = "Not specified"
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    # Longest first, so "clean energy" wins over "energy"
+    return "|".join(re.escape(phrase) for phrase in sorted(set(phrases), key=len, reverse=True))
+
+
+def _keyword_pattern(phrases: Iterable[str]) -> Pattern[str]:
+    return re.compile(rf"(?<![\w&$]){'(?:' + _alternation(phrases) + ')'}(?![\w&])", re.IGNORECASE)
+
+
+class KeywordTable:
+    """Labels found in a text through their phrases, matched as whole words in one regex pass."""
+
+    def __init__(self, labels: Dict[str, Tuple[str, ...]]):
+        self.labels = {phrase.lower(): label for label, phrases in labels.items() for phrase in phrases}
+        self.pattern = _keyword_pattern(self.labels)
+
+    def find(self, text: str, spans: List[Tuple[int, int]], names: List[Tuple[int, int]]) -> List[str]:
+        """Labels in order of first appearance; matched spans are added to `spans`."""
+        found: List[str] = []
+        for match in self.pattern.finditer(text):
+            # Words of a company name ("Bank" of Bank of America) are not keywords
+            if _covered(match.start(), names):
+                continue
+            spans.append(match.span())
+            label = self.labels[match.group(0).lower()]
+            if label not in found:
+                found.append(label)
+        return found
+
+
+@dataclass(frozen=True)
+class Company:
+    ticker: str
+    name: str
+    sector: str
+
+    def __str__(self) -> str:
+        return self.name if self.name == self.ticker else f"{self.name} ({self.ticker})"
+
+
+class CompanyIndex:
+    """Tickers and company names compiled into two regexes."""
+
+    def __init__(self, companies: Sequence[Tuple[str, str, str, Tuple[str, ...]]]):
+        self.by_ticker: Dict[str, Company] = {}
+        self.by_name: Dict[str, Company] = {}
+        for ticker, name, sector, aliases in companies:
+            company = Company(ticker, name, sector)
+            self.by_ticker[ticker] = company
+            for alias in (name, *aliases):
+                self.by_name[alias.lower()] = company
+        self.names = _keyword_pattern(self.by_name)
+        # Upper-case symbols; one-letter tickers only with a $ in front
+        self.symbols = re.compile(r"(?<![\w$&])(?:\$[A-Z]{1,5}(?:\.[A-Z])?|[A-Z][A-Z0-9]{1,4}(?:\.[A-Z])?)(?![\w&])")
+
+    def find(self, text: str, spans: List[Tuple[int, int]], unknown: List[str]) -> List[Company]:
+        found: List[Company] = []
+        for match in self.names.finditer(text):
+            matched = match.group(0)
+            if matched.lower() in CASE_SENSITIVE_NAMES and not matched[0].isupper():
+                # "apple orchard" or a careless "compare apple and microsoft": the model decides
+                unknown.append(matched)
+                continue
+            spans.append(match.span())
+            company = self.by_name[matched.lower()]
+            if company not in found:
+                found.append(company)
+        for match in self.symbols.finditer(text):
+            if _covered(match.start(), spans):
+                continue
+            symbol = match.group(0).lstrip("$")
+            if symbol in NON_TICKERS:
+                # Left for the keyword tables ("ESG", "AI")
+                continue
+            spans.append(match.span())
+            if symbol in self.by_ticker:
+                if self.by_ticker[symbol] not in found:
+                    found.append(self.by_ticker[symbol])
+            else:
+                unknown.append(match.group(0))
+        return found
+
+
+def _covered(position: int, spans: List[Tuple[int, int]]) -> bool:
+    return any(start <= position < end for start, end in spans)
+
+
+# Compiled once at import and shared by every parse
+COMPANY_INDEX = CompanyIndex(COMPANIES)
+SECTOR_TABLE = KeywordTable(SECTORS)
+GOAL_TABLE = KeywordTable(GOALS)
+HORIZON_TABLE = KeywordTable(HORIZONS)
+RISK_TABLE = KeywordTable(RISKS)
+CRITERIA_TABLE = KeywordTable(CRITERIA)
+SPAN = re.compile(r"\b(\d+)(?:\s*(?:-|to)\s*\d+)?\s*(year|yr|month|week|day)s?\b", re.IGNORECASE)
+BUDGET = re.compile(
+    r"(?:[$€£]\s?\d[\d,]*(?:\.\d+)?(?:\s?(?:k|m|bn|thousand|million|billion)\b)?"
+    r"|\b\d[\d,]*(?:\.\d+)?\s?(?:k|thousand|million)?\s?(?:dollars|usd|euros?|eur)\b)",
+    re.IGNORECASE,
+)
+NAME = re.compile(r"\b[A-Z][\w&'’.-]*")
+
+
+@dataclass
+class ParsedRequest:
+    """The fields the parse step extracts, and how sure the parser is of them."""
+
+    companies: List[Company] = field(default_factory=list)
+    sectors: List[str] = field(default_factory=list)
+    goals: List[str] = field(default_factory=list)
+    horizon: Optional[str] = None
+    risk: Optional[str] = None
+    budget: Optional[str] = None
+    criteria: List[str] = field(default_factory=list)
+    # Capitalized words and symbols in none of the tables, and lower-case names that may be common words
+    unknown: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+
+    def to_markdown(self) -> str:
+        """The fields in the format the parse prompt asks the model for."""
+
+        def listed(values: Sequence[object]) -> str:
+            return ", ".join(str(value) for value in values) or NOT_SPECIFIED
+
+        return "\n".join(
+            [
+                f"- **Companies**: {listed(self.companies)}",
+                f"- **Sectors**: {listed(self.sectors)}",
+                f"- **Goals**: {listed(self.goals)}",
+                f"- **Horizon**: {self.horizon or NOT_SPECIFIED}",
+                f"- **Risk**: {self.risk or NOT_SPECIFIED}",
+                f"- **Budget**: {self.budget or NOT_SPECIFIED}",
+                f"- **Criteria**: {listed(self.criteria)}",
+            ]
+        )
+
+
+def _horizon(text: str, spans: List[Tuple[int, int]], names: List[Tuple[int, int]]) -> Optional[str]:
+    labels = HORIZON_TABLE.find(text, spans, names)
+    if labels:
+        return labels[0]
+    match = SPAN.search(text)
+    if match is None:
+        return None
+    spans.append(match.span())
+    count, unit = int(match.group(1)), match.group(2).lower()
+    if unit in ("year", "yr"):
+        return "Long-term" if count >= 5 else "Medium-term" if count >= 2 else "Short-term"
+    return "Medium-term" if unit == "month" and count >= 24 else "Short-term"
+
+
+def extract(request: str) -> ParsedRequest:
+    """Fill every field the tables can find, and score the result."""
+    spans: List[Tuple[int, int]] = []
+    unknown: List[str] = []
+    parsed = ParsedRequest(companies=COMPANY_INDEX.find(request, spans, unknown))
+    names = list(spans)
+    parsed.sectors = SECTOR_TABLE.find(request, spans, names)
+    for company in parsed.companies:
+        if company.sector not in parsed.sectors:
+            parsed.sectors.append(company.sector)
+    parsed.goals = GOAL_TABLE.find(request, spans, names)
+    parsed.horizon = _horizon(request, spans, names)
+    risks = RISK_TABLE.find(request, spans, names)
+    parsed.risk = risks[0] if risks else None
+    parsed.criteria = CRITERIA_TABLE.find(request, spans, names)
+    budget = BUDGET.search(request)
+    if budget is not None:
+        spans.append(budget.span())
+        parsed.budget = budget.group(0).strip()
+    for match in NAME.finditer(request):
+        # "I'm" -> "I", "Rivian's" -> "Rivian"
+        word = re.split(r"['’]", match.group(0))[0].rstrip(".")
+        if not _covered(match.start(), spans) and word.lower() not in COMMON_WORDS:
+            unknown.append(word)
+    parsed.unknown = unknown
+    # The model suggests companies for requests that name none
+    parsed.confidence = max(0.0, 1.0 - UNKNOWN_PENALTY * len(unknown)) if parsed.companies else 0.0
+    return parsed
+
+
+class FastParseStats:
+    """Thread-safe counters of requests parsed without the model, and parse latencies."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+        self.reasons: Dict[str, int] = {}
+        self.latency = Histogram(PARSE_BUCKETS)
+
+    def record(self, seconds: float, reason: Optional[str]) -> None:
+        self.latency.observe(seconds)
+        with self._lock:
+            if reason is None:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.hits + self.fallbacks
+            return {
+                "hits": self.hits,
+                "fallbacks": self.fallbacks,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "fallback_reasons": dict(self.reasons),
+                "latency_seconds": self.latency.snapshot(),
+            }
+
+
+def parse_request(request: str) -> Optional[ParsedRequest]:
+    """
+    Parse an investment request without the model.
+
+    Args:
+        request: The investment request as the user wrote it
+
+    Returns:
+        Optional[ParsedRequest]: The parsed fields, or None when the model should parse the request
+    """
+    if not fast_parse_settings.enabled:
+        return None
+    started = time.perf_counter()
+    parsed = extract(request)
+    reason = _fallback_reason(parsed)
+    fast_parse_stats.record(time.perf_counter() - started, reason)
+    return parsed if reason is None else None
+
+
+def request_key(request: str) -> Optional[str]:
+    """
+    The parsed fields of a request the tables can parse, so differently worded requests that parse
+    the same ("Analyze Apple stock", "Analyze AAPL shares") can share one run. Not counted in the
+    fast-parse stats.
+
+    Args:
+        request: The investment request as the user wrote it
+
+    Returns:
+        Optional[str]: The fields in the parse step's format, or None when the model would parse the request
+    """
+    if not fast_parse_settings.enabled:
+        return None
+    parsed = extract(request)
+    return parsed.to_markdown() if _fallback_reason(parsed) is None else None
+
+
+def _fallback_reason(parsed: ParsedRequest) -> Optional[str]:
+    if not parsed.companies:
+        return "no_company"
+    if parsed.confidence < fast_parse_settings.min_confidence:
+        return "unknown_names"
+    return None
+
+
+# Global settings and stats shared by the parse step and the /metrics/fast-parse endpoint
+fast_parse_settings = FastParseSettings()
+fast_parse_stats = FastParseStats()
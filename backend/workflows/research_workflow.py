@@ -1,10 +1,6 @@
 from textwrap import dedent
-from typing import List
 
 from agno.agent.agent import Agent
-from agno.models.ollama import Ollama
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.tools.wikipedia import WikipediaTools
 from agno.workflow.condition import Condition
 from agno.workflow.loop import Loop
 from agno.workflow.step import Step
@@ -12,8 +8,17 @@ from agno.workflow.types import StepInput, StepOutput, WorkflowExecutionInput
 from agno.workflow.workflow import Workflow
 from pydantic import BaseModel, Field
 
-from app.models import OLLAMA_BASE_URL, OLLAMA_MODEL_ID
+from app.models import get_model
 from db.session import get_postgres_db
+from tools.duckduckgo import DuckDuckGoTools
+from tools.wikipedia import WikipediaTools
+from workflows.branching import if_else
+from workflows.checkpoint import workflow_checkpoints
+from workflows.context_budget import fit_context, log_prompt
+from workflows.graph import Node, StepGraph, workflow_graph_settings
+from workflows.incremental import IncrementalLoop, QualityGate, refine
+from workflows.quality import Indicator, stream_agent
+from workflows.step_memo import memoize_step
 
 
 # ************* Input Schema *************
@@ -28,8 +33,8 @@ class ResearchTopic(BaseModel):
 # ************* Agents *************
 research_coordinator = Agent(
     name="Research Coordinator",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
-    tools=[DuckDuckGoTools(), WikipediaTools()],
+    model=get_model(),
+    tools=[DuckDuckGoTools(enable_multi_search=True), WikipediaTools()],
     description=dedent("""\
         Expert research coordinator specializing in comprehensive information gathering,
         source validation, and research planning across multiple domains.
@@ -85,7 +90,7 @@ research_coordinator = Agent(
 
 content_analyst = Agent(
     name="Content Analyst",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     tools=[DuckDuckGoTools()],
     description=dedent("""\
         Expert content analyst specializing in information synthesis,
@@ -130,7 +135,7 @@ content_analyst = Agent(
 
 report_writer = Agent(
     name="Research Report Writer",
-    model=Ollama(id=OLLAMA_MODEL_ID, host=OLLAMA_BASE_URL),
+    model=get_model(),
     description=dedent("""\
         Expert research report writer specializing in creating comprehensive,
         professional research reports and documentation.
@@ -196,6 +201,8 @@ async def comprehensive_research_step(
     2. **Execute systematic research** using all available tools:
        - **DuckDuckGo Search**: For current news, diverse perspectives, and real-time information
        - **Wikipedia Research**: For background context, definitions, and comprehensive overviews
+    3. **Batch your web searches**: plan the queries for each research area up front and pass them
+       together in one `duckduckgo_multi_search` call instead of calling `duckduckgo_search` repeatedly
     
     **Research Coverage:**
     - **Background & Context**: Historical development, key concepts, definitions
@@ -220,7 +227,10 @@ async def comprehensive_research_step(
     Focus on comprehensive, well-sourced research with clear references.
     """
 
-    result = await research_coordinator.arun(research_prompt)
+    # Inside the research loop, retries only fill the gaps the quality check found
+    findings = await refine(
+        research_coordinator, research_prompt, search_input.research_request, step="Comprehensive Research"
+    )
 
     return StepOutput(
         content=f"""
@@ -230,7 +240,7 @@ async def comprehensive_research_step(
             {search_input.research_request}
 
             ## Research Results
-            {result.content}
+            {findings}
         """.strip(),
         success=True,
     )
@@ -239,7 +249,13 @@ async def comprehensive_research_step(
 async def content_analysis_step(execution_input: WorkflowExecutionInput) -> StepOutput:
     """Analyze research content and generate insights"""
     search_input = execution_input.input
-    research_content = execution_input.get_step_content("Comprehensive Research")
+    # Research without the repeated request and headers, trimmed to the prompt budget
+    context = fit_context(
+        "Content Analysis",
+        search_input.research_request,
+        {"Comprehensive Research": execution_input.get_step_content("Comprehensive Research")},
+    )
+    research_content = context["Comprehensive Research"]
 
     analysis_prompt = f"""
     Analyze the research findings and generate comprehensive insights:
@@ -264,7 +280,10 @@ async def content_analysis_step(execution_input: WorkflowExecutionInput) -> Step
     Focus on generating actionable insights and clear, well-supported conclusions.
     """
 
-    result = await content_analyst.arun(analysis_prompt)
+    # Stops generating once the analysis passes its quality check
+    analysis = await stream_agent(
+        content_analyst, log_prompt("Content Analysis", analysis_prompt), check_analysis_quality, "Content Analysis"
+    )
 
     return StepOutput(
         content=f"""
@@ -274,18 +293,27 @@ async def content_analysis_step(execution_input: WorkflowExecutionInput) -> Step
             {search_input.research_request}
 
             ## Analysis Results
-            {result.content}
+            {analysis}
 
         """.strip(),
         success=True,
     )
 
 
+@memoize_step("Comprehensive Research", "Content Analysis")
 async def report_writing_step(execution_input: WorkflowExecutionInput) -> StepOutput:
     """Create comprehensive research report"""
     search_input = execution_input.input
-    research_content = execution_input.get_step_content("Comprehensive Research")
-    analysis_content = execution_input.get_step_content("Content Analysis")
+    # Upstream outputs without the repeated request and headers, trimmed to the prompt budget
+    context = fit_context(
+        "Research Report",
+        search_input.research_request,
+        {
+            "Comprehensive Research": execution_input.get_step_content("Comprehensive Research"),
+            "Content Analysis": execution_input.get_step_content("Content Analysis"),
+        },
+    )
+    research_content, analysis_content = context["Comprehensive Research"], context["Content Analysis"]
 
     report_prompt = f"""
     Create a comprehensive research report based on all findings and analysis:
@@ -323,7 +351,7 @@ async def report_writing_step(execution_input: WorkflowExecutionInput) -> StepOu
     Create a report that is informative, professional, and actionable for decision-makers.
     """
 
-    result = await report_writer.arun(report_prompt)
+    report = await stream_agent(report_writer, log_prompt("Research Report", report_prompt), None, "Research Report")
 
     return StepOutput(
         content=f"""
@@ -333,7 +361,7 @@ async def report_writing_step(execution_input: WorkflowExecutionInput) -> StepOu
             {search_input.research_request}
 
             ## Final Report
-            {result.content}
+            {report}
 
             ---
             *Professional research report by Research Report Writer*
@@ -347,45 +375,29 @@ async def report_writing_step(execution_input: WorkflowExecutionInput) -> StepOu
 
 
 # ************* Quality Check Functions *************
-def check_research_quality(outputs: List[StepOutput]) -> bool:
-    """Check if research quality is sufficient"""
-    if not outputs:
-        return False
-
-    latest_output = outputs[-1]
-    content = latest_output.content.lower()
-
-    # Quality indicators
-    quality_indicators = [
-        "http" in content or "source" in content,  # URLs/references
-        len(content) > 2000,  # Substantial content
-        "research" in content or "study" in content,
-        "expert" in content or "analysis" in content,
-        content.count("http") >= 5,  # Multiple sources
-    ]
-
+check_research_quality = QualityGate(
+    [
+        Indicator("Cite your sources with URLs", keywords=("http", "source")),
+        Indicator("Add more depth: the findings are too short", min_length=2000),
+        Indicator("Reference relevant research or studies", keywords=("research", "study")),
+        Indicator("Include expert opinions and analysis", keywords=("expert", "analysis")),
+        Indicator("Add more sources: at least 5 source URLs", keywords=("http",), min_count=5),
+    ],
     # Need at least 4 out of 5 quality indicators
-    return sum(quality_indicators) >= 4
-
-
-def check_analysis_quality(outputs: List[StepOutput]) -> bool:
-    """Check if content analysis quality is sufficient"""
-    if not outputs:
-        return False
-
-    latest_output = outputs[-1]
-    content = latest_output.content.lower()
-
-    # Analysis quality indicators
-    analysis_indicators = [
-        "insight" in content or "analysis" in content,
-        "trend" in content or "pattern" in content,
-        "implication" in content or "impact" in content,
-        "recommendation" in content or "conclusion" in content,
-    ]
+    required=4,
+)
 
+# Content analysis quality indicators
+check_analysis_quality = QualityGate(
+    [
+        Indicator("Generate insights and analysis", keywords=("insight", "analysis")),
+        Indicator("Identify trends and patterns", keywords=("trend", "pattern")),
+        Indicator("Assess implications and impact", keywords=("implication", "impact")),
+        Indicator("Give recommendations and conclusions", keywords=("recommendation", "conclusion")),
+    ],
     # Need at least 3 out of 4 analysis indicators
-    return sum(analysis_indicators) >= 3
+    required=3,
+)
 
 
 def should_conduct_deep_analysis(step_input) -> bool:
@@ -412,10 +424,10 @@ def should_conduct_deep_analysis(step_input) -> bool:
 # ************* Workflow Steps *************
 
 # Step 1: Comprehensive research step
-research_loop = Loop(
+research_loop = IncrementalLoop(
     name="Comprehensive Research Loop",
     steps=[comprehensive_research_step],
-    end_condition=check_research_quality,
+    gate=check_research_quality,
     max_iterations=3,
 )
 
@@ -445,29 +457,39 @@ analysis_condition = Condition(
     ],
 )
 
-# Step 3: Conditional comprehensive report
-comprehensive_report_condition = Condition(
+# Step 3: Comprehensive report for complex requests, basic report otherwise (never both)
+report_branch = if_else(
+    name="Research Report",
     evaluator=should_conduct_deep_analysis,
-    steps=[report_writing_step],
+    then=Step(name="Comprehensive Research Report", executor=report_writing_step),
+    otherwise=Step(name="Basic Research Report", executor=report_writing_step),
 )
 
-# Step 4: Basic report
-basic_report_step = Step(
-    name="Basic Research Report",
-    executor=report_writing_step,
+# ************* Workflow *************
+# The steps one after another, in declaration order
+research_steps = [
+    research_loop,
+    analysis_condition,
+    report_branch,
+]
+
+# The same steps as a graph whose node names are the names the executors pass to get_step_content();
+# every step reads the research, so the nodes still form a chain
+research_graph = StepGraph(
+    name="Research Analysis",
+    nodes=[
+        Node("Comprehensive Research", research_loop),
+        Node("Content Analysis", analysis_condition, needs=("Comprehensive Research",)),
+        Node("Research Report", report_branch, needs=("Comprehensive Research", "Content Analysis")),
+    ],
+    checkpoints=workflow_checkpoints,
 )
 
-# ************* Workflow *************
 research_workflow = Workflow(
     name="Advanced Research Analyst",
     description="AI-powered research analyst that conducts multi-source investigations, performs quality-validated analysis, and generates professional reports with insights and citations",
     db=get_postgres_db(),
-    steps=[
-        research_loop,
-        analysis_condition,
-        comprehensive_report_condition,
-        basic_report_step,
-    ],
+    steps=[research_graph] if workflow_graph_settings.enabled else research_steps,
     input_schema=ResearchTopic,
     session_state={},
     debug_mode=True,
@@ -0,0 +1,105 @@
+"""
+Per-run memoization of workflow step executors.
+
+An executor wrapped with memoize_step() runs once per workflow run for a given input: calling it
+again in the same run with the same request and the same upstream step outputs returns the first
+StepOutput instead of repeating a long LLM generation. Entries are keyed by run id, so separate
+runs never share results.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+from agno.run.base import RunContext
+from agno.workflow.types import StepInput, StepOutput
+
+from app.response_cache import MemoryLRU
+
+log = logging.getLogger("app")
+
+StepExecutor = Callable[[StepInput], Awaitable[StepOutput]]
+# Memoized executors also take the run_context agno passes in
+MemoizedExecutor = Callable[..., Coroutine[Any, Any, StepOutput]]
+
+# Long enough to outlive any workflow run; entries are only ever reused within one run
+MEMO_TTL_SECONDS = 6 * 3600
+
+
+class StepMemo:
+    """Bounded store of step outputs keyed by run, executor and the inputs the executor reads."""
+
+    def __init__(self, max_entries: int = 256):
+        self.entries: MemoryLRU[StepOutput] = MemoryLRU(max_entries, MEMO_TTL_SECONDS)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(run_id: str, executor: str, step_input: StepInput, reads: tuple) -> str:
+        if reads:
+            upstream: Dict[str, Any] = {name: step_input.get_step_content(name) for name in reads}
+        else:
+            upstream = {name: output.content for name, output in (step_input.previous_step_outputs or {}).items()}
+        payload = {"run": run_id, "executor": executor, "input": step_input.get_input_as_string(), "upstream": upstream}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[StepOutput]:
+        output, _ = self.entries.get(key)
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return output
+
+    def put(self, key: str, output: StepOutput) -> None:
+        self.entries.put(key, output)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+def memoize_step(*reads: str) -> Callable[[StepExecutor], MemoizedExecutor]:
+    """
+    Reuse an async step executor's output when it is called again with the same inputs in one run.
+
+    Args:
+        *reads: Names of the upstream steps whose content the executor uses; by default every
+            previous step output is part of the key
+
+    Returns:
+        A decorator for async step executors
+    """
+
+    def decorate(executor: StepExecutor) -> MemoizedExecutor:
+        # agno passes run_context only to executors that declare it, so the wrapper declares it
+        # and deliberately does not set __wrapped__ (inspect.signature would follow it)
+        async def memoized(step_input: StepInput, run_context: Optional[RunContext] = None) -> StepOutput:
+            if run_context is None:
+                return await executor(step_input)
+            key = step_memo.key(run_context.run_id, executor.__qualname__, step_input, reads)
+            cached = step_memo.get(key)
+            if cached is not None:
+                log.debug(f"Reusing the output of {executor.__name__} from earlier in run {run_context.run_id}")
+                return cached
+            output = await executor(step_input)
+            if output.success:
+                step_memo.put(key, output)
+            return output
+
+        memoized.__name__ = executor.__name__
+        memoized.__qualname__ = executor.__qualname__
+        memoized.__doc__ = executor.__doc__
+        return memoized
+
+    return decorate
+
+
+# Global memo shared by every workflow in the process
+step_memo = StepMemo()
@@ -0,0 +1,48 @@
+"""
+Token streaming from custom step executors into the workflow stream.
+
+The workflows' steps are async functions that return a StepOutput once their agent has finished,
+so a streamed workflow run used to show nothing until the first step was done. agno forwards the
+events a step yields, but turning every executor into an async generator would also change the
+loops, memoized steps and checkpoints built around them. Instead, a streamed StepGraph registers a
+sink for its run; executors running inside it stream their agent (stream_agent() in
+workflows.quality) and emit every content delta to the sink, tagged with the step name. The graph
+forwards these events with the step started/completed events of its nodes, in the order they
+happen, so the client sees the first token of the first step as soon as the model produces it.
+Outside a streamed graph there is no sink and executors run their agents without streaming.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+# Receives the content events of the step executors of the streamed run being executed
+TokenSink = Callable[[Any], None]
+current_sink: ContextVar[Optional[TokenSink]] = ContextVar("workflow_token_sink", default=None)
+
+
+def streaming() -> bool:
+    """Whether the executor runs inside a streamed workflow run that forwards its tokens."""
+    return current_sink.get() is not None
+
+
+def emit(event: Any, step: str) -> None:
+    """Forward an agent's content event to the streamed run, tagged with the step it belongs to."""
+    sink = current_sink.get()
+    if sink is None:
+        return
+    if getattr(event, "step_name", None) is None:
+        event.step_name = step
+    sink(event)
+
+
+@contextmanager
+def token_sink(sink: TokenSink) -> Iterator[None]:
+    """Send the tokens of executors started inside the block (including tasks created there) to a sink."""
+    token = current_sink.set(sink)
+    try:
+        yield
+    finally:
+        current_sink.reset(token)
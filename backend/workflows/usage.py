@@ -0,0 +1,64 @@
+"""
+Model token usage of the workflow runs being executed.
+
+Step executors run their agents through run_agent() (workflows.checkpoint) and stream_agent()
+(workflows.quality), which record the token counts of every finished agent run into the usage
+tracked by the caller, if any. Job workers (app.jobs) track the usage of each job this way, so a
+batch can report the tokens it consumed. Outside a tracked block, recording does nothing.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+
+@dataclass
+class TokenUsage:
+    """Tokens consumed by the agent runs of one tracked block."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    runs: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def add(self, input_tokens: int, output_tokens: int) -> None:
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.runs += 1
+
+
+current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("workflow_token_usage", default=None)
+
+
+def record_usage(metrics: Any = None, output_tokens: int = 0) -> None:
+    """
+    Add an agent run's token counts to the tracked usage.
+
+    Args:
+        metrics: The run's metrics (agno Metrics); None when the run was stopped before it reported them
+        output_tokens: Tokens received, counted instead when there are no metrics
+    """
+    usage = current_usage.get()
+    if usage is None:
+        return
+    if metrics is not None:
+        usage.add(metrics.input_tokens or 0, metrics.output_tokens or 0)
+    else:
+        usage.add(0, output_tokens)
+
+
+@contextmanager
+def track_usage(usage: Optional[TokenUsage] = None) -> Iterator[TokenUsage]:
+    """Record the token usage of agent runs started inside the block (including tasks created there)."""
+    usage = usage if usage is not None else TokenUsage()
+    token = current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        current_usage.reset(token)
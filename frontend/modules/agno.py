@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import AsyncGenerator, Dict, List, Literal, Optional
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Literal, Optional
 
 from agno.client import AgentOSClient
 from agno.db.base import SessionType
@@ -39,6 +39,49 @@ class Entity:
         )
 
 
+async def _workflow_chunks(stream: AsyncIterator[Any]) -> AsyncGenerator[str, None]:
+    """
+    Turn a workflow's event stream into message chunks, one step at a time.
+
+    Workflow steps stream their agents' tokens (RunContent events tagged with the step name), and
+    steps that run at the same time interleave them. The first step to stream is shown live under
+    its name; tokens of other steps are held back and shown once the live step completes. Step and
+    workflow outputs, which repeat the streamed tokens, are only shown when nothing was streamed.
+    """
+    live: Optional[str] = None
+    held: Dict[str, List[str]] = {}
+    completed = set()
+    streamed = False
+    async for event in stream:
+        kind = getattr(event, "event", None)
+        if kind == "RunContent" and event.content:
+            streamed = True
+            step = event.step_name or ""
+            if live is None:
+                live = step
+                yield f"\n\n### {step}\n\n"
+            if step == live:
+                yield event.content
+            else:
+                held.setdefault(step, []).append(event.content)
+        elif kind == "StepCompleted":
+            completed.add(event.step_name)
+            if event.step_name != live:
+                continue
+            # Show the held steps in the order they started; the first one still running goes live
+            live = None
+            while live is None and held:
+                step, tokens = next(iter(held.items()))
+                del held[step]
+                yield f"\n\n### {step}\n\n" + "".join(tokens)
+                if step not in completed:
+                    live = step
+        elif not streamed and getattr(event, "content", None):
+            yield event.content
+    for step, tokens in held.items():
+        yield f"\n\n### {step}\n\n" + "".join(tokens)
+
+
 class AgnoClientError(Exception):
     """Base exception for AgnoService errors."""
 
@@ -195,6 +238,11 @@ class AgnoClient:
                 case "team":
                     stream = self.client.run_team_stream(team_id=entity_id, **params)
 
+            if entity_type == "workflow":
+                async for chunk in _workflow_chunks(stream):
+                    yield chunk
+                return
+
             async for event in stream:
                 if hasattr(event, "content") and event.content:
                     yield event.content